@@ -25,7 +25,57 @@ if (-not (Test-Path $LogDir)) {
 $Timestamp = Get-Date -Format "yyyyMMdd_HHmmss"
 $ErrorLog = Join-Path $LogDir "error_$Timestamp.log"
 
-# 関数: エラーログを記録
+# 伏せ字に使うPythonをスクリプトの開始時に1回だけ探す
+$RedactPython = Get-Command python3, python -CommandType Application -ErrorAction SilentlyContinue | Select-Object -First 1
+
+# Pythonがない場合の置換（Pythonのルールと同じ値を伏せ字にする: AWSアクセスキーID、
+# AWSシークレットアクセスキー・セッショントークン、秘密鍵の本文、引用符で囲んだパスワードなどの値）。
+# 変数参照も区別せずに伏せ字にする（伏せ字が多くなる側に倒す）
+$RedactReplacements = @(
+    @('(?s)(-----BEGIN (?:[A-Z]+ )?PRIVATE KEY-----).*?(?=-----END|$)', '$1********'),
+    @('AKIA[0-9A-Z]{16}', 'AKIA****************'),
+    @('((?:aws_secret_access_key|secret_access_key|SecretAccessKey|AWS_SECRET_ACCESS_KEY|aws_session_token|session_token|SessionToken)\s*[=:]\s*["'']?)[A-Za-z0-9/+=]{40,}', '$1****************************************'),
+    @('(?i)((?:password|secret|api_key|access_key|private_key|token|credentials)\s*=\s*)(?:"[^"]{3,}"|''[^'']{3,}'')', '$1"********"')
+)
+
+# 関数: テキストのシークレットを伏せ字にする
+# （tests/secret_scan のルールでストリーミング処理する。Pythonがない場合は $RedactReplacements の置換）
+function Hide-SecretText {
+    param(
+        [string]$Text
+    )
+    
+    $Python = $RedactPython
+    if ($Python) {
+        $PreviousOutputEncoding = $OutputEncoding
+        $PreviousConsoleEncoding = [Console]::OutputEncoding
+        Push-Location $ProjectRoot
+        try {
+            # Pythonとの受け渡しはUTF-8で行う
+            $OutputEncoding = [System.Text.UTF8Encoding]::new($false)
+            [Console]::OutputEncoding = [System.Text.UTF8Encoding]::new($false)
+            $Redacted = $Text | & $Python.Source -m tests.secret_scan redact 2>$null
+            if ($LASTEXITCODE -eq 0) {
+                return ($Redacted -join [Environment]::NewLine)
+            }
+        }
+        catch {
+            # Pythonで処理できない場合は下の置換で伏せ字にする
+        }
+        finally {
+            $OutputEncoding = $PreviousOutputEncoding
+            [Console]::OutputEncoding = $PreviousConsoleEncoding
+            Pop-Location
+        }
+    }
+    
+    foreach ($Replacement in $RedactReplacements) {
+        $Text = $Text -creplace $Replacement[0], $Replacement[1]
+    }
+    return $Text
+}
+
+# 関数: エラーログを記録（コマンドと出力は伏せ字にしてから書き込む）
 function Write-ErrorLog {
     param(
         [string]$ErrorMessage,
@@ -33,6 +83,9 @@ function Write-ErrorLog {
         [int]$ExitCode
     )
     
+    $ErrorMessage = Hide-SecretText -Text $ErrorMessage
+    $Command = Hide-SecretText -Text $Command
+    
     $LogContent = @"
 ========================================
 エラー発生日時: $(Get-Date -Format 'yyyy-MM-dd HH:mm:ss')
@@ -5,25 +5,67 @@
 set -e
 
 # ログディレクトリの作成
-LOG_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)/logs"
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/.." && pwd)"
+LOG_DIR="$PROJECT_ROOT/logs"
 mkdir -p "$LOG_DIR"
 
 # ログファイル名（タイムスタンプ付き）
 TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
 ERROR_LOG="$LOG_DIR/error_${TIMESTAMP}.log"
 
-# 関数: エラーログを記録
+# 伏せ字に使うPython（tests/secret_scan を読み込めるもの）をスクリプトの開始時に1回だけ探す
+REDACT_WITH_PYTHON=""
+for python_bin in python3 python; do
+    if command -v "$python_bin" > /dev/null 2>&1 && \
+        (cd "$PROJECT_ROOT" && "$python_bin" -c "import tests.secret_scan.redact" > /dev/null 2>&1); then
+        REDACT_WITH_PYTHON="$python_bin"
+        break
+    fi
+done
+
+# Pythonがない場合の置換（Pythonのルールと同じ値を伏せ字にする: AWSアクセスキーID、
+# AWSシークレットアクセスキー・セッショントークン、秘密鍵の本文、引用符で囲んだパスワードなどの値）。
+# 変数参照も区別せずに伏せ字にする（伏せ字が多くなる側に倒す）
+REDACT_SED_SCRIPT=$(cat <<'SED'
+s/(-----BEGIN ([A-Z]+ )?PRIVATE KEY-----)[^-]+/\1********/g
+s/AKIA[0-9A-Z]{16}/AKIA****************/g
+s/((aws_secret_access_key|secret_access_key|SecretAccessKey|AWS_SECRET_ACCESS_KEY|aws_session_token|session_token|SessionToken)[[:space:]]*[=:][[:space:]]*["']?)[A-Za-z0-9/+=]{40,}/\1****************************************/g
+s/(([Pp][Aa][Ss][Ss][Ww][Oo][Rr][Dd]|[Ss][Ee][Cc][Rr][Ee][Tt]|[Aa][Pp][Ii]_[Kk][Ee][Yy]|[Aa][Cc][Cc][Ee][Ss][Ss]_[Kk][Ee][Yy]|[Pp][Rr][Ii][Vv][Aa][Tt][Ee]_[Kk][Ee][Yy]|[Tt][Oo][Kk][Ee][Nn]|[Cc][Rr][Ee][Dd][Ee][Nn][Tt][Ii][Aa][Ll][Ss])[[:space:]]*=[[:space:]]*)("[^"]{3,}"|'[^']{3,}')/\1"********"/g
+/-----BEGIN ([A-Z]+ )?PRIVATE KEY-----/{
+/-----END/!{
+:private_key
+n
+/-----END/!{
+s/[^[:space:]]/*/g
+b private_key
+}
+}
+}
+SED
+)
+
+# 関数: 標準入力のシークレットを伏せ字にして標準出力に書き出す
+# （tests/secret_scan のルールでストリーミング処理する。Pythonがない場合は REDACT_SED_SCRIPT の置換）
+redact_output() {
+    if [ -n "$REDACT_WITH_PYTHON" ]; then
+        (cd "$PROJECT_ROOT" && "$REDACT_WITH_PYTHON" -m tests.secret_scan redact)
+    else
+        sed -E -e "$REDACT_SED_SCRIPT"
+    fi
+}
+
+# 関数: エラーログを記録（出力は伏せ字にしたファイルから追記する）
 log_error() {
-    local error_message="$1"
+    local output_file="$1"
     local command="$2"
     local exit_code="$3"
     
     echo "========================================" >> "$ERROR_LOG"
     echo "エラー発生日時: $(date '+%Y-%m-%d %H:%M:%S')" >> "$ERROR_LOG"
-    echo "コマンド: $command" >> "$ERROR_LOG"
+    echo "コマンド: $command" | redact_output >> "$ERROR_LOG"
     echo "終了コード: $exit_code" >> "$ERROR_LOG"
     echo "エラーメッセージ:" >> "$ERROR_LOG"
-    echo "$error_message" >> "$ERROR_LOG"
+    cat "$output_file" >> "$ERROR_LOG"
     echo "========================================" >> "$ERROR_LOG"
     echo "" >> "$ERROR_LOG"
     
@@ -38,13 +80,21 @@ run_terraform_command() {
     
     echo "🔄 $description を実行中..."
     
-    # コマンドを実行してエラーをキャプチャ
-    if output=$(cd terraform && eval "$command" 2>&1); then
+    # コマンドの出力を伏せ字にしながら一時ファイルに書き出す（出力全体をメモリに保持しない）
+    local output_file
+    output_file=$(mktemp "$LOG_DIR/.output_XXXXXX")
+    set +e
+    (cd terraform && eval "$command" 2>&1) | redact_output > "$output_file"
+    local exit_code=${PIPESTATUS[0]}
+    set -e
+
+    if [ "$exit_code" -eq 0 ]; then
+        rm -f "$output_file"
         echo "✅ $description が正常に完了しました"
         return 0
     else
-        exit_code=$?
-        log_error "$output" "$command" "$exit_code"
+        log_error "$output_file" "$command" "$exit_code"
+        rm -f "$output_file"
         return $exit_code
     fi
 }
@@ -0,0 +1,2 @@
+# Secret Scan Benchmark Package
+# シークレットスキャナーのスループット・メモリ使用量・検出精度のベンチマーク
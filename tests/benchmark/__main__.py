@@ -0,0 +1,95 @@
+"""
+ベンチマークのコマンドラインインターフェース
+
+合成コーパスを生成してスキャナーを計測し、ベースラインと比較します。
+GB単位のコーパスなど、pytestの既定（1MB）より大きな計測に使います。
+
+使用例:
+    # 1MB〜1GBのコーパスで計測し、ベースラインと比較する
+    python -m tests.benchmark --sizes 1M,64M,1G
+
+    # 計測結果でベースライン（tests/benchmark/baselines.json）を更新する
+    python -m tests.benchmark --sizes 1M,64M --update-baselines
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .corpus import SCANNER_NAMES, generate_corpus
+from .runner import (
+    find_regressions,
+    format_table,
+    load_baselines,
+    measure,
+    parse_size,
+    save_baselines,
+)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを構築する"""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.benchmark",
+        description="シークレットスキャナーのベンチマーク",
+    )
+    parser.add_argument(
+        "--sizes", default="1M", help="コーパスの大きさ（カンマ区切り。例: 1M,64M,1G）"
+    )
+    parser.add_argument(
+        "--scanners", default=",".join(SCANNER_NAMES), help="計測するスキャナー（カンマ区切り）"
+    )
+    parser.add_argument(
+        "--corpus-dir", type=Path, help="コーパスを書き出すディレクトリ（既定は一時ディレクトリ）"
+    )
+    parser.add_argument(
+        "--update-baselines", action="store_true", help="計測結果でベースラインを更新する"
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """エントリポイント: 回帰があれば終了コード1を返す"""
+    args = build_parser().parse_args(argv)
+    scanners = [name.strip() for name in args.scanners.split(",") if name.strip()]
+    size_labels = [label.strip().upper() for label in args.sizes.split(",") if label.strip()]
+
+    measurements = []
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        corpus_dir = args.corpus_dir or Path(temporary_dir)
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        for size_label in size_labels:
+            corpus_path = corpus_dir / f"corpus-{size_label}.tf"
+            print(f"コーパスを生成しています: {corpus_path}", file=sys.stderr)
+            truth = generate_corpus(corpus_path, parse_size(size_label))
+            for scanner in scanners:
+                measurements.append(measure(scanner, corpus_path, truth, size_label))
+            if args.corpus_dir is None:
+                corpus_path.unlink()
+
+    print(format_table(measurements))
+
+    if args.update_baselines:
+        save_baselines(measurements)
+        print("\nベースラインを更新しました", file=sys.stderr)
+        return 0
+
+    baselines = load_baselines()
+    regressions = []
+    for measurement in measurements:
+        baseline = baselines.get(measurement.scanner, {}).get(measurement.size_label)
+        if baseline is not None:
+            regressions.extend(find_regressions(measurement, baseline))
+
+    if regressions:
+        print("\n❌ ベースラインからの回帰:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  - {regression}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
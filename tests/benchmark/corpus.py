@@ -0,0 +1,199 @@
+"""
+ベンチマーク用の合成コーパスの生成
+
+プロパティテストのHypothesisのテキスト生成戦略から取り出した行（埋め草）に、
+検出されるべき認証情報（植え込み）と検出されてはいけない紛らわしい行（おとり）を
+一定間隔で混ぜたファイルを生成します。植え込み・おとりの行番号を正解として記録し、
+適合率・再現率の計算に使います。
+
+生成は乱数のシードとHypothesisの derandomize により決定的で、同じ大きさのコーパスは
+常に同じ内容になります（ベースラインの適合率・再現率が安定する）。
+"""
+
+import random
+import re
+import string
+import unicodedata
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Set, Tuple
+
+from hypothesis import HealthCheck, Phase, given, settings, strategies as st
+
+from tests.secret_scan import (
+    AWS_CREDENTIAL_PATTERNS,
+    EXAMPLE_KEYS,
+    SENSITIVE_CHECKS,
+    SENSITIVE_PATTERNS,
+)
+from tests.property.test_secret_scan_engine import secret_like_text
+
+
+# ベンチマーク対象のスキャナー名
+SCANNER_NAMES = ("aws", "sensitive")
+
+# 埋め草の行を取り出す例の数（戦略ごと）
+FILLER_EXAMPLES = 400
+
+# 植え込み・おとりを入れる間隔（行数）。各区間に植え込み1行とおとり1行を入れる
+PLANT_INTERVAL = 400
+
+# 1回に書き込む行数（PLANT_INTERVAL の倍数）
+WRITE_CHUNK_LINES = 2000
+
+_BASE64_CHARS = string.ascii_letters + string.digits + "+/"
+_KEY_ID_CHARS = string.ascii_uppercase + string.digits
+
+
+class GroundTruth(NamedTuple):
+    """コーパスの正解（行番号は1始まり）"""
+
+    size: int  # コーパスの大きさ（バイト）
+    lines: int  # 行数
+    positives: Dict[str, FrozenSet[int]]  # スキャナー名 → 検出されるべき行
+    decoys: FrozenSet[int]  # おとりの行
+
+
+def _random_key_id(rng: random.Random) -> str:
+    return "AKIA" + "".join(rng.choices(_KEY_ID_CHARS, k=16))
+
+
+def _random_secret_key(rng: random.Random) -> str:
+    return "".join(rng.choices(_BASE64_CHARS, k=40))
+
+
+def _random_password(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits + "!@%^*-_", k=rng.randint(12, 24)))
+
+
+# 植え込む認証情報: (行を生成する関数, 検出すべきスキャナー)
+PLANTS: List[Tuple[Callable[[random.Random], str], FrozenSet[str]]] = [
+    (lambda rng: f'aws_access_key_id = "{_random_key_id(rng)}"', frozenset({"aws", "sensitive"})),
+    (lambda rng: f'aws_secret_access_key = "{_random_secret_key(rng)}"', frozenset({"aws", "sensitive"})),
+    (lambda rng: f"AWS_SECRET_ACCESS_KEY={_random_secret_key(rng)}", frozenset({"aws", "sensitive"})),
+    (lambda rng: f'  SessionToken: "{_random_secret_key(rng) * 3}"', frozenset({"aws", "sensitive"})),
+    (lambda rng: f'  password = "{_random_password(rng)}"', frozenset({"sensitive"})),
+    (lambda rng: f'  token    = "{_random_password(rng)}"', frozenset({"sensitive"})),
+]
+
+# おとり: 検出されてはいけない行（例示用のキー・コメント・変数参照・形式の合わない文字列）
+DECOYS: List[Callable[[random.Random], str]] = [
+    lambda rng: f'aws_access_key_id = "{EXAMPLE_KEYS[0]}"',
+    lambda rng: f'aws_secret_access_key = "{EXAMPLE_KEYS[1]}"',
+    lambda rng: f'# aws_access_key_id = "{_random_key_id(rng)}"',
+    lambda rng: f'  # password = "{_random_password(rng)}"',
+    lambda rng: '  password = "var.db_password"',
+    lambda rng: '  token    = "data.aws_ssm_parameter.token.value"',
+    lambda rng: f'  key_id = "akia{_random_key_id(rng)[4:].lower()}"',
+    lambda rng: f'  secret_access_key = "{_random_secret_key(rng)[:20]}"',
+]
+
+
+def _reference_hits(line: str) -> bool:
+    """行が検出ルールの仕様（パターンごとの re.findall）に一致するか"""
+    for pattern, _ in AWS_CREDENTIAL_PATTERNS:
+        if re.search(pattern, line):
+            return True
+    for pattern, name in SENSITIVE_PATTERNS:
+        check = SENSITIVE_CHECKS.get(name)
+        for rule_match in re.finditer(pattern, line):
+            if check is None or check(line, rule_match.start(), rule_match.end()):
+                return True
+    return False
+
+
+def _plain_line(line: str) -> str:
+    """
+    タブ以外の制御文字・サロゲートを空白に置き換える
+
+    制御文字はバイナリ判定に、\r は行の区切りに影響するため埋め草には使いません。
+    """
+    return "".join(
+        char if char == "\t" or unicodedata.category(char) not in ("Cc", "Cs") else " "
+        for char in line
+    )
+
+
+def _draw_examples(strategy, count: int) -> List[str]:
+    """Hypothesisの戦略から決定的に例を取り出す"""
+    examples = []
+
+    @settings(
+        max_examples=count,
+        derandomize=True,
+        database=None,
+        phases=[Phase.generate],
+        suppress_health_check=list(HealthCheck),
+        deadline=None,
+    )
+    @given(strategy)
+    def collect(value):
+        examples.append(value)
+
+    collect()
+    return examples
+
+
+def filler_lines() -> List[str]:
+    """
+    埋め草の行を返す
+
+    プロパティテストの戦略（シークレット風のテキスト・任意のテキスト）から取り出した行のうち、
+    検出ルールの仕様に一致しない行だけを使います。埋め草での検出はすべて誤検知になります。
+
+    Returns:
+        埋め草の行のリスト（重複なし、順序は決定的）
+    """
+    lines: Dict[str, None] = {}
+    for strategy in (secret_like_text, st.text(min_size=20, max_size=200)):
+        for example in _draw_examples(strategy, FILLER_EXAMPLES):
+            for line in example.split("\n"):
+                line = _plain_line(line)
+                if not _reference_hits(line):
+                    lines[line] = None
+    return list(lines)
+
+
+def generate_corpus(path: Path, size: int, seed: int = 0) -> GroundTruth:
+    """
+    合成コーパスをファイルに書き出す
+
+    Args:
+        path: 書き出すファイルのパス
+        size: おおよその大きさ（バイト。行の途中では切らないため少し超える）
+        seed: 乱数のシード
+
+    Returns:
+        コーパスの正解
+    """
+    rng = random.Random(seed)
+    fillers = filler_lines()
+    positives: Dict[str, Set[int]] = {name: set() for name in SCANNER_NAMES}
+    decoys: Set[int] = set()
+
+    written = 0
+    line_num = 0
+    with open(path, "wb") as f:
+        while written < size:
+            chunk = rng.choices(fillers, k=WRITE_CHUNK_LINES)
+            for interval_start in range(0, WRITE_CHUNK_LINES, PLANT_INTERVAL):
+                plant_offset, decoy_offset = rng.sample(range(PLANT_INTERVAL), 2)
+
+                make_line, scanners = rng.choice(PLANTS)
+                chunk[interval_start + plant_offset] = make_line(rng)
+                for name in scanners:
+                    positives[name].add(line_num + interval_start + plant_offset + 1)
+
+                chunk[interval_start + decoy_offset] = rng.choice(DECOYS)(rng)
+                decoys.add(line_num + interval_start + decoy_offset + 1)
+
+            data = ("\n".join(chunk) + "\n").encode("utf-8")
+            f.write(data)
+            written += len(data)
+            line_num += len(chunk)
+
+    return GroundTruth(
+        size=written,
+        lines=line_num,
+        positives={name: frozenset(lines) for name, lines in positives.items()},
+        decoys=frozenset(decoys),
+    )
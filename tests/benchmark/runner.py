@@ -0,0 +1,225 @@
+"""
+スキャナーのスループット・メモリ使用量・検出精度の計測とベースラインとの比較
+
+計測はスキャンごとに新しいプロセス（spawn）で行い、そのプロセスの最大RSSを
+ピークメモリ使用量として報告します。ベースラインは baselines.json に保存し、
+スループット・ピークRSS・適合率・再現率のいずれかが許容範囲を超えて悪化した場合に
+回帰として報告します。
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .corpus import GroundTruth
+
+
+# 計測対象のスキャン関数: スキャナー名 → (モジュール, 関数名)
+SCANNERS = {
+    "aws": ("tests.property.test_aws_credentials_security", "scan_file_for_aws_credentials"),
+    "sensitive": ("tests.property.test_terraform_security", "scan_file_for_secrets"),
+}
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+# スループットの許容低下率（0.5: ベースラインの半分までは許容。マシンの性能差を吸収する）
+SPEED_TOLERANCE = float(os.getenv("SECRET_SCAN_BENCH_SPEED_TOLERANCE", "0.5"))
+
+# ピークRSSの許容増加（ベースラインの RSS_TOLERANCE 倍 + RSS_SLACK_MB まで）
+RSS_TOLERANCE = 1.25
+RSS_SLACK_MB = 32.0
+
+_SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class Measurement(NamedTuple):
+    """1つのスキャナー・コーパスの計測結果"""
+
+    scanner: str
+    size_label: str  # コーパスの大きさの表記（"1M", "1G" など）
+    size: int  # コーパスの実際の大きさ（バイト）
+    seconds: float
+    mb_per_s: float
+    peak_rss_mb: Optional[float]  # 計測できない環境（Windows）ではNone
+    precision: float
+    recall: float
+    false_positives: int
+
+    def baseline_entry(self) -> Dict[str, float]:
+        """ベースラインとして保存する値"""
+        entry = {
+            "mb_per_s": round(self.mb_per_s, 1),
+            "precision": round(self.precision, 6),
+            "recall": round(self.recall, 6),
+        }
+        if self.peak_rss_mb is not None:
+            entry["peak_rss_mb"] = round(self.peak_rss_mb, 1)
+        return entry
+
+
+def parse_size(label: str) -> int:
+    """
+    大きさの表記（"1M", "512K", "4G"）をバイト数に変換する
+
+    Raises:
+        ValueError: 表記が不正な場合
+    """
+    label = label.strip().upper()
+    unit = _SIZE_UNITS.get(label[-1:])
+    if unit is None:
+        return int(label)
+    return int(float(label[:-1]) * unit)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """このプロセスの最大RSS（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト単位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure_in_process(
+    scanner: str, corpus_path: str, positives: FrozenSet[int]
+) -> Dict[str, object]:
+    """計測用のプロセスでスキャンを1回実行する"""
+    module_name, function_name = SCANNERS[scanner]
+    scan = getattr(importlib.import_module(module_name), function_name)
+
+    start = time.perf_counter()
+    findings = scan(Path(corpus_path))
+    seconds = time.perf_counter() - start
+
+    # 検出は行単位で評価する（同じ行に複数のルールが一致しても1件）
+    flagged = {line_num for _, _, line_num in findings}
+    true_positives = len(flagged & positives)
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": _peak_rss_mb(),
+        "precision": true_positives / len(flagged) if flagged else 1.0,
+        "recall": true_positives / len(positives) if positives else 1.0,
+        "false_positives": len(flagged - positives),
+    }
+
+
+def measure(scanner: str, corpus_path: Path, truth: GroundTruth, size_label: str) -> Measurement:
+    """
+    スキャナーのスループット・ピークRSS・適合率・再現率を計測する
+
+    Args:
+        scanner: スキャナー名（SCANNERS のキー）
+        corpus_path: コーパスのパス
+        truth: コーパスの正解
+        size_label: コーパスの大きさの表記
+
+    Returns:
+        計測結果
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        result = executor.submit(
+            _measure_in_process, scanner, str(corpus_path), truth.positives[scanner]
+        ).result()
+
+    seconds = result["seconds"]
+    return Measurement(
+        scanner=scanner,
+        size_label=size_label,
+        size=truth.size,
+        seconds=seconds,
+        mb_per_s=truth.size / (1024 * 1024) / seconds if seconds > 0 else float("inf"),
+        peak_rss_mb=result["peak_rss_mb"],
+        precision=result["precision"],
+        recall=result["recall"],
+        false_positives=result["false_positives"],
+    )
+
+
+def load_baselines(path: Path = BASELINES_PATH) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """ベースラインを読み込む（ファイルがない場合は空）"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(measurements: List[Measurement], path: Path = BASELINES_PATH) -> None:
+    """計測結果でベースラインを更新する（計測していないスキャナー・大きさの値は残す）"""
+    baselines = load_baselines(path)
+    for measurement in measurements:
+        baselines.setdefault(measurement.scanner, {})[measurement.size_label] = (
+            measurement.baseline_entry()
+        )
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def find_regressions(
+    measurement: Measurement, baseline: Dict[str, float], check_performance: bool = True
+) -> List[str]:
+    """
+    計測結果をベースラインと比較する
+
+    Args:
+        measurement: 計測結果
+        baseline: 同じスキャナー・大きさのベースライン
+        check_performance: スループット・ピークRSSも比較する（Falseの場合は適合率・再現率のみ。
+            ベースラインを記録したマシンと性能が異なるマシン向け）
+
+    Returns:
+        回帰の説明のリスト（回帰がない場合は空）
+    """
+    regressions = []
+    name = f"{measurement.scanner} ({measurement.size_label})"
+
+    minimum_speed = baseline["mb_per_s"] * (1 - SPEED_TOLERANCE)
+    if check_performance and measurement.mb_per_s < minimum_speed:
+        regressions.append(
+            f"{name}: スループット {measurement.mb_per_s:.1f} MB/s が下限 {minimum_speed:.1f} MB/s"
+            f"（ベースライン {baseline['mb_per_s']:.1f} MB/s）を下回りました"
+        )
+
+    if check_performance and measurement.peak_rss_mb is not None and "peak_rss_mb" in baseline:
+        maximum_rss = baseline["peak_rss_mb"] * RSS_TOLERANCE + RSS_SLACK_MB
+        if measurement.peak_rss_mb > maximum_rss:
+            regressions.append(
+                f"{name}: ピークRSS {measurement.peak_rss_mb:.1f} MB が上限 {maximum_rss:.1f} MB"
+                f"（ベースライン {baseline['peak_rss_mb']:.1f} MB）を超えました"
+            )
+
+    # コーパスは決定的なため、検出精度は少しでも下がれば回帰とする
+    for metric in ("precision", "recall"):
+        value = getattr(measurement, metric)
+        if value < baseline[metric] - 1e-6:
+            regressions.append(
+                f"{name}: {metric} {value:.4f} がベースライン {baseline[metric]:.4f} を下回りました"
+            )
+
+    return regressions
+
+
+def format_table(measurements: List[Measurement]) -> str:
+    """計測結果を表形式の文字列にする"""
+    header = f"{'scanner':<10} {'size':>6} {'MB/s':>8} {'peak RSS':>10} {'precision':>10} {'recall':>8} {'FP':>6}"
+    rows = [header, "-" * len(header)]
+    for m in measurements:
+        rss = "-" if m.peak_rss_mb is None else f"{m.peak_rss_mb:.1f} MB"
+        rows.append(
+            f"{m.scanner:<10} {m.size_label:>6} {m.mb_per_s:>8.1f} {rss:>10} "
+            f"{m.precision:>10.4f} {m.recall:>8.4f} {m.false_positives:>6}"
+        )
+    return "\n".join(rows)
@@ -0,0 +1,100 @@
+"""
+Benchmark Test: シークレットスキャナーのスループットと検出精度
+
+**Validates: Requirements 6.4, 8.4**
+
+このテストは、合成コーパスに対するスキャナーの適合率・再現率が
+ベースライン（baselines.json）から悪化していないことを検証します。
+スループット・ピークRSSはベースラインを記録したマシンの値のため、環境変数 SECRET_SCAN_BENCH_PERF=1 を
+指定した場合のみ比較します（性能の異なるCIのマシンでコードと無関係に失敗しないように）。
+
+計測するコーパスの大きさは環境変数 SECRET_SCAN_BENCH_SIZES（カンマ区切り、既定 1M）で指定します。
+"""
+
+import os
+
+import pytest
+
+from tests.benchmark.corpus import SCANNER_NAMES, generate_corpus
+from tests.benchmark.runner import (
+    Measurement,
+    find_regressions,
+    format_table,
+    load_baselines,
+    measure,
+    parse_size,
+)
+
+
+SIZE_LABELS = [
+    label.strip().upper()
+    for label in os.getenv("SECRET_SCAN_BENCH_SIZES", "1M").split(",")
+    if label.strip()
+]
+
+# スループット・ピークRSSもベースラインと比較する（ベースラインを記録したマシンと同等の環境向け）
+CHECK_PERFORMANCE = os.getenv("SECRET_SCAN_BENCH_PERF") == "1"
+
+
+@pytest.fixture(scope="module", params=SIZE_LABELS)
+def corpus(request, tmp_path_factory):
+    """指定した大きさの合成コーパスと正解を返す"""
+    size_label = request.param
+    corpus_path = tmp_path_factory.mktemp("benchmark") / f"corpus-{size_label}.tf"
+    truth = generate_corpus(corpus_path, parse_size(size_label))
+    yield size_label, corpus_path, truth
+    corpus_path.unlink()
+
+
+@pytest.mark.parametrize("scanner", SCANNER_NAMES)
+def test_scanner_has_no_regression(corpus, scanner):
+    """
+    スキャナーの適合率・再現率（SECRET_SCAN_BENCH_PERF=1 の場合はスループット・ピークRSSも）が
+    ベースラインから悪化していないことを検証します。
+
+    **Validates: Requirements 6.4, 8.4**
+    """
+    size_label, corpus_path, truth = corpus
+    baseline = load_baselines().get(scanner, {}).get(size_label)
+    if baseline is None:
+        pytest.skip(
+            f"{scanner} ({size_label}) のベースラインがありません"
+            f"（python -m tests.benchmark --sizes {size_label} --update-baselines で作成）"
+        )
+
+    measurement = measure(scanner, corpus_path, truth, size_label)
+    regressions = find_regressions(measurement, baseline, check_performance=CHECK_PERFORMANCE)
+
+    assert not regressions, (
+        "❌ スキャナーの性能・検出精度がベースラインから悪化しました:\n"
+        + "\n".join(f"  - {regression}" for regression in regressions)
+        + "\n\n"
+        + format_table([measurement])
+    )
+
+
+def test_corpus_is_deterministic(tmp_path):
+    """
+    同じ大きさ・シードのコーパスが同じ内容・正解になることを検証します（ベースラインの前提）。
+    """
+    first = generate_corpus(tmp_path / "first.tf", parse_size("64K"))
+    second = generate_corpus(tmp_path / "second.tf", parse_size("64K"))
+
+    assert first == second
+    assert (tmp_path / "first.tf").read_bytes() == (tmp_path / "second.tf").read_bytes()
+    assert first.positives["aws"] and first.decoys
+    assert first.positives["aws"] <= first.positives["sensitive"]
+
+
+def test_performance_is_compared_only_on_request():
+    """
+    スループット・ピークRSSの悪化は check_performance=True の場合のみ回帰とし、
+    適合率・再現率の悪化は常に回帰とすることを検証します。
+    """
+    baseline = {"mb_per_s": 100.0, "peak_rss_mb": 50.0, "precision": 1.0, "recall": 1.0}
+    slow = Measurement("aws", "1M", 1024 * 1024, 1.0, 1.0, 500.0, 1.0, 1.0, 0)
+    inaccurate = slow._replace(recall=0.5)
+
+    assert find_regressions(slow, baseline, check_performance=False) == []
+    assert len(find_regressions(slow, baseline)) == 2
+    assert len(find_regressions(inaccurate, baseline, check_performance=False)) == 1
@@ -0,0 +1,45 @@
+# Test Selection Configuration
+# Terraform構成の変更の影響を受けるテストの選択（プロパティテスト・統合テスト共通）
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from tests.tfanalysis.impact import MARKER, impact_from_environment  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: 実行に時間がかかるテスト（terraform plan など）")
+    config.addinivalue_line(
+        "markers",
+        f"{MARKER}(*patterns): テストが検証するTerraformの宣言のアドレス（fnmatch のパターン。'*' は構成全体）",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    環境変数 TF_IMPACT_BASE・TF_IMPACT_FILES が指定された場合、変更の影響を受けるテストだけを選ぶ
+    """
+    try:
+        impact = impact_from_environment(project_root)
+    except subprocess.CalledProcessError as e:
+        raise pytest.UsageError(f"変更したファイルを列挙できません: {e.stderr.decode('utf-8', 'replace').strip()}")
+    if impact is None:
+        return
+
+    selected, deselected = [], []
+    for item in items:
+        patterns = [pattern for mark in item.iter_markers(MARKER) for pattern in mark.args]
+        (selected if impact.selects(item.path, patterns) else deselected).append(item)
+    reporter = config.pluginmanager.get_plugin("terminalreporter")
+    if reporter is not None:
+        reporter.write_line(f"影響範囲: {impact.describe()}")
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
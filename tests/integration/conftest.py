@@ -4,11 +4,39 @@
 
 このファイルは、pytest統合テストで使用する共通設定とフィクスチャを提供します。
 AWS boto3クライアントの初期化、テスト環境の設定などを行います。
+
+環境変数 TF_PLAN_JSON（terraform show -json の出力ファイル）または TF_PLAN_FILE（terraform plan -out
+で保存したプラン）を指定すると、ec2_client はAWSのAPIの代わりにプランのリソースの索引から応答を返します
+（オフライン解析。apply 前にAWSへアクセスせずにアサーションを評価できます）。
+
+ec2_client・logs_client・cloudtrail_client は、セッションで共有するインベントリ（tests.inventory）から
+応答します。describe_* はリソースの種類ごとに1回だけ（ページネーションを最後まで）呼び、以降の呼び出しは
+取得済みの読み取り専用の一覧に Filters などを適用して返すため、同じAPIを繰り返し呼ぶことはありません。
 """
 
-import boto3
 import pytest
 import os
+import sys
+from pathlib import Path
+
+try:
+    import boto3
+except ImportError:  # オフライン解析のみの環境
+    boto3 = None
+
+# プロジェクトルートをPythonパスに追加（tests.secret_scan、tests.tfanalysis を読み込むため）
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from tests.inventory import Inventory  # noqa: E402
+from tests.network import CidrPlan, RouteSimulator, SecurityGroupEvaluator  # noqa: E402
+from tests.tfanalysis import PlanEC2View, ResourceIndex, TerraformModule  # noqa: E402
+
+
+def _boto3_client(service, region):
+    """boto3クライアントを返す（boto3がない場合はテストをスキップ）"""
+    if boto3 is None:
+        pytest.skip("boto3 がインストールされていません（オフライン解析は TF_PLAN_JSON で指定）")
+    return boto3.client(service, region_name=region)
 
 
 @pytest.fixture(scope="session")
@@ -18,45 +46,98 @@ def aws_region():
 
 
 @pytest.fixture(scope="session")
-def ec2_client(aws_region):
-    """EC2クライアントを返すフィクスチャ"""
-    return boto3.client("ec2", region_name=aws_region)
+def plan_index():
+    """
+    プランのリソースの索引を返すフィクスチャ（TF_PLAN_JSON・TF_PLAN_FILE が未指定の場合は None）
+
+    TF_PLAN_FILE の場合は terraform/ ディレクトリで terraform show -json を1回だけ実行します。
+    """
+    plan_json = os.environ.get("TF_PLAN_JSON")
+    if plan_json:
+        return ResourceIndex.load(plan_json)
+    plan_file = os.environ.get("TF_PLAN_FILE")
+    if plan_file:
+        terraform_dir = Path(__file__).parent.parent.parent / "terraform"
+        return ResourceIndex.from_plan_file(Path(plan_file).resolve(), terraform_dir)
+    return None
+
+
+@pytest.fixture(scope="session")
+def aws_inventory():
+    """
+    セッションで共有するAWSのリソースのスナップショットを返すフィクスチャ
+
+    inventory.resources("ec2", "describe_subnets").tagged("Type", "Private") のように、
+    ID・タグ・VPCの索引で直接参照することもできます。inventory.calls はAPIの呼び出し回数です。
+    """
+    return Inventory()
+
+
+@pytest.fixture(scope="session")
+def ec2_client(aws_region, plan_index, aws_inventory):
+    """EC2クライアントを返すフィクスチャ（オフライン解析ではプランの索引による応答）"""
+    if plan_index is not None:
+        return aws_inventory.view("ec2", PlanEC2View(plan_index))
+    return aws_inventory.view("ec2", _boto3_client("ec2", aws_region))
+
+
+@pytest.fixture(scope="session")
+def security_groups(ec2_client):
+    """
+    すべてのセキュリティグループを返すフィクスチャ（describe_security_groups をセッションで1回だけ呼ぶ）
+    """
+    return ec2_client.describe_security_groups()["SecurityGroups"]
+
+
+@pytest.fixture(scope="session")
+def security_group_evaluator(security_groups):
+    """セキュリティグループのルールをコンパイルした到達可能性の評価器を返すフィクスチャ"""
+    return SecurityGroupEvaluator.from_describe(security_groups)
+
+
+@pytest.fixture(scope="session")
+def route_simulator(ec2_client):
+    """
+    ルートテーブルと Client VPN のルート・認可ルールを読み込んだ経路のシミュレーターを返すフィクスチャ
+    （describe_* はセッションで1回だけ呼ぶ）
+    """
+    return RouteSimulator.from_ec2(ec2_client)
 
 
 @pytest.fixture(scope="session")
-def logs_client(aws_region):
+def logs_client(aws_region, aws_inventory):
     """CloudWatch Logsクライアントを返すフィクスチャ"""
-    return boto3.client("logs", region_name=aws_region)
+    return aws_inventory.view("logs", _boto3_client("logs", aws_region))
 
 
 @pytest.fixture(scope="session")
-def cloudtrail_client(aws_region):
+def cloudtrail_client(aws_region, aws_inventory):
     """CloudTrailクライアントを返すフィクスチャ"""
-    return boto3.client("cloudtrail", region_name=aws_region)
+    return aws_inventory.view("cloudtrail", _boto3_client("cloudtrail", aws_region))
 
 
 @pytest.fixture(scope="session")
 def acm_client(aws_region):
     """AWS Certificate Managerクライアントを返すフィクスチャ"""
-    return boto3.client("acm", region_name=aws_region)
+    return _boto3_client("acm", aws_region)
 
 
 @pytest.fixture(scope="session")
 def iam_client(aws_region):
     """IAMクライアントを返すフィクスチャ"""
-    return boto3.client("iam", region_name=aws_region)
+    return _boto3_client("iam", aws_region)
 
 
 @pytest.fixture(scope="session")
 def s3_client(aws_region):
     """S3クライアントを返すフィクスチャ"""
-    return boto3.client("s3", region_name=aws_region)
+    return _boto3_client("s3", aws_region)
 
 
 @pytest.fixture(scope="session")
 def sts_client(aws_region):
     """STSクライアントを返すフィクスチャ（アカウントID取得用）"""
-    return boto3.client("sts", region_name=aws_region)
+    return _boto3_client("sts", aws_region)
 
 
 @pytest.fixture(scope="session")
@@ -65,6 +146,23 @@ def vpc_name():
     return "client-vpn-vpc"
 
 
+@pytest.fixture(scope="session")
+def terraform_module():
+    """Terraformの構成（構文木）を返すフィクスチャ"""
+    return TerraformModule.load(Path(__file__).parent.parent.parent / "terraform")
+
+
+@pytest.fixture(scope="session")
+def cidr_plan(terraform_module):
+    """
+    Terraformの構成から作ったCIDRの割り当て表を返すフィクスチャ
+
+    VPC・サブネット・クライアントCIDRの重なり（CidrConflict）やVPCに含まれないサブネットがある場合は
+    エラーになります。
+    """
+    return CidrPlan.from_module(terraform_module)
+
+
 @pytest.fixture(scope="session")
 def expected_vpc_cidr():
     """期待されるVPC CIDRブロックを返すフィクスチャ"""
@@ -83,6 +181,18 @@ def expected_private_subnet_cidrs():
     return ["192.168.10.0/24", "192.168.11.0/24"]
 
 
+@pytest.fixture(scope="session")
+def expected_pc_client_cidr():
+    """期待されるPC用VPNエンドポイントのClient CIDRを返すフィクスチャ"""
+    return "172.16.0.0/22"
+
+
+@pytest.fixture(scope="session")
+def expected_mobile_client_cidr():
+    """期待されるスマホ用VPNエンドポイントのClient CIDRを返すフィクスチャ"""
+    return "172.17.0.0/22"
+
+
 @pytest.fixture(scope="session")
 def expected_availability_zones():
     """期待されるアベイラビリティゾーンを返すフィクスチャ"""
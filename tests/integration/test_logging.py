@@ -12,6 +12,7 @@
 import pytest
 
 
+@pytest.mark.terraform_resources("aws_cloudwatch_log_*")
 class TestCloudWatchLogs:
     """CloudWatch Logs設定の検証テスト"""
 
@@ -178,6 +179,7 @@ class TestCloudWatchLogs:
             pytest.skip(f"⚠️  CloudWatch Logsグループまたはストリームが見つかりません")
 
 
+@pytest.mark.terraform_resources("aws_cloudtrail.*", "aws_s3_bucket*.cloudtrail")
 class TestCloudTrail:
     """CloudTrail設定の検証テスト"""
 
@@ -6,8 +6,18 @@ Requirements: 5.1, 5.2, 5.4, 5.5
 VPC、サブネット、Internet Gateway、NAT Gatewayが正しく作成されることを検証します。
 """
 
+import ipaddress
+import random
+
 import pytest
 
+from tests.network import INTERNET, LOCAL
+
+# 検証するTerraformの宣言（変更の影響を受けるテストの選択に使用）
+pytestmark = pytest.mark.terraform_resources(
+    "aws_vpc.*", "aws_subnet.*", "aws_internet_gateway.*", "aws_nat_gateway.*", "aws_eip.*", "aws_route_table*",
+)
+
 
 class TestVPCConfiguration:
     """VPC構成の検証テスト"""
@@ -50,6 +60,31 @@ class TestVPCConfiguration:
         assert vpc["EnableDnsSupport"] is True, "DNS Supportが有効化されていません"
 
 
+class TestCidrPlan:
+    """Terraformの構成のCIDRの割り当ての検証テスト（AWSに接続せずに実行できます）"""
+
+    @pytest.mark.terraform_resources("aws_ec2_client_vpn_endpoint.*")
+    def test_cidr_plan_matches_requirements(
+        self, cidr_plan, expected_vpc_cidr, expected_public_subnet_cidrs, expected_private_subnet_cidrs,
+        expected_pc_client_cidr, expected_mobile_client_cidr,
+    ):
+        """
+        Requirements 2.1, 3.1, 5.1, 5.2: Terraformの構成のVPC・サブネット・Client CIDRが互いに重ならず
+        （cidr_plan の作成時に CidrConflict にならないこと）、要件のCIDRと一致することを検証
+        """
+        subnets = {allocation.name: str(allocation.network) for allocation in cidr_plan.by_kind("subnet")}
+        public_cidrs = sorted(cidr for name, cidr in subnets.items() if name.startswith("aws_subnet.public["))
+        private_cidrs = sorted(cidr for name, cidr in subnets.items() if name.startswith("aws_subnet.private["))
+
+        assert str(cidr_plan.get("aws_vpc.main").network) == expected_vpc_cidr
+        assert public_cidrs == sorted(expected_public_subnet_cidrs), \
+            f"パブリックサブネットCIDRが期待値と異なります。期待: {expected_public_subnet_cidrs}, 実際: {public_cidrs}"
+        assert private_cidrs == sorted(expected_private_subnet_cidrs), \
+            f"プライベートサブネットCIDRが期待値と異なります。期待: {expected_private_subnet_cidrs}, 実際: {private_cidrs}"
+        assert str(cidr_plan.get("aws_ec2_client_vpn_endpoint.pc").network) == expected_pc_client_cidr
+        assert str(cidr_plan.get("aws_ec2_client_vpn_endpoint.mobile").network) == expected_mobile_client_cidr
+
+
 class TestSubnetConfiguration:
     """サブネット構成の検証テスト"""
 
@@ -399,3 +434,81 @@ class TestRouteTables:
         
         assert private_subnet_ids == associated_subnet_ids, \
             f"プライベートサブネットがプライベートルートテーブルに正しく関連付けられていません。期待: {private_subnet_ids}, 実際: {associated_subnet_ids}"
+
+
+def sample_destinations(count, exclude, seed=0):
+    """ユニキャストのIPv4アドレスを count 件選ぶ（exclude のCIDRを除く。再現性のため乱数の種を固定）"""
+    excluded = [ipaddress.ip_network(cidr) for cidr in exclude]
+    generator = random.Random(seed)
+    destinations = []
+    while len(destinations) < count:
+        address = ipaddress.IPv4Address(generator.getrandbits(32))
+        if address.is_global and not any(address in network for network in excluded):
+            destinations.append(str(address))
+    return destinations
+
+
+class TestEffectiveRoutes:
+    """ルートの最長一致による実効的な経路の検証テスト"""
+
+    def test_public_subnets_egress_through_internet_gateway(self, ec2_client, route_simulator, expected_vpc_cidr):
+        """
+        Requirements 4.5: パブリックサブネットからインターネットへの通信が Internet Gateway から出ることを検証
+        """
+        subnets = ec2_client.describe_subnets(Filters=[{"Name": "tag:Type", "Values": ["Public"]}])["Subnets"]
+        assert subnets, "パブリックサブネットが見つかりません"
+        destinations = sample_destinations(500, [expected_vpc_cidr])
+        
+        for subnet in subnets:
+            for trace in route_simulator.trace_many(subnet["SubnetId"], destinations):
+                assert trace.outcome == INTERNET and len(trace.hops) == 1, \
+                    f"パブリックサブネットからの通信が Internet Gateway から出ません: {trace}"
+
+    def test_private_subnets_egress_through_nat_gateway(self, ec2_client, route_simulator, expected_vpc_cidr):
+        """
+        Requirements 4.1: プライベートサブネットからインターネットへの通信が NAT Gateway を経由して
+        Internet Gateway から出ることを検証
+        """
+        subnets = ec2_client.describe_subnets(Filters=[{"Name": "tag:Type", "Values": ["Private"]}])["Subnets"]
+        assert subnets, "プライベートサブネットが見つかりません"
+        destinations = sample_destinations(500, [expected_vpc_cidr])
+        
+        for subnet in subnets:
+            for trace in route_simulator.trace_many(subnet["SubnetId"], destinations):
+                kinds = [hop.target.kind for hop in trace.hops]
+                assert trace.outcome == INTERNET and kinds == ["nat-gateway", "internet-gateway"], \
+                    f"プライベートサブネットからの通信が NAT Gateway を経由しません: {trace}"
+
+    @pytest.mark.terraform_resources("aws_ec2_client_vpn_*")
+    def test_client_vpn_full_tunnel_reaches_vpc(self, route_simulator, expected_vpc_cidr):
+        """
+        Requirements 4.1: フルトンネルの Client VPN 利用者の通信が、VPC内へはローカルルートで届くことを検証
+        """
+        vpc = ipaddress.ip_network(expected_vpc_cidr)
+        
+        assert route_simulator.endpoints, "Client VPNエンドポイントが見つかりません"
+        for endpoint_id, endpoint in route_simulator.endpoints.items():
+            assert not endpoint.split_tunnel, f"{endpoint_id} がスプリットトンネルです"
+            client = str(endpoint.client_cidr.network_address + 10)
+            
+            inside = route_simulator.trace(client, str(vpc.network_address + 10))
+            assert inside.outcome == LOCAL, f"{endpoint_id} の利用者がVPCに届きません: {inside}"
+
+    @pytest.mark.xfail(
+        strict=True,
+        reason="構成に Client VPN の 0.0.0.0/0 のルート（aws_ec2_client_vpn_route）がなく、フルトンネルの利用者はインターネットに出られない",
+    )
+    @pytest.mark.terraform_resources("aws_ec2_client_vpn_*")
+    def test_client_vpn_full_tunnel_egress(self, route_simulator, expected_vpc_cidr):
+        """
+        Requirements 4.1: フルトンネルの Client VPN 利用者のインターネットへの通信が、関連付けたサブネットから
+        NAT Gateway を経由して出ることを検証
+        """
+        destinations = sample_destinations(500, [expected_vpc_cidr])
+        
+        assert route_simulator.endpoints, "Client VPNエンドポイントが見つかりません"
+        for endpoint_id, endpoint in route_simulator.endpoints.items():
+            client = str(endpoint.client_cidr.network_address + 10)
+            outcomes = route_simulator.outcomes(client, destinations)
+            assert {outcome for outcome, _ in outcomes} == {INTERNET}, \
+                f"{endpoint_id} の利用者のインターネットへの通信が届きません: {dict(outcomes)}"
@@ -8,37 +8,42 @@ Client VPNエンドポイント用セキュリティグループが正しく設
 
 import pytest
 
+from tests.network import ADMIN_PORTS, Peer
+
+# 検証するTerraformの宣言（変更の影響を受けるテストの選択に使用）
+pytestmark = pytest.mark.terraform_resources("aws_security_group.*", "aws_vpc_security_group_*_rule.*")
+
+VPN_SECURITY_GROUP = "client-vpn-endpoint-sg"
+
+
+@pytest.fixture(scope="module")
+def vpn_security_groups(security_groups):
+    """Client VPNエンドポイント用セキュリティグループ（名前が一致するもの）を返すフィクスチャ"""
+    return [sg for sg in security_groups if sg.get("GroupName") == VPN_SECURITY_GROUP]
+
 
 class TestVPNEndpointSecurityGroup:
     """Client VPNエンドポイント用セキュリティグループの検証テスト"""
 
-    def test_security_group_exists(self, ec2_client):
+    def test_security_group_exists(self, vpn_security_groups):
         """
         Requirements 5.6: Client VPNエンドポイント用セキュリティグループが存在することを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1, \
+        assert len(vpn_security_groups) == 1, \
             "Client VPNエンドポイント用セキュリティグループが見つかりません"
 
-    def test_security_group_description(self, ec2_client):
+    def test_security_group_description(self, vpn_security_groups):
         """
         Requirements 5.6: セキュリティグループに適切な説明が設定されていることを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         assert sg["Description"], "セキュリティグループに説明が設定されていません"
         assert "Client VPN" in sg["Description"], \
             f"セキュリティグループの説明が不適切です: {sg['Description']}"
 
-    def test_security_group_vpc_association(self, ec2_client, vpc_name):
+    def test_security_group_vpc_association(self, ec2_client, vpc_name, vpn_security_groups):
         """
         Requirements 5.6: セキュリティグループが正しいVPCに関連付けられていることを検証
         """
@@ -50,26 +55,18 @@ class TestVPNEndpointSecurityGroup:
         vpc_id = vpcs["Vpcs"][0]["VpcId"]
         
         # セキュリティグループを取得
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         assert sg["VpcId"] == vpc_id, \
             f"セキュリティグループが正しいVPCに関連付けられていません。期待: {vpc_id}, 実際: {sg['VpcId']}"
 
-    def test_security_group_tags(self, ec2_client):
+    def test_security_group_tags(self, vpn_security_groups):
         """
         Requirements 5.6: セキュリティグループに適切なタグが設定されていることを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         tags = {tag["Key"]: tag["Value"] for tag in sg.get("Tags", [])}
         
@@ -87,31 +84,23 @@ class TestVPNEndpointSecurityGroup:
 class TestSecurityGroupIngressRules:
     """セキュリティグループのインバウンドルール検証テスト"""
 
-    def test_ingress_rules_count(self, ec2_client):
+    def test_ingress_rules_count(self, vpn_security_groups):
         """
         Requirements 7.3: インバウンドルールが最小限（UDP 443のみ）であることを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         ingress_rules = sg["IpPermissions"]
         assert len(ingress_rules) == 1, \
             f"インバウンドルールが複数設定されています。期待: 1, 実際: {len(ingress_rules)}"
 
-    def test_ingress_udp_443_allowed(self, ec2_client):
+    def test_ingress_udp_443_allowed(self, vpn_security_groups):
         """
         Requirements 7.3: UDP 443のインバウンドトラフィックが許可されていることを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         ingress_rules = sg["IpPermissions"]
         assert len(ingress_rules) == 1
@@ -128,17 +117,13 @@ class TestSecurityGroupIngressRules:
         assert rule["ToPort"] == 443, \
             f"ToPortが443ではありません: {rule['ToPort']}"
 
-    def test_ingress_source_cidr(self, ec2_client):
+    def test_ingress_source_cidr(self, vpn_security_groups):
         """
         Requirements 7.3: インバウンドルールのソースCIDRが0.0.0.0/0であることを検証
         （Client VPNの性質上、任意の場所からの接続を受け入れる必要がある）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         ingress_rules = sg["IpPermissions"]
         assert len(ingress_rules) == 1
@@ -153,61 +138,45 @@ class TestSecurityGroupIngressRules:
         assert "0.0.0.0/0" in cidrs, \
             f"0.0.0.0/0が許可されていません。実際: {cidrs}"
 
-    def test_no_ssh_rdp_ports_open(self, ec2_client):
+    def test_no_ssh_rdp_ports_open(self, vpn_security_groups, security_group_evaluator):
         """
         Requirements 7.3: SSH（22）やRDP（3389）などの管理ポートが開放されていないことを検証
+        （送信元を問わず、全プロトコルのルールを含む）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
-        
-        ingress_rules = sg["IpPermissions"]
+        assert len(vpn_security_groups) == 1
+        group_id = vpn_security_groups[0]["GroupId"]
         
         # 危険なポートのリスト
         dangerous_ports = [22, 3389, 3306, 5432, 1433, 27017]
         
-        for rule in ingress_rules:
-            from_port = rule.get("FromPort")
-            to_port = rule.get("ToPort")
-            
-            if from_port is not None and to_port is not None:
+        for protocol in ("tcp", "udp"):
+            for from_port, to_port in security_group_evaluator.port_ranges(group_id, "ingress", protocol):
                 for dangerous_port in dangerous_ports:
                     assert not (from_port <= dangerous_port <= to_port), \
-                        f"危険なポート {dangerous_port} が開放されています"
+                        f"危険なポート {dangerous_port}/{protocol} が開放されています"
 
 
 class TestSecurityGroupEgressRules:
     """セキュリティグループのアウトバウンドルール検証テスト"""
 
-    def test_egress_rules_count(self, ec2_client):
+    def test_egress_rules_count(self, vpn_security_groups):
         """
         Requirements 7.3: アウトバウンドルールが設定されていることを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         egress_rules = sg["IpPermissionsEgress"]
         assert len(egress_rules) >= 1, \
             "アウトバウンドルールが設定されていません"
 
-    def test_egress_all_traffic_allowed(self, ec2_client):
+    def test_egress_all_traffic_allowed(self, vpn_security_groups):
         """
         Requirements 7.3: 全アウトバウンドトラフィックが許可されていることを検証
         （VPN経由のインターネットアクセスに必要）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         egress_rules = sg["IpPermissionsEgress"]
         
@@ -233,18 +202,14 @@ class TestSecurityGroupEgressRules:
 class TestSecurityGroupOWASPCompliance:
     """OWASP基準準拠の検証テスト"""
 
-    def test_least_privilege_principle(self, ec2_client):
+    def test_least_privilege_principle(self, vpn_security_groups):
         """
         OWASP準拠: 最小権限の原則が適用されていることを検証
         - インバウンド: UDP 443のみ
         - アウトバウンド: 全トラフィック（VPN用途で必要）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         # インバウンドルールが1つのみであることを確認
         ingress_rules = sg["IpPermissions"]
@@ -257,44 +222,31 @@ class TestSecurityGroupOWASPCompliance:
         assert rule["FromPort"] == 443, "ポートが443ではありません"
         assert rule["ToPort"] == 443, "ポートが443ではありません"
 
-    def test_default_deny_implicit(self, ec2_client):
+    def test_default_deny_implicit(self, vpn_security_groups, security_group_evaluator):
         """
         OWASP準拠: デフォルト拒否が暗黙的に適用されていることを検証
         （AWSセキュリティグループはデフォルトで全インバウンドを拒否）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
-        
-        # 明示的に許可されたルールのみが存在することを確認
-        ingress_rules = sg["IpPermissions"]
-        
-        # 全ポート開放（0-65535）のルールが存在しないことを確認
-        for rule in ingress_rules:
-            from_port = rule.get("FromPort", 0)
-            to_port = rule.get("ToPort", 0)
-            
-            # 全ポート開放を検出
-            is_all_ports = (from_port == 0 and to_port == 65535) or \
-                          (from_port == 0 and to_port == 0 and rule["IpProtocol"] == "-1")
-            
-            assert not is_all_ports, \
-                "全ポート開放のルールが存在します（デフォルト拒否の原則に違反）"
-
-    def test_rule_descriptions_present(self, ec2_client):
+        assert len(vpn_security_groups) == 1
+        group_id = vpn_security_groups[0]["GroupId"]
+        
+        # 全ポート開放（全プロトコル、または 0-65535）のルールが送信元を問わず存在しないことを確認
+        exposures = security_group_evaluator.all_ports_exposures("ingress", world=False, group_ids=[group_id])
+        assert not exposures, \
+            f"全ポート開放のルールが存在します（デフォルト拒否の原則に違反）: {exposures}"
+        
+        # 許可したポート以外（例: TCP 8443）はインターネットから届かないことを確認
+        target = Peer(groups=(group_id,))
+        assert not security_group_evaluator.can_reach(Peer("203.0.113.10"), target, "tcp", 8443), \
+            "明示的に許可していないポートへのアクセスが許可されています"
+
+    def test_rule_descriptions_present(self, vpn_security_groups):
         """
         OWASP準拠: すべてのルールに説明が付与されていることを検証
         （監査とトラブルシューティングのため）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         # インバウンドルールの説明を確認
         ingress_rules = sg["IpPermissions"]
@@ -318,16 +270,12 @@ class TestSecurityGroupOWASPCompliance:
 class TestSecurityGroupCISCompliance:
     """CIS AWS Foundations Benchmark準拠の検証テスト"""
 
-    def test_security_group_has_description(self, ec2_client):
+    def test_security_group_has_description(self, vpn_security_groups):
         """
         CIS 5.2: セキュリティグループに説明が設定されていることを検証
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
-        
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
+        assert len(vpn_security_groups) == 1
+        sg = vpn_security_groups[0]
         
         assert sg["Description"], \
             "セキュリティグループに説明が設定されていません（CIS 5.2違反）"
@@ -336,22 +284,27 @@ class TestSecurityGroupCISCompliance:
         assert sg["Description"] != "Managed by Terraform", \
             "セキュリティグループの説明が汎用的すぎます"
 
-    def test_no_unrestricted_ingress_on_all_ports(self, ec2_client):
+    def test_no_unrestricted_ingress_on_all_ports(self, vpn_security_groups, security_group_evaluator):
         """
         CIS 5.1: 全ポート（0-65535）への無制限アクセスが許可されていないことを検証
+        （0.0.0.0/0・::/0 のほか、インターネット全体を覆う複数のCIDRも含む）
         """
-        security_groups = ec2_client.describe_security_groups(
-            Filters=[{"Name": "group-name", "Values": ["client-vpn-endpoint-sg"]}]
-        )
+        assert len(vpn_security_groups) == 1
+        group_id = vpn_security_groups[0]["GroupId"]
         
-        assert len(security_groups["SecurityGroups"]) == 1
-        sg = security_groups["SecurityGroups"][0]
-        
-        ingress_rules = sg["IpPermissions"]
+        exposures = security_group_evaluator.all_ports_exposures("ingress", world=True, group_ids=[group_id])
+        assert not exposures, \
+            f"全ポート・全プロトコルへの無制限アクセスが許可されています（CIS 5.1違反）: {exposures}"
+
+    def test_no_admin_ports_open_to_world_in_vpc(self, vpn_security_groups, security_groups, security_group_evaluator):
+        """
+        CIS 5.2・5.3: VPCのすべてのセキュリティグループで、SSH（22）・RDP（3389）が
+        インターネット全体（0.0.0.0/0・::/0）に公開されていないことを検証
+        """
+        assert len(vpn_security_groups) == 1
+        vpc_id = vpn_security_groups[0]["VpcId"]
+        group_ids = [sg["GroupId"] for sg in security_groups if sg.get("VpcId") == vpc_id]
         
-        for rule in ingress_rules:
-            # 全プロトコル（-1）かつ0.0.0.0/0の組み合わせをチェック
-            if rule["IpProtocol"] == "-1":
-                for ip_range in rule.get("IpRanges", []):
-                    assert ip_range["CidrIp"] != "0.0.0.0/0", \
-                        "全ポート・全プロトコルへの無制限アクセスが許可されています（CIS 5.1違反）"
+        exposures = security_group_evaluator.world_exposures(ADMIN_PORTS, group_ids=group_ids)
+        assert not exposures, \
+            f"管理ポートがインターネットに公開されています（CIS 5.2・5.3違反）: {exposures}"
@@ -15,6 +15,11 @@ from pathlib import Path
 
 import pytest
 
+from tests.secret_scan.redact import RedactingWriter, redact_text
+
+# terraform init・validate・plan は構成全体を対象とする
+pytestmark = pytest.mark.terraform_resources("*")
+
 
 @pytest.fixture(scope="module")
 def terraform_dir():
@@ -158,10 +163,11 @@ def test_terraform_plan_succeeds(terraform_dir, terraform_initialized):
     # 0 = 変更なし
     # 1 = エラー
     # 2 = 変更あり
+    # 失敗メッセージはテスト結果のレポートに残るため、シークレットは伏せ字にする
     assert result.returncode in [0, 2], (
         f"❌ terraform planが失敗しました:\n"
-        f"標準出力:\n{result.stdout}\n"
-        f"標準エラー:\n{result.stderr}"
+        f"標準出力:\n{redact_text(result.stdout)}\n"
+        f"標準エラー:\n{redact_text(result.stderr)}"
     )
     
     # エラーメッセージが含まれていないことを確認
@@ -169,7 +175,7 @@ def test_terraform_plan_succeeds(terraform_dir, terraform_initialized):
     has_errors = any(keyword in result.stderr for keyword in error_keywords)
     
     assert not has_errors, (
-        f"❌ terraform planの出力にエラーが含まれています:\n{result.stderr}"
+        f"❌ terraform planの出力にエラーが含まれています:\n{redact_text(result.stderr)}"
     )
     
     if result.returncode == 0:
@@ -177,12 +183,12 @@ def test_terraform_plan_succeeds(terraform_dir, terraform_initialized):
     else:
         print(f"✅ terraform plan が正常に完了しました（変更あり）")
     
-    # 実行計画をログファイルに保存
+    # 実行計画をログファイルに保存（シークレットは伏せ字にしてから書き込む）
     log_dir = Path(__file__).parent.parent.parent / "test-results"
     log_dir.mkdir(exist_ok=True)
     
     log_file = log_dir / "terraform-plan.log"
-    with open(log_file, "w", encoding="utf-8") as f:
+    with open(log_file, "w", encoding="utf-8") as raw_log, RedactingWriter(raw_log) as f:
         f.write("=== Terraform Plan Output ===\n\n")
         f.write(result.stdout)
         f.write("\n\n=== Terraform Plan Errors ===\n\n")
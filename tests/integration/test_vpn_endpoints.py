@@ -10,6 +10,11 @@
 
 import pytest
 
+from tests.network import AuthorizationSimulator
+
+# 検証するTerraformの宣言（変更の影響を受けるテストの選択に使用）
+pytestmark = pytest.mark.terraform_resources("aws_ec2_client_vpn_*")
+
 
 @pytest.fixture(scope="module")
 def pc_vpn_endpoint(ec2_client):
@@ -85,11 +90,11 @@ class TestPCVPNEndpoint:
         
         print(f"✅ PC用VPNエンドポイントでSelf-Service Portalが有効化されています")
 
-    def test_pc_vpn_client_cidr(self, pc_vpn_endpoint):
+    def test_pc_vpn_client_cidr(self, pc_vpn_endpoint, expected_pc_client_cidr):
         """
         Requirements 2.1: PC用VPNエンドポイントのClient CIDRが正しく設定されていることを検証
         """
-        expected_cidr = "172.16.0.0/22"
+        expected_cidr = expected_pc_client_cidr
         actual_cidr = pc_vpn_endpoint.get("ClientCidrBlock")
         
         assert actual_cidr == expected_cidr, \
@@ -235,11 +240,11 @@ class TestMobileVPNEndpoint:
         
         print(f"✅ スマホ用VPNエンドポイントが証明書認証を使用しています")
 
-    def test_mobile_vpn_client_cidr(self, mobile_vpn_endpoint):
+    def test_mobile_vpn_client_cidr(self, mobile_vpn_endpoint, expected_mobile_client_cidr):
         """
         Requirements 3.1: スマホ用VPNエンドポイントのClient CIDRが正しく設定されていることを検証
         """
-        expected_cidr = "172.17.0.0/22"
+        expected_cidr = expected_mobile_client_cidr
         actual_cidr = mobile_vpn_endpoint.get("ClientCidrBlock")
         
         assert actual_cidr == expected_cidr, \
@@ -380,6 +385,24 @@ class TestVPNEndpointSecurity:
             
             print(f"✅ {endpoint_name}VPNエンドポイントにセキュリティグループが設定されています")
 
+    def test_vpn_authorization_matches_configuration(self, ec2_client, terraform_module,
+                                                     pc_vpn_endpoint, mobile_vpn_endpoint):
+        """
+        Requirements 4.4: デプロイ済みの認可ルールによる到達範囲が、Terraformの構成と一致することを検証
+        （apply で利用者・グループの到達範囲が変わる場合は、その差分を表示する）
+        """
+        for endpoint_name, endpoint, address in [
+            ("PC用", pc_vpn_endpoint, "aws_ec2_client_vpn_endpoint.pc"),
+            ("スマホ用", mobile_vpn_endpoint, "aws_ec2_client_vpn_endpoint.mobile"),
+        ]:
+            deployed = AuthorizationSimulator.from_ec2(ec2_client, endpoint["ClientVpnEndpointId"])
+            changes = deployed.diff(AuthorizationSimulator.from_module(terraform_module, address))
+
+            assert not changes, \
+                f"{endpoint_name}VPNエンドポイントの認可ルールが構成と異なります: {changes}"
+
+            print(f"✅ {endpoint_name}VPNエンドポイントの認可ルールによる到達範囲が構成と一致しています")
+
 
 if __name__ == "__main__":
     # スタンドアロン実行用
@@ -0,0 +1,13 @@
+# AWS Inventory Package
+# 統合テストのセッションで共有するAWSのリソースのスナップショット（一括取得・索引・読み取り専用の応答）
+
+from .collector import SPECS, Inventory, InventoryClient, ResourceSet, ResourceSpec, freeze
+
+__all__ = [
+    "SPECS",
+    "Inventory",
+    "InventoryClient",
+    "ResourceSet",
+    "ResourceSpec",
+    "freeze",
+]
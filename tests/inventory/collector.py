@@ -0,0 +1,341 @@
+"""
+AWSのリソースの一括取得（統合テストのセッションで共有するスナップショット）
+
+統合テストの多くは同じ describe_*（サブネット、ルートテーブル、ロググループなど）を同じフィルタで
+何度も呼びます。Inventory はリソースの種類（操作）ごとに、初回の呼び出しでページネーションを最後まで
+たどってすべてのリソースを取得し、読み取り専用の値（MappingProxyType・tuple）として ID・タグ・VPC で
+索引します。InventoryClient は boto3 のクライアントと同じ呼び出し方で、Filters・ID・名前の指定を
+この索引の上で評価して応答するため、テストのコードを変えずにAPIの呼び出しが種類ごとに1回になります。
+
+索引で評価できない引数（未対応のフィルタ、MaxResults・orderBy など）を含む呼び出しと、一覧でない操作
+（get_trail_status など）は、元のクライアントにそのまま渡します。
+"""
+
+from collections import Counter
+from fnmatch import fnmatchcase
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from tests.tfanalysis import UnsupportedFilter
+
+Record = Mapping[str, Any]
+
+
+def freeze(value: Any) -> Any:
+    """応答を読み取り専用にする（dict → MappingProxyType、list → tuple）"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _values(path: str) -> Callable[[Record], List[Any]]:
+    """レコードのキー（a.b は一覧 a の各要素のキー b）の値のリストを返す関数"""
+    def extract(record: Record) -> List[Any]:
+        values: List[Any] = [record]
+        for key in path.split("."):
+            found: List[Any] = []
+            for value in values:
+                item = value.get(key) if isinstance(value, Mapping) else None
+                found.extend(item if isinstance(item, tuple) else [item])
+            values = found
+        return [value for value in values if value is not None]
+    return extract
+
+
+def _filter_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class ResourceSpec(NamedTuple):
+    """一覧の操作の応答の形と、索引で評価できる引数"""
+
+    key: str  # 応答の一覧のキー（Subnets など）
+    id_key: Optional[str] = None  # リソースのIDのキー
+    ids: Optional[str] = None  # IDを指定する引数（SubnetIds など）
+    filters: Mapping[str, Callable[[Record], List[Any]]] = MappingProxyType({})  # フィルタ名 → 値
+    vpc: Callable[[Record], List[Any]] = _values("VpcId")
+    scope: Optional[str] = None  # 取得の単位になる引数（ClientVpnEndpointId など）
+    names: Mapping[str, Tuple[str, ...]] = MappingProxyType({})  # 名前を指定する引数 → 一致するキー
+    prefixes: Mapping[str, str] = MappingProxyType({})  # 前方一致の引数 → キー
+
+
+# サービス → 操作 → 応答の形
+SPECS: Dict[str, Dict[str, ResourceSpec]] = {
+    "ec2": {
+        "describe_vpcs": ResourceSpec("Vpcs", "VpcId", "VpcIds", {
+            "vpc-id": _values("VpcId"),
+            "cidr": _values("CidrBlock"),
+            "cidr-block-association.cidr-block": _values("CidrBlockAssociationSet.CidrBlock"),
+            "state": _values("State"),
+            "is-default": _values("IsDefault"),
+        }),
+        "describe_subnets": ResourceSpec("Subnets", "SubnetId", "SubnetIds", {
+            "subnet-id": _values("SubnetId"),
+            "vpc-id": _values("VpcId"),
+            "cidr-block": _values("CidrBlock"),
+            "availability-zone": _values("AvailabilityZone"),
+            "map-public-ip-on-launch": _values("MapPublicIpOnLaunch"),
+            "state": _values("State"),
+        }),
+        "describe_security_groups": ResourceSpec("SecurityGroups", "GroupId", "GroupIds", {
+            "group-id": _values("GroupId"),
+            "group-name": _values("GroupName"),
+            "vpc-id": _values("VpcId"),
+        }, names={"GroupNames": ("GroupName",)}),
+        "describe_route_tables": ResourceSpec("RouteTables", "RouteTableId", "RouteTableIds", {
+            "route-table-id": _values("RouteTableId"),
+            "vpc-id": _values("VpcId"),
+            "association.subnet-id": _values("Associations.SubnetId"),
+            "association.route-table-association-id": _values("Associations.RouteTableAssociationId"),
+            "association.main": _values("Associations.Main"),
+            "route.destination-cidr-block": _values("Routes.DestinationCidrBlock"),
+            "route.gateway-id": _values("Routes.GatewayId"),
+            "route.nat-gateway-id": _values("Routes.NatGatewayId"),
+        }),
+        "describe_internet_gateways": ResourceSpec("InternetGateways", "InternetGatewayId", "InternetGatewayIds", {
+            "internet-gateway-id": _values("InternetGatewayId"),
+            "attachment.vpc-id": _values("Attachments.VpcId"),
+            "attachment.state": _values("Attachments.State"),
+        }, vpc=_values("Attachments.VpcId")),
+        "describe_nat_gateways": ResourceSpec("NatGateways", "NatGatewayId", "NatGatewayIds", {
+            "nat-gateway-id": _values("NatGatewayId"),
+            "subnet-id": _values("SubnetId"),
+            "vpc-id": _values("VpcId"),
+            "state": _values("State"),
+        }),
+        "describe_addresses": ResourceSpec("Addresses", "AllocationId", "AllocationIds", {
+            "allocation-id": _values("AllocationId"),
+            "public-ip": _values("PublicIp"),
+            "domain": _values("Domain"),
+        }, names={"PublicIps": ("PublicIp",)}),
+        "describe_client_vpn_endpoints": ResourceSpec(
+            "ClientVpnEndpoints", "ClientVpnEndpointId", "ClientVpnEndpointIds", {
+                "endpoint-id": _values("ClientVpnEndpointId"),
+                "transport-protocol": _values("TransportProtocol"),
+            },
+        ),
+        "describe_client_vpn_target_networks": ResourceSpec("ClientVpnTargetNetworks", "AssociationId", None, {
+            "association-id": _values("AssociationId"),
+            "target-network-id": _values("TargetNetworkId"),
+            "vpc-id": _values("VpcId"),
+        }, scope="ClientVpnEndpointId"),
+        "describe_client_vpn_authorization_rules": ResourceSpec("AuthorizationRules", None, None, {
+            "description": _values("Description"),
+            "destination-cidr": _values("DestinationCidr"),
+            "group-id": _values("GroupId"),
+        }, scope="ClientVpnEndpointId"),
+        "describe_client_vpn_routes": ResourceSpec("Routes", None, None, {
+            "destination-cidr": _values("DestinationCidr"),
+            "origin": _values("Origin"),
+            "target-subnet": _values("TargetSubnet"),
+        }, scope="ClientVpnEndpointId"),
+    },
+    "logs": {
+        "describe_log_groups": ResourceSpec(
+            "logGroups", "logGroupName", prefixes={"logGroupNamePrefix": "logGroupName"},
+        ),
+        "describe_log_streams": ResourceSpec(
+            "logStreams", "logStreamName", scope="logGroupName",
+            prefixes={"logStreamNamePrefix": "logStreamName"},
+        ),
+    },
+    "cloudtrail": {
+        "describe_trails": ResourceSpec(
+            "trailList", "TrailARN", names={"trailNameList": ("Name", "TrailARN")},
+        ),
+    },
+}
+
+
+def _tags(record: Record) -> Dict[str, str]:
+    return {tag["Key"]: tag.get("Value", "") for tag in record.get("Tags") or ()}
+
+
+class ResourceSet:
+    """
+    1種類のリソースの読み取り専用の一覧（ID・タグ・VPCの索引つき）
+
+    使用例:
+        subnets = inventory.resources("ec2", "describe_subnets")
+        subnets.tagged("Type", "Private")   # タグ Type=Private のサブネット
+        subnets.in_vpc(vpc_id)               # VPCのサブネット
+        subnets.get("subnet-0123")           # IDのサブネット
+    """
+
+    def __init__(self, spec: ResourceSpec, records: Iterable[Any]):
+        self.spec = spec
+        self.records: Tuple[Record, ...] = tuple(freeze(record) for record in records)
+        self._tags = [_tags(record) for record in self.records]
+        self._by_id: Dict[Any, Record] = {}
+        self._by_tag: Dict[Tuple[str, str], List[int]] = {}
+        self._by_vpc: Dict[Any, List[int]] = {}
+        for position, record in enumerate(self.records):
+            if spec.id_key and record.get(spec.id_key) is not None:
+                self._by_id.setdefault(record[spec.id_key], record)
+            for item in self._tags[position].items():
+                self._by_tag.setdefault(item, []).append(position)
+            for vpc_id in dict.fromkeys(spec.vpc(record)):
+                self._by_vpc.setdefault(vpc_id, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[Record]:
+        return iter(self.records)
+
+    def get(self, resource_id: Any) -> Optional[Record]:
+        """IDのリソース（ない場合は None）"""
+        return self._by_id.get(resource_id)
+
+    def tagged(self, key: str, value: Optional[str] = None) -> Tuple[Record, ...]:
+        """タグ key（value を指定した場合はその値）を持つリソース"""
+        if value is not None:
+            return tuple(self.records[i] for i in self._by_tag.get((key, value), ()))
+        return tuple(record for record, tags in zip(self.records, self._tags) if key in tags)
+
+    def in_vpc(self, vpc_id: Any) -> Tuple[Record, ...]:
+        """VPCのリソース"""
+        return tuple(self.records[i] for i in self._by_vpc.get(vpc_id, ()))
+
+    def select(self, filters: Optional[Iterable[Mapping[str, Any]]] = None) -> Tuple[Record, ...]:
+        """
+        EC2 APIの Filters（名前ごとにAND、値はOR、* と ? のワイルドカード）に一致するリソース
+
+        Raises:
+            UnsupportedFilter: 索引で評価できないフィルタの場合
+        """
+        filters = list(filters or ())
+        positions: Iterable[int] = range(len(self.records))
+        # タグの完全一致は索引で絞り込む
+        for item in filters:
+            name, patterns = item["Name"], list(item.get("Values", ()))
+            if name.startswith("tag:") and not any("*" in p or "?" in p for p in patterns):
+                positions = sorted({i for p in patterns for i in self._by_tag.get((name[4:], p), ())})
+                break
+        return tuple(self.records[i] for i in positions if self._matches(i, filters))
+
+    def _matches(self, position: int, filters: List[Mapping[str, Any]]) -> bool:
+        record, tags = self.records[position], self._tags[position]
+        for item in filters:
+            name = item["Name"]
+            if name.startswith("tag:"):
+                candidates = [tags[name[4:]]] if name[4:] in tags else []
+            elif name == "tag-key":
+                candidates = list(tags)
+            elif name in self.spec.filters:
+                candidates = self.spec.filters[name](record)
+            else:
+                raise UnsupportedFilter(f"インベントリでは未対応のフィルタです: {name}")
+            if not any(
+                # EC2 APIのワイルドカードは * と ? のみ（[ は文字どおり照合する）
+                fnmatchcase(_filter_text(candidate), str(pattern).replace("[", "[[]"))
+                for candidate in candidates for pattern in item.get("Values", ())
+            ):
+                return False
+        return True
+
+
+def _pages(client: Any, operation: str, params: Dict[str, Any]) -> Iterator[Mapping[str, Any]]:
+    """操作の応答のページ（ページネーションのない操作・PlanEC2View は1ページ）"""
+    can_paginate = getattr(client, "can_paginate", None)
+    if can_paginate is not None and can_paginate(operation):
+        yield from client.get_paginator(operation).paginate(**params)
+    else:
+        yield getattr(client, operation)(**params)
+
+
+class Inventory:
+    """
+    セッションで共有するAWSのリソースのスナップショット
+
+    リソースの種類（サービス・操作・取得の単位）ごとに、初回の参照でページネーションを最後までたどって
+    取得し、以降は同じ ResourceSet を返します。calls は実際に呼んだAPIの回数（ページ数）です。
+    """
+
+    def __init__(self):
+        self.clients: Dict[str, Any] = {}
+        self.calls: Counter = Counter()  # (サービス, 操作) → APIの呼び出し回数
+        self._resources: Dict[Tuple[str, str, Optional[str]], ResourceSet] = {}
+
+    def view(self, service: str, client: Any) -> "InventoryClient":
+        """クライアントを登録して、インベントリから応答するクライアントを返す"""
+        self.clients[service] = client
+        return InventoryClient(self, service)
+
+    def resources(self, service: str, operation: str, scope: Optional[str] = None) -> ResourceSet:
+        """
+        リソースの一覧（初回のみAPIを呼ぶ）
+
+        Args:
+            scope: 取得の単位になる引数の値（describe_client_vpn_routes のエンドポイントのIDなど）
+        """
+        key = (service, operation, scope)
+        if key not in self._resources:
+            spec = SPECS[service][operation]
+            params = {spec.scope: scope} if spec.scope else {}
+            self._resources[key] = ResourceSet(spec, self._fetch(service, operation, spec.key, params))
+        return self._resources[key]
+
+    def _fetch(self, service: str, operation: str, key: str, params: Dict[str, Any]) -> Iterator[Any]:
+        for page in _pages(self.clients[service], operation, params):
+            self.calls[(service, operation)] += 1
+            yield from page.get(key) or ()
+
+
+class InventoryClient:
+    """
+    boto3 のクライアントと同じ呼び出し方で、Inventory の索引から応答するクライアント
+
+    応答の一覧は読み取り専用です。索引で評価できない呼び出しは元のクライアントに渡します。
+    """
+
+    def __init__(self, inventory: Inventory, service: str):
+        self.inventory = inventory
+        self.service = service
+
+    def __getattr__(self, name: str) -> Any:
+        spec = SPECS.get(self.service, {}).get(name)
+        if spec is None:
+            return getattr(self.inventory.clients[self.service], name)
+
+        def call(**params: Any) -> Dict[str, Any]:
+            response = self._answer(name, spec, dict(params))
+            if response is None:
+                self.inventory.calls[(self.service, name)] += 1
+                return getattr(self.inventory.clients[self.service], name)(**params)
+            return response
+
+        return call
+
+    def _answer(self, operation: str, spec: ResourceSpec, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """索引で評価した応答（評価できない引数がある場合は None）"""
+        scope = params.pop(spec.scope, None) if spec.scope else None
+        if spec.scope and scope is None:
+            return None
+        filters = params.pop("Filters", None) or params.pop("Filter", None)
+        checks = []  # (指定した値, 照合するキー, 前方一致か)
+        if spec.ids and params.get(spec.ids):
+            checks.append((set(params.pop(spec.ids)), (spec.id_key,), False))
+        for param, keys in spec.names.items():
+            if params.get(param):
+                checks.append((set(params.pop(param)), keys, False))
+        for param, key in spec.prefixes.items():
+            if params.get(param):
+                checks.append((params.pop(param), (key,), True))
+        if any(value is not None for value in params.values()):
+            return None  # MaxResults・NextToken・orderBy など
+
+        try:
+            records = self.inventory.resources(self.service, operation, scope).select(filters)
+        except UnsupportedFilter:
+            return None
+        for expected, keys, prefix in checks:
+            records = tuple(r for r in records if any(
+                isinstance(r.get(k), str) and (r[k].startswith(expected) if prefix else r[k] in expected)
+                for k in keys
+            ))
+        return {spec.key: records}
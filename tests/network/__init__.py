@@ -0,0 +1,74 @@
+# Network Model Package
+# Terraform構成・describe の応答から作るネットワーク（CIDRの割り当て、経路、認可ルール、セキュリティグループ）のモデル
+
+from .authorization import (
+    AccessChange,
+    Audience,
+    AuthorizationSimulator,
+)
+from .cidr import (
+    Allocation,
+    CidrConflict,
+    CidrExhausted,
+    CidrPlan,
+    IntervalMap,
+    parse_network,
+)
+from .routing import (
+    BLACKHOLE,
+    EXIT,
+    INTERNET,
+    LOCAL,
+    LOOP,
+    NO_ROUTE,
+    SPLIT_TUNNEL,
+    UNAUTHORIZED,
+    AuthorizationRule,
+    Hop,
+    RadixTrie,
+    RouteSimulator,
+    RouteTarget,
+    Trace,
+)
+from .security_groups import (
+    ADMIN_PORTS,
+    WORLD,
+    WORLD_IPV6,
+    Exposure,
+    Peer,
+    SecurityGroupEvaluator,
+    normalize_protocol,
+)
+
+__all__ = [
+    "AccessChange",
+    "Audience",
+    "AuthorizationSimulator",
+    "Allocation",
+    "CidrConflict",
+    "CidrExhausted",
+    "CidrPlan",
+    "IntervalMap",
+    "parse_network",
+    "BLACKHOLE",
+    "EXIT",
+    "INTERNET",
+    "LOCAL",
+    "LOOP",
+    "NO_ROUTE",
+    "SPLIT_TUNNEL",
+    "UNAUTHORIZED",
+    "AuthorizationRule",
+    "Hop",
+    "RadixTrie",
+    "RouteSimulator",
+    "RouteTarget",
+    "Trace",
+    "ADMIN_PORTS",
+    "WORLD",
+    "WORLD_IPV6",
+    "Exposure",
+    "Peer",
+    "SecurityGroupEvaluator",
+    "normalize_protocol",
+]
@@ -0,0 +1,244 @@
+"""
+Client VPN の認可ルールのシミュレーション
+
+describe_client_vpn_authorization_rules の応答（AWS、または PlanEC2View によるプラン・構成からの応答）を、
+宛先のプレフィックス → 許可するグループ（最長一致の二分木）と、グループ → 到達できるアドレスの区間の
+2つの索引に読み込みます。Client VPN は宛先を含む最長のプレフィックスの認可ルールだけを適用するため、
+各プレフィックスが決める範囲（プレフィックスから、より長いプレフィックスのルールの範囲を除いたもの）は
+互いに重なりません。グループの到達範囲はその範囲の和集合になり、複数のグループに属する利用者の到達範囲は
+グループごとの到達範囲の和集合になります。
+
+「グループ G が届く宛先」「宛先 D に届くグループ」は索引の参照だけで求まり、数千人の利用者 × 宛先の検査も
+宛先ごとの最長一致1回と、グループの組み合わせごとのキャッシュで評価できます。2つのルールセットの差分
+（apply 前後でグループごとに増える・減る宛先）も区間の差として求まります。
+"""
+
+import ipaddress
+from typing import (
+    Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple,
+)
+
+from tests.tfanalysis import Evaluator, PlanEC2View, TerraformModule
+
+from .cidr import _IPV4_OFFSET, Network, _bounds, parse_network
+from .routing import Address, AuthorizationRule, RadixTrie
+
+Interval = Tuple[int, int]
+
+
+class Audience(NamedTuple):
+    """宛先に適用される認可ルール（宛先を含む最長のプレフィックスのルール）"""
+
+    destination: Network  # ルールの宛先のプレフィックス
+    all_groups: bool  # すべての利用者に許可する（authorize_all_groups）
+    groups: FrozenSet[str]  # 許可するアクセスグループのID
+
+    def admits(self, groups: Iterable[str]) -> bool:
+        """アクセスグループ groups の利用者に許可するか"""
+        return self.all_groups or not self.groups.isdisjoint(groups)
+
+
+class AccessChange(NamedTuple):
+    """ルールセットの変更による到達範囲の変化"""
+
+    group: Optional[str]  # アクセスグループのID（None はどのグループにも属さない利用者）
+    granted: Tuple[Network, ...]  # 新たに届くようになる宛先
+    revoked: Tuple[Network, ...]  # 届かなくなる宛先
+
+
+def _coalesce(intervals: Iterable[Interval]) -> List[Interval]:
+    merged: List[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _subtract(intervals: Sequence[Interval], removed: Sequence[Interval]) -> List[Interval]:
+    """区間の差（どちらも連結済みの区間のリスト）"""
+    result: List[Interval] = []
+    index = 0
+    for start, end in intervals:
+        while index < len(removed) and removed[index][1] < start:
+            index += 1
+        cursor = start
+        scan = index
+        while scan < len(removed) and removed[scan][0] <= end:
+            if removed[scan][0] > cursor:
+                result.append((cursor, removed[scan][0] - 1))
+            cursor = max(cursor, removed[scan][1] + 1)
+            scan += 1
+        if cursor <= end:
+            result.append((cursor, end))
+    return result
+
+
+def _networks(intervals: Iterable[Interval]) -> Tuple[Network, ...]:
+    """区間をCIDRの列に分解する（IPv6とIPv4の境界をまたぐ区間は分ける）"""
+    networks: List[Network] = []
+    for start, end in intervals:
+        if start < _IPV4_OFFSET <= end:
+            networks.extend(_networks([(start, _IPV4_OFFSET - 1), (_IPV4_OFFSET, end)]))
+            continue
+        if start >= _IPV4_OFFSET:
+            first, last = ipaddress.IPv4Address(start - _IPV4_OFFSET), ipaddress.IPv4Address(end - _IPV4_OFFSET)
+        else:
+            first, last = ipaddress.IPv6Address(start), ipaddress.IPv6Address(end)
+        networks.extend(ipaddress.summarize_address_range(first, last))
+    return tuple(networks)
+
+
+class AuthorizationSimulator:
+    """
+    Client VPN エンドポイントの認可ルールのシミュレーター
+
+    使用例:
+        simulator = AuthorizationSimulator.from_module(module, "aws_ec2_client_vpn_endpoint.pc")
+        simulator.reachable(["engineering"])          # engineering の利用者が届く宛先（CIDRの列）
+        simulator.audience("192.168.10.5")            # 192.168.10.5 に適用されるルール（許可するグループ）
+        simulator.evaluate(users, destinations)       # 利用者ごとの届く宛先（一括）
+        current.diff(proposed)                        # ルールの変更で増える・減る宛先（グループごと）
+    """
+
+    def __init__(self, rules: Iterable[AuthorizationRule] = ()):
+        self.rules: List[AuthorizationRule] = list(rules)
+        grants: Dict[Network, Tuple[bool, set]] = {}
+        for rule in self.rules:
+            all_groups, groups = grants.get(parse_network(rule.destination), (False, set()))
+            if rule.group:
+                groups.add(rule.group)
+            grants[parse_network(rule.destination)] = (all_groups or rule.access_all, groups)
+
+        self._trie: RadixTrie[Audience] = RadixTrie()
+        audiences = []
+        for network, (all_groups, groups) in grants.items():
+            audience = Audience(network, all_groups, frozenset(groups))
+            self._trie.insert(network, audience)
+            audiences.append(audience)
+
+        # プレフィックスごとに決める範囲を、グループ（None はすべての利用者）の到達範囲に加える
+        regions: Dict[Optional[str], List[Interval]] = {None: []}
+        for audience, region in self._regions(audiences):
+            for principal in ([None] if audience.all_groups else sorted(audience.groups)):
+                regions.setdefault(principal, []).extend(region)
+        self._reach: Dict[Optional[str], List[Interval]] = {g: _coalesce(r) for g, r in regions.items()}
+        self._cache: Dict[FrozenSet[str], List[Interval]] = {}
+
+    @staticmethod
+    def _regions(audiences: List[Audience]) -> Iterator[Tuple[Audience, List[Interval]]]:
+        """各プレフィックスから、その中のより長いプレフィックス（直下のもの）を除いた範囲"""
+        # 開始位置の昇順・長さの降順に並べると、プレフィックスの包含は括弧の入れ子になる
+        ordered = sorted(audiences, key=lambda a: (_bounds(a.destination)[0], -_bounds(a.destination)[1]))
+        children: Dict[Network, List[Interval]] = {a.destination: [] for a in ordered}
+        stack: List[Tuple[Network, int]] = []
+        for audience in ordered:
+            start, end = _bounds(audience.destination)
+            while stack and stack[-1][1] < start:
+                stack.pop()
+            if stack:
+                children[stack[-1][0]].append((start, end))
+            stack.append((audience.destination, end))
+        for audience in ordered:
+            yield audience, _subtract([_bounds(audience.destination)], children[audience.destination])
+
+    @classmethod
+    def from_describe(cls, authorization_rules: Iterable[Dict[str, Any]]) -> "AuthorizationSimulator":
+        """describe_client_vpn_authorization_rules の AuthorizationRules から作る"""
+        return cls(
+            AuthorizationRule(rule["DestinationCidr"], bool(rule.get("AccessAll")), rule.get("GroupId") or None)
+            for rule in authorization_rules
+        )
+
+    @classmethod
+    def from_ec2(cls, client: Any, endpoint_id: str) -> "AuthorizationSimulator":
+        """EC2クライアント（boto3 または PlanEC2View）から、エンドポイントの認可ルールを読み込んで作る"""
+        response = client.describe_client_vpn_authorization_rules(ClientVpnEndpointId=endpoint_id)
+        return cls.from_describe(response["AuthorizationRules"])
+
+    @classmethod
+    def from_module(cls, module: TerraformModule, endpoint: str,
+                    variables: Optional[Dict[str, Any]] = None) -> "AuthorizationSimulator":
+        """
+        Terraformの構成から作る
+
+        Args:
+            endpoint: エンドポイントのアドレス（aws_ec2_client_vpn_endpoint.pc など）
+        """
+        return cls.from_ec2(PlanEC2View(Evaluator(module, variables).resource_index()), endpoint)
+
+    # --- 参照 ---
+
+    @property
+    def groups(self) -> List[str]:
+        """ルールに現れるアクセスグループのID"""
+        return sorted(g for g in self._reach if g is not None)
+
+    def audience(self, destination: Address) -> Optional[Audience]:
+        """宛先に適用される認可ルール（宛先に届くグループ）。ルールがない場合は None"""
+        found = self._trie.longest_match(destination)
+        return found[1] if found else None
+
+    def allows(self, groups: Iterable[str], destination: Address) -> bool:
+        """アクセスグループ groups の利用者が宛先に届くか"""
+        audience = self.audience(destination)
+        return audience is not None and audience.admits(groups)
+
+    def _intervals(self, groups: Iterable[str]) -> List[Interval]:
+        key = frozenset(groups)
+        if key not in self._cache:
+            self._cache[key] = _coalesce(
+                interval for principal in [None, *key] for interval in self._reach.get(principal, ())
+            )
+        return self._cache[key]
+
+    def reachable(self, groups: Iterable[str]) -> Tuple[Network, ...]:
+        """アクセスグループ groups の利用者が届く宛先（重ならないCIDRの列）"""
+        return _networks(self._intervals(groups))
+
+    def evaluate(self, users: Mapping[str, Iterable[str]],
+                 destinations: Iterable[Address]) -> Dict[str, Tuple[str, ...]]:
+        """
+        利用者ごとに、届く宛先を求める（一括）
+
+        宛先ごとの最長一致は1回だけ行い、同じグループの組み合わせの利用者は結果を共有します。
+
+        Args:
+            users: 利用者 → 所属するアクセスグループのID
+            destinations: 宛先のアドレス
+
+        Returns:
+            利用者 → 届く宛先（destinations の順）
+        """
+        order = {d: i for i, d in enumerate(dict.fromkeys(str(d) for d in destinations))}
+        by_audience: Dict[Audience, List[str]] = {}
+        for destination in order:
+            audience = self.audience(destination)
+            if audience is not None:
+                by_audience.setdefault(audience, []).append(destination)
+        results: Dict[FrozenSet[str], Tuple[str, ...]] = {}
+        evaluated: Dict[str, Tuple[str, ...]] = {}
+        for user, groups in users.items():
+            key = frozenset(groups)
+            if key not in results:
+                allowed = [d for a, ds in by_audience.items() if a.admits(key) for d in ds]
+                results[key] = tuple(sorted(allowed, key=order.__getitem__))
+            evaluated[user] = results[key]
+        return evaluated
+
+    def diff(self, other: "AuthorizationSimulator") -> List[AccessChange]:
+        """
+        このルールセットを other に変えたときの、グループごとの到達範囲の変化
+
+        どのグループにも属さない利用者（None）と、どちらかのルールセットに現れるグループのうち、
+        到達範囲が変わるものだけを返します。ルールに現れないグループの利用者の変化は None と同じです。
+        """
+        changes = []
+        for group in [None, *sorted(set(self.groups) | set(other.groups))]:
+            groups = () if group is None else (group,)
+            before, after = self._intervals(groups), other._intervals(groups)
+            granted, revoked = _subtract(after, before), _subtract(before, after)
+            if granted or revoked:
+                changes.append(AccessChange(group, _networks(granted), _networks(revoked)))
+        return changes
@@ -0,0 +1,425 @@
+"""
+CIDRの割り当てと重なりの検査
+
+CIDRブロックを整数の区間 [先頭アドレス, 末尾アドレス] として、開始位置の昇順に並べた重ならない区間の列に保持します。
+重なりの検索は二分探索（O(log n + 重なりの件数)）、次の空きブロックの割り当ては空き区間を順にたどるため、
+数千テナント分の範囲を読み込んでも検査・割り当ては高速です。
+
+CidrPlan はVPC・サブネット・Client VPNのクライアントCIDRの割り当て表です:
+    - VPCとクライアントCIDRは1つのアドレス空間を共有し、互いに重なってはならない
+      （クライアントCIDRは関連付けるVPCのCIDRと重なってはならない、というAWSの制約を含む）
+    - サブネットは所属するVPCのCIDRに含まれ、同じVPCのサブネットと重なってはならない
+    - クライアントCIDRのプレフィックス長は /12〜/22（AWS Client VPNの制約）
+"""
+
+import ipaddress
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Generic, Iterator, List, NamedTuple, Optional, Tuple, TypeVar, Union
+
+from tests.tfanalysis import Evaluator, NotLiteral, TerraformModule
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+V = TypeVar("V")
+
+# IPv4 と IPv6 を1つの整数の軸に並べる（IPv4 を IPv6 の範囲の後ろに置く）
+_IPV4_OFFSET = 1 << 128
+
+# AWS Client VPNのクライアントCIDRのプレフィックス長の範囲
+CLIENT_PREFIX_RANGE = (12, 22)
+
+
+class CidrConflict(ValueError):
+    """既存の割り当てと重なるCIDR"""
+
+    def __init__(self, message: str, conflicts: List[Any]):
+        super().__init__(message)
+        self.conflicts = conflicts
+
+
+class CidrExhausted(ValueError):
+    """空きブロックがない"""
+
+
+def parse_network(value: Union[str, Network]) -> Network:
+    """
+    CIDRを解析する（ホスト部が0でない場合はエラー）
+
+    Raises:
+        ValueError: CIDRとして不正な場合
+    """
+    if isinstance(value, (ipaddress.IPv4Network, ipaddress.IPv6Network)):
+        return value
+    return ipaddress.ip_network(value, strict=True)
+
+
+def _bounds(network: Network) -> Tuple[int, int]:
+    offset = _IPV4_OFFSET if network.version == 4 else 0
+    start = int(network.network_address) + offset
+    return start, start + network.num_addresses - 1
+
+
+class IntervalMap(Generic[V]):
+    """
+    重ならないCIDRブロック → 値
+
+    使用例:
+        blocks = IntervalMap()
+        blocks.add("10.0.0.0/16", "tenant-a")
+        blocks.overlapping("10.0.128.0/17")  # [(IPv4Network('10.0.0.0/16'), 'tenant-a')]
+        blocks.allocate("10.0.0.0/8", 16)    # IPv4Network('10.1.0.0/16')
+    """
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._entries: List[Tuple[Network, V]] = []
+        # 隣接するブロックを連結した区間（空き区間の列挙で、詰めて割り当てたブロックを1つの区間として飛ばす）
+        self._run_starts: List[int] = []
+        self._run_ends: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Tuple[Network, V]]:
+        """(ブロック, 値) をアドレスの順に列挙する"""
+        return iter(list(self._entries))
+
+    def _range(self, start: int, end: int) -> Tuple[int, int]:
+        # 区間は重ならないため、開始位置と末尾位置はどちらも昇順に並ぶ
+        return bisect_left(self._ends, start), bisect_right(self._starts, end)
+
+    def overlapping(self, network: Union[str, Network]) -> List[Tuple[Network, V]]:
+        """ブロックと重なる (ブロック, 値) をアドレスの順に返す"""
+        low, high = self._range(*_bounds(parse_network(network)))
+        return self._entries[low:high]
+
+    def lookup(self, address: Union[str, ipaddress.IPv4Address, ipaddress.IPv6Address]) -> Optional[Tuple[Network, V]]:
+        """アドレスを含む (ブロック, 値) を返す（ない場合はNone）"""
+        address = ipaddress.ip_address(address)
+        found = self.overlapping(ipaddress.ip_network(address))
+        return found[0] if found else None
+
+    def add(self, network: Union[str, Network], value: V) -> Network:
+        """
+        ブロックを追加する
+
+        Raises:
+            CidrConflict: 既存のブロックと重なる場合
+        """
+        network = parse_network(network)
+        start, end = _bounds(network)
+        low, high = self._range(start, end)
+        if low < high:
+            conflicts = self._entries[low:high]
+            raise CidrConflict(
+                f"{network} は {', '.join(f'{n} ({v})' for n, v in conflicts)} と重なります", conflicts
+            )
+        self._starts.insert(low, start)
+        self._ends.insert(low, end)
+        self._entries.insert(low, (network, value))
+        self._cover(start, end)
+        return network
+
+    def remove(self, network: Union[str, Network]) -> V:
+        """
+        ブロックを削除して値を返す
+
+        Raises:
+            KeyError: ブロックがない場合
+        """
+        network = parse_network(network)
+        start, _ = _bounds(network)
+        index = bisect_left(self._starts, start)
+        if index == len(self._entries) or self._entries[index][0] != network:
+            raise KeyError(str(network))
+        self._uncover(self._starts[index], self._ends[index])
+        del self._starts[index], self._ends[index]
+        return self._entries.pop(index)[1]
+
+    def _cover(self, start: int, end: int) -> None:
+        # 前後で隣接する連結区間とつなげる
+        low = bisect_left(self._run_ends, start - 1)
+        high = bisect_right(self._run_starts, end + 1)
+        if low < high:
+            start = min(start, self._run_starts[low])
+            end = max(end, self._run_ends[high - 1])
+        self._run_starts[low:high] = [start]
+        self._run_ends[low:high] = [end]
+
+    def _uncover(self, start: int, end: int) -> None:
+        # 削除するブロックを含む連結区間を前後に分ける
+        index = bisect_right(self._run_starts, start) - 1
+        run_start, run_end = self._run_starts[index], self._run_ends[index]
+        pieces = [(a, b) for a, b in ((run_start, start - 1), (end + 1, run_end)) if a <= b]
+        self._run_starts[index:index + 1] = [a for a, _ in pieces]
+        self._run_ends[index:index + 1] = [b for _, b in pieces]
+
+    def free_blocks(self, parent: Union[str, Network], prefixlen: int) -> Iterator[Network]:
+        """
+        parent の中で、どのブロックとも重ならないプレフィックス長 prefixlen のブロックをアドレスの順に列挙する
+
+        隣接するブロックを連結した区間の間（空き区間）だけをたどるため、既存のブロックの数によらず
+        次の空きブロックは親ブロックの中の空き区間の数に比例する時間で見つかります。
+        """
+        parent = parse_network(parent)
+        if not parent.prefixlen <= prefixlen <= parent.max_prefixlen:
+            raise ValueError(f"{parent} の中に /{prefixlen} のブロックは作れません")
+        size = 1 << (parent.max_prefixlen - prefixlen)
+        offset = _IPV4_OFFSET if parent.version == 4 else 0
+        parent_start, parent_end = _bounds(parent)
+        low = bisect_left(self._run_ends, parent_start)
+        high = bisect_right(self._run_starts, parent_end)
+
+        cursor = parent_start
+        for index in range(low, high + 1):
+            gap_end = self._run_starts[index] - 1 if index < high else parent_end
+            # 空き区間 [cursor, gap_end] の中の境界に揃えたブロック
+            start = -(-(cursor - offset) // size) * size + offset
+            while start + size - 1 <= min(gap_end, parent_end):
+                yield ipaddress.ip_network((start - offset, prefixlen))
+                start += size
+            if index < high:
+                cursor = max(cursor, self._run_ends[index] + 1)
+
+    def allocate(self, parent: Union[str, Network], prefixlen: int) -> Network:
+        """
+        parent の中の最初の空きブロック（プレフィックス長 prefixlen）を返す（追加はしない）
+
+        Raises:
+            CidrExhausted: 空きブロックがない場合
+        """
+        for network in self.free_blocks(parent, prefixlen):
+            return network
+        raise CidrExhausted(f"{parent} に /{prefixlen} の空きブロックがありません")
+
+
+class Allocation(NamedTuple):
+    """CIDRの割り当て"""
+
+    name: str  # aws_vpc.main、aws_subnet.private[0]、テナント名など
+    kind: str  # vpc、subnet、client
+    network: Network
+    vpc: Optional[str]  # サブネット・クライアントCIDRのVPC（名前）
+    tenant: Optional[str]
+
+
+VPC = "vpc"
+SUBNET = "subnet"
+CLIENT = "client"
+
+
+class CidrPlan:
+    """
+    VPC・サブネット・クライアントCIDRの割り当て表
+
+    使用例:
+        plan = CidrPlan.from_module(TerraformModule.load("terraform"))
+        plan.allocate_client("aws_ec2_client_vpn_endpoint.tablet", pool="172.16.0.0/12")
+    """
+
+    def __init__(self):
+        # VPC・クライアントCIDR（1つのアドレス空間）
+        self._space: IntervalMap[Allocation] = IntervalMap()
+        # VPCの名前 → サブネット
+        self._subnets: Dict[str, IntervalMap[Allocation]] = {}
+        self._allocations: Dict[str, Allocation] = {}
+
+    def __len__(self) -> int:
+        return len(self._allocations)
+
+    def __iter__(self) -> Iterator[Allocation]:
+        return iter(list(self._allocations.values()))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._allocations
+
+    def get(self, name: str) -> Optional[Allocation]:
+        """名前の割り当てを返す（ない場合はNone）"""
+        return self._allocations.get(name)
+
+    def by_kind(self, kind: str, vpc: Optional[str] = None) -> List[Allocation]:
+        """種類（vpc、subnet、client）の割り当てを名前の順に返す"""
+        return sorted(
+            (a for a in self._allocations.values() if a.kind == kind and (vpc is None or a.vpc == vpc)),
+            key=lambda a: a.name,
+        )
+
+    def _register(self, allocation: Allocation) -> Allocation:
+        if allocation.name in self._allocations:
+            raise ValueError(f"{allocation.name} は割り当て済みです")
+        self._allocations[allocation.name] = allocation
+        return allocation
+
+    def _conflict(self, network: Network, error: CidrConflict) -> CidrConflict:
+        names = ", ".join(f"{allocation.name} ({n})" for n, allocation in error.conflicts)
+        return CidrConflict(f"{network} は {names} と重なります", [a for _, a in error.conflicts])
+
+    def add_vpc(self, name: str, cidr: Union[str, Network], tenant: Optional[str] = None) -> Allocation:
+        """
+        VPCのCIDRを追加する
+
+        Raises:
+            CidrConflict: 他のVPC・クライアントCIDRと重なる場合
+            ValueError: CIDRとして不正な場合、名前が割り当て済みの場合
+        """
+        network = parse_network(cidr)
+        allocation = Allocation(name, VPC, network, None, tenant)
+        if name in self._allocations:
+            raise ValueError(f"{name} は割り当て済みです")
+        try:
+            self._space.add(network, allocation)
+        except CidrConflict as error:
+            raise self._conflict(network, error) from None
+        self._subnets[name] = IntervalMap()
+        return self._register(allocation)
+
+    def add_subnet(self, name: str, vpc: str, cidr: Union[str, Network]) -> Allocation:
+        """
+        サブネットのCIDRを追加する
+
+        Raises:
+            CidrConflict: 同じVPCのサブネットと重なる場合
+            ValueError: VPCに含まれない場合、VPCがない場合、名前が割り当て済みの場合
+        """
+        network = parse_network(cidr)
+        parent = self._vpc(vpc)
+        if network.version != parent.network.version or not network.subnet_of(parent.network):
+            raise ValueError(f"{name} の {network} はVPC {vpc} の {parent.network} に含まれません")
+        if name in self._allocations:
+            raise ValueError(f"{name} は割り当て済みです")
+        allocation = Allocation(name, SUBNET, network, vpc, parent.tenant)
+        try:
+            self._subnets[vpc].add(network, allocation)
+        except CidrConflict as error:
+            raise self._conflict(network, error) from None
+        return self._register(allocation)
+
+    def add_client(self, name: str, cidr: Union[str, Network], vpc: Optional[str] = None,
+                   tenant: Optional[str] = None) -> Allocation:
+        """
+        Client VPNのクライアントCIDRを追加する
+
+        Raises:
+            CidrConflict: VPC・他のクライアントCIDRと重なる場合
+            ValueError: プレフィックス長が /12〜/22 ではない場合、名前が割り当て済みの場合
+        """
+        network = parse_network(cidr)
+        low, high = CLIENT_PREFIX_RANGE
+        if network.version != 4 or not low <= network.prefixlen <= high:
+            raise ValueError(f"{name} のクライアントCIDR {network} は /{low}〜/{high} のIPv4ブロックではありません")
+        if vpc is not None:
+            self._vpc(vpc)
+        if name in self._allocations:
+            raise ValueError(f"{name} は割り当て済みです")
+        allocation = Allocation(name, CLIENT, network, vpc, tenant)
+        try:
+            self._space.add(network, allocation)
+        except CidrConflict as error:
+            raise self._conflict(network, error) from None
+        return self._register(allocation)
+
+    def _vpc(self, name: str) -> Allocation:
+        allocation = self._allocations.get(name)
+        if allocation is None or allocation.kind != VPC:
+            raise ValueError(f"VPC {name} は割り当てられていません")
+        return allocation
+
+    def allocate_client(self, name: str, pool: Union[str, Network] = "172.16.0.0/12", prefixlen: int = 22,
+                        vpc: Optional[str] = None, tenant: Optional[str] = None) -> Allocation:
+        """
+        pool の中の最初の空きブロックをクライアントCIDRとして割り当てる
+
+        Raises:
+            CidrExhausted: 空きブロックがない場合
+        """
+        return self.add_client(name, self._space.allocate(pool, prefixlen), vpc, tenant)
+
+    def allocate_subnet(self, name: str, vpc: str, prefixlen: int) -> Allocation:
+        """
+        VPCの中の最初の空きブロックをサブネットとして割り当てる
+
+        Raises:
+            CidrExhausted: 空きブロックがない場合
+        """
+        parent = self._vpc(vpc)
+        return self.add_subnet(name, vpc, self._subnets[vpc].allocate(parent.network, prefixlen))
+
+    def remove(self, name: str) -> Allocation:
+        """
+        割り当てを削除する（VPCはサブネットがない場合のみ）
+
+        Raises:
+            KeyError: 割り当てがない場合
+            ValueError: サブネットが残っているVPCの場合
+        """
+        allocation = self._allocations[name]
+        if allocation.kind == SUBNET:
+            self._subnets[allocation.vpc].remove(allocation.network)
+        else:
+            if allocation.kind == VPC and len(self._subnets[name]):
+                raise ValueError(f"VPC {name} にはサブネットが残っています")
+            self._space.remove(allocation.network)
+            self._subnets.pop(name, None)
+        return self._allocations.pop(name)
+
+    def conflicts(self, cidr: Union[str, Network]) -> List[Allocation]:
+        """CIDRと重なるVPC・クライアントCIDRを返す"""
+        return [allocation for _, allocation in self._space.overlapping(cidr)]
+
+    def locate(self, address: str) -> List[Allocation]:
+        """アドレスを含む割り当て（VPCまたはクライアントCIDRと、そのVPCのサブネット）を返す"""
+        found = self._space.lookup(address)
+        if found is None:
+            return []
+        allocation = found[1]
+        result = [allocation]
+        if allocation.kind == VPC:
+            subnet = self._subnets[allocation.name].lookup(address)
+            if subnet is not None:
+                result.append(subnet[1])
+        return result
+
+    @classmethod
+    def from_module(cls, module: TerraformModule, variables: Optional[Dict[str, Any]] = None) -> "CidrPlan":
+        """
+        Terraformの構成（aws_vpc、aws_subnet、aws_ec2_client_vpn_endpoint）から割り当て表を作る
+
+        Args:
+            module: Terraformの構成
+            variables: 変数の値（指定しない変数は既定値）
+
+        Raises:
+            CidrConflict: CIDRが重なる場合
+            ValueError: サブネットがVPCに含まれない場合など
+            NotLiteral: CIDR・VPCの参照を静的に評価できない場合
+        """
+        evaluator = Evaluator(module, variables)
+        plan = cls()
+        for kind, resource_type in ((VPC, "aws_vpc"), (SUBNET, "aws_subnet"), (CLIENT, "aws_ec2_client_vpn_endpoint")):
+            for address in sorted(module.resources):
+                if not address.startswith(resource_type + "."):
+                    continue
+                for instance in evaluator.instances(address):
+                    if kind == VPC:
+                        plan.add_vpc(instance.address, evaluator.attribute(instance, "cidr_block"))
+                    elif kind == SUBNET:
+                        plan.add_subnet(
+                            instance.address,
+                            _vpc_name(evaluator.attribute(instance, "vpc_id")),
+                            evaluator.attribute(instance, "cidr_block"),
+                        )
+                    else:
+                        vpc_id = evaluator.attribute(instance, "vpc_id", None)
+                        plan.add_client(
+                            instance.address,
+                            evaluator.attribute(instance, "client_cidr_block"),
+                            _vpc_name(vpc_id) if vpc_id is not None else None,
+                        )
+        return plan
+
+
+def _vpc_name(vpc_id: Any) -> str:
+    """vpc_id の値（記号的な値 aws_vpc.main など）をVPCの割り当ての名前にする"""
+    if not isinstance(vpc_id, str) or not vpc_id.startswith("aws_vpc."):
+        raise NotLiteral(f"VPCの参照 {vpc_id!r} を評価できません")
+    return vpc_id
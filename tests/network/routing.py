@@ -0,0 +1,397 @@
+"""
+ルートの最長一致（LPM）による経路のシミュレーション
+
+VPCのルートテーブルと Client VPN のルート・認可ルールをプレフィックスの二分木（radix trie）に読み込み、
+サブネットまたはクライアントCIDRから任意の宛先への実効的な経路（ルートテーブル → NAT Gateway →
+Internet Gateway など）を求めます。1件の宛先の解決は木の深さ（IPv4では32）に比例するため、
+大量のアドレスに対するフルトンネルの出口の検証もAWSへアクセスせずに評価できます。
+
+入力は describe_* の応答（AWSのAPI、または PlanEC2View によるプラン・構成からの応答）です。
+"""
+
+import ipaddress
+from collections import Counter
+from typing import Any, Dict, Generic, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, TypeVar, Union
+
+from tests.tfanalysis import Evaluator, PlanEC2View, TerraformModule
+
+from .cidr import Network, parse_network
+
+V = TypeVar("V")
+Address = Union[str, ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# 経路の結果
+INTERNET = "internet"  # Internet Gateway からインターネットへ
+LOCAL = "local"  # VPC内（ローカルルート）
+NO_ROUTE = "no-route"  # 一致するルートがない
+BLACKHOLE = "blackhole"  # ターゲットが削除されたルート
+UNAUTHORIZED = "unauthorized"  # Client VPN の認可ルールが許可しない
+SPLIT_TUNNEL = "split-tunnel"  # スプリットトンネルでVPNを経由しない
+EXIT = "exit"  # モデルの外のターゲット（ピアリング接続、Transit Gateway など）
+LOOP = "loop"  # ルートが循環している
+
+# ルートのターゲットのキー（describe_route_tables の Routes の要素）
+_TARGET_KEYS = (
+    "GatewayId",
+    "NatGatewayId",
+    "TransitGatewayId",
+    "VpcPeeringConnectionId",
+    "NetworkInterfaceId",
+    "EgressOnlyInternetGatewayId",
+    "CarrierGatewayId",
+    "LocalGatewayId",
+    "InstanceId",
+)
+
+
+class _Node:
+    __slots__ = ("children", "entry")
+
+    def __init__(self):
+        self.children: List[Optional["_Node"]] = [None, None]
+        self.entry: Optional[Tuple[Network, Any]] = None
+
+
+class RadixTrie(Generic[V]):
+    """
+    プレフィックス → 値（最長一致の検索）
+
+    プレフィックスのビットを先頭からたどる二分木です。IPv4とIPv6は別の木に保持します。
+
+    使用例:
+        routes = RadixTrie()
+        routes.insert("0.0.0.0/0", "igw")
+        routes.insert("192.168.0.0/16", "local")
+        routes.longest_match("192.168.1.5")  # (IPv4Network('192.168.0.0/16'), 'local')
+    """
+
+    def __init__(self):
+        self._roots = {4: _Node(), 6: _Node()}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Tuple[Network, V]]:
+        """(プレフィックス, 値) をプレフィックスの順（短い順ではなく木の前順）に列挙する"""
+        for version in (4, 6):
+            stack = [self._roots[version]]
+            while stack:
+                node = stack.pop()
+                if node.entry is not None:
+                    yield node.entry
+                stack.extend(child for child in reversed(node.children) if child is not None)
+
+    def _node(self, network: Network, create: bool) -> Optional[_Node]:
+        node = self._roots[network.version]
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+        for depth in range(network.prefixlen):
+            bit = (bits >> (width - 1 - depth)) & 1
+            child = node.children[bit]
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[bit] = _Node()
+            node = child
+        return node
+
+    def insert(self, network: Union[str, Network], value: V) -> None:
+        """プレフィックスの値を設定する（既存の値は置き換える）"""
+        network = parse_network(network)
+        node = self._node(network, create=True)
+        if node.entry is None:
+            self._size += 1
+        node.entry = (network, value)
+
+    def get(self, network: Union[str, Network], default: Optional[V] = None) -> Optional[V]:
+        """プレフィックスの値（完全一致。ない場合は default）"""
+        node = self._node(parse_network(network), create=False)
+        return default if node is None or node.entry is None else node.entry[1]
+
+    def matches(self, address: Address) -> List[Tuple[Network, V]]:
+        """アドレスを含むすべての (プレフィックス, 値) を短い順に返す"""
+        address = ipaddress.ip_address(address)
+        node = self._roots[address.version]
+        bits = int(address)
+        width = address.max_prefixlen
+        found = []
+        for depth in range(width + 1):
+            if node.entry is not None:
+                found.append(node.entry)
+            if depth == width:
+                break
+            node = node.children[(bits >> (width - 1 - depth)) & 1]
+            if node is None:
+                break
+        return found
+
+    def longest_match(self, address: Address) -> Optional[Tuple[Network, V]]:
+        """アドレスを含む最長のプレフィックスの (プレフィックス, 値)（ない場合はNone）"""
+        found = self.matches(address)
+        return found[-1] if found else None
+
+
+class RouteTarget(NamedTuple):
+    """ルートのターゲット"""
+
+    kind: str  # local、internet-gateway、nat-gateway、blackhole、subnet（Client VPN）、その他はキー名
+    id: str
+
+
+class Hop(NamedTuple):
+    """経路の1区間（ルートテーブル・Client VPN エンドポイントで一致したルート）"""
+
+    at: str  # ルートテーブル・Client VPN エンドポイントのID
+    prefix: str  # 一致したルートの宛先
+    target: RouteTarget
+
+
+class Trace(NamedTuple):
+    """宛先までの経路"""
+
+    source: str
+    destination: str
+    outcome: str  # INTERNET、LOCAL、NO_ROUTE、BLACKHOLE、UNAUTHORIZED、SPLIT_TUNNEL、EXIT、LOOP
+    hops: Tuple[Hop, ...]
+
+    @property
+    def exit(self) -> Optional[str]:
+        """最後に一致したルートのターゲットのID（ルートがない場合はNone）"""
+        return self.hops[-1].target.id if self.hops else None
+
+
+class AuthorizationRule(NamedTuple):
+    """Client VPN の認可ルール"""
+
+    destination: str
+    access_all: bool
+    group: Optional[str]  # アクセスグループのID（access_all の場合はNone）
+
+
+class ClientVpnEndpoint(NamedTuple):
+    """Client VPN エンドポイントの経路の情報"""
+
+    id: str
+    client_cidr: Network
+    split_tunnel: bool
+    routes: RadixTrie  # 宛先 → ターゲットサブネットのID（ID順）
+    authorizations: RadixTrie  # 宛先 → AuthorizationRule のリスト
+
+
+def _route_target(route: Dict[str, Any], internet_gateways: Iterable[str]) -> RouteTarget:
+    if route.get("State") == "blackhole":
+        return RouteTarget("blackhole", next((route[k] for k in _TARGET_KEYS if route.get(k)), ""))
+    gateway = route.get("GatewayId")
+    if gateway == "local":
+        return RouteTarget("local", "local")
+    if gateway and gateway in internet_gateways:
+        return RouteTarget("internet-gateway", gateway)
+    if route.get("NatGatewayId"):
+        return RouteTarget("nat-gateway", route["NatGatewayId"])
+    for key in _TARGET_KEYS:
+        if route.get(key):
+            return RouteTarget(key, route[key])
+    return RouteTarget("blackhole", "")
+
+
+class RouteSimulator:
+    """
+    VPCのルートテーブルと Client VPN のルート・認可ルールによる経路のシミュレーター
+
+    使用例:
+        simulator = RouteSimulator.from_ec2(ec2_client)
+        simulator.trace("aws_subnet.private[0]", "8.8.8.8").outcome  # "internet"（NAT Gateway 経由）
+        simulator.trace("172.16.0.10", "192.168.10.5").hops           # Client VPN → サブネットのルートテーブル
+    """
+
+    def __init__(self):
+        self.subnets: Dict[str, Tuple[Network, Optional[str]]] = {}  # サブネットのID → (CIDR, VPCのID)
+        self.route_tables: Dict[str, RadixTrie] = {}  # ルートテーブルのID → 宛先 → RouteTarget
+        self.subnet_tables: Dict[str, str] = {}  # サブネットのID → ルートテーブルのID（明示的な関連付け）
+        self.main_tables: Dict[str, str] = {}  # VPCのID → メインルートテーブルのID
+        self.nat_gateways: Dict[str, str] = {}  # NAT Gateway のID → サブネットのID
+        self.endpoints: Dict[str, ClientVpnEndpoint] = {}
+        self._subnet_index: RadixTrie = RadixTrie()  # サブネットのCIDR → サブネットのID
+        self._client_index: RadixTrie = RadixTrie()  # クライアントCIDR → エンドポイントのID
+
+    # --- 読み込み ---
+
+    def add_subnet(self, subnet_id: str, cidr: Union[str, Network], vpc_id: Optional[str] = None) -> None:
+        network = parse_network(cidr)
+        self.subnets[subnet_id] = (network, vpc_id)
+        self._subnet_index.insert(network, subnet_id)
+
+    def add_route_table(self, route_table: Dict[str, Any], internet_gateways: Iterable[str] = ()) -> None:
+        """describe_route_tables の RouteTables の要素を読み込む"""
+        internet_gateways = set(internet_gateways)
+        table_id = route_table["RouteTableId"]
+        routes: RadixTrie = RadixTrie()
+        for route in route_table.get("Routes") or []:
+            destination = route.get("DestinationCidrBlock") or route.get("DestinationIpv6CidrBlock")
+            if destination:  # プレフィックスリストの宛先は解決しない
+                routes.insert(destination, _route_target(route, internet_gateways))
+        self.route_tables[table_id] = routes
+        for association in route_table.get("Associations") or []:
+            if association.get("Main"):
+                self.main_tables[route_table.get("VpcId")] = table_id
+            elif association.get("SubnetId"):
+                self.subnet_tables[association["SubnetId"]] = table_id
+
+    def add_endpoint(self, endpoint: Dict[str, Any], routes: Iterable[Dict[str, Any]],
+                     authorization_rules: Iterable[Dict[str, Any]]) -> None:
+        """
+        describe_client_vpn_endpoints の要素と、そのルート・認可ルール（describe_client_vpn_routes・
+        describe_client_vpn_authorization_rules の要素）を読み込む
+        """
+        endpoint_id = endpoint["ClientVpnEndpointId"]
+        route_index: RadixTrie = RadixTrie()
+        for route in routes:
+            targets = route_index.get(route["DestinationCidr"]) or []
+            route_index.insert(route["DestinationCidr"], sorted(targets + [route["TargetSubnet"]]))
+        authorizations: RadixTrie = RadixTrie()
+        for rule in authorization_rules:
+            rules = authorizations.get(rule["DestinationCidr"]) or []
+            authorizations.insert(rule["DestinationCidr"], rules + [AuthorizationRule(
+                rule["DestinationCidr"], bool(rule.get("AccessAll")), rule.get("GroupId") or None,
+            )])
+        client_cidr = parse_network(endpoint["ClientCidrBlock"])
+        self.endpoints[endpoint_id] = ClientVpnEndpoint(
+            endpoint_id, client_cidr, bool(endpoint.get("SplitTunnel")), route_index, authorizations,
+        )
+        self._client_index.insert(client_cidr, endpoint_id)
+
+    @classmethod
+    def from_ec2(cls, client: Any) -> "RouteSimulator":
+        """
+        EC2クライアント（boto3 または PlanEC2View）の describe_* の応答から作る
+        """
+        simulator = cls()
+        for subnet in client.describe_subnets()["Subnets"]:
+            simulator.add_subnet(subnet["SubnetId"], subnet["CidrBlock"], subnet.get("VpcId"))
+        internet_gateways = {g["InternetGatewayId"] for g in client.describe_internet_gateways()["InternetGateways"]}
+        for table in client.describe_route_tables()["RouteTables"]:
+            simulator.add_route_table(table, internet_gateways)
+        for gateway in client.describe_nat_gateways()["NatGateways"]:
+            simulator.nat_gateways[gateway["NatGatewayId"]] = gateway.get("SubnetId")
+        for endpoint in client.describe_client_vpn_endpoints()["ClientVpnEndpoints"]:
+            endpoint_id = endpoint["ClientVpnEndpointId"]
+            simulator.add_endpoint(
+                endpoint,
+                client.describe_client_vpn_routes(ClientVpnEndpointId=endpoint_id)["Routes"],
+                client.describe_client_vpn_authorization_rules(ClientVpnEndpointId=endpoint_id)["AuthorizationRules"],
+            )
+        return simulator
+
+    @classmethod
+    def from_module(cls, module: TerraformModule, variables: Optional[Dict[str, Any]] = None) -> "RouteSimulator":
+        """Terraformの構成から作る（プランを作らずに、変数の既定値などから静的に評価する）"""
+        return cls.from_ec2(PlanEC2View(Evaluator(module, variables).resource_index()))
+
+    # --- 経路 ---
+
+    def subnet_of(self, address: Address) -> Optional[str]:
+        """アドレスを含むサブネットのID"""
+        found = self._subnet_index.longest_match(address)
+        return found[1] if found else None
+
+    def endpoint_of(self, address: Address) -> Optional[str]:
+        """アドレスをクライアントCIDRに含む Client VPN エンドポイントのID"""
+        found = self._client_index.longest_match(address)
+        return found[1] if found else None
+
+    def route_table_of(self, subnet_id: str) -> Optional[str]:
+        """サブネットのルートテーブル（関連付けがない場合はVPCのメインルートテーブル）"""
+        if subnet_id in self.subnet_tables:
+            return self.subnet_tables[subnet_id]
+        _, vpc_id = self.subnets.get(subnet_id, (None, None))
+        return self.main_tables.get(vpc_id)
+
+    def authorized(self, endpoint_id: str, destination: Address, groups: Optional[Sequence[str]] = None) -> bool:
+        """
+        Client VPN の認可ルールが宛先へのアクセスを許可するか
+
+        宛先を含む最長のプレフィックスの認可ルールを適用します（AWSと同じ）。
+
+        Args:
+            groups: 利用者のアクセスグループ（省略時はいずれかのグループに許可する場合 True）
+        """
+        found = self.endpoints[endpoint_id].authorizations.longest_match(destination)
+        if found is None:
+            return False
+        rules = found[1]
+        return any(rule.access_all or groups is None or rule.group in groups for rule in rules)
+
+    def trace(self, source: str, destination: Address, groups: Optional[Sequence[str]] = None) -> Trace:
+        """
+        送信元から宛先までの経路を求める
+
+        Args:
+            source: サブネットのID、Client VPN エンドポイントのID、またはクライアントCIDRのアドレス
+            destination: 宛先のアドレス
+            groups: Client VPN の利用者のアクセスグループ（省略時は認可ルールのいずれかのグループに属するとする）
+
+        Raises:
+            KeyError: 送信元がサブネット・エンドポイント・クライアントCIDRのいずれでもない場合
+        """
+        destination = str(destination)
+        hops: List[Hop] = []
+        if source in self.subnets:
+            subnet = source
+        else:
+            endpoint_id = source if source in self.endpoints else self._endpoint_for(source)
+            endpoint = self.endpoints[endpoint_id]
+            if not self.authorized(endpoint_id, destination, groups):
+                return Trace(source, destination, UNAUTHORIZED, ())
+            found = endpoint.routes.longest_match(destination)
+            if found is None:
+                return Trace(source, destination, SPLIT_TUNNEL if endpoint.split_tunnel else NO_ROUTE, ())
+            prefix, targets = found
+            subnet = targets[0]
+            hops.append(Hop(endpoint_id, str(prefix), RouteTarget("subnet", subnet)))
+        return self._trace_subnet(source, destination, subnet, hops)
+
+    def _endpoint_for(self, address: str) -> str:
+        try:
+            endpoint_id = self.endpoint_of(address)
+        except ValueError:
+            endpoint_id = None
+        if endpoint_id is None:
+            raise KeyError(f"{address} はサブネット・Client VPN エンドポイント・クライアントCIDRのいずれでもありません")
+        return endpoint_id
+
+    def _trace_subnet(self, source: str, destination: str, subnet: str, hops: List[Hop]) -> Trace:
+        visited = set()
+        while True:
+            table_id = self.route_table_of(subnet)
+            if table_id is None:
+                return Trace(source, destination, NO_ROUTE, tuple(hops))
+            if table_id in visited:
+                return Trace(source, destination, LOOP, tuple(hops))
+            visited.add(table_id)
+            found = self.route_tables[table_id].longest_match(destination)
+            if found is None:
+                return Trace(source, destination, NO_ROUTE, tuple(hops))
+            prefix, target = found
+            hops.append(Hop(table_id, str(prefix), target))
+            if target.kind == "local":
+                return Trace(source, destination, LOCAL, tuple(hops))
+            if target.kind == "internet-gateway":
+                return Trace(source, destination, INTERNET, tuple(hops))
+            if target.kind == "blackhole":
+                return Trace(source, destination, BLACKHOLE, tuple(hops))
+            if target.kind == "nat-gateway" and self.nat_gateways.get(target.id) in self.subnets:
+                # NAT Gateway のサブネットのルートテーブルで続きを解決する
+                subnet = self.nat_gateways[target.id]
+                continue
+            return Trace(source, destination, EXIT, tuple(hops))
+
+    def trace_many(self, source: str, destinations: Iterable[Address],
+                   groups: Optional[Sequence[str]] = None) -> List[Trace]:
+        """複数の宛先への経路を求める"""
+        return [self.trace(source, destination, groups) for destination in destinations]
+
+    def outcomes(self, source: str, destinations: Iterable[Address],
+                 groups: Optional[Sequence[str]] = None) -> Counter:
+        """複数の宛先への経路の結果を (結果, 最後のターゲット) ごとに数える"""
+        return Counter((t.outcome, t.exit) for t in self.trace_many(source, destinations, groups))
@@ -0,0 +1,352 @@
+"""
+セキュリティグループの到達可能性の評価
+
+describe_security_groups の応答（AWSのスナップショット、または PlanEC2View によるプラン・構成からの応答）を、
+グループ・方向（ingress・egress）・プロトコルごとに、ポートの区間 → 許可する相手（CIDRの区間・グループ）の表に
+コンパイルします。「X から Y へポート P で届くか」はポートと相手のアドレスの二分探索だけで求まるため、
+数百グループを対象とする CIS・OWASP の検査（管理ポートの公開、全ポートの無制限な許可など）も
+ルールを走査せずに評価できます。
+
+セキュリティグループは許可のみのステートフルなルールのため、通信は送信元のグループのいずれかの egress と
+宛先のグループのいずれかの ingress がともに許可する場合に届きます（グループのない相手は制限なしとします）。
+プレフィックスリストの内容は解決しないため、プレフィックスリストのルールは相手と一致しません。
+"""
+
+import ipaddress
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from tests.tfanalysis import Evaluator, PlanEC2View, ResourceIndex, TerraformModule
+
+from .cidr import _bounds, parse_network
+
+INGRESS = "ingress"
+EGRESS = "egress"
+
+# 全プロトコル
+ALL = "-1"
+# プロトコル番号・Terraformの表記 → EC2 APIの表記
+_PROTOCOLS = {"all": ALL, "-1": ALL, "6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6"}
+# ポートの範囲（ICMPはタイプ）
+PORT_RANGE = (0, 65535)
+# CIS AWS Foundations Benchmark 5.2・5.3 のリモート管理ポート（SSH、RDP）
+ADMIN_PORTS = (22, 3389)
+
+_IPV4_WORLD = _bounds(ipaddress.ip_network("0.0.0.0/0"))
+_IPV6_WORLD = _bounds(ipaddress.ip_network("::/0"))
+
+
+class Peer(NamedTuple):
+    """通信の相手（アドレス・CIDRと、所属するセキュリティグループ）"""
+
+    address: Optional[str] = None  # 192.0.2.10、0.0.0.0/0 など（CIDRの場合はすべてのアドレス）
+    groups: Tuple[str, ...] = ()  # グループのID（プランでは aws_security_group.x）
+
+
+WORLD = Peer("0.0.0.0/0")
+WORLD_IPV6 = Peer("::/0")
+
+
+class Exposure(NamedTuple):
+    """検査に該当するルール（ポートの区間）"""
+
+    group_id: str
+    group_name: Optional[str]
+    direction: str  # ingress または egress
+    protocol: str  # tcp、udp、icmp、-1 など
+    from_port: int
+    to_port: int
+
+
+def normalize_protocol(protocol: Any) -> str:
+    """プロトコルをEC2 APIの表記（tcp、udp、icmp、icmpv6、-1、その他は番号）にする"""
+    text = str(protocol).lower()
+    return _PROTOCOLS.get(text, text)
+
+
+class _Peers:
+    """許可する相手の集合（連結したCIDRの区間・グループ・プレフィックスリスト）"""
+
+    __slots__ = ("starts", "ends", "groups", "prefix_lists")
+
+    def __init__(self, networks: Iterable[Tuple[int, int]], groups: Iterable[str], prefix_lists: Iterable[str]):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in sorted(networks):
+            if self.ends and start <= self.ends[-1] + 1:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        self.groups: FrozenSet[str] = frozenset(groups)
+        self.prefix_lists: FrozenSet[str] = frozenset(prefix_lists)
+
+    def __bool__(self) -> bool:
+        return bool(self.starts or self.groups or self.prefix_lists)
+
+    def covers(self, start: int, end: int) -> bool:
+        """区間のすべてのアドレスを含むか"""
+        index = bisect_right(self.starts, start) - 1
+        return index >= 0 and self.ends[index] >= end
+
+    def matches(self, bounds: Optional[Tuple[int, int]], groups: Sequence[str]) -> bool:
+        return (bounds is not None and self.covers(*bounds)) or any(group in self.groups for group in groups)
+
+    @property
+    def world(self) -> bool:
+        """IPv4またはIPv6のすべてのアドレスを含むか"""
+        return self.covers(*_IPV4_WORLD) or self.covers(*_IPV6_WORLD)
+
+
+class _Rule(NamedTuple):
+    low: int
+    high: int
+    networks: Tuple[Tuple[int, int], ...]
+    groups: Tuple[str, ...]
+    prefix_lists: Tuple[str, ...]
+
+
+class _PortIndex:
+    """ポートの区間（境界の昇順）→ 許可する相手"""
+
+    __slots__ = ("bounds", "segments")
+
+    def __init__(self, rules: List[_Rule]):
+        points = sorted({PORT_RANGE[0]} | {r.low for r in rules} | {r.high + 1 for r in rules if r.high < PORT_RANGE[1]})
+        self.bounds: List[int] = points
+        self.segments: List[_Peers] = []
+        for low in points:
+            covering = [r for r in rules if r.low <= low <= r.high]
+            self.segments.append(_Peers(
+                (network for r in covering for network in r.networks),
+                (group for r in covering for group in r.groups),
+                (prefix for r in covering for prefix in r.prefix_lists),
+            ))
+
+    def at(self, port: int) -> _Peers:
+        return self.segments[bisect_right(self.bounds, port) - 1]
+
+    def ranges(self) -> Iterable[Tuple[int, int, _Peers]]:
+        """(先頭のポート, 末尾のポート, 許可する相手) をポートの順に列挙する"""
+        for position, low in enumerate(self.bounds):
+            high = self.bounds[position + 1] - 1 if position + 1 < len(self.bounds) else PORT_RANGE[1]
+            yield low, high, self.segments[position]
+
+
+def _port_range(protocol: str, permission: Dict[str, Any]) -> Tuple[int, int]:
+    from_port, to_port = permission.get("FromPort"), permission.get("ToPort")
+    if protocol in ("tcp", "udp") and from_port is not None and to_port is not None and from_port >= 0:
+        return from_port, to_port
+    if protocol in ("icmp", "icmpv6") and from_port is not None and from_port >= 0:
+        # ICMPの FromPort はタイプ（ToPort はコード）
+        return from_port, from_port
+    return PORT_RANGE
+
+
+def _compile(permissions: Iterable[Dict[str, Any]]) -> Dict[str, _PortIndex]:
+    """IpPermissions → プロトコル → ポートの索引（全プロトコル -1 の索引は常に含める）"""
+    by_protocol: Dict[str, List[_Rule]] = {}
+    for permission in permissions:
+        protocol = normalize_protocol(permission.get("IpProtocol", ALL))
+        low, high = _port_range(protocol, permission)
+        networks = tuple(
+            _bounds(parse_network(item[key]))
+            for name, key in (("IpRanges", "CidrIp"), ("Ipv6Ranges", "CidrIpv6"))
+            for item in permission.get(name) or [] if item.get(key)
+        )
+        groups = tuple(pair["GroupId"] for pair in permission.get("UserIdGroupPairs") or [] if pair.get("GroupId"))
+        prefix_lists = tuple(
+            item["PrefixListId"] for item in permission.get("PrefixListIds") or [] if item.get("PrefixListId")
+        )
+        by_protocol.setdefault(protocol, []).append(_Rule(low, high, networks, groups, prefix_lists))
+    by_protocol.setdefault(ALL, [])
+    return {protocol: _PortIndex(rules) for protocol, rules in by_protocol.items()}
+
+
+@lru_cache(maxsize=4096)
+def _address_bounds(address: str) -> Tuple[int, int]:
+    # 同じ相手への問い合わせを繰り返すため、アドレスの解析はキャッシュする
+    return _bounds(ipaddress.ip_network(address, strict=False))
+
+
+def _peer_bounds(peer: Peer) -> Optional[Tuple[int, int]]:
+    return None if peer.address is None else _address_bounds(peer.address)
+
+
+class SecurityGroupEvaluator:
+    """
+    セキュリティグループのルールをコンパイルした到達可能性の評価器
+
+    使用例:
+        evaluator = SecurityGroupEvaluator.from_describe(ec2_client.describe_security_groups())
+        evaluator.can_reach(Peer("203.0.113.5"), Peer(groups=("sg-0123",)), "udp", 443)
+        evaluator.world_exposures(ADMIN_PORTS)  # 0.0.0.0/0・::/0 に公開した管理ポート
+    """
+
+    def __init__(self, groups: Iterable[Dict[str, Any]]):
+        """
+        Args:
+            groups: describe_security_groups の SecurityGroups の要素
+
+        Raises:
+            ValueError: ルールのCIDRが不正な場合
+        """
+        self.groups: Dict[str, Dict[str, Any]] = {}
+        self._tables: Dict[Tuple[str, str], Dict[str, _PortIndex]] = {}
+        for group in groups:
+            group_id = group["GroupId"]
+            self.groups[group_id] = group
+            self._tables[(group_id, INGRESS)] = _compile(group.get("IpPermissions") or [])
+            self._tables[(group_id, EGRESS)] = _compile(group.get("IpPermissionsEgress") or [])
+
+    @classmethod
+    def from_describe(cls, response: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> "SecurityGroupEvaluator":
+        """describe_security_groups の応答（または SecurityGroups の要素）から作る"""
+        if isinstance(response, dict):
+            response = response.get("SecurityGroups", [])
+        return cls(response)
+
+    @classmethod
+    def from_plan(cls, index: ResourceIndex) -> "SecurityGroupEvaluator":
+        """プランのリソースの索引から作る（グループのIDは aws_security_group.x などの記号的な値）"""
+        return cls.from_describe(PlanEC2View(index).describe_security_groups())
+
+    @classmethod
+    def from_module(cls, module: TerraformModule, variables: Optional[Dict[str, Any]] = None) -> "SecurityGroupEvaluator":
+        """
+        Terraformの構成から作る（プランを作らずに、変数の既定値などから静的に評価する）
+
+        Raises:
+            ValueError: ルールのCIDRを静的に評価できない場合（記号的な値になるため）
+        """
+        return cls.from_plan(Evaluator(module, variables).resource_index(
+            ("aws_security_group", "aws_security_group_rule",
+             "aws_vpc_security_group_ingress_rule", "aws_vpc_security_group_egress_rule")
+        ))
+
+    def group_id(self, name: str) -> str:
+        """
+        グループ名（またはID）のIDを返す
+
+        Raises:
+            KeyError: グループがない、または同じ名前のグループが複数ある場合
+        """
+        if name in self.groups:
+            return name
+        found = [group_id for group_id, group in self.groups.items() if group.get("GroupName") == name]
+        if len(found) != 1:
+            raise KeyError(f"セキュリティグループ {name} が {len(found)} 件あります")
+        return found[0]
+
+    def _indexes(self, group_id: str, direction: str, protocol: Any) -> List[_PortIndex]:
+        """プロトコルに適用する索引（プロトコルのルールと全プロトコルのルール）"""
+        table = self._tables[(group_id, direction)]
+        protocol = normalize_protocol(protocol)
+        return [table[ALL]] if protocol == ALL or protocol not in table else [table[protocol], table[ALL]]
+
+    def _permits(self, group_id: str, direction: str, protocol: Any, port: int,
+                 bounds: Optional[Tuple[int, int]], groups: Sequence[str]) -> bool:
+        return any(index.at(port).matches(bounds, groups) for index in self._indexes(group_id, direction, protocol))
+
+    def allows(self, group_id: str, direction: str, protocol: Any, port: int, peer: Peer) -> bool:
+        """
+        グループのルールが相手との通信を許可するか
+
+        Args:
+            group_id: グループのID
+            direction: ingress（相手が送信元）または egress（相手が宛先）
+            protocol: tcp、udp、icmp、-1、プロトコル番号など
+            port: ポート（ICMPはタイプ）
+            peer: 相手（アドレスがCIDRの場合は、そのすべてのアドレスを許可する場合のみ True）
+
+        Raises:
+            KeyError: グループがない場合
+        """
+        return self._permits(group_id, direction, protocol, port, _peer_bounds(peer), peer.groups)
+
+    def can_reach(self, source: Peer, target: Peer, protocol: Any, port: int) -> bool:
+        """
+        送信元から宛先へ、プロトコル・ポートの通信が届くか
+
+        送信元のグループのいずれかの egress と、宛先のグループのいずれかの ingress がともに許可する場合に
+        True を返します（グループのない側は制限なしとします）。
+
+        Raises:
+            ValueError: 送信元・宛先にアドレスもグループもない場合
+            KeyError: 送信元・宛先のグループがない場合
+        """
+        if not (source.address or source.groups) or not (target.address or target.groups):
+            raise ValueError("送信元・宛先にはアドレスまたはグループが必要です")
+        source_bounds, target_bounds = _peer_bounds(source), _peer_bounds(target)
+        if source.groups and not any(
+            self._permits(group, EGRESS, protocol, port, target_bounds, target.groups) for group in source.groups
+        ):
+            return False
+        return not target.groups or any(
+            self._permits(group, INGRESS, protocol, port, source_bounds, source.groups) for group in target.groups
+        )
+
+    def port_ranges(self, group_id: str, direction: str, protocol: Any,
+                    peer: Optional[Peer] = None) -> List[Tuple[int, int]]:
+        """
+        グループのルールが許可するポートの区間（連結したもの）
+
+        Args:
+            peer: 相手（省略時はいずれかの相手に許可するポート）
+        """
+        bounds = None if peer is None else _peer_bounds(peer)
+        allowed = sorted(
+            (low, high)
+            for index in self._indexes(group_id, direction, protocol)
+            for low, high, peers in index.ranges()
+            if (peers if peer is None else peers.matches(bounds, peer.groups))
+        )
+        ranges: List[Tuple[int, int]] = []
+        for low, high in allowed:
+            if ranges and low <= ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], high))
+            else:
+                ranges.append((low, high))
+        return ranges
+
+    def _exposures(self, direction: str, world: bool, group_ids: Optional[Iterable[str]]) -> Iterable[Exposure]:
+        for group_id in self.groups if group_ids is None else group_ids:
+            name = self.groups[group_id].get("GroupName")
+            for protocol, index in self._tables[(group_id, direction)].items():
+                for low, high, peers in index.ranges():
+                    if peers.world if world else peers:
+                        yield Exposure(group_id, name, direction, protocol, low, high)
+
+    def world_exposures(self, ports: Iterable[int] = ADMIN_PORTS, direction: str = INGRESS,
+                        protocols: Iterable[str] = ("tcp", "udp"),
+                        group_ids: Optional[Iterable[str]] = None) -> List[Exposure]:
+        """
+        インターネット全体（0.0.0.0/0 または ::/0）に許可したポート（CIS 5.2・5.3 など）
+
+        Args:
+            ports: 検査するポート
+            protocols: 検査するプロトコル（全プロトコル -1 のルールは常に該当する）
+            group_ids: 対象のグループ（省略時はすべて）
+        """
+        ports = list(ports)
+        protocols = {normalize_protocol(p) for p in protocols}
+        return [
+            exposure for exposure in self._exposures(direction, True, group_ids)
+            if exposure.protocol in protocols | {ALL}
+            and any(exposure.from_port <= port <= exposure.to_port for port in ports)
+        ]
+
+    def all_ports_exposures(self, direction: str = INGRESS, world: bool = True,
+                            group_ids: Optional[Iterable[str]] = None) -> List[Exposure]:
+        """
+        ポートの範囲全体（全プロトコル、または 0〜65535）を許可したルール（CIS 5.1 など）
+
+        Args:
+            world: True の場合はインターネット全体に許可したもののみ、False の場合は相手を問わない
+            group_ids: 対象のグループ（省略時はすべて）
+        """
+        return [
+            exposure for exposure in self._exposures(direction, world, group_ids)
+            if (exposure.from_port, exposure.to_port) == PORT_RANGE
+        ]
@@ -21,6 +21,13 @@ settings.register_profile("dev", max_examples=50, verbosity=Verbosity.verbose)
 profile = os.getenv("HYPOTHESIS_PROFILE", "default")
 settings.load_profile(profile)
 
+# プロジェクトルートをパスに追加した後に読み込む
+from tests.secret_scan.baseline import DEFAULT_BASELINE_FILE, Baseline  # noqa: E402
+from tests.secret_scan.cache import ScanCache  # noqa: E402
+from tests.secret_scan.sources import scan_sources  # noqa: E402
+from tests.secret_scan.walker import ProjectFiles  # noqa: E402
+from tests.tfanalysis import TerraformModule  # noqa: E402
+
 
 @pytest.fixture(scope="session")
 def terraform_dir():
@@ -40,21 +47,90 @@ def terraform_files(terraform_dir):
     return list(terraform_dir.glob("*.tf"))
 
 
+@pytest.fixture(scope="session")
+def terraform_module(terraform_dir):
+    """
+    Terraformディレクトリの .tf ファイルの構文木を返す
+
+    ファイル内容のハッシュをキーにキャッシュし、1回のテスト実行で各ファイルを1回だけ解析する
+    """
+    return TerraformModule.load(terraform_dir)
+
+
+@pytest.fixture(scope="session")
+def scan_cache(request):
+    """
+    シークレットスキャンの永続キャッシュを返す（.pytest_cache/d/secret-scan に保存）
+
+    環境変数 SECRET_SCAN_CACHE=0 またはpytestのキャッシュが無効な場合はNoneを返す
+    """
+    config_cache = getattr(request.config, "cache", None)
+    if os.getenv("SECRET_SCAN_CACHE", "1") == "0" or config_cache is None:
+        yield None
+        return
+
+    cache = ScanCache(config_cache.mkdir("secret-scan") / "scan-cache.sqlite3")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture(scope="session")
+def scan_baseline(project_root_dir):
+    """
+    シークレットスキャンの受け入れ済みの検出結果と除外パスを返す
+
+    環境変数 SECRET_SCAN_BASELINE でファイルを指定できます
+    （既定はプロジェクトルートの .secret-scan-baseline.json。ファイルがない場合は空）
+    """
+    baseline_path = os.getenv("SECRET_SCAN_BASELINE") or project_root_dir / DEFAULT_BASELINE_FILE
+    return Baseline.load(Path(baseline_path))
+
+
 @pytest.fixture(scope="session")
 def all_project_files(project_root_dir):
-    """プロジェクト内のすべてのファイルのリストを返す（バイナリファイルを除く）"""
+    """
+    プロジェクト内のすべてのファイルを返す（バイナリファイルを除く）
+
+    除外ディレクトリと .gitignore で無視されるディレクトリは降りる前に刈り込み、
+    反復するたびにファイルを遅延的に列挙する（リストは作らない）
+    """
     exclude_dirs = {".git", "node_modules", "__pycache__", ".terraform", ".venv", "venv"}
     exclude_extensions = {".pyc", ".pyo", ".so", ".dll", ".exe", ".bin", ".jpg", ".png", ".gif"}
-    
-    files = []
-    for file_path in project_root_dir.rglob("*"):
-        if file_path.is_file():
-            # 除外ディレクトリをチェック
-            if any(excluded in file_path.parts for excluded in exclude_dirs):
-                continue
-            # 除外拡張子をチェック
-            if file_path.suffix in exclude_extensions:
-                continue
-            files.append(file_path)
-    
-    return files
+
+    return ProjectFiles(project_root_dir, exclude_dirs, exclude_extensions)
+
+
+@pytest.fixture
+def project_scan_sources(request, project_root_dir, scan_baseline, scan_cache):
+    """
+    プロジェクトファイルのシークレットスキャン結果を返す
+
+    コマンドライン（python -m tests.secret_scan scan）・常駐スキャナーと同じ
+    tests.secret_scan.sources.scan_sources でスキャンします。
+    環境変数で差分スキャンモードを選択できます（pre-commit / pre-pushフック向け）:
+    - SECRET_SCAN_STAGED=1: ステージ済みの変更のみ
+    - SECRET_SCAN_BASE=<ref>: <ref>...HEAD の差分のみ
+    - SECRET_SCAN_HISTORY=1: 全refから到達可能なすべてのblob（重複なし）
+    いずれも未指定の場合は all_project_files（作業ツリーの全ファイル）をスキャンする
+
+    Returns:
+        (表示用の位置, ベースラインと照合するパス, 検出結果) のイテレータ
+    """
+    history = os.getenv("SECRET_SCAN_HISTORY") == "1"
+    base_ref = os.getenv("SECRET_SCAN_BASE")
+    staged = os.getenv("SECRET_SCAN_STAGED") == "1"
+    paths = []
+    if not (history or base_ref or staged):
+        paths = [
+            file_path.relative_to(project_root_dir).as_posix()
+            for file_path in request.getfixturevalue("all_project_files")
+        ]
+    return scan_sources(
+        paths,
+        project_root_dir,
+        scan_baseline,
+        staged=staged,
+        base=base_ref,
+        history=history,
+        cache=scan_cache,
+    )
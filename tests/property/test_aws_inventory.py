@@ -0,0 +1,193 @@
+"""
+Property-Based Test: 統合テストで共有するAWSのインベントリ
+
+**Validates: Requirements 6.4**
+
+このテストは、インベントリがリソースの種類ごとに1回だけ（ページネーションを最後まで）取得し、
+Filters・ID・名前の指定を元のクライアントと同じ結果で評価し、読み取り専用の一覧を返すことを検証します。
+"""
+
+import random
+from types import MappingProxyType
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from tests.inventory import Inventory
+from tests.tfanalysis import Evaluator, PlanEC2View
+
+
+def thaw(value):
+    """読み取り専用の応答を dict・list に戻す（元のクライアントの応答と比べるため）"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+class PaginatedEC2:
+    """ページ（100件）に分けて describe_subnets に応答するクライアント"""
+
+    def __init__(self, subnets):
+        self.subnets = subnets
+        self.requests = 0
+
+    def can_paginate(self, operation):
+        return operation == "describe_subnets"
+
+    def get_paginator(self, operation):
+        client = self
+
+        class Paginator:
+            def paginate(self, **params):
+                for start in range(0, len(client.subnets), 100):
+                    client.requests += 1
+                    yield {"Subnets": client.subnets[start:start + 100]}
+
+        return Paginator()
+
+    def describe_subnets(self, **params):
+        self.requests += 1
+        return {"Subnets": self.subnets[:params.get("MaxResults", 100)]}
+
+
+def synthetic_subnets(count, seed=0):
+    generator = random.Random(seed)
+    return [
+        {
+            "SubnetId": f"subnet-{i:05d}",
+            "VpcId": f"vpc-{i % 7}",
+            "CidrBlock": f"10.{i // 256}.{i % 256}.0/24",
+            "AvailabilityZone": generator.choice(["ap-northeast-1a", "ap-northeast-1c", "ap-northeast-1d"]),
+            "State": "available",
+            "Tags": [
+                {"Key": "Name", "Value": f"subnet-{i}"},
+                {"Key": "Type", "Value": generator.choice(["Public", "Private"])},
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(scope="module")
+def plan_ec2(terraform_module):
+    return PlanEC2View(Evaluator(terraform_module).resource_index())
+
+
+filters = st.lists(
+    st.one_of(
+        st.builds(
+            lambda v: {"Name": "tag:Type", "Values": v},
+            st.lists(st.sampled_from(["Public", "Private", "P*", "*ate"]), min_size=1),
+        ),
+        st.builds(
+            lambda v: {"Name": "tag:Name", "Values": [v]}, st.sampled_from(["client-vpn-*", "*private*", "none"]),
+        ),
+        st.builds(lambda v: {"Name": "vpc-id", "Values": [v]}, st.sampled_from(["aws_vpc.main", "vpc-other"])),
+        st.builds(lambda v: {"Name": "availability-zone", "Values": [v]}, st.sampled_from(["ap-northeast-1a", "*1c"])),
+        st.just({"Name": "state", "Values": ["available"]}),
+        st.just({"Name": "tag-key", "Values": ["Type"]}),
+    ),
+    max_size=3,
+)
+
+
+@settings(max_examples=50)
+@given(subnet_filters=filters, table_subnet=st.sampled_from(["aws_subnet.private[0]", "aws_subnet.public[1]", "x"]))
+def test_property_filters_match_original_client(plan_ec2, subnet_filters, table_subnet):
+    """
+    インベントリの応答が、同じ Filters を渡した元のクライアントの応答と一致し、APIの呼び出しは
+    種類ごとに1回であることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    inventory = Inventory()
+    ec2 = inventory.view("ec2", plan_ec2)
+    table_filters = [{"Name": "association.subnet-id", "Values": [table_subnet]}]
+
+    for _ in range(3):
+        assert thaw(ec2.describe_subnets(Filters=subnet_filters)) == plan_ec2.describe_subnets(Filters=subnet_filters)
+        assert thaw(ec2.describe_route_tables(Filters=table_filters)) == \
+            plan_ec2.describe_route_tables(Filters=table_filters)
+    assert thaw(ec2.describe_internet_gateways(
+        Filters=[{"Name": "attachment.vpc-id", "Values": ["aws_vpc.main"]}]
+    )) == plan_ec2.describe_internet_gateways(Filters=[{"Name": "attachment.vpc-id", "Values": ["aws_vpc.main"]}])
+    assert inventory.calls == {
+        ("ec2", "describe_subnets"): 1, ("ec2", "describe_route_tables"): 1, ("ec2", "describe_internet_gateways"): 1,
+    }
+
+
+def test_paginates_once_and_answers_from_index():
+    """
+    2,500件のサブネットをページネーションで1回だけ取得し、以降の呼び出し（フィルタ・IDの指定）を
+    APIを呼ばずに総当たりと同じ結果で返すことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    subnets = synthetic_subnets(2500)
+    client = PaginatedEC2(subnets)
+    inventory = Inventory()
+    ec2 = inventory.view("ec2", client)
+
+    for vpc in range(7):
+        for kind in ("Public", "Private"):
+            found = ec2.describe_subnets(Filters=[
+                {"Name": "tag:Type", "Values": [kind]}, {"Name": "vpc-id", "Values": [f"vpc-{vpc}"]},
+            ])["Subnets"]
+            expected = [s for s in subnets if s["VpcId"] == f"vpc-{vpc}" and s["Tags"][1]["Value"] == kind]
+            assert thaw(found) == expected
+    found = ec2.describe_subnets(SubnetIds=["subnet-00042", "subnet-02499"])["Subnets"]
+    assert thaw(found) == [subnets[42], subnets[2499]]
+    assert client.requests == 25
+    assert inventory.calls[("ec2", "describe_subnets")] == 25
+
+    resources = inventory.resources("ec2", "describe_subnets")
+    assert len(resources) == 2500
+    assert thaw(resources.get("subnet-00007")) == subnets[7]
+    assert len(resources.in_vpc("vpc-3")) == len([s for s in subnets if s["VpcId"] == "vpc-3"])
+    assert len(resources.tagged("Type")) == 2500
+    assert thaw(resources.tagged("Name", "subnet-9")) == [subnets[9]]
+
+
+def test_responses_are_read_only_and_unsupported_calls_pass_through():
+    """
+    一覧の要素は変更できず、索引で評価できない引数（MaxResults）・未対応のフィルタは元のクライアントに
+    渡すことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    client = PaginatedEC2(synthetic_subnets(150))
+    ec2 = Inventory().view("ec2", client)
+    subnet = ec2.describe_subnets()["Subnets"][0]
+
+    with pytest.raises(TypeError):
+        subnet["CidrBlock"] = "0.0.0.0/0"
+    with pytest.raises(TypeError):
+        subnet["Tags"][0]["Value"] = "changed"
+    assert client.requests == 2
+
+    assert len(ec2.describe_subnets(MaxResults=5)["Subnets"]) == 5
+    assert client.requests == 3
+    ec2.describe_subnets(Filters=[{"Name": "ipv6-native", "Values": ["true"]}])
+    assert client.requests == 4
+    assert ec2.can_paginate("describe_subnets")
+
+
+def test_scoped_operations_are_cached_per_scope(plan_ec2):
+    """
+    Client VPN のルート・認可ルールなど、エンドポイントごとの操作はエンドポイントごとに1回だけ取得することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    inventory = Inventory()
+    ec2 = inventory.view("ec2", plan_ec2)
+
+    for _ in range(3):
+        for endpoint in ("aws_ec2_client_vpn_endpoint.pc", "aws_ec2_client_vpn_endpoint.mobile"):
+            assert thaw(ec2.describe_client_vpn_routes(ClientVpnEndpointId=endpoint)) == \
+                plan_ec2.describe_client_vpn_routes(ClientVpnEndpointId=endpoint)
+            assert thaw(ec2.describe_client_vpn_authorization_rules(ClientVpnEndpointId=endpoint)) == \
+                plan_ec2.describe_client_vpn_authorization_rules(ClientVpnEndpointId=endpoint)
+    assert inventory.calls[("ec2", "describe_client_vpn_routes")] == 2
+    assert inventory.calls[("ec2", "describe_client_vpn_authorization_rules")] == 2
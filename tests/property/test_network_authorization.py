@@ -0,0 +1,160 @@
+"""
+Property-Based Test: Client VPN の認可ルールのシミュレーション
+
+**Validates: Requirements 6.4**
+
+このテストは、認可ルールの索引による「グループが届く宛先」「宛先に届くグループ」の判定が
+最長一致の総当たりと一致し、ルールセットの差分がグループごとの到達範囲の変化を正しく表し、
+数千人の利用者の一括評価が高速であることを検証します。
+"""
+
+import ipaddress
+import random
+import time
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.network import AuthorizationRule, AuthorizationSimulator
+
+GROUPS = ("eng", "ops", "sales", "audit")
+
+# 10.0.0.0/8 の中のプレフィックス（/8〜/28）と 0.0.0.0/0
+prefixes = st.one_of(
+    st.just("0.0.0.0/0"),
+    st.builds(
+        lambda offset, prefixlen: str(ipaddress.ip_network((0x0A000000 + offset, prefixlen), strict=False)),
+        st.integers(min_value=0, max_value=0xFFFFFF),
+        st.integers(min_value=8, max_value=28),
+    ),
+)
+rules = st.lists(
+    st.builds(
+        lambda destination, group: AuthorizationRule(destination, group is None, group),
+        prefixes,
+        st.one_of(st.none(), st.sampled_from(GROUPS)),
+    ),
+    max_size=25,
+)
+addresses = st.builds(
+    lambda offset: ipaddress.IPv4Address(0x0A000000 + offset - 0x800000),
+    st.integers(min_value=0, max_value=0x1FFFFFF),
+)
+memberships = st.frozensets(st.sampled_from(GROUPS), max_size=3)
+
+
+def brute_force(ruleset, groups, address):
+    """宛先を含む最長のプレフィックスのルールを総当たりで適用する"""
+    containing = [r for r in ruleset if address in ipaddress.ip_network(r.destination)]
+    if not containing:
+        return False
+    longest = max(ipaddress.ip_network(r.destination).prefixlen for r in containing)
+    return any(
+        r.access_all or r.group in groups
+        for r in containing
+        if ipaddress.ip_network(r.destination).prefixlen == longest
+    )
+
+
+@given(ruleset=rules, groups=memberships, address=addresses)
+def test_property_access_matches_longest_prefix_rules(ruleset, groups, address):
+    """
+    allows・reachable・audience・evaluate が、最長一致のルールの総当たりと一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    simulator = AuthorizationSimulator(ruleset)
+    expected = brute_force(ruleset, groups, address)
+
+    assert simulator.allows(groups, address) == expected
+    assert any(address in network for network in simulator.reachable(groups)) == expected
+    assert simulator.evaluate({"user": groups}, [address])["user"] == ((str(address),) if expected else ())
+    audience = simulator.audience(address)
+    assert (audience is not None and audience.admits(groups)) == expected
+
+
+@given(before=rules, after=rules, address=addresses)
+def test_property_diff_reports_access_changes(before, after, address):
+    """
+    diff の granted・revoked が、グループごとの変更前後の到達可否の変化と一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    current, proposed = AuthorizationSimulator(before), AuthorizationSimulator(after)
+    changes = {change.group: change for change in current.diff(proposed)}
+
+    for group in (None, *GROUPS):
+        groups = () if group is None else (group,)
+        was, will = current.allows(groups, address), proposed.allows(groups, address)
+        # ルールに現れないグループの利用者は、どのグループにも属さない利用者と同じ変化になる
+        change = changes.get(group) if group in current.groups + proposed.groups else changes.get(None)
+        granted = change is not None and any(address in network for network in change.granted)
+        revoked = change is not None and any(address in network for network in change.revoked)
+        assert granted == (will and not was)
+        assert revoked == (was and not will)
+
+
+@pytest.mark.terraform_resources("aws_ec2_client_vpn_authorization_rule.*")
+def test_project_authorization_allows_all_users(terraform_module):
+    """
+    Terraformの構成で、PC用・スマホ用のエンドポイントの認可ルールがすべての利用者にインターネットへの
+    アクセスを許可することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    for endpoint in ("aws_ec2_client_vpn_endpoint.pc", "aws_ec2_client_vpn_endpoint.mobile"):
+        simulator = AuthorizationSimulator.from_module(terraform_module, endpoint)
+
+        assert simulator.reachable([]) == (ipaddress.ip_network("0.0.0.0/0"),)
+        assert simulator.audience("8.8.8.8").all_groups
+
+
+@pytest.mark.terraform_resources("aws_ec2_client_vpn_authorization_rule.*")
+def test_project_migration_to_group_rules_is_audited(terraform_module):
+    """
+    authorize_all_groups からグループごとのルールへの移行で、どのグループにも属さない利用者が
+    インターネットに届かなくなり、VPCへのアクセスが運用グループだけに絞られることを差分で検出できることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    current = AuthorizationSimulator.from_module(terraform_module, "aws_ec2_client_vpn_endpoint.pc")
+    proposed = AuthorizationSimulator([
+        AuthorizationRule("0.0.0.0/0", False, "saml-staff"),
+        AuthorizationRule("0.0.0.0/0", False, "saml-ops"),
+        AuthorizationRule("192.168.0.0/16", False, "saml-ops"),
+    ])
+
+    changes = {change.group: change for change in current.diff(proposed)}
+
+    assert changes[None].revoked == (ipaddress.ip_network("0.0.0.0/0"),)
+    assert changes["saml-staff"].revoked == (ipaddress.ip_network("192.168.0.0/16"),)
+    assert "saml-ops" not in changes
+    assert proposed.audience("192.168.10.5").groups == {"saml-ops"}
+
+
+def test_bulk_evaluation_stays_fast():
+    """
+    300グループ・600ルールに対して、5,000人の利用者 × 2,000件の宛先の一括評価が高速で、
+    個別の判定と一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    generator = random.Random(0)
+    groups = [f"saml-{i}" for i in range(300)]
+    ruleset = [AuthorizationRule("0.0.0.0/0", False, "saml-0")]
+    for i in range(600):
+        network = ipaddress.ip_network((0x0A000000 + generator.getrandbits(24), generator.randint(12, 28)), strict=False)
+        ruleset.append(AuthorizationRule(str(network), False, generator.choice(groups)))
+    simulator = AuthorizationSimulator(ruleset)
+    users = {f"user-{i}": generator.sample(groups, generator.randint(1, 5)) for i in range(5000)}
+    destinations = [str(ipaddress.IPv4Address(0x0A000000 + generator.getrandbits(24))) for _ in range(1500)]
+    destinations += [str(ipaddress.IPv4Address(generator.getrandbits(32))) for _ in range(500)]
+
+    started = time.perf_counter()
+    evaluated = simulator.evaluate(users, destinations)
+    elapsed = time.perf_counter() - started
+
+    assert len(evaluated) == len(users)
+    for user in generator.sample(sorted(users), 20):
+        assert evaluated[user] == tuple(d for d in destinations if simulator.allows(users[user], d))
+    assert elapsed < 10.0
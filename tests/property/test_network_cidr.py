@@ -0,0 +1,190 @@
+"""
+Property-Based Test: CIDRの割り当てと重なりの検査
+
+**Validates: Requirements 6.4**
+
+このテストは、区間の索引による重なりの検索・空きブロックの割り当てが総当たりの結果と一致し、
+Terraformの構成のVPC・サブネット・クライアントCIDRが互いに矛盾せず、数千テナント分の範囲を読み込んでも
+検索・割り当てが高速であることを検証します。
+"""
+
+import ipaddress
+import time
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.network import CidrConflict, CidrExhausted, CidrPlan, IntervalMap
+from tests.tfanalysis import Evaluator, NotLiteral, ParseCache, TerraformModule
+
+# 10.0.0.0/16 の中のブロック（重なりが起きやすいように小さな空間に限る）
+blocks = st.builds(
+    lambda offset, prefixlen: ipaddress.ip_network((0x0A000000 + (offset >> (32 - prefixlen) << (32 - prefixlen)), prefixlen)),
+    st.integers(min_value=0, max_value=0xFFFF),
+    st.integers(min_value=16, max_value=28),
+)
+
+
+def overlaps(a, b):
+    return a.network_address <= b.broadcast_address and b.network_address <= a.broadcast_address
+
+
+@given(networks=st.lists(blocks, max_size=30), query=blocks)
+def test_property_overlapping_matches_brute_force(networks, query):
+    """
+    追加できたブロック（重なるものは CidrConflict で拒否）に対して、overlapping が総当たりで求めた
+    重なるブロックと一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    index = IntervalMap()
+    added = []
+    for network in networks:
+        if any(overlaps(network, other) for other in added):
+            with pytest.raises(CidrConflict):
+                index.add(network, str(network))
+        else:
+            index.add(network, str(network))
+            added.append(network)
+
+    assert [n for n, _ in index] == sorted(added)
+    assert [n for n, _ in index.overlapping(query)] == sorted(n for n in added if overlaps(n, query))
+    found = index.lookup(query.network_address)
+    assert found == next(((n, str(n)) for n in added if query.network_address in n), None)
+
+
+@given(
+    networks=st.lists(blocks, max_size=30),
+    removed=st.sets(st.integers(min_value=0, max_value=29)),
+    prefixlen=st.integers(min_value=20, max_value=28),
+)
+def test_property_free_blocks_are_aligned_and_free(networks, removed, prefixlen):
+    """
+    ブロックの追加・削除の後で、free_blocks が親ブロックの中で既存のブロックと重ならない、境界に揃った
+    すべてのブロックをアドレスの順に列挙し、空きがない場合は allocate が CidrExhausted を送出することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    parent = ipaddress.ip_network("10.0.0.0/20")
+    index = IntervalMap()
+    for network in networks:
+        if not index.overlapping(network):
+            index.add(network, None)
+    for position, (network, _) in enumerate(list(index)):
+        if position in removed:
+            index.remove(network)
+
+    expected = [
+        candidate for candidate in parent.subnets(new_prefix=prefixlen)
+        if not any(overlaps(candidate, n) for n, _ in index)
+    ]
+    assert list(index.free_blocks(parent, prefixlen)) == expected
+    if expected:
+        assert index.allocate(parent, prefixlen) == expected[0]
+    else:
+        with pytest.raises(CidrExhausted):
+            index.allocate(parent, prefixlen)
+
+
+@pytest.mark.terraform_resources("aws_vpc.*", "aws_subnet.*", "aws_ec2_client_vpn_endpoint.*")
+def test_project_cidr_plan(terraform_module):
+    """
+    Terraformの構成のVPC・サブネット・クライアントCIDRが重ならず、サブネットがVPCに含まれ、
+    新しいエンドポイントには既存のクライアントCIDRと重ならないブロックが割り当てられることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    plan = CidrPlan.from_module(terraform_module)
+
+    assert str(plan.get("aws_vpc.main").network) == "192.168.0.0/16"
+    assert {str(a.network) for a in plan.by_kind("subnet", vpc="aws_vpc.main")} == {
+        "192.168.1.0/24", "192.168.2.0/24", "192.168.10.0/24", "192.168.11.0/24",
+    }
+    assert {a.name: str(a.network) for a in plan.by_kind("client")} == {
+        "aws_ec2_client_vpn_endpoint.mobile": "172.17.0.0/22",
+        "aws_ec2_client_vpn_endpoint.pc": "172.16.0.0/22",
+    }
+    assert [a.name for a in plan.locate("192.168.10.20")] == ["aws_vpc.main", "aws_subnet.private[0]"]
+
+    tablet = plan.allocate_client("tablet", pool="172.16.0.0/12", vpc="aws_vpc.main")
+    assert str(tablet.network) == "172.16.4.0/22"
+    assert str(plan.allocate_subnet("aws_subnet.extra", "aws_vpc.main", 24).network) == "192.168.0.0/24"
+
+
+def test_conflicting_cidrs_are_rejected(tmp_path):
+    """
+    VPCと重なるクライアントCIDR・重なるサブネット・VPCに含まれないサブネット・/22 より小さいクライアントCIDRを
+    拒否することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    plan = CidrPlan()
+    plan.add_vpc("aws_vpc.main", "192.168.0.0/16")
+    plan.add_subnet("aws_subnet.a", "aws_vpc.main", "192.168.1.0/24")
+
+    with pytest.raises(CidrConflict) as error:
+        plan.add_client("client", "192.168.0.0/22", vpc="aws_vpc.main")
+    assert [a.name for a in error.value.conflicts] == ["aws_vpc.main"]
+    with pytest.raises(CidrConflict):
+        plan.add_subnet("aws_subnet.b", "aws_vpc.main", "192.168.1.128/25")
+    with pytest.raises(ValueError):
+        plan.add_subnet("aws_subnet.c", "aws_vpc.main", "10.0.0.0/24")
+    with pytest.raises(ValueError):
+        plan.add_client("client", "172.16.0.0/24")
+
+    # 構成の中のクライアントCIDRがVPCと重なる
+    (tmp_path / "main.tf").write_text(
+        'resource "aws_vpc" "main" {\n  cidr_block = "10.0.0.0/16"\n}\n'
+        'resource "aws_ec2_client_vpn_endpoint" "x" {\n'
+        '  client_cidr_block = cidrsubnet(aws_vpc.main.cidr_block, 6, 0)\n  vpc_id = aws_vpc.main.id\n}\n',
+        encoding="utf-8",
+    )
+    module = TerraformModule.load(tmp_path, ParseCache())
+    with pytest.raises(CidrConflict):
+        CidrPlan.from_module(module)
+
+
+@pytest.mark.terraform_resources("aws_vpc.*", "aws_subnet.*", "aws_nat_gateway.*")
+def test_evaluator_expands_instances(terraform_module):
+    """
+    評価器が count のインスタンスごとに属性を評価し、構成で指定していない属性を記号的な値にすることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    evaluator = Evaluator(terraform_module)
+
+    nat = evaluator.instances("aws_nat_gateway.main")
+    assert [evaluator.attribute(i, "subnet_id") for i in nat] == [
+        f"aws_subnet.public[{i}]" for i in range(len(nat))
+    ]
+    assert evaluator.attribute(evaluator.instances("aws_vpc.main")[0], "arn") == "aws_vpc.main.arn"
+    with pytest.raises(NotLiteral):
+        evaluator.variable("undeclared")
+
+
+def test_thousands_of_tenants_stay_fast():
+    """
+    4,096テナント分のVPC・クライアントCIDRを読み込んでも、重なりの検索・次の空きブロックの割り当てが
+    高速に終わることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    plan = CidrPlan()
+    for tenant in range(4096):
+        plan.add_vpc(f"vpc-{tenant}", ipaddress.ip_network((0x0A000000 + (tenant << 12), 20)), tenant=str(tenant))
+        plan.allocate_client(f"client-{tenant}", pool="100.64.0.0/10", prefixlen=22, tenant=str(tenant))
+    assert len(plan) == 8192
+
+    started = time.perf_counter()
+    for tenant in range(0, 4096, 7):
+        assert [a.name for a in plan.conflicts(f"10.{tenant >> 4}.{(tenant & 15) << 4}.0/24")] == [f"vpc-{tenant}"]
+        assert plan.locate(f"100.{64 + (tenant >> 6)}.{(tenant & 63) << 2}.1")[0].name == f"client-{tenant}"
+    # 100.64.0.0/10 の /22 は4,096個ですべて割り当て済み
+    with pytest.raises(CidrExhausted):
+        plan.allocate_client("client-new", pool="100.64.0.0/10")
+    released = plan.remove("client-2049").network
+    allocated = plan.allocate_client("client-new", pool="100.64.0.0/10")
+    elapsed = time.perf_counter() - started
+
+    assert allocated.network == released
+    assert elapsed < 1.0
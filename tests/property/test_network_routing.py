@@ -0,0 +1,212 @@
+"""
+Property-Based Test: ルートの最長一致による経路のシミュレーション
+
+**Validates: Requirements 6.4**
+
+このテストは、プレフィックスの二分木の最長一致が総当たりの結果と一致し、シミュレーターが
+ルートテーブル・NAT Gateway・Client VPN のルートと認可ルールをたどって実効的な経路を求め、
+大量の宛先に対しても高速であることを検証します。
+"""
+
+import ipaddress
+import random
+import time
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.network import (
+    BLACKHOLE,
+    EXIT,
+    INTERNET,
+    LOCAL,
+    LOOP,
+    NO_ROUTE,
+    SPLIT_TUNNEL,
+    UNAUTHORIZED,
+    RadixTrie,
+    RouteSimulator,
+)
+
+# 10.0.0.0/8 の中のプレフィックス（/8〜/32）と 0.0.0.0/0
+prefixes = st.one_of(
+    st.just(ipaddress.ip_network("0.0.0.0/0")),
+    st.builds(
+        lambda offset, prefixlen: ipaddress.ip_network((0x0A000000 + offset, prefixlen), strict=False),
+        st.integers(min_value=0, max_value=0xFFFFFF),
+        st.integers(min_value=8, max_value=32),
+    ),
+)
+
+
+@given(networks=st.lists(prefixes, max_size=40), offset=st.integers(min_value=0, max_value=0x1FFFFFF))
+def test_property_longest_match_matches_brute_force(networks, offset):
+    """
+    longest_match が、アドレスを含むプレフィックスのうち最長のもの（総当たり）と一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    trie = RadixTrie()
+    for network in networks:
+        trie.insert(network, str(network))
+    address = ipaddress.IPv4Address(0x0A000000 + offset - 0x800000)
+
+    containing = sorted({n for n in networks if address in n}, key=lambda n: n.prefixlen)
+    assert trie.longest_match(address) == ((containing[-1], str(containing[-1])) if containing else None)
+    assert [n for n, _ in trie.matches(address)] == containing
+    assert len(trie) == len(set(networks)) == len(list(trie))
+
+
+def build_simulator():
+    simulator = RouteSimulator()
+    simulator.add_subnet("subnet-public", "10.0.1.0/24", "vpc-1")
+    simulator.add_subnet("subnet-private", "10.0.10.0/24", "vpc-1")
+    simulator.add_subnet("subnet-isolated", "10.0.20.0/24", "vpc-1")
+    simulator.add_route_table({
+        "RouteTableId": "rtb-public", "VpcId": "vpc-1",
+        "Routes": [
+            {"DestinationCidrBlock": "10.0.0.0/16", "GatewayId": "local"},
+            {"DestinationCidrBlock": "0.0.0.0/0", "GatewayId": "igw-1"},
+        ],
+        "Associations": [{"SubnetId": "subnet-public"}],
+    }, internet_gateways=["igw-1"])
+    simulator.add_route_table({
+        "RouteTableId": "rtb-private", "VpcId": "vpc-1",
+        "Routes": [
+            {"DestinationCidrBlock": "10.0.0.0/16", "GatewayId": "local"},
+            {"DestinationCidrBlock": "0.0.0.0/0", "NatGatewayId": "nat-1"},
+            {"DestinationCidrBlock": "198.51.100.0/24", "VpcPeeringConnectionId": "pcx-1"},
+            {"DestinationCidrBlock": "203.0.113.0/24", "NatGatewayId": "nat-gone", "State": "blackhole"},
+        ],
+        "Associations": [{"SubnetId": "subnet-private"}],
+    })
+    # メインルートテーブル（関連付けのないサブネット）はローカルルートのみ
+    simulator.add_route_table({
+        "RouteTableId": "rtb-main", "VpcId": "vpc-1",
+        "Routes": [{"DestinationCidrBlock": "10.0.0.0/16", "GatewayId": "local"}],
+        "Associations": [{"Main": True}],
+    })
+    simulator.nat_gateways["nat-1"] = "subnet-public"
+    simulator.add_endpoint(
+        {"ClientVpnEndpointId": "cvpn-1", "ClientCidrBlock": "172.16.0.0/22", "SplitTunnel": False},
+        [
+            {"DestinationCidr": "10.0.0.0/16", "TargetSubnet": "subnet-private"},
+            {"DestinationCidr": "0.0.0.0/0", "TargetSubnet": "subnet-private"},
+        ],
+        [
+            {"DestinationCidr": "0.0.0.0/0", "AccessAll": True},
+            {"DestinationCidr": "10.0.10.0/24", "GroupId": "admins"},
+        ],
+    )
+    simulator.add_endpoint(
+        {"ClientVpnEndpointId": "cvpn-split", "ClientCidrBlock": "172.20.0.0/22", "SplitTunnel": True},
+        [{"DestinationCidr": "10.0.0.0/16", "TargetSubnet": "subnet-private"}],
+        [{"DestinationCidr": "0.0.0.0/0", "AccessAll": True}],
+    )
+    return simulator
+
+
+@pytest.mark.parametrize(
+    "source, destination, groups, outcome, targets",
+    [
+        ("subnet-public", "8.8.8.8", None, INTERNET, ["igw-1"]),
+        ("subnet-private", "8.8.8.8", None, INTERNET, ["nat-1", "igw-1"]),
+        ("subnet-private", "10.0.1.9", None, LOCAL, ["local"]),
+        ("subnet-private", "198.51.100.7", None, EXIT, ["pcx-1"]),
+        ("subnet-private", "203.0.113.7", None, BLACKHOLE, ["nat-gone"]),
+        ("subnet-isolated", "8.8.8.8", None, NO_ROUTE, []),
+        ("172.16.1.5", "8.8.8.8", ["staff"], INTERNET, ["subnet-private", "nat-1", "igw-1"]),
+        # 10.0.10.0/24 は最長一致の認可ルール（admins のみ）が適用される
+        ("172.16.1.5", "10.0.10.5", ["staff"], UNAUTHORIZED, []),
+        ("172.16.1.5", "10.0.10.5", ["admins"], LOCAL, ["subnet-private", "local"]),
+        ("172.16.1.5", "10.0.20.5", ["staff"], LOCAL, ["subnet-private", "local"]),
+        ("cvpn-split", "8.8.8.8", None, SPLIT_TUNNEL, []),
+    ],
+)
+def test_trace_follows_routes(source, destination, groups, outcome, targets):
+    """
+    ルートテーブル・NAT Gateway・Client VPN のルートと認可ルール（最長一致）をたどって経路を求めることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    trace = build_simulator().trace(source, destination, groups)
+
+    assert trace.outcome == outcome
+    assert [hop.target.id for hop in trace.hops] == targets
+
+
+def test_route_loop_and_unknown_source():
+    """
+    NAT Gateway を介して循環するルートを検出し、不明な送信元は KeyError を送出することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    simulator = build_simulator()
+    simulator.nat_gateways["nat-1"] = "subnet-private"
+
+    assert simulator.trace("subnet-private", "8.8.8.8").outcome == LOOP
+    with pytest.raises(KeyError):
+        simulator.trace("192.0.2.1", "8.8.8.8")
+
+
+@pytest.mark.terraform_resources("aws_route_table*", "aws_nat_gateway.*", "aws_subnet.*", "aws_ec2_client_vpn_*")
+def test_project_routes(terraform_module):
+    """
+    Terraformの構成で、プライベートサブネットの通信が NAT Gateway → Internet Gateway から出て、
+    Client VPN の利用者が関連付けたサブネットからVPCに届くことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    simulator = RouteSimulator.from_module(terraform_module)
+
+    for subnet in ("aws_subnet.private[0]", "aws_subnet.private[1]"):
+        trace = simulator.trace(subnet, "8.8.8.8")
+        assert trace.outcome == INTERNET
+        assert [hop.target.id for hop in trace.hops] == ["aws_nat_gateway.main[0]", "aws_internet_gateway.main"]
+    for client in ("172.16.0.10", "172.17.3.250"):
+        trace = simulator.trace(client, "192.168.11.20")
+        assert trace.outcome == LOCAL
+        assert trace.hops[0].target.id == "aws_subnet.private[0]"
+
+
+@pytest.mark.xfail(
+    strict=True,
+    reason="構成に Client VPN の 0.0.0.0/0 のルート（aws_ec2_client_vpn_route）がなく、フルトンネルの利用者はインターネットに出られない",
+)
+@pytest.mark.terraform_resources("aws_ec2_client_vpn_*")
+def test_project_full_tunnel_reaches_internet(terraform_module):
+    """
+    Terraformの構成で、フルトンネルの Client VPN の利用者の通信がインターネットに届くことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    simulator = RouteSimulator.from_module(terraform_module)
+
+    assert simulator.trace("172.16.0.10", "8.8.8.8").outcome == INTERNET
+
+
+def test_large_batches_stay_fast():
+    """
+    1,024ルートのルートテーブルに対して、20,000件の宛先の経路が高速に求まることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    simulator = build_simulator()
+    routes = [{"DestinationCidrBlock": "10.0.0.0/16", "GatewayId": "local"},
+              {"DestinationCidrBlock": "0.0.0.0/0", "NatGatewayId": "nat-1"}]
+    routes += [
+        {"DestinationCidrBlock": f"100.{i // 256}.{i % 256}.0/24", "TransitGatewayId": f"tgw-{i}"} for i in range(1024)
+    ]
+    simulator.add_route_table({"RouteTableId": "rtb-private", "VpcId": "vpc-1", "Routes": routes,
+                               "Associations": [{"SubnetId": "subnet-private"}]})
+    generator = random.Random(0)
+    destinations = [f"100.{generator.randrange(4)}.{generator.randrange(256)}.1" for _ in range(10000)]
+    destinations += [str(ipaddress.IPv4Address(generator.getrandbits(32))) for _ in range(10000)]
+
+    started = time.perf_counter()
+    outcomes = simulator.outcomes("172.16.0.9", destinations, groups=["staff"])
+    elapsed = time.perf_counter() - started
+
+    assert sum(outcomes.values()) == 20000
+    assert sum(count for (outcome, target), count in outcomes.items() if outcome == EXIT) >= 10000
+    assert elapsed < 5.0
@@ -0,0 +1,163 @@
+"""
+Property-Based Test: セキュリティグループの到達可能性の評価
+
+**Validates: Requirements 6.4**
+
+このテストは、ルールをコンパイルした評価器の判定がルールを総当たりで調べた結果と一致し、
+Terraformの構成のセキュリティグループが管理ポート・全ポートをインターネットに公開しておらず、
+数百グループに対する検査・問い合わせが高速であることを検証します。
+"""
+
+import ipaddress
+import time
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.network import ADMIN_PORTS, WORLD, Peer, SecurityGroupEvaluator
+
+GROUPS = ["sg-a", "sg-b", "sg-c"]
+
+cidrs = st.sampled_from(["0.0.0.0/0", "10.0.0.0/8", "10.1.0.0/16", "192.168.0.0/24", "0.0.0.0/1", "128.0.0.0/1"])
+ports = st.integers(min_value=0, max_value=70)
+
+
+@st.composite
+def permissions(draw):
+    protocol = draw(st.sampled_from(["tcp", "udp", "-1", "6"]))
+    permission = {
+        "IpProtocol": protocol,
+        "IpRanges": [{"CidrIp": cidr} for cidr in draw(st.lists(cidrs, max_size=2))],
+        "UserIdGroupPairs": [{"GroupId": group} for group in draw(st.lists(st.sampled_from(GROUPS), max_size=1))],
+    }
+    if protocol != "-1":
+        low = draw(ports)
+        permission["FromPort"], permission["ToPort"] = low, draw(st.integers(min_value=low, max_value=80))
+    return permission
+
+
+def brute_force(permissions, protocol, port, peer):
+    """ルールを1つずつ調べる（CIDRの相手は、1つのルールのCIDRの和集合に含まれる場合に許可）"""
+    target = ipaddress.ip_network(peer.address) if peer.address else None
+    networks, groups = [], set()
+    for permission in permissions:
+        rule_protocol = {"6": "tcp"}.get(permission["IpProtocol"], permission["IpProtocol"])
+        if rule_protocol not in ("-1", protocol):
+            continue
+        if rule_protocol != "-1" and not permission["FromPort"] <= port <= permission["ToPort"]:
+            continue
+        networks += [ipaddress.ip_network(r["CidrIp"]) for r in permission["IpRanges"]]
+        groups |= {pair["GroupId"] for pair in permission["UserIdGroupPairs"]}
+    if set(peer.groups) & groups:
+        return True
+    if target is None:
+        return False
+    # 0.0.0.0/1 と 128.0.0.0/1 のように、複数のCIDRで覆う場合も許可
+    merged = list(ipaddress.collapse_addresses(networks))
+    return any(target.subnet_of(network) for network in merged)
+
+
+@given(
+    rules=st.lists(permissions(), max_size=5),
+    protocol=st.sampled_from(["tcp", "udp"]),
+    port=st.integers(min_value=0, max_value=90),
+    address=st.sampled_from([None, "10.1.2.3", "10.2.0.0/16", "192.168.0.7", "8.8.8.8", "0.0.0.0/0"]),
+    groups=st.lists(st.sampled_from(GROUPS), max_size=2),
+)
+def test_property_allows_matches_brute_force(rules, protocol, port, address, groups):
+    """
+    allows が、ルールを総当たりで調べた結果と一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    evaluator = SecurityGroupEvaluator([{"GroupId": "sg-x", "IpPermissions": rules, "IpPermissionsEgress": []}])
+    peer = Peer(address, tuple(groups))
+
+    assert evaluator.allows("sg-x", "ingress", protocol, port, peer) == brute_force(rules, protocol, port, peer)
+    ranges = evaluator.port_ranges("sg-x", "ingress", protocol, peer)
+    assert any(low <= port <= high for low, high in ranges) == brute_force(rules, protocol, port, peer)
+
+
+def test_can_reach_requires_egress_and_ingress():
+    """
+    グループ間の通信は、送信元のegressと宛先のingressがともに許可する場合のみ届くことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    evaluator = SecurityGroupEvaluator([
+        {
+            "GroupId": "sg-app", "GroupName": "app",
+            "IpPermissions": [],
+            "IpPermissionsEgress": [{"IpProtocol": "tcp", "FromPort": 5432, "ToPort": 5432,
+                                     "UserIdGroupPairs": [{"GroupId": "sg-db"}]}],
+        },
+        {
+            "GroupId": "sg-db", "GroupName": "db",
+            "IpPermissions": [{"IpProtocol": "tcp", "FromPort": 5432, "ToPort": 5432,
+                               "UserIdGroupPairs": [{"GroupId": "sg-app"}]}],
+            "IpPermissionsEgress": [],
+        },
+    ])
+    app, db = Peer("10.0.1.5", ("sg-app",)), Peer("10.0.2.5", ("sg-db",))
+
+    assert evaluator.can_reach(app, db, "tcp", 5432)
+    assert not evaluator.can_reach(app, db, "tcp", 5433)
+    assert not evaluator.can_reach(db, app, "tcp", 5432)
+    assert not evaluator.can_reach(Peer("10.0.1.5"), db, "tcp", 5432)
+    assert evaluator.group_id("db") == "sg-db"
+    with pytest.raises(ValueError):
+        evaluator.can_reach(Peer(), db, "tcp", 5432)
+
+
+@pytest.mark.terraform_resources("aws_security_group.*", "aws_vpc_security_group_*_rule.*")
+def test_project_security_groups(terraform_module):
+    """
+    Terraformの構成のVPNエンドポイント用セキュリティグループが、インターネットからTCP・UDP 443のみを受け付け、
+    管理ポート・全ポートを公開していないことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    evaluator = SecurityGroupEvaluator.from_module(terraform_module)
+    group_id = evaluator.group_id("client-vpn-endpoint-sg")
+    vpn = Peer(groups=(group_id,))
+
+    assert group_id == "aws_security_group.vpn_endpoint"
+    assert evaluator.port_ranges(group_id, "ingress", "udp", WORLD) == [(443, 443)]
+    assert evaluator.port_ranges(group_id, "ingress", "tcp", WORLD) == [(443, 443)]
+    assert evaluator.can_reach(Peer("203.0.113.5"), vpn, "udp", 443)
+    assert not evaluator.can_reach(Peer("203.0.113.5"), vpn, "tcp", 22)
+    assert evaluator.world_exposures(ADMIN_PORTS) == []
+    assert evaluator.all_ports_exposures("ingress") == []
+    assert [e.protocol for e in evaluator.all_ports_exposures("egress")] == ["-1"]
+
+
+def test_hundreds_of_groups_stay_fast():
+    """
+    500グループを読み込んでも、CISの検査と到達可能性の問い合わせが高速に終わることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    groups = []
+    for i in range(500):
+        ingress = [
+            {"IpProtocol": "tcp", "FromPort": 1000 + i, "ToPort": 1010 + i,
+             "IpRanges": [{"CidrIp": f"10.{i % 256}.0.0/16"}]},
+            {"IpProtocol": "udp", "FromPort": 53, "ToPort": 53, "UserIdGroupPairs": [{"GroupId": f"sg-{(i - 1) % 500}"}]},
+        ]
+        if i % 100 == 7:
+            ingress.append({"IpProtocol": "tcp", "FromPort": 22, "ToPort": 22, "IpRanges": [{"CidrIp": "0.0.0.0/0"}]})
+        groups.append({"GroupId": f"sg-{i}", "GroupName": f"g{i}", "IpPermissions": ingress,
+                       "IpPermissionsEgress": [{"IpProtocol": "-1", "IpRanges": [{"CidrIp": "0.0.0.0/0"}]}]})
+    evaluator = SecurityGroupEvaluator(groups)
+
+    started = time.perf_counter()
+    exposures = evaluator.world_exposures(ADMIN_PORTS)
+    reachable = sum(
+        evaluator.can_reach(Peer(f"10.{i % 256}.1.1", (f"sg-{(i - 1) % 500}",)), Peer("172.16.0.1", (f"sg-{i}",)), "tcp", 1005 + i)
+        for i in range(500)
+    )
+    elapsed = time.perf_counter() - started
+
+    assert sorted(e.group_id for e in exposures) == [f"sg-{i}" for i in (107, 207, 307, 407, 7)]
+    assert reachable == 500
+    assert elapsed < 0.5
@@ -0,0 +1,256 @@
+"""
+Property-Based Test: アーカイブのメンバーのスキャン
+
+**Validates: Requirements 8.4**
+
+このテストは、zip・tar・gzip（入れ子を含む）のメンバーを展開せずにスキャンした結果が、
+メンバーの内容を直接スキャンした結果と同一であり、`archive!member` 形式の場所で報告されること、
+入れ子の深さ・展開後のサイズ・メンバー数の上限を超えると ArchiveLimitExceeded を送出することを検証します。
+"""
+
+import gzip
+import io
+import tarfile
+import zipfile
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.secret_scan import AWS_CREDENTIAL_RULESET, ArchiveLimitExceeded, should_scan_file
+from tests.secret_scan import archive
+from tests.secret_scan.archive import archive_kind, is_archive_path, scan_archive
+from tests.property.test_secret_scan_engine import ascii_secret_like_text
+
+
+ACCESS_KEY = "AKIA" + "ABCDEFGHIJKLMNOP"
+
+
+def make_zip(members):
+    """メンバー名 → 内容 の辞書からzipを作る"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive_file:
+        for name, data in members.items():
+            archive_file.writestr(name, data)
+    return buffer.getvalue()
+
+
+def make_tar(members):
+    """メンバー名 → 内容 の辞書からtarを作る"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as archive_file:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive_file.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+PACKERS = {
+    "zip": lambda data: ("bundle.zip", make_zip({"src/main.tf": data}), "bundle.zip!src/main.tf"),
+    "tar": lambda data: ("configs.tar", make_tar({"vpn/main.tf": data}), "configs.tar!vpn/main.tf"),
+    "gzip": lambda data: ("main.tf.gz", gzip.compress(data), "main.tf.gz!main.tf"),
+    "tar.gz": lambda data: (
+        "release.tgz",
+        gzip.compress(make_tar({"vpn/main.tf": data})),
+        "release.tgz!release.tar!vpn/main.tf",
+    ),
+    "zip in tar.gz": lambda data: (
+        "release.tar.gz",
+        gzip.compress(make_tar({"lambda.zip": make_zip({"main.tf": data})})),
+        "release.tar.gz!release.tar!lambda.zip!main.tf",
+    ),
+}
+
+
+@given(content=ascii_secret_like_text, packer=st.sampled_from(sorted(PACKERS)))
+def test_property_member_findings_match_direct_scan(content, packer):
+    """
+    アーカイブのメンバーの検出結果が、内容を直接スキャンした結果と同一であることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = content.encode()
+    name, packed, label = PACKERS[packer](data)
+
+    expected = AWS_CREDENTIAL_RULESET.scan_bytes(data)
+    result = scan_archive(packed, name, AWS_CREDENTIAL_RULESET)
+
+    assert result == ([(label, expected)] if expected else [])
+
+
+@given(
+    lines=st.lists(st.sampled_from(["x = 1", f'key = "{ACCESS_KEY}"', "", "# " + ACCESS_KEY]), max_size=40),
+    window=st.integers(min_value=1, max_value=64),
+)
+def test_property_line_numbers_across_windows(lines, window):
+    """
+    メンバーを小さな窓に区切ってスキャンしても、行番号と検出順が内容全体のスキャンと同一であることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = "\n".join(lines).encode()
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(archive, "SCAN_WINDOW_BYTES", window)
+        result = scan_archive(gzip.compress(data), "main.tf.gz", AWS_CREDENTIAL_RULESET)
+
+    expected = AWS_CREDENTIAL_RULESET.scan_bytes(data)
+    assert result == ([("main.tf.gz!main.tf", expected)] if expected else [])
+
+
+def test_members_are_filtered_and_reported_in_order(tmp_path):
+    """
+    除外パターンに一致するメンバー（.mdなど）とバイナリのメンバーをスキップし、
+    アーカイブ内の順序で報告し、ディスクに何も展開しないことを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    secret = f"AWS_ACCESS_KEY_ID={ACCESS_KEY}\n".encode()
+    path = tmp_path / "artifacts.zip"
+    path.write_bytes(make_zip({
+        "README.md": secret,
+        "b/handler.py": b"\n" + secret,
+        "image.bin": b"\0" + secret,
+        "a/config.tf": secret,
+    }))
+
+    result = scan_archive(path, "artifacts.zip", AWS_CREDENTIAL_RULESET, member_filter=should_scan_file)
+
+    assert [(label, [line for _, _, line in findings]) for label, findings in result] == [
+        ("artifacts.zip!b/handler.py", [2, 2]),
+        ("artifacts.zip!a/config.tf", [1, 1]),
+    ]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["artifacts.zip"]
+
+
+def test_depth_limit_raises():
+    """
+    入れ子の深さが上限を超えると ArchiveLimitExceeded を送出することを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = ACCESS_KEY.encode()
+    for _ in range(3):
+        data = gzip.compress(data)
+
+    assert scan_archive(data, "deep.gz", AWS_CREDENTIAL_RULESET, max_depth=3)
+    with pytest.raises(ArchiveLimitExceeded, match="deep.gz!deep!deep"):
+        scan_archive(data, "deep.gz", AWS_CREDENTIAL_RULESET, max_depth=2)
+
+
+def test_size_and_member_limits_raise():
+    """
+    展開後のサイズ（展開爆弾）とメンバー数が上限を超えると ArchiveLimitExceeded を送出することを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    bomb = gzip.compress(b"a = 1\n" * (1024 * 1024))
+    with pytest.raises(ArchiveLimitExceeded, match="bomb.gz!bomb"):
+        scan_archive(bomb, "bomb.gz", AWS_CREDENTIAL_RULESET, max_bytes=1024 * 1024)
+
+    many = make_tar({f"{index}.tf": b"x = 1\n" for index in range(20)})
+    with pytest.raises(ArchiveLimitExceeded, match="many.tar!10.tf"):
+        scan_archive(many, "many.tar", AWS_CREDENTIAL_RULESET, max_members=10)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"plain text", b"PK\x03\x04broken", b"\x1f\x8bbroken", gzip.compress(b"x")[:-4]],
+)
+def test_non_archives_and_broken_archives_do_not_raise(data):
+    """
+    アーカイブでない内容・壊れたアーカイブは例外を送出せず、検出がなければ空の結果になることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    assert scan_archive(data, "artifact.gz", AWS_CREDENTIAL_RULESET) == []
+
+
+@pytest.mark.parametrize("name", ["creds.zip", "creds.gz", "creds.tgz", "creds.jar"])
+def test_plain_text_with_archive_suffix_is_scanned(name):
+    """
+    拡張子がアーカイブでも中身がテキストのファイルは、内容をそのままスキャンすることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = f"aws_access_key_id = {ACCESS_KEY}\n".encode()
+
+    assert scan_archive(data, name, AWS_CREDENTIAL_RULESET) == [(name, AWS_CREDENTIAL_RULESET.scan_bytes(data))]
+
+
+@pytest.mark.parametrize(
+    "name, packed, label",
+    [
+        ("creds.zip", lambda data: b"PK\x03\x04\n" + data, "creds.zip"),
+        ("release.tar", lambda data: make_tar({"lambda.zip": b"PK\x03\x04\n" + data}), "release.tar!lambda.zip"),
+        ("lambda.zip.gz", lambda data: gzip.compress(b"PK\x05\x06\n" + data), "lambda.zip.gz!lambda.zip"),
+        ("release.tgz", lambda data: gzip.compress(make_tar({"lambda.zip": b"PK\x03\x04\n" + data})),
+         "release.tgz!release.tar!lambda.zip"),
+    ],
+)
+def test_broken_archives_fall_back_to_raw_content(name, packed, label):
+    """
+    先頭がマジックバイトでも壊れたアーカイブ（入れ子を含む）は、元のバイト列をスキャンすることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = f"aws_access_key_id = {ACCESS_KEY}\n".encode()
+
+    result = scan_archive(packed(data), name, AWS_CREDENTIAL_RULESET)
+
+    assert [location for location, _ in result] == [label]
+    assert ("AWS Access Key ID", ACCESS_KEY) in [finding[:2] for finding in result[0][1]]
+
+
+@pytest.mark.parametrize(
+    "name, packed, label",
+    [
+        ("bundle.zip", lambda data: make_zip({"lambda.zip": b"PK\x03\x04\n" + data}), "bundle.zip!lambda.zip"),
+        ("release.tar", lambda data: make_tar({"lambda.zip": b"PK\x03\x04\n" + data}), "release.tar!lambda.zip"),
+        ("lambda.zip.gz", lambda data: gzip.compress(b"PK\x05\x06\n" + data), "lambda.zip.gz!lambda.zip"),
+    ],
+)
+def test_large_broken_archives_are_reopened(name, packed, label):
+    """
+    メモリに残す上限より大きい壊れた入れ子のアーカイブは、シークできる外側から開き直して
+    元のバイト列をスキャンすることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = b"x = 1\n" * 1024 + f"aws_access_key_id = {ACCESS_KEY}\n".encode()
+
+    result = scan_archive(packed(data), name, AWS_CREDENTIAL_RULESET, max_replay_bytes=1024)
+
+    assert [location for location, _ in result] == [label]
+    assert ("AWS Access Key ID", ACCESS_KEY) in [finding[:2] for finding in result[0][1]]
+
+
+def test_large_broken_archive_in_compressed_tar_raises():
+    """
+    圧縮されたtarの中の、メモリに残す上限より大きい壊れたアーカイブは、ディスクに書き出さずに
+    ArchiveLimitExceeded を送出することを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = b"x = 1\n" * 1024 + f"aws_access_key_id = {ACCESS_KEY}\n".encode()
+    packed = gzip.compress(make_tar({"lambda.zip": b"PK\x03\x04\n" + data}))
+
+    assert scan_archive(packed, "release.tgz", AWS_CREDENTIAL_RULESET)
+    with pytest.raises(ArchiveLimitExceeded, match="release.tgz!release.tar!lambda.zip"):
+        scan_archive(packed, "release.tgz", AWS_CREDENTIAL_RULESET, max_replay_bytes=1024)
+
+
+def test_archive_detection():
+    """
+    拡張子とマジックバイトによるアーカイブの判定を検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    assert is_archive_path("dist/lambda.zip")
+    assert is_archive_path("logs/export.json.GZ")
+    assert is_archive_path("vpn-configs.tgz")
+    assert not is_archive_path("terraform/main.tf")
+
+    assert archive_kind(make_zip({"a": b""})) == "zip"
+    assert archive_kind(make_tar({"a": b""})) == "tar"
+    assert archive_kind(gzip.compress(b"")) == "gzip"
+    assert archive_kind(b"resource \"aws_vpc\" \"main\" {}") is None
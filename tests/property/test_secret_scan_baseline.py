@@ -0,0 +1,155 @@
+"""
+Property-Based Test: ベースライン（受け入れ済みの検出結果）と除外パス
+
+**Validates: Requirements 8.4**
+
+このテストは、検出結果のフィンガープリントが行番号によらず一定で、ルール名・パス・マッチ文字列の
+いずれかが変われば変わること、ベースラインファイルに検出値が保存されないこと、
+1つにまとめた除外パターンの判定が .gitignore のルールを1つずつ評価した結果と一致することを検証します。
+"""
+
+import json
+import re
+from pathlib import PurePosixPath
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.secret_scan import EXCLUDE_FILE_PATTERNS, should_scan_file
+from tests.secret_scan.baseline import Baseline, BaselineEntry, fingerprint
+from tests.secret_scan.walker import compile_glob_matcher, is_ignored, parse_gitignore
+
+
+ACCESS_KEY = "AKIA" + "ABCDEFGHIJKLMNOP"
+
+path_segments = st.sampled_from(["docs", "terraform", "a", "b.tf", "x.md", "vpn-configs", ".cache"])
+relative_paths = st.lists(path_segments, min_size=1, max_size=4).map("/".join)
+glob_patterns = st.lists(
+    st.sampled_from(["*", "**", "a", "b.tf", "*.md", "docs", "vpn-configs", "?.tf", "[ab]*", ".cache"]),
+    min_size=1,
+    max_size=3,
+).map("/".join).flatmap(
+    lambda body: st.sampled_from([body, "/" + body, body + "/", "**/" + body])
+)
+
+
+def reference_is_excluded(patterns, relative_path):
+    """パスとその上位のディレクトリを .gitignore のルールで1つずつ評価する参照実装"""
+    levels = [("", [rule for rule in parse_gitignore(patterns) if not rule.negated])]
+    parts = relative_path.split("/")
+    for depth in range(1, len(parts)):
+        if is_ignored(levels, "/".join(parts[:depth]), True):
+            return True
+    return is_ignored(levels, relative_path, False)
+
+
+@given(patterns=st.lists(glob_patterns, max_size=4), relative_path=relative_paths)
+def test_property_compiled_exclusions_match_rule_by_rule(patterns, relative_path):
+    """
+    1つの正規表現にまとめた除外パターンが、ルールを1つずつ評価した結果と一致することを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    matcher = compile_glob_matcher(patterns)
+
+    assert (matcher.fullmatch(relative_path) is not None) == reference_is_excluded(patterns, relative_path)
+
+
+@given(st.text(alphabet="abtesx_.-/mdpyrqiun", min_size=1, max_size=30))
+def test_property_should_scan_file_matches_pattern_loop(file_name):
+    """
+    1つにまとめたファイル名の除外パターンが、パターンごとの re.match の結果と一致することを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    path = PurePosixPath(file_name)
+    expected = not any(re.match(pattern, path.name) for pattern in EXCLUDE_FILE_PATTERNS)
+
+    assert should_scan_file(path) == expected
+
+
+@given(
+    rule=st.sampled_from(["AWS Access Key ID", "password"]),
+    path=relative_paths,
+    value=st.text(min_size=1, max_size=40),
+    other=st.text(min_size=1, max_size=40),
+)
+def test_property_fingerprint_identifies_rule_path_and_value(rule, path, value, other):
+    """
+    フィンガープリントがルール名・パス・マッチ文字列で決まることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    assert fingerprint(rule, path, value) == fingerprint(rule, "./" + path, value)
+    assert fingerprint(rule, path, value) != fingerprint(rule + " ", path, value)
+    assert fingerprint(rule, path, value) != fingerprint(rule, path + "x", value)
+    if other != value:
+        assert fingerprint(rule, path, value) != fingerprint(rule, path, other)
+
+
+def test_baseline_suppresses_accepted_findings_after_lines_move(tmp_path):
+    """
+    受け入れ済みの検出結果が、行番号が変わっても抑制されることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    accepted = [("AWS Access Key ID", ACCESS_KEY, 3)]
+    baseline_path = tmp_path / ".secret-scan-baseline.json"
+    Baseline.from_findings([("terraform/main.tf", accepted)]).save(baseline_path)
+
+    baseline = Baseline.load(baseline_path)
+    moved = [("AWS Access Key ID", ACCESS_KEY, 10)]
+    other_key = [("AWS Access Key ID", "AKIA" + "QRSTUVWXYZ234567", 10)]
+
+    assert baseline.filter("terraform/main.tf", moved) == []
+    assert baseline.filter("terraform/other.tf", moved) == moved
+    assert baseline.filter("terraform/main.tf", other_key) == other_key
+
+
+def test_baseline_file_does_not_store_values(tmp_path):
+    """
+    ベースラインファイルに検出値そのものが保存されないことを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    baseline_path = tmp_path / "baseline.json"
+    Baseline.from_findings(
+        [("a.tf", [("AWS Access Key ID", ACCESS_KEY, 1)])], exclude=["docs/**"]
+    ).save(baseline_path)
+
+    text = baseline_path.read_text(encoding="utf-8")
+    assert ACCESS_KEY not in text
+    assert json.loads(text)["exclude"] == ["docs/**"]
+    assert Baseline.load(baseline_path).entries == [
+        BaselineEntry(fingerprint("AWS Access Key ID", "a.tf", ACCESS_KEY), "AWS Access Key ID", "a.tf", 1)
+    ]
+
+
+def test_excluded_paths_and_archive_members():
+    """
+    除外パスのファイルと、除外パスのアーカイブのメンバーの検出結果を報告しないことを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    baseline = Baseline(exclude=["docs/", "*.example.ovpn"])
+    findings = [("AWS Access Key ID", ACCESS_KEY, 1)]
+
+    assert baseline.filter("docs/guide.tf", findings) == []
+    assert baseline.filter("vpn-configs/client.example.ovpn", findings) == []
+    assert baseline.filter("docs/bundle.zip!main.tf", findings) == []
+    assert baseline.filter("terraform/main.tf", findings) == findings
+    assert not baseline.is_excluded("docs")
+
+
+def test_missing_and_invalid_baseline_files(tmp_path):
+    """
+    ベースラインファイルがない場合は空、版数が不正な場合は ValueError になることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    assert len(Baseline.load(tmp_path / "missing.json")) == 0
+
+    invalid = tmp_path / "invalid.json"
+    invalid.write_text('{"version": 99}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        Baseline.load(invalid)
@@ -0,0 +1,211 @@
+"""
+Property-Based Test: 常駐スキャナー（エディタ・フック向け）
+
+**Validates: Requirements 8.4**
+
+このテストは、常駐スキャナーが送られた内容・パスを test_aws_credentials_security.py と同じルールで
+スキャンして同一の検出結果を返し、キャッシュとベースラインの更新を反映し、
+UNIXドメインソケット越しのリクエスト・異常なリクエスト・残ったソケットを正しく扱うことを検証します。
+"""
+
+import base64
+import json
+import socket
+import stat
+import threading
+
+import pytest
+from hypothesis import given
+
+from tests.secret_scan import AWS_CREDENTIAL_RULESET
+from tests.secret_scan.baseline import Baseline
+from tests.secret_scan.cache import ScanCache
+from tests.secret_scan.client import DaemonUnavailable, request
+from tests.secret_scan.daemon import DaemonAlreadyRunning, ScanServer, ScanService, is_running
+from tests.property.test_secret_scan_archive import make_zip
+from tests.property.test_secret_scan_engine import ascii_secret_like_text
+
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="UNIXドメインソケットが必要です")
+
+ACCESS_KEY = "AKIA" + "ABCDEFGHIJKLMNOP"
+
+
+def blob_request(path, data):
+    """scan_blob リクエストを作る"""
+    return {"op": "scan_blob", "path": path, "data": base64.b64encode(data).decode("ascii")}
+
+
+@pytest.fixture
+def service(tmp_path):
+    """一時ディレクトリをプロジェクトルートとするリクエスト処理"""
+    with ScanCache(tmp_path / "cache.sqlite3") as cache:
+        yield ScanService(tmp_path, tmp_path / ".secret-scan-baseline.json", cache)
+
+
+def start_server(tmp_path):
+    """別スレッドで常駐スキャナーを起動し、(ソケットのパス, スレッド) を返す"""
+    socket_path = tmp_path / "daemon.sock"
+    scan_server = ScanServer(socket_path, ScanService(tmp_path, tmp_path / "baseline.json"))
+
+    def run():
+        with scan_server:
+            scan_server.serve(idle_timeout=0)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return socket_path, thread
+
+
+@pytest.fixture
+def server(tmp_path):
+    """別スレッドで待ち受ける常駐スキャナー（ソケットのパス）"""
+    socket_path, thread = start_server(tmp_path)
+    yield socket_path
+    request(socket_path, {"op": "shutdown"})
+    thread.join(timeout=10)
+
+
+@given(content=ascii_secret_like_text)
+def test_property_blob_findings_match_direct_scan(content):
+    """
+    送られた内容の検出結果が、ルールセットで直接スキャンした結果と同一であることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = content.encode()
+    expected = AWS_CREDENTIAL_RULESET.scan_bytes(data)
+    service = ScanService(".", "missing-baseline.json")
+
+    response = service.handle(blob_request("terraform/main.tf", data))
+
+    assert response["ok"]
+    assert response["results"] == (
+        [{"location": "terraform/main.tf", "path": "terraform/main.tf", "findings": [list(f) for f in expected]}]
+        if expected else []
+    )
+
+
+def test_paths_use_cache_and_baseline_reload(tmp_path, service):
+    """
+    2回目のスキャンがキャッシュから返り、ベースラインファイルの更新が次のリクエストに反映されることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    (tmp_path / "main.tf").write_text(f'key = "{ACCESS_KEY}"\n', encoding="utf-8")
+    (tmp_path / "README.md").write_text(ACCESS_KEY, encoding="utf-8")
+    message = {"op": "scan", "paths": ["main.tf", "README.md"]}
+
+    first = service.handle(message)
+    hits = service.cache.hits
+    second = service.handle(message)
+
+    assert first == second
+    assert [(r["location"], [f[2] for f in r["findings"]]) for r in first["results"]] == [("main.tf", [1])]
+    assert service.cache.hits == hits + 1
+
+    Baseline.from_findings([("main.tf", [tuple(f) for f in first["results"][0]["findings"]])]).save(
+        service.baseline_path
+    )
+    assert service.handle(message) == {"ok": True, "results": []}
+
+
+def test_archive_blobs_are_reported_per_member(service):
+    """
+    アーカイブの内容はメンバーごとに `archive!member` 形式で報告されることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    data = make_zip({"docs/README.md": ACCESS_KEY.encode(), "src/main.tf": ACCESS_KEY.encode()})
+
+    response = service.handle(blob_request("dist/bundle.zip", data))
+
+    assert [result["location"] for result in response["results"]] == ["dist/bundle.zip!src/main.tf"]
+
+
+@pytest.mark.parametrize(
+    "message",
+    [{}, {"op": "unknown"}, {"op": ["scan"]}, {"op": "scan", "paths": "main.tf"},
+     {"op": "scan_blob", "path": "a.tf"}, {"op": "scan_blob", "path": "a.tf", "data": "!!"}],
+)
+def test_invalid_requests_return_errors(service, message):
+    """
+    不正なリクエストには例外を送出せずエラーの応答を返すことを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    response = service.handle(message)
+
+    assert response["ok"] is False and response["error"]
+
+
+def test_scan_over_time_budget_returns_error(monkeypatch, service):
+    """
+    スキャンが時間予算を超えた場合も、例外を送出せずエラーの応答を返すことを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    monkeypatch.setattr(AWS_CREDENTIAL_RULESET, "time_budget", 1e-9)
+    data = "".join(f'key_{i} = "{ACCESS_KEY}"\n' for i in range(100)).encode()
+
+    response = service.handle(blob_request("terraform/slow.tf", data))
+
+    assert response["ok"] is False
+    assert response["error"].startswith("ScanBudgetExceeded: ")
+
+
+def test_requests_over_unix_socket(server):
+    """
+    ソケット越しに ping・スキャン・不正なJSONを処理し、所有者のみが接続できることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    assert stat.S_IMODE(server.stat().st_mode) & 0o077 == 0
+    assert is_running(server)
+    assert request(server, {"op": "ping"})["ruleset"] == AWS_CREDENTIAL_RULESET.version
+
+    response = request(server, blob_request("vars.tf", f'key = "{ACCESS_KEY}"\n'.encode()))
+    assert response["results"][0]["findings"] == [["AWS Access Key ID", ACCESS_KEY, 1]]
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(server))
+        stream = client.makefile("rwb")
+        stream.write(b"not json\n" + json.dumps({"op": "ping"}).encode() + b"\n")
+        stream.flush()
+        assert json.loads(stream.readline())["ok"] is False
+        assert json.loads(stream.readline())["ok"] is True
+
+
+def test_shutdown_removes_socket_and_running_daemon_is_detected(tmp_path):
+    """
+    起動中の常駐スキャナーと同じソケットでは起動できず、shutdown でソケットが削除されることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    socket_path, thread = start_server(tmp_path)
+    with pytest.raises(DaemonAlreadyRunning):
+        ScanServer(socket_path, ScanService(tmp_path, tmp_path / "baseline.json"))
+
+    assert request(socket_path, {"op": "shutdown"}) == {"ok": True}
+    thread.join(timeout=10)
+
+    assert not socket_path.exists()
+    assert not is_running(socket_path)
+    with pytest.raises(DaemonUnavailable):
+        request(socket_path, {"op": "ping"})
+
+
+def test_stale_socket_is_replaced(tmp_path):
+    """
+    異常終了で残った（接続を受け付けない）ソケットを削除して起動できることを検証します。
+
+    **Validates: Requirements 8.4**
+    """
+    socket_path = tmp_path / "stale.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(socket_path))
+    stale.close()
+
+    with ScanServer(socket_path, ScanService(tmp_path, tmp_path / "baseline.json")) as scan_server:
+        assert scan_server.socket_path.exists()
+    assert not socket_path.exists()
@@ -0,0 +1,152 @@
+"""
+Property-Based Test: 高エントロピー文字列の検出
+
+**Validates: Requirements 6.4**
+
+このテストは、NumPyによる窓ごとのエントロピー計算が、トークンごと・窓ごとに
+シャノンエントロピーを計算する参照実装と同一の検出結果を返し、ランダムなトークンを検出して
+識別子やパスを検出しないことを検証します。
+"""
+
+import base64
+import mmap
+import random
+import re
+import secrets
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.secret_scan import ENTROPY_DETECTOR, ENTROPY_RULES, EXAMPLE_KEYS
+from tests.secret_scan.entropy import (
+    MAX_TOKEN_LENGTH,
+    EntropyDetector,
+    EntropyRule,
+    shannon_entropy,
+    window_starts,
+)
+
+
+pytest.importorskip("numpy")
+
+# 閾値の低い小さなルール（Hypothesisで生成する短いトークンでも検出が起きるようにする）
+SMALL_RULES = [
+    EntropyRule("alnum", "abcdefghij0123456789", threshold=2.5, window=8),
+    EntropyRule("hex", "0123456789abcdef", threshold=2.0, window=6),
+]
+
+token_like_text = st.lists(
+    st.one_of(
+        st.text(alphabet="abcdefghij0123456789", min_size=1, max_size=40),
+        st.sampled_from([" ", "\n", "# ", "=", '"', "xyz", "é", "\t"]),
+    ),
+    max_size=40,
+).map("".join)
+
+
+def reference_scan(content, rules, comment_prefixes, allowlist):
+    """トークンごと・窓ごとにシャノンエントロピーを計算する参照実装"""
+    findings = []
+    for rule in rules:
+        token_pattern = re.compile(f"[{re.escape(rule.charset)}]+")
+        for line_num, line in enumerate(content.split("\n"), start=1):
+            if line.strip().startswith(comment_prefixes):
+                continue
+            for match in token_pattern.finditer(line):
+                token = match.group(0)[:MAX_TOKEN_LENGTH]
+                starts = window_starts(len(token), rule.window)
+                if not starts:
+                    continue
+                score = max(shannon_entropy(token[start:start + rule.window]) for start in starts)
+                # 計算順序の違いによる浮動小数点の誤差を許容する
+                if score >= rule.threshold - 1e-9 and token not in allowlist:
+                    findings.append((rule.name, token, line_num))
+    return findings
+
+
+@given(token_like_text)
+def test_property_vectorized_scan_matches_reference(content: str):
+    """
+    任意のテキストについて、ベクトル化した検出が参照実装と同一の結果を返すことを検証します。
+    """
+    detector = EntropyDetector(SMALL_RULES, comment_prefixes=("#",))
+
+    assert detector.scan_text(content) == reference_scan(content, SMALL_RULES, ("#",), ())
+
+
+def _random_base64(rng, size: int) -> str:
+    return base64.b64encode(bytes(rng.getrandbits(8) for _ in range(size))).decode("ascii")
+
+
+def test_random_tokens_are_detected():
+    """
+    ランダムなBase64・16進数のトークンを検出し、行番号・ルール名を報告することを検証します。
+    """
+    rng = random.Random(0)
+    base64_token = _random_base64(rng, 30)
+    hex_token = "".join(rng.choice("0123456789abcdef") for _ in range(40))
+    content = (
+        f'api = "{base64_token}"\n'
+        f"sha = {hex_token}\n"
+    )
+
+    assert ENTROPY_DETECTOR.scan_text(content) == [
+        ("High entropy base64 string", base64_token, 1),
+        ("High entropy hex string", hex_token, 2),
+    ]
+
+    # ランダムな40文字のトークンのほとんどが閾値を超える
+    detected = sum(bool(ENTROPY_DETECTOR.scan_text(_random_base64(rng, 30))) for _ in range(200))
+    assert detected >= 180
+
+
+@pytest.mark.parametrize("content", [
+    'resource "aws_security_group" "TestSecurityGroupOWASPCompliance" {}',
+    "ApplyServerSideEncryptionByDefault",
+    "arn:aws:iam::123456789012:role/ClientVpnEndpointServiceRole",
+    "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa",
+    f'example = "{EXAMPLE_KEYS[1]}"',
+    f'# key = "{base64.b64encode(bytes(range(48))).decode("ascii")}"',
+])
+def test_identifiers_comments_and_examples_are_not_detected(content: str):
+    """
+    識別子・ARN・繰り返し文字列・例示用のキー・コメント行を検出しないことを検証します。
+    """
+    assert ENTROPY_DETECTOR.scan_text(content) == []
+
+
+def test_long_tokens_are_truncated():
+    """
+    証明書などの長いトークンは先頭部分だけを評価・報告することを検証します。
+    """
+    blob = base64.b64encode(secrets.token_bytes(3 * MAX_TOKEN_LENGTH)).decode("ascii")
+
+    findings = ENTROPY_DETECTOR.scan_text(f"data = {blob}\n")
+
+    assert [(rule, len(token), line) for rule, token, line in findings] == [
+        ("High entropy base64 string", MAX_TOKEN_LENGTH, 1)
+    ]
+
+
+def test_memory_mapped_scan_matches_text_scan(tmp_path):
+    """
+    メモリマップしたファイルのスキャンが、テキストのスキャンと同一の結果を返すことを検証します。
+    """
+    tokens = [base64.b64encode(secrets.token_bytes(30)).decode("ascii") for _ in range(50)]
+    content = "".join(f'line{index} = "{token}"\nname = "x"\n' for index, token in enumerate(tokens))
+    file_path = tmp_path / "state.json"
+    file_path.write_text(content, encoding="utf-8")
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        assert ENTROPY_DETECTOR.scan_buffer(buffer) == ENTROPY_DETECTOR.scan_text(content)
+
+
+def test_rules_are_configurable_per_charset():
+    """
+    文字種ごとの閾値がスキャンキャッシュのキー（version）に反映されることを検証します。
+    """
+    stricter = [rule._replace(threshold=rule.threshold + 0.1) for rule in ENTROPY_RULES]
+
+    assert EntropyDetector(stricter).version != EntropyDetector(ENTROPY_RULES).version
+    with pytest.raises(ValueError):
+        EntropyDetector([EntropyRule("non-ascii", "äöü", threshold=1.0)]).scan_text("äöü")
@@ -0,0 +1,159 @@
+"""
+Property-Based Test: 線形時間の正規表現バックエンドと時間予算
+
+**Validates: Requirements 8.4**
+
+このテストは、RE2で照合するルールが従来の re と同一の検出結果を返し、
+バックトラックが爆発するルールでも線形時間で終わること、および re で照合するルールが
+1ファイルあたりの時間予算で打ち切られることを検証します。
+"""
+
+import time
+
+import pytest
+from hypothesis import given
+
+from tests.secret_scan import (
+    AWS_CREDENTIAL_PATTERNS,
+    EXAMPLE_KEYS,
+    SENSITIVE_CHECKS,
+    SENSITIVE_PATTERNS,
+    SENSITIVE_RULESET,
+    Ruleset,
+    ScanBudgetExceeded,
+)
+from tests.secret_scan.linear import compile_linear, translate_for_re2
+
+from tests.property.test_secret_scan_engine import ascii_secret_like_text, secret_like_text
+
+
+# 長い行でバックトラックが爆発するルール（先頭のリテラルで候補位置が決まる）
+CATASTROPHIC_RULE = (r'kkk[^\n]*[^\n]*Z', 'Catastrophic')
+CATASTROPHIC_LINE = "k" * 3000
+
+
+# プロジェクトのルールセットと同じ設定: (ルール, フラグ, コメント記号, 除外する値, 確認関数)
+RULESET_CONFIGS = [
+    (AWS_CREDENTIAL_PATTERNS, 0, ('#', '//'), EXAMPLE_KEYS, None),
+    (SENSITIVE_PATTERNS, 0, ('#',), (), SENSITIVE_CHECKS),
+]
+
+
+def _rulesets(patterns, **kwargs):
+    """同じルールの re2 版と re 版の Ruleset を作成する"""
+    return (
+        Ruleset(patterns, regex_backend="re2", **kwargs),
+        Ruleset(patterns, regex_backend="re", **kwargs),
+    )
+
+
+def test_translation_excludes_newlines():
+    """
+    RE2向けの書き換えで、\\s・否定の文字クラスが改行に一致しなくなることを検証します。
+    """
+    translated = translate_for_re2(r'key\s*=\s*[^"\s]+', binary=False)
+
+    assert translated is not None
+    assert "\\n" not in translated.replace("[^\\n", "")
+    assert translated.startswith("key[\t")
+    assert translate_for_re2(r'[^\n]+', binary=True) == "[^\\n\\n]+"
+
+
+@pytest.mark.parametrize("pattern", [
+    r'^AKIA', r'key$', r'a\nb', r'[\n]', r'\bkey', r'(?i:\w)+', r'[\x00-z]',
+])
+def test_translation_rejects_patterns_with_different_semantics(pattern):
+    """
+    行頭・行末・改行・Unicodeの文字種・範囲の端点のエスケープを含むパターンは書き換えないことを検証します。
+    """
+    assert translate_for_re2(pattern, binary=False) is None
+
+
+def test_unknown_backend_is_rejected():
+    """
+    不明な正規表現バックエンドを指定するとValueErrorになることを検証します。
+    """
+    with pytest.raises(ValueError):
+        Ruleset([CATASTROPHIC_RULE], regex_backend="pcre")
+
+
+def test_time_budget_stops_backtracking_rule(tmp_path):
+    """
+    re で照合するルールが時間予算を超えると、ファイルのパスを含む例外で打ち切られることを検証します。
+    """
+    ruleset = Ruleset([CATASTROPHIC_RULE], regex_backend="re", time_budget=0.2)
+    file_path = tmp_path / "slow.tf"
+    file_path.write_text(CATASTROPHIC_LINE, encoding="utf-8")
+
+    start = time.monotonic()
+    with pytest.raises(ScanBudgetExceeded, match="slow.tf"):
+        ruleset.scan_path(file_path)
+    assert time.monotonic() - start < 5
+
+
+def test_re2_backend_scans_backtracking_rule_in_linear_time():
+    """
+    RE2で照合するルールは、バックトラックが爆発する入力でもすぐに終わることを検証します。
+    """
+    pytest.importorskip("re2")
+    ruleset = Ruleset([CATASTROPHIC_RULE], regex_backend="re2", time_budget=0)
+
+    start = time.monotonic()
+    findings = ruleset.scan_text(CATASTROPHIC_LINE * 10 + "\nkkkZ\n")
+
+    assert time.monotonic() - start < 1
+    assert findings == [("Catastrophic", "kkkZ", 2)]
+
+
+def test_sensitive_rules_run_on_linear_backend():
+    """
+    機密情報ルールがすべてRE2で照合され（先読み・後読み・re.IGNORECASE を使わない）、
+    値の除外と前後の文字の確認が一致の後に行われることを検証します。
+    """
+    pytest.importorskip("re2")
+    for binary in (False, True):
+        assert all(compile_linear(pattern, SENSITIVE_RULESET.flags, binary) for pattern, _ in SENSITIVE_PATTERNS)
+
+    linear = Ruleset(SENSITIVE_PATTERNS, comment_prefixes=('#',), regex_backend="re2", checks=SENSITIVE_CHECKS)
+    content = (
+        'PASSWORD = "hunter2hunter2"\n'
+        'password = "var.db_password"\n'
+        'private_key = "file(\'id_rsa\')"\n'
+        f'secret_key = "{"A" * 40}"\n'
+        f'blob = "{"A" * 41}"\n'
+    )
+
+    assert linear.scan_text(content) == [
+        ("password", 'PASSWORD = "hunter2hunter2"', 1),
+        ("AWS Secret Access Key", "A" * 40, 4),
+    ]
+
+
+@pytest.mark.parametrize("patterns, flags, comment_prefixes, allowlist, checks", RULESET_CONFIGS)
+@given(content=secret_like_text)
+def test_property_re2_backend_matches_re_backend(
+    patterns, flags, comment_prefixes, allowlist, checks, content: str
+):
+    """
+    任意のテキストについて、RE2バックエンドが re バックエンドと同一の検出結果を返すことを検証します。
+    """
+    pytest.importorskip("re2")
+    linear, backtracking = _rulesets(
+        patterns, flags=flags, comment_prefixes=comment_prefixes, allowlist=allowlist, checks=checks
+    )
+
+    assert linear.scan_text(content) == backtracking.scan_text(content)
+
+
+@given(content=ascii_secret_like_text)
+def test_property_re2_backend_matches_re_backend_on_bytes(content: str):
+    """
+    バイト列走査（大きなファイル向け）でも、RE2バックエンドが re バックエンドと同一の結果を返すことを検証します。
+    """
+    pytest.importorskip("re2")
+    data = content.encode("utf-8")
+    for patterns, flags, comment_prefixes, allowlist, checks in RULESET_CONFIGS:
+        linear, backtracking = _rulesets(
+            patterns, flags=flags, comment_prefixes=comment_prefixes, allowlist=allowlist, checks=checks
+        )
+        assert linear.scan_buffer(data) == backtracking.scan_buffer(data)
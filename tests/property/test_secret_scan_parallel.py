@@ -0,0 +1,86 @@
+"""
+Property-Based Test: 並列ファイルスキャン
+
+**Validates: Requirements 8.4**
+
+このテストは、プロセスプールによる並列スキャンが直列スキャンと同一の結果を
+入力順（決定的な順序）で返すことを検証します。
+"""
+
+from tests.secret_scan import AWS_CREDENTIAL_RULESET
+from tests.secret_scan.cache import ScanCache
+from tests.secret_scan.parallel import default_worker_count, scan_paths
+
+
+def _make_tree(root, file_count: int = 40):
+    """認証情報を含むファイルと含まないファイルが混在するツリーを作成する"""
+    paths = []
+    for index in range(file_count):
+        path = root / f"file_{index:03d}.tf"
+        if index % 7 == 0:
+            path.write_text(f'# file {index}\naws_access_key_id = "AKIA{index:016d}"\n', encoding="utf-8")
+        elif index % 11 == 0:
+            path.write_bytes(b"\x00\xff binary AKIA0000000000000000")
+        else:
+            path.write_text(f'resource "aws_vpc" "vpc_{index}" {{}}\n', encoding="utf-8")
+        paths.append(path)
+    # 存在しないファイルも結果に含まれる（検出なし）
+    paths.append(root / "missing.tf")
+    return paths
+
+
+def test_parallel_scan_matches_serial_scan_in_input_order(tmp_path):
+    """
+    並列スキャンの結果が直列スキャンの結果と同一で、入力順に並んでいることを検証します。
+    """
+    paths = _make_tree(tmp_path)
+
+    serial = scan_paths(paths, AWS_CREDENTIAL_RULESET, workers=1)
+    parallel = scan_paths(
+        paths, AWS_CREDENTIAL_RULESET, workers=3, min_parallel_files=0, min_parallel_bytes=0
+    )
+
+    assert parallel == serial
+    assert [path for path, _ in parallel] == paths
+    assert parallel[7][1] == [
+        ("AWS Access Key ID", "AKIA0000000000000007", 2),
+        ("AWS Access Key ID in config", "AKIA0000000000000007", 2),
+    ]
+    assert parallel[11][1] == []
+
+
+def test_parallel_scan_records_worker_results_in_cache(tmp_path):
+    """
+    ワーカーの検出結果がキャッシュに記録され、次回はワーカーを使わずに返されることを検証します。
+    """
+    tree = tmp_path / "tree"
+    tree.mkdir()
+    paths = _make_tree(tree)
+
+    with ScanCache(tmp_path / "cache.sqlite3") as cache:
+        first = scan_paths(
+            paths, AWS_CREDENTIAL_RULESET, cache=cache,
+            workers=2, min_parallel_files=0, min_parallel_bytes=0,
+        )
+        assert cache.misses > 0
+
+    with ScanCache(tmp_path / "cache.sqlite3") as cache:
+        # 書き込み直後のファイルは再確認されるため、内容ハッシュ経由でキャッシュが使われる
+        second = scan_paths(paths, AWS_CREDENTIAL_RULESET, cache=cache, workers=1)
+        assert cache.misses == 0
+
+    assert first == second
+
+
+def test_worker_count_knob(monkeypatch):
+    """
+    環境変数 SECRET_SCAN_WORKERS でワーカー数を指定できることを検証します。
+    """
+    monkeypatch.setenv("SECRET_SCAN_WORKERS", "3")
+    assert default_worker_count() == 3
+
+    monkeypatch.setenv("SECRET_SCAN_WORKERS", "0")
+    assert default_worker_count() == 1
+
+    monkeypatch.delenv("SECRET_SCAN_WORKERS")
+    assert default_worker_count() >= 1
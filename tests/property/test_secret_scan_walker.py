@@ -0,0 +1,153 @@
+"""
+Property-Based Test: .gitignoreを考慮したプロジェクトファイルの走査
+
+**Validates: Requirements 8.4**
+
+このテストは、プロジェクトファイルの走査が除外ディレクトリを降りる前に刈り込み、
+.gitignore の規則を git と同じように解釈することを検証します。
+"""
+
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from tests.secret_scan import walker
+from tests.secret_scan.walker import ProjectFiles, parse_gitignore, walk_files
+
+
+GITIGNORE = """\
+# コメント
+*.log
+!keep.log
+build/
+/root-only.txt
+docs/**/*.tmp
+**/cache
+secret[0-9].txt
+\\#literal
+""" + "trailing-space.txt   \n"  # 末尾の空白は無視される
+
+TREE = [
+    "main.tf",
+    "debug.log",
+    "keep.log",
+    "nested/debug.log",
+    "nested/keep.log",
+    "build/output.tf",
+    "nested/build/output.tf",
+    "root-only.txt",
+    "nested/root-only.txt",
+    "docs/a.tmp",
+    "docs/x/y/b.tmp",
+    "docs/x/c.md",
+    "cache/data.json",
+    "deep/er/cache/data.json",
+    "secret1.txt",
+    "secretA.txt",
+    "#literal",
+    "trailing-space.txt",
+    "modules/.gitignore",
+    "modules/local.tfvars",
+    "modules/vpc/main.tf",
+    "modules/vpc/local.tfvars",
+    "modules/vpc/debug.log",
+]
+
+NESTED_GITIGNORE = """\
+*.tfvars
+!vpc/
+!debug.log
+"""
+
+
+def _make_tree(root: Path) -> None:
+    for relative_path in TREE:
+        path = root / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x\n", encoding="utf-8")
+    (root / ".gitignore").write_text(GITIGNORE, encoding="utf-8")
+    (root / "modules" / ".gitignore").write_text(NESTED_GITIGNORE, encoding="utf-8")
+
+
+def _relative(paths, root: Path):
+    return sorted(path.relative_to(root).as_posix() for path in paths)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="gitが見つかりません")
+def test_walker_matches_git_ignore_semantics(tmp_path):
+    """
+    走査結果が git ls-files --others --exclude-standard（gitが無視しないファイル）と一致することを検証します。
+    """
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    _make_tree(tmp_path)
+
+    output = subprocess.run(
+        ["git", "ls-files", "-z", "--others", "--exclude-standard"],
+        cwd=tmp_path, check=True, capture_output=True,
+    ).stdout.decode("utf-8")
+    expected = sorted(path for path in output.split("\0") if path)
+
+    assert _relative(walk_files(tmp_path, exclude_dirs={".git"}), tmp_path) == expected
+    assert "modules/vpc/debug.log" in expected
+    assert "secret1.txt" not in expected
+
+
+def test_excluded_directories_are_pruned_before_descending(tmp_path, monkeypatch):
+    """
+    除外ディレクトリと無視されたディレクトリの中身が読み取られない（降りない）ことを検証します。
+    """
+    _make_tree(tmp_path)
+    provider_cache = tmp_path / ".terraform" / "providers" / "registry.terraform.io"
+    provider_cache.mkdir(parents=True)
+    (provider_cache / "terraform-provider-aws").write_bytes(b"\0" * 16)
+
+    scanned = []
+    real_scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(Path(path).relative_to(tmp_path).as_posix())
+        return real_scandir(path)
+
+    monkeypatch.setattr(walker.os, "scandir", recording_scandir)
+
+    files = _relative(walk_files(tmp_path, exclude_dirs={".terraform"}), tmp_path)
+
+    assert not any(path.startswith((".terraform", "build", "nested/build")) for path in scanned)
+    assert "cache" not in scanned and "deep/er/cache" not in scanned
+    assert "main.tf" in files
+    assert not any(path.startswith(".terraform/") for path in files)
+
+
+def test_project_files_is_lazy_and_reiterable(tmp_path):
+    """
+    プロジェクトファイル一覧が遅延的に列挙され、何度でも反復できることを検証します。
+    """
+    _make_tree(tmp_path)
+    project_files = ProjectFiles(tmp_path, exclude_extensions={".json"})
+
+    iterator = iter(project_files)
+    assert not isinstance(iterator, list)
+    first = next(iterator)
+    assert first.is_file()
+
+    assert list(project_files) == list(project_files)
+    assert not any(path.suffix == ".json" for path in project_files)
+
+
+def test_gitignore_pattern_parsing():
+    """
+    否定・ディレクトリ限定・固定（/を含む）パターンの解釈を検証します。
+    """
+    negated, directory_only, anchored, floating = parse_gitignore(
+        ["!keep.log", "build/", "/docs/*.md", "*.tfstate"]
+    )
+
+    assert negated.negated and negated.regex.fullmatch("a/keep.log")
+    assert directory_only.directory_only and directory_only.regex.fullmatch("x/build")
+    assert anchored.regex.fullmatch("docs/readme.md")
+    assert not anchored.regex.fullmatch("x/docs/readme.md")
+    assert not anchored.regex.fullmatch("docs/a/readme.md")
+    assert floating.regex.fullmatch("terraform/terraform.tfstate")
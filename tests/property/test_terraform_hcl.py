@@ -0,0 +1,266 @@
+"""
+Property-Based Test: HCLの構文解析と構文木のキャッシュ
+
+**Validates: Requirements 6.4**
+
+このテストは、HCLの構文解析が任意のブロック・属性・リテラルの入れ子を書き出したテキストを元の構造に戻し、
+入れ子の波括弧・ヒアドキュメント・テンプレート・コメントを正しく扱い、式中の参照を（for 式の反復変数を除いて）
+列挙し、プロジェクトのすべての .tf ファイルを内容ハッシュごとに1回だけ解析することを検証します。
+"""
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.tfanalysis import HclSyntaxError, NotLiteral, ParseCache, TerraformModule, parse
+from tests.tfanalysis.hcl import ForExpression, Template
+
+
+identifiers = st.from_regex(r'[a-z_][a-z0-9_]{0,8}', fullmatch=True).filter(
+    lambda name: name not in ("true", "false", "null", "for", "in", "if")
+)
+
+literals = st.recursive(
+    st.none() | st.booleans() | st.integers(min_value=-10**6, max_value=10**6)
+    | st.text(st.characters(blacklist_categories=("Cs",)), max_size=12),
+    lambda children: st.lists(children, max_size=3) | st.dictionaries(st.text(max_size=6), children, max_size=3),
+    max_leaves=8,
+)
+
+
+def render_string(value):
+    """文字列をHCLの "..." にする（補間・ディレクティブの開始はエスケープする）"""
+    escaped = []
+    for char in value:
+        if char in '"\\':
+            escaped.append("\\" + char)
+        elif char in "\n\r\t":
+            escaped.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char])
+        elif ord(char) < 0x20:
+            escaped.append(f"\\u{ord(char):04x}")
+        else:
+            escaped.append(char)
+    return '"' + "".join(escaped).replace("${", "$${").replace("%{", "%%{") + '"'
+
+
+def render_value(value):
+    """リテラルの値をHCLの式にする"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, str):
+        return render_string(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(render_value(item) for item in value) + "]"
+    return "{\n" + "".join(f"{render_string(k)} = {render_value(v)}\n" for k, v in value.items()) + "}"
+
+
+@st.composite
+def bodies(draw, depth=2):
+    """(属性の辞書, [(種類, ラベル, 本文), ...]) の本文"""
+    attributes = draw(st.dictionaries(identifiers, literals, max_size=4))
+    blocks = []
+    if depth:
+        for _ in range(draw(st.integers(min_value=0, max_value=3))):
+            labels = tuple(draw(st.lists(st.text(max_size=6), max_size=2)))
+            blocks.append((draw(identifiers), labels, draw(bodies(depth=depth - 1))))
+    return attributes, blocks
+
+
+def render_body(body, indent=""):
+    attributes, blocks = body
+    lines = [f"{indent}{name} = {render_value(value)}\n" for name, value in attributes.items()]
+    for block_type, labels, child in blocks:
+        header = " ".join([block_type] + [render_string(label) for label in labels])
+        lines.append(f"{indent}# {block_type}\n{indent}{header} {{\n")
+        lines.append(render_body(child, indent + "  "))
+        lines.append(f"{indent}}}\n")
+    return "".join(lines)
+
+
+def model_of(block):
+    """解析したブロックを bodies と同じ形にする"""
+    return (
+        block.type,
+        block.labels,
+        ({attribute.name: attribute.value for attribute in block.attributes}, [model_of(b) for b in block.blocks]),
+    )
+
+
+@given(blocks=st.lists(st.tuples(identifiers, st.lists(st.text(max_size=6), max_size=2).map(tuple), bodies()),
+                       max_size=3))
+def test_property_rendered_blocks_round_trip(blocks):
+    """
+    任意の入れ子のブロック・属性・リテラルを書き出したテキストを解析すると、元の構造と値に戻ることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    text = render_body(({}, blocks))
+
+    parsed = parse(text)
+
+    assert [model_of(block) for block in parsed] == [
+        (block_type, labels, body) for block_type, labels, body in blocks
+    ]
+
+
+reference_targets = st.sampled_from([
+    ("var.vpc_cidr", "var.vpc_cidr"),
+    ("local.logs_kms_key_arn", "local.logs_kms_key_arn"),
+    ("aws_subnet.public[count.index].id", "aws_subnet.public"),
+    ("aws_eip.nat[*].public_ip", "aws_eip.nat"),
+    ("data.aws_region.current.name", "data.aws_region.current"),
+    ("module.network.vpc_id", "module.network"),
+])
+
+
+@given(
+    targets=st.lists(reference_targets, min_size=1, max_size=4),
+    shape=st.sampled_from(["{}", "[{}]", "length({})", "true ? {} : null", '"x-${{{}}}"', "!({})"]),
+)
+def test_property_references_are_collected(targets, shape):
+    """
+    関数呼び出し・条件式・テンプレート・添字の中の参照を、添字の中の参照（count.index）を含めて列挙することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    expression = " + ".join(shape.format(source) for source, _ in targets)
+    (block,) = parse(f'resource "null_resource" "x" {{\n  value = {expression}\n}}\n')
+
+    subjects = {reference.subject for reference in block.references()}
+
+    assert {subject for _, subject in targets} <= subjects
+    assert subjects - {subject for _, subject in targets} <= {"count.index"}
+
+
+def test_nested_braces_in_variable_block():
+    """
+    validation ブロックの後ろにある sensitive を取りこぼさないことを検証します
+    （正規表現 variable\\s+"..."\\s*\\{([^}]+)\\} は最初の } で本文を打ち切っていた）。
+
+    **Validates: Requirements 6.4**
+    """
+    text = '''
+variable "db_password" {
+  type = string
+
+  validation {
+    condition     = length(var.db_password) >= 16
+    error_message = "too short: ${length(var.db_password)}"
+  }
+
+  sensitive = true
+}
+'''
+    (variable,) = parse(text)
+
+    assert variable.address == "var.db_password"
+    assert variable.literal("sensitive") is True
+    assert [block.type for block in variable.blocks] == ["validation"]
+    assert variable.children("validation")[0].attribute("condition").source == "length(var.db_password) >= 16"
+
+
+def test_heredoc_template_and_comments():
+    """
+    ヒアドキュメント（<<- の字下げ）・テンプレートのエスケープ・3種類のコメントを正しく扱うことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    text = (
+        '# comment\n'
+        'locals {\n'
+        '  // comment\n'
+        '  policy = <<-EOT\n'
+        '    {\n'
+        '      "Resource": "${aws_s3_bucket.logs.arn}"\n'
+        '    }\n'
+        '    EOT\n'
+        '  plain = <<EOT\n'
+        '  keep $${literal} \\n\n'
+        'EOT\n'
+        '  /* multi\n'
+        '     line */\n'
+        '  escaped = "a\\"b\\u00e9 $${x} %%{y}"\n'
+        '}\n'
+    )
+    (block,) = parse(text)
+
+    policy = block.attribute("policy").expression
+    assert isinstance(policy, Template)
+    assert policy.parts[0] == '{\n  "Resource": "'
+    assert [str(reference) for reference in block.attribute("policy").references()] == ["aws_s3_bucket.logs.arn"]
+    assert block.literal("plain") == "  keep ${literal} \\n\n"
+    assert block.literal("escaped") == 'a"b\u00e9 ${x} %{y}'
+
+
+def test_for_expression_variables_are_not_references():
+    """
+    for 式・%{for} の反復変数を参照に含めず、コレクションの参照は含めることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    text = '''
+output "x" {
+  value = {
+    for name, subnet in aws_subnet.private : name => subnet.id
+    if subnet.tags != var.tags
+  }
+  listing = "%{ for ip in var.ips ~}${ip}, %{ endfor ~}"
+}
+'''
+    (output,) = parse(text)
+
+    assert isinstance(output.attribute("value").expression, ForExpression)
+    assert [reference.subject for reference in output.references()] == [
+        "aws_subnet.private", "var.tags", "var.ips"
+    ]
+    with pytest.raises(NotLiteral):
+        output.literal("value")
+
+
+@pytest.mark.parametrize(
+    "text, line",
+    [
+        ('resource "a" "b" {\n  x = \n}\n', 2),
+        ('resource "a" "b" {\n  x = 1 y = 2\n}\n', 2),
+        ('variable "a" {\n  default = "unterminated\n}\n', 2),
+        ('locals {\n  x = 1\n  x = 2\n}\n', 3),
+        ('locals {\n  x = <<EOT\nno end\n}\n', 2),
+        ('x = 1\n', 1),
+    ],
+)
+def test_syntax_errors_report_location(text, line):
+    """
+    構文の誤りを行番号とともに HclSyntaxError として報告することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    with pytest.raises(HclSyntaxError) as error:
+        parse(text, "broken.tf")
+
+    assert error.value.path == "broken.tf"
+    assert error.value.line == line
+
+
+@pytest.mark.terraform_resources("*")
+def test_project_files_are_parsed_once(terraform_dir, terraform_module):
+    """
+    プロジェクトのすべての .tf ファイルを解析でき、同じ内容のファイルは内容ハッシュのキャッシュから返すことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    cache = ParseCache()
+    first = TerraformModule.load(terraform_dir, cache)
+    second = TerraformModule.load(terraform_dir, cache)
+
+    assert cache.misses == len(first.files) and cache.hits == len(first.files)
+    assert all(a.blocks is b.blocks for a, b in zip(first.files, second.files))
+    assert [f.digest for f in terraform_module.files] == [f.digest for f in first.files]
+
+    assert "aws_ec2_client_vpn_endpoint.pc" in terraform_module.resources
+    assert "data.aws_region.current" in terraform_module.data_sources
+    endpoint = terraform_module.resources["aws_ec2_client_vpn_endpoint.pc"]
+    assert "aws_cloudwatch_log_group.vpn_pc" in {reference.subject for reference in endpoint.references()}
+    assert terraform_module.variables["vpn_client_cidr_pc"].literal("default") == "172.16.0.0/22"
@@ -0,0 +1,203 @@
+"""
+Property-Based Test: Terraform構成の参照グラフと影響を受けるテストの選択
+
+**Validates: Requirements 6.4**
+
+このテストは、参照グラフが宣言間の参照（推移的な影響を含む）を正しく表し、変更したファイル・宣言から
+影響を受ける宣言だけを求め、cloudtrail.tf の変更でVPNエンドポイント・ネットワークのテストを選ばないことを検証します。
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.tfanalysis import ParseCache, ReferenceGraph, TerraformModule
+from tests.tfanalysis.impact import ChangedFile, ImpactAnalysis, git_changed_files
+
+
+# 有向非巡回グラフ（ノード i は i より小さいノードのみを参照する）
+dags = st.integers(min_value=1, max_value=8).flatmap(
+    lambda size: st.tuples(*[
+        st.sets(st.integers(min_value=0, max_value=max(i - 1, 0)), max_size=i) if i else st.just(frozenset())
+        for i in range(size)
+    ])
+)
+
+
+def render_dag(edges):
+    return "".join(
+        f'resource "null_resource" "n{i}" {{\n'
+        f'  triggers = {{ {", ".join(f"d{j} = null_resource.n{j}.id" for j in sorted(targets))} }}\n'
+        f'}}\n'
+        for i, targets in enumerate(edges)
+    )
+
+
+def write_module(directory: Path, files):
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, text in files.items():
+        (directory / name).write_text(text, encoding="utf-8")
+    return TerraformModule.load(directory, ParseCache())
+
+
+@given(edges=dags, changed=st.integers(min_value=0, max_value=7))
+def test_property_downstream_is_reverse_reachability(tmp_path_factory, edges, changed):
+    """
+    downstream が、変更した宣言を（推移的に）参照するすべての宣言と一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    directory = tmp_path_factory.mktemp("dag")
+    graph = ReferenceGraph.from_module(write_module(directory, {"main.tf": render_dag(edges)}))
+    changed %= len(edges)
+
+    def reaches(node):
+        return node == changed or any(reaches(target) for target in edges[node])
+
+    expected = {f"null_resource.n{i}" for i in range(len(edges)) if reaches(i)}
+    assert graph.downstream([f"null_resource.n{changed}"]) == expected
+    assert {target for _, target in graph.edges()} <= graph.nodes
+    for i, targets in enumerate(edges):
+        assert graph.dependencies(f"null_resource.n{i}") == {f"null_resource.n{j}" for j in targets}
+
+
+def test_graph_nodes_locals_and_checks(tmp_path):
+    """
+    locals の値・check ブロックをノードとし、宣言されていない参照（count.index など）を辺にしないことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    module = write_module(tmp_path, {
+        "main.tf": (
+            'variable "cidr" {}\n'
+            'locals {\n  cidr = var.cidr\n  name = "x"\n}\n'
+            'resource "aws_vpc" "main" {\n  count = 1\n  cidr_block = local.cidr\n  tags = { Name = local.name }\n}\n'
+            'check "vpc" {\n  assert {\n    condition = aws_vpc.main[0].cidr_block != ""\n'
+            '    error_message = "x"\n  }\n}\n'
+            'provider "aws" {}\n'
+        ),
+    })
+    graph = ReferenceGraph.from_module(module)
+
+    assert graph.dependencies("aws_vpc.main") == {"local.cidr", "local.name"}
+    assert graph.dependents("aws_vpc.main") == {"check.vpc"}
+    assert graph.downstream(["var.cidr"]) == {"var.cidr", "local.cidr", "aws_vpc.main", "check.vpc"}
+    assert graph.upstream(["check.vpc"]) == {"check.vpc", "aws_vpc.main", "local.cidr", "local.name", "var.cidr"}
+    assert graph.declared_in(tmp_path / "main.tf") == graph.nodes
+    assert graph.is_global(tmp_path / "main.tf")
+
+
+def test_project_cloudtrail_change_skips_vpn_and_network(terraform_module):
+    """
+    cloudtrail.tf の変更はVPNエンドポイント・ネットワークの宣言に影響せず、kms.tf の変更は
+    ロググループを介してVPNエンドポイントに影響することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    graph = ReferenceGraph.from_module(terraform_module)
+    assert "aws_cloudwatch_log_group.vpn_pc" in graph.dependencies("aws_ec2_client_vpn_endpoint.pc")
+
+    cloudtrail = ImpactAnalysis(terraform_module, [ChangedFile(terraform_module.directory / "cloudtrail.tf", None)])
+    assert "aws_cloudtrail.main" in cloudtrail.affected
+    assert not cloudtrail.covers(["aws_ec2_client_vpn_*"])
+    assert not cloudtrail.covers(["aws_vpc.*", "aws_subnet.*", "aws_route_table*", "aws_security_group.*"])
+    assert cloudtrail.covers(["aws_s3_bucket*.cloudtrail"])
+
+    kms = ImpactAnalysis(terraform_module, [ChangedFile(terraform_module.directory / "kms.tf", None)])
+    assert kms.covers(["aws_ec2_client_vpn_*"]) and not kms.covers(["aws_subnet.*"])
+
+
+VARIABLES = 'variable "a" {\n  default = 1\n}\n\nvariable "b" {\n  default = 2\n}\n'
+RESOURCES = (
+    'resource "null_resource" "uses_a" {\n  triggers = { a = var.a }\n}\n'
+    'resource "null_resource" "uses_b" {\n  triggers = { b = var.b }\n}\n'
+    'resource "null_resource" "chained" {\n  triggers = { x = null_resource.uses_b.id }\n}\n'
+)
+
+
+@pytest.mark.parametrize(
+    "previous, expected",
+    [
+        # b の既定値だけを変更
+        (VARIABLES.replace("default = 2", "default = 3"), {"var.b", "null_resource.uses_b", "null_resource.chained"}),
+        # 変数 c を削除した（削除した宣言も影響範囲に含める）
+        (VARIABLES + 'variable "c" {}\n', {"var.c"}),
+        # 内容が同じ
+        (VARIABLES, set()),
+    ],
+)
+def test_changed_declarations_compare_with_previous(tmp_path, previous, expected):
+    """
+    ベースの内容がある場合は、ファイル全体ではなく変更した宣言とその影響だけを求めることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    module = write_module(tmp_path, {"variables.tf": VARIABLES, "main.tf": RESOURCES})
+
+    impact = ImpactAnalysis(module, [ChangedFile(tmp_path / "variables.tf", previous.encode("utf-8"))])
+
+    assert impact.affected == expected
+
+
+def test_unclassified_changes_select_conservatively(tmp_path):
+    """
+    provider ブロック・tfvars の変更は構成全体に影響し、テストモジュールの変更はそのモジュールだけを選び、
+    それ以外のファイルの変更はすべてのテストを選ぶことを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    terraform_dir = tmp_path / "terraform"
+    module = write_module(terraform_dir, {"variables.tf": VARIABLES, "main.tf": RESOURCES + 'provider "aws" {}\n'})
+    test_module = tmp_path / "tests" / "test_x.py"
+
+    provider = ImpactAnalysis(module, [ChangedFile(terraform_dir / "main.tf", RESOURCES.encode("utf-8"))])
+    assert provider.affected == module_nodes(module)
+    tfvars = ImpactAnalysis(module, [ChangedFile(terraform_dir / "terraform.tfvars", None)])
+    assert tfvars.affected == module_nodes(module)
+
+    test_only = ImpactAnalysis(module, [ChangedFile(test_module, None)])
+    assert test_only.selects(test_module, []) and not test_only.selects(tmp_path / "tests" / "test_y.py", ["*"])
+
+    helper = ImpactAnalysis(module, [ChangedFile(tmp_path / "tests" / "helpers.py", None)])
+    assert helper.selects(tmp_path / "tests" / "test_y.py", [])
+
+    deleted = ImpactAnalysis(module, [ChangedFile(terraform_dir / "removed.tf", None)])
+    assert deleted.affected == module_nodes(module)
+
+
+def module_nodes(module):
+    return ReferenceGraph.from_module(module).nodes
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="gitが見つかりません")
+def test_git_changed_files_include_uncommitted_and_previous(tmp_path):
+    """
+    ベースとのマージベースから作業ツリーまでの変更（未コミット・未追跡を含む）と、変更前の内容を列挙することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("config", "user.email", "test@example.com")
+    git("config", "user.name", "test")
+    (tmp_path / "terraform").mkdir()
+    (tmp_path / "terraform" / "variables.tf").write_text(VARIABLES, encoding="utf-8")
+    git("add", ".")
+    git("commit", "-q", "-m", "base")
+    git("branch", "base")
+
+    (tmp_path / "terraform" / "variables.tf").write_text(VARIABLES.replace("2", "3"), encoding="utf-8")
+    (tmp_path / "terraform" / "main.tf").write_text(RESOURCES, encoding="utf-8")
+
+    changes = {change.path.name: change for change in git_changed_files(tmp_path, "base")}
+
+    assert set(changes) == {"variables.tf", "main.tf"}
+    assert changes["variables.tf"].previous == VARIABLES.encode("utf-8")
+    assert changes["main.tf"].previous is None
+    module = TerraformModule.load(tmp_path / "terraform", ParseCache())
+    assert ImpactAnalysis(module, changes.values()).changed_declarations >= {"var.b", "null_resource.chained"}
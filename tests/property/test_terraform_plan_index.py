@@ -0,0 +1,273 @@
+"""
+Property-Based Test: プラン（terraform show -json）のリソースの索引とオフライン解析
+
+**Validates: Requirements 6.4**
+
+このテストは、プランのJSONからリソースのインスタンスをアドレス・種類・タグで引ける索引を作り、
+apply まで決まらないIDを構成の参照先のインスタンスの記号的な値にしてリソース間の関連を照合でき、
+索引による EC2 API の応答（PlanEC2View）が boto3 と同じ形でフィルタに一致するリソースを返すことを検証します。
+"""
+
+import json
+
+import pytest
+from hypothesis import given, strategies as st
+
+from tests.tfanalysis import PlanEC2View, ResourceIndex, UnsupportedFilter
+
+
+def _refs(*references):
+    return {"references": list(references)}
+
+
+def _counted(target):
+    """target[count.index] を参照する式（terraform show -json と同じ参照の並び）"""
+    return _refs(f"{target}[count.index].id", f"{target}[count.index]", target, "count.index")
+
+
+def _resource(address, values, index=None):
+    resource_type, name = address.split(".")[-2:]
+    return {
+        "address": address if index is None else f"{address}[{index}]",
+        "mode": "managed",
+        "type": resource_type,
+        "name": name,
+        "index": index,
+        "values": values,
+    }
+
+
+def _change(item, after_unknown):
+    return {"address": item["address"], "change": {"actions": ["create"], "after_unknown": after_unknown}}
+
+
+def build_plan(subnet_count=2):
+    """VPC・サブネット・NAT Gateway・セキュリティグループ・Client VPN のプラン"""
+    tags = {"Project": "client-vpn"}
+    resources = [
+        _resource("aws_vpc.main", {
+            "cidr_block": "192.168.0.0/16", "enable_dns_hostnames": True, "enable_dns_support": True,
+            "tags": {"Name": "client-vpn-vpc"}, "tags_all": dict(tags, Name="client-vpn-vpc"),
+        }),
+        _resource("aws_security_group.vpn", {
+            "name": "client-vpn-sg", "description": "Client VPN", "tags_all": dict(tags, Name="client-vpn-sg"),
+            "egress": [{
+                "protocol": "-1", "from_port": 0, "to_port": 0, "cidr_blocks": ["0.0.0.0/0"],
+                "ipv6_cidr_blocks": [], "prefix_list_ids": [], "security_groups": [], "self": False,
+                "description": "all",
+            }],
+            "ingress": [],
+        }),
+        _resource("aws_vpc_security_group_ingress_rule.https", {
+            "ip_protocol": "udp", "from_port": 443, "to_port": 443, "cidr_ipv4": "172.16.0.0/22",
+            "description": "VPN clients", "tags_all": tags,
+        }),
+        _resource("aws_ec2_client_vpn_endpoint.pc", {
+            "description": "PC", "client_cidr_block": "172.16.0.0/22", "split_tunnel": False,
+            "transport_protocol": "udp", "vpn_port": 443, "server_certificate_arn": "arn:aws:acm:cert",
+            "authentication_options": [{
+                "type": "federated-authentication", "saml_provider_arn": "arn:aws:iam::1:saml-provider/pc",
+                "self_service_saml_provider_arn": None,
+            }],
+            "connection_log_options": [{
+                "enabled": True, "cloudwatch_log_group": "/aws/vpn/pc", "cloudwatch_log_stream": None,
+            }],
+            "tags_all": dict(tags, Name="client-vpn-pc"),
+        }),
+        _resource("aws_ec2_client_vpn_authorization_rule.pc", {
+            "target_network_cidr": "192.168.0.0/16", "authorize_all_groups": True, "description": "all",
+        }),
+    ]
+    changes = [_change(resources[0], {"id": True, "arn": True, "tags": {}, "tags_all": {}})]
+    changes.append(_change(resources[1], {"id": True, "vpc_id": True, "egress": [{}], "tags_all": {}}))
+    changes.append(_change(resources[2], {"id": True, "security_group_id": True}))
+    changes.append(_change(resources[3], {"id": True, "vpc_id": True, "security_group_ids": [True],
+                                          "authentication_options": [{}], "connection_log_options": [{}]}))
+    changes.append(_change(resources[4], {"id": True, "client_vpn_endpoint_id": True}))
+    for index in range(subnet_count):
+        subnet = _resource("aws_subnet.private", {
+            "cidr_block": f"192.168.{10 + index}.0/24", "availability_zone": f"ap-northeast-1{'ac'[index % 2]}",
+            "map_public_ip_on_launch": False, "tags_all": dict(tags, Type="Private", Name=f"private-{index}"),
+        }, index)
+        eip = _resource("aws_eip.nat", {"domain": "vpc", "tags_all": tags}, index)
+        nat = _resource("aws_nat_gateway.main", {"connectivity_type": "public", "tags_all": tags}, index)
+        table = _resource("aws_route_table.private", {"route": [{"cidr_block": "0.0.0.0/0"}], "tags_all": tags}, index)
+        association = _resource("aws_route_table_association.private", {}, index)
+        resources += [subnet, eip, nat, table, association]
+        changes += [
+            _change(subnet, {"id": True, "vpc_id": True}),
+            _change(eip, {"id": True, "allocation_id": True, "public_ip": True}),
+            _change(nat, {"id": True, "allocation_id": True, "subnet_id": True, "public_ip": True}),
+            _change(table, {"id": True, "vpc_id": True, "route": [{"nat_gateway_id": True}]}),
+            _change(association, {"id": True, "subnet_id": True, "route_table_id": True}),
+        ]
+    configuration = [
+        ("aws_security_group.vpn", {"vpc_id": _refs("aws_vpc.main.id", "aws_vpc.main")}),
+        ("aws_vpc_security_group_ingress_rule.https",
+         {"security_group_id": _refs("aws_security_group.vpn.id", "aws_security_group.vpn")}),
+        ("aws_ec2_client_vpn_endpoint.pc", {
+            "vpc_id": _refs("aws_vpc.main.id", "aws_vpc.main"),
+            "security_group_ids": _refs("aws_security_group.vpn.id", "aws_security_group.vpn"),
+        }),
+        ("aws_ec2_client_vpn_authorization_rule.pc",
+         {"client_vpn_endpoint_id": _refs("aws_ec2_client_vpn_endpoint.pc.id", "aws_ec2_client_vpn_endpoint.pc")}),
+        ("aws_subnet.private", {"vpc_id": _refs("aws_vpc.main.id", "aws_vpc.main")}),
+        ("aws_eip.nat", {}),
+        ("aws_nat_gateway.main", {"allocation_id": _counted("aws_eip.nat"),
+                                  "subnet_id": _counted("aws_subnet.private")}),
+        ("aws_route_table.private", {"vpc_id": _refs("aws_vpc.main.id", "aws_vpc.main"),
+                                     "route": [{"nat_gateway_id": _counted("aws_nat_gateway.main")}]}),
+        ("aws_route_table_association.private", {"subnet_id": _counted("aws_subnet.private"),
+                                                 "route_table_id": _counted("aws_route_table.private")}),
+    ]
+    return {
+        "format_version": "1.2",
+        "planned_values": {"root_module": {"resources": resources}},
+        "resource_changes": changes,
+        "configuration": {"root_module": {"resources": [
+            {"address": address, "expressions": expressions} for address, expressions in configuration
+        ]}},
+    }
+
+
+@given(subnet_count=st.integers(min_value=1, max_value=6))
+def test_property_unknown_ids_resolve_to_referenced_instances(subnet_count):
+    """
+    apply まで決まらないIDが参照先のインスタンスの記号的な値になり、count.index の参照が同じ添字のインスタンスに
+    対応することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    index = ResourceIndex.from_json(build_plan(subnet_count))
+
+    vpc = index.get("aws_vpc.main")
+    assert vpc.values["id"] == "aws_vpc.main" and "id" in vpc.unknown
+    assert vpc.actions == ("create",)
+    for position in range(subnet_count):
+        subnet = index.get(f"aws_subnet.private[{position}]")
+        nat = index.get(f"aws_nat_gateway.main[{position}]")
+        assert subnet.values["vpc_id"] == vpc.values["id"]
+        assert nat.values["subnet_id"] == subnet.values["id"]
+        assert nat.values["allocation_id"] == index.get(f"aws_eip.nat[{position}]").values["id"]
+        table = index.get(f"aws_route_table.private[{position}]")
+        assert table.values["route"][0]["nat_gateway_id"] == nat.values["id"]
+        assert table.values["route"][0]["cidr_block"] == "0.0.0.0/0"
+    assert len(index.by_type("aws_subnet")) == subnet_count
+    assert len(index.find("aws_subnet", Type="Private", Project="client-vpn")) == subnet_count
+
+
+def test_index_lookup_by_address_type_and_tag():
+    """
+    アドレス・種類・タグで引けること、default_tags を含む tags_all を優先することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    index = ResourceIndex.from_json(build_plan())
+
+    assert "aws_ec2_client_vpn_endpoint.pc" in index
+    assert index.get("aws_vpc.other") is None
+    assert [r.address for r in index.find("aws_vpc", Name="client-vpn-vpc")] == ["aws_vpc.main"]
+    assert index.get("aws_vpc.main").tags["Project"] == "client-vpn"
+    assert {r.type for r in index.by_tag("Project", "client-vpn")} >= {"aws_vpc", "aws_subnet", "aws_nat_gateway"}
+    assert index.find(Name="private-1")[0].resource_address == "aws_subnet.private"
+    assert index.find("aws_vpc", Name="private-1") == []
+    assert len(index) == 5 + 5 * 2
+
+
+def test_ec2_view_returns_boto3_shapes():
+    """
+    PlanEC2View が boto3 の EC2 クライアントと同じ形の応答を返し、リソース間のIDが一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    ec2 = PlanEC2View(ResourceIndex.from_json(build_plan()))
+
+    (vpc,) = ec2.describe_vpcs(Filters=[{"Name": "tag:Name", "Values": ["client-vpn-vpc"]}])["Vpcs"]
+    assert vpc["CidrBlock"] == "192.168.0.0/16" and vpc["State"] == "available"
+    assert {"Key": "Name", "Value": "client-vpn-vpc"} in vpc["Tags"]
+
+    subnets = ec2.describe_subnets(Filters=[
+        {"Name": "vpc-id", "Values": [vpc["VpcId"]]}, {"Name": "tag:Type", "Values": ["Private"]},
+    ])["Subnets"]
+    assert [s["CidrBlock"] for s in subnets] == ["192.168.10.0/24", "192.168.11.0/24"]
+    assert all(s["MapPublicIpOnLaunch"] is False for s in subnets)
+
+    (group,) = ec2.describe_security_groups(GroupNames=["client-vpn-sg"])["SecurityGroups"]
+    assert group["VpcId"] == vpc["VpcId"]
+    assert group["IpPermissions"] == [{
+        "IpProtocol": "udp", "FromPort": 443, "ToPort": 443,
+        "IpRanges": [{"CidrIp": "172.16.0.0/22", "Description": "VPN clients"}],
+        "Ipv6Ranges": [], "UserIdGroupPairs": [], "PrefixListIds": [],
+    }]
+    (egress,) = group["IpPermissionsEgress"]
+    assert egress["IpProtocol"] == "-1" and "FromPort" not in egress
+
+    (endpoint,) = ec2.describe_client_vpn_endpoints()["ClientVpnEndpoints"]
+    assert endpoint["SecurityGroupIds"] == [group["GroupId"]]
+    assert endpoint["SplitTunnel"] is False
+    assert endpoint["AuthenticationOptions"] == [{
+        "Type": "federated-authentication",
+        "FederatedAuthentication": {"SamlProviderArn": "arn:aws:iam::1:saml-provider/pc"},
+    }]
+    assert endpoint["ConnectionLogOptions"] == {"Enabled": True, "CloudwatchLogGroup": "/aws/vpn/pc"}
+    (rule,) = ec2.describe_client_vpn_authorization_rules(
+        ClientVpnEndpointId=endpoint["ClientVpnEndpointId"]
+    )["AuthorizationRules"]
+    assert rule["AccessAll"] is True and "GroupId" not in rule
+
+    nat_gateways = ec2.describe_nat_gateways(Filter=[{"Name": "vpc-id", "Values": [vpc["VpcId"]]}])["NatGateways"]
+    assert [n["SubnetId"] for n in nat_gateways] == [s["SubnetId"] for s in subnets]
+    allocation_ids = {a["AllocationId"] for a in ec2.describe_addresses()["Addresses"]}
+    assert {n["NatGatewayAddresses"][0]["AllocationId"] for n in nat_gateways} == allocation_ids
+
+    (table,) = ec2.describe_route_tables(Filters=[
+        {"Name": "association.subnet-id", "Values": [subnets[1]["SubnetId"]]},
+    ])["RouteTables"]
+    assert table["Routes"][0] == {
+        "DestinationCidrBlock": "192.168.0.0/16", "GatewayId": "local", "Origin": "CreateRouteTable", "State": "active",
+    }
+    assert table["Routes"][1]["NatGatewayId"] == nat_gateways[1]["NatGatewayId"]
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ([{"Name": "tag:Name", "Values": ["private-*"]}], 2),
+        ([{"Name": "tag:Name", "Values": ["private-1", "private-9"]}], 1),
+        ([{"Name": "tag-key", "Values": ["Type"]}], 2),
+        ([{"Name": "availability-zone", "Values": ["ap-northeast-1c"]}, {"Name": "tag:Type", "Values": ["Private"]}], 1),
+        ([{"Name": "tag:Type", "Values": ["Public"]}], 0),
+    ],
+)
+def test_ec2_view_filters(filters, expected):
+    """
+    フィルタが名前ごとにAND、値はOR、ワイルドカードで一致することを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    ec2 = PlanEC2View(ResourceIndex.from_json(build_plan()))
+
+    assert len(ec2.describe_subnets(Filters=filters)["Subnets"]) == expected
+
+
+def test_unsupported_filter_and_input_errors(tmp_path):
+    """
+    未対応のフィルタを無視せずに報告し、プラン・ステート以外のJSONを拒否し、ステートからも索引を作れることを検証します。
+
+    **Validates: Requirements 6.4**
+    """
+    ec2 = PlanEC2View(ResourceIndex.from_json(build_plan()))
+    with pytest.raises(UnsupportedFilter):
+        ec2.describe_vpcs(Filters=[{"Name": "owner-id", "Values": ["1"]}])
+    with pytest.raises(ValueError):
+        ResourceIndex.from_json({"format_version": "1.0"})
+
+    state = {"values": {"root_module": {"resources": [
+        _resource("aws_vpc.main", {"id": "vpc-0123", "cidr_block": "10.0.0.0/16", "tags": {"Name": "v"}}),
+    ]}}}
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps(state), encoding="utf-8")
+    index = ResourceIndex.load(path)
+    assert index.get("aws_vpc.main").values["id"] == "vpc-0123"
+    assert index.get("aws_vpc.main").unknown == frozenset()
+    assert PlanEC2View(index).describe_vpcs(VpcIds=["vpc-0123"])["Vpcs"][0]["CidrBlock"] == "10.0.0.0/16"
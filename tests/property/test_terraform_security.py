@@ -9,88 +9,51 @@ OWASP基準に準拠し、パスワード、秘密鍵、APIキーなどの機密
 
 import re
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import pytest
 from hypothesis import given, strategies as st
 
+from tests.secret_scan import ENTROPY_DETECTOR, SENSITIVE_RULESET
+from tests.secret_scan.cache import ScanCache
+from tests.tfanalysis import NotLiteral
 
-# 機密情報パターン（OWASP基準）
-SENSITIVE_PATTERNS = [
-    # パスワードパターン（変数参照を除く）
-    (r'password\s*=\s*["\'](?!var\.|data\.|local\.|module\.)[^"\']{3,}["\']', "password"),
-    
-    # シークレットパターン（変数参照を除く）
-    (r'secret\s*=\s*["\'](?!var\.|data\.|local\.|module\.)[^"\']{3,}["\']', "secret"),
-    
-    # APIキーパターン（変数参照を除く）
-    (r'api_key\s*=\s*["\'](?!var\.|data\.|local\.|module\.)[^"\']{3,}["\']', "api_key"),
-    
-    # アクセスキーパターン（変数参照を除く）
-    (r'access_key\s*=\s*["\'](?!var\.|data\.|local\.|module\.)[^"\']{3,}["\']', "access_key"),
-    
-    # 秘密鍵パターン（変数参照とfile()関数を除く）
-    (r'private_key\s*=\s*["\'](?!var\.|data\.|local\.|module\.|file\()[^"\']{10,}["\']', "private_key"),
-    
-    # AWS Access Key ID パターン（実際のキー形式）
-    (r'AKIA[0-9A-Z]{16}', "AWS Access Key ID"),
-    
-    # AWS Secret Access Key パターン（40文字のBase64風文字列）
-    (r'(?<![A-Za-z0-9/+=])[A-Za-z0-9/+=]{40}(?![A-Za-z0-9/+=])', "AWS Secret Access Key"),
-    
-    # トークンパターン（変数参照を除く）
-    (r'token\s*=\s*["\'](?!var\.|data\.|local\.|module\.)[^"\']{10,}["\']', "token"),
-    
-    # 認証情報パターン（変数参照を除く）
-    (r'credentials\s*=\s*["\'](?!var\.|data\.|local\.|module\.)[^"\']{3,}["\']', "credentials"),
-]
+# すべての .tf ファイルを検証する
+pytestmark = pytest.mark.terraform_resources("*")
 
 
-def scan_file_for_secrets(file_path: Path) -> List[tuple]:
+def scan_file_for_secrets(file_path: Path, cache: Optional[ScanCache] = None) -> List[tuple]:
     """
     ファイルをスキャンして機密情報パターンを検出する
     
     Args:
         file_path: スキャンするファイルのパス
+        cache: スキャンキャッシュ（指定した場合は変更のないファイルを再スキャンしない）
         
     Returns:
         検出された機密情報のリスト [(パターン名, マッチした文字列, 行番号), ...]
     """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except (UnicodeDecodeError, PermissionError):
-        # バイナリファイルや読み取り不可ファイルはスキップ
-        return []
-    
-    findings = []
-    lines = content.split('\n')
-    
-    for pattern, pattern_name in SENSITIVE_PATTERNS:
-        for line_num, line in enumerate(lines, start=1):
-            # コメント行はスキップ
-            if line.strip().startswith('#'):
-                continue
-            
-            matches = re.findall(pattern, line, re.IGNORECASE)
-            for match in matches:
-                findings.append((pattern_name, match, line_num))
-    
-    return findings
+    # 全パターンを結合したマッチャーで内容全体を1パスでスキャン
+    # （バイナリファイルや読み取り不可ファイルはスキップ）
+    return SENSITIVE_RULESET.scan_path(file_path, cache)
 
 
-def test_terraform_files_no_plaintext_secrets(terraform_files):
+def test_terraform_files_no_plaintext_secrets(
+    terraform_files, scan_cache, scan_baseline, project_root_dir
+):
     """
     Feature: aws-client-vpn, Property 1
     
     すべてのTerraformファイル（.tf）に機密情報が平文で含まれていないことを検証します。
+    （ベースラインで受け入れ済みの検出結果は報告しません）
     
     **Validates: Requirements 6.4**
     """
     all_findings = {}
     
     for tf_file in terraform_files:
-        findings = scan_file_for_secrets(tf_file)
+        relative_path = tf_file.relative_to(project_root_dir).as_posix()
+        findings = scan_baseline.filter(relative_path, scan_file_for_secrets(tf_file, scan_cache))
         if findings:
             all_findings[tf_file.name] = findings
     
@@ -108,6 +71,40 @@ def test_terraform_files_no_plaintext_secrets(terraform_files):
     )
 
 
+def test_terraform_files_no_high_entropy_strings(
+    terraform_files, scan_cache, scan_baseline, project_root_dir
+):
+    """
+    Feature: aws-client-vpn, Property 1
+    
+    すべてのTerraformファイル（.tf）に、既知の形式に一致しないランダムなトークン
+    （高エントロピー文字列）が含まれていないことを検証します。
+    （ベースラインで受け入れ済みの検出結果は報告しません）
+    
+    **Validates: Requirements 6.4**
+    """
+    pytest.importorskip("numpy")
+
+    all_findings = {}
+    
+    for tf_file in terraform_files:
+        relative_path = tf_file.relative_to(project_root_dir).as_posix()
+        findings = scan_baseline.filter(relative_path, ENTROPY_DETECTOR.scan_path(tf_file, scan_cache))
+        if findings:
+            all_findings[tf_file.name] = findings
+    
+    assert not all_findings, (
+        f"❌ Terraformファイルに高エントロピー文字列が検出されました:\n"
+        + "\n".join([
+            f"  📄 {file_name}:\n" + "\n".join([
+                f"    - 行 {line_num}: {rule_name} = '{token[:8]}...'"
+                for rule_name, token, line_num in findings
+            ])
+            for file_name, findings in all_findings.items()
+        ])
+    )
+
+
 @given(st.text(min_size=10, max_size=1000))
 def test_property_no_aws_access_keys_in_content(file_content: str):
     """
@@ -151,7 +148,7 @@ def test_property_no_hardcoded_passwords_in_content(file_content: str):
     )
 
 
-def test_terraform_variables_use_sensitive_flag(terraform_files):
+def test_terraform_variables_use_sensitive_flag(terraform_module):
     """
     Terraformの機密変数にsensitive = trueフラグが設定されていることを検証します。
     
@@ -164,42 +161,25 @@ def test_terraform_variables_use_sensitive_flag(terraform_files):
     
     issues = {}
     
-    for tf_file in terraform_files:
-        try:
-            with open(tf_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except (UnicodeDecodeError, PermissionError):
-            continue
+    # variable ブロックを構文木から取得（validation などの入れ子のブロックを含む）
+    for tf_file, variable in terraform_module.blocks("variable"):
+        var_name = variable.labels[0]
         
-        # variable ブロックを検索
-        variable_blocks = re.finditer(
-            r'variable\s+"([^"]+)"\s*\{([^}]+)\}',
-            content,
-            re.DOTALL
+        # 機密情報を含む変数名かチェック
+        is_sensitive_var = any(
+            sensitive_name in var_name.lower() 
+            for sensitive_name in sensitive_var_names
         )
         
-        for match in variable_blocks:
-            var_name = match.group(1)
-            var_block = match.group(2)
-            
-            # 機密情報を含む変数名かチェック
-            is_sensitive_var = any(
-                sensitive_name in var_name.lower() 
-                for sensitive_name in sensitive_var_names
-            )
+        if is_sensitive_var:
+            # sensitive = true が設定されているかチェック
+            try:
+                has_sensitive_flag = variable.literal("sensitive", False) is True
+            except NotLiteral:
+                has_sensitive_flag = False
             
-            if is_sensitive_var:
-                # sensitive = true が設定されているかチェック
-                has_sensitive_flag = re.search(
-                    r'sensitive\s*=\s*true',
-                    var_block,
-                    re.IGNORECASE
-                )
-                
-                if not has_sensitive_flag:
-                    if tf_file.name not in issues:
-                        issues[tf_file.name] = []
-                    issues[tf_file.name].append(var_name)
+            if not has_sensitive_flag:
+                issues.setdefault(tf_file.path.name, []).append(var_name)
     
     # 警告として出力（エラーにはしない）
     if issues:
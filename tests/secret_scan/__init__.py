@@ -0,0 +1,34 @@
+# Secret Scanning Package
+# プロパティベーステストとフックで共有するシークレットスキャンエンジン
+
+from .archive import ArchiveLimitExceeded
+from .engine import Finding, Ruleset, ScanBudgetExceeded
+from .rules import (
+    AWS_CREDENTIAL_PATTERNS,
+    AWS_CREDENTIAL_RULESET,
+    ENTROPY_DETECTOR,
+    ENTROPY_RULES,
+    EXAMPLE_KEYS,
+    EXCLUDE_FILE_PATTERNS,
+    SENSITIVE_CHECKS,
+    SENSITIVE_PATTERNS,
+    SENSITIVE_RULESET,
+    should_scan_file,
+)
+
+__all__ = [
+    "ArchiveLimitExceeded",
+    "Finding",
+    "Ruleset",
+    "ScanBudgetExceeded",
+    "AWS_CREDENTIAL_PATTERNS",
+    "AWS_CREDENTIAL_RULESET",
+    "ENTROPY_DETECTOR",
+    "ENTROPY_RULES",
+    "EXAMPLE_KEYS",
+    "EXCLUDE_FILE_PATTERNS",
+    "SENSITIVE_CHECKS",
+    "SENSITIVE_PATTERNS",
+    "SENSITIVE_RULESET",
+    "should_scan_file",
+]
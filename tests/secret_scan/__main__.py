@@ -0,0 +1,255 @@
+"""
+シークレットスキャンのコマンドラインインターフェース
+
+pytestを介さずにスキャンエンジンを実行します（pre-commit / pre-pushフック向け）。
+
+使用例:
+    # ステージ済みの変更のみをスキャン（pre-commitフック）
+    python -m tests.secret_scan scan --staged
+
+    # origin/main との差分のみをスキャン（pre-pushフック）
+    python -m tests.secret_scan scan --base origin/main
+
+    # 全履歴（到達可能なすべてのblob）をスキャン
+    python -m tests.secret_scan scan --history
+
+    # 現在の検出結果を受け入れ済みとしてベースライン（.secret-scan-baseline.json）に記録
+    python -m tests.secret_scan scan --update-baseline terraform/main.tf
+
+    # 指定したファイルをスキャン（zip, tar, gzip はメンバーを展開せずにスキャン）
+    python -m tests.secret_scan scan terraform/main.tf dist/lambda.zip
+
+    # Terraformのステート・プランJSONをストリーミングでスキャン（- は標準入力）
+    terraform show -json plan.out | python -m tests.secret_scan tfjson -
+    terraform state pull | python -m tests.secret_scan tfjson -
+
+    # コマンドの出力を伏せ字にしてからログに書き込む（- または省略で標準入力）
+    terraform plan 2>&1 | python -m tests.secret_scan redact > logs/plan.log
+
+    # 常駐スキャナーを起動（ルールセットとキャッシュを保持し、client.py からの依頼に応答する）
+    python -m tests.secret_scan serve
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .archive import ArchiveLimitExceeded
+from .baseline import DEFAULT_BASELINE_FILE, Baseline
+from .cache import ScanCache
+from .client import PROJECT_ROOT, default_socket_path, mask
+from .daemon import DEFAULT_IDLE_TIMEOUT, DaemonAlreadyRunning, ScanServer, ScanService
+from .engine import Finding
+from .jsonstream import JsonStreamError
+from .redact import redact_stream
+from .sources import scan_sources
+from .tfjson import SECRET, scan_path as scan_tfjson_path
+
+
+def _scan_sources(
+    args: argparse.Namespace, baseline: Baseline
+) -> Iterator[Tuple[str, str, List[Finding]]]:
+    """
+    コマンドライン引数に応じたスキャン対象を検出結果とともに列挙する
+
+    Yields:
+        (表示用の位置, ベースラインと照合するパス, 検出結果)
+    """
+    return scan_sources(
+        args.paths,
+        Path.cwd(),
+        baseline,
+        staged=args.staged,
+        base=args.base,
+        history=args.history,
+    )
+
+
+def command_scan(args: argparse.Namespace) -> int:
+    """scanサブコマンド: 検出があれば終了コード1、アーカイブが上限を超えた場合は2を返す"""
+    try:
+        baseline = Baseline.load(args.baseline)
+    except (OSError, ValueError) as error:
+        print(f"❌ ベースラインを読み込めません: {error}", file=sys.stderr)
+        return 2
+
+    found = False
+    accepted = []
+    try:
+        for name, baseline_path, findings in _scan_sources(args, baseline):
+            if args.update_baseline:
+                accepted.append((baseline_path, findings))
+                continue
+            for pattern_name, match, line_num in baseline.filter(baseline_path, findings):
+                found = True
+                print(f"{name}:{line_num}: {pattern_name} = '{mask(match)}'")
+    except ArchiveLimitExceeded as error:
+        print(f"❌ アーカイブをスキャンできません: {error}", file=sys.stderr)
+        return 2
+
+    if args.update_baseline:
+        # 除外パスは既存のベースラインから引き継ぐ
+        updated = Baseline.from_findings(accepted, exclude=baseline.exclude)
+        updated.save(args.baseline)
+        print(f"{args.baseline}: {len(updated)} 件の検出結果を受け入れ済みとして記録しました", file=sys.stderr)
+        return 0
+
+    if found:
+        print(
+            "\n⚠️  AWS認証情報は環境変数またはAWS CLIセッションを使用してください。",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def command_tfjson(args: argparse.Namespace) -> int:
+    """tfjsonサブコマンド: 検出があれば終了コード1、JSONとして不正な場合は2を返す"""
+    found = False
+    for path in args.paths:
+        try:
+            findings = scan_tfjson_path(Path(path))
+        except (OSError, JsonStreamError) as error:
+            print(f"{path}: 読み込めません: {error}", file=sys.stderr)
+            return 2
+        for finding in findings:
+            found = True
+            if finding.kind == SECRET:
+                print(f"{path}:{finding.path}: {finding.rule} = '{mask(finding.value)}'")
+            else:
+                print(f"{path}:{finding.path}: sensitive としてマークされていません")
+
+    if found:
+        print(
+            "\n⚠️  機密情報を含む属性・変数・出力には sensitive = true を指定し、"
+            "ステートは暗号化したリモートバックエンドに保存してください。",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+def command_redact(args: argparse.Namespace) -> int:
+    """redactサブコマンド: 入力を伏せ字にして標準出力に書き出す（読み込めない場合は2を返す）"""
+    target = sys.stdout.buffer
+    for path in args.paths or ["-"]:
+        try:
+            if path == "-":
+                redact_stream(sys.stdin.buffer, target)
+            else:
+                with open(path, "rb") as source:
+                    redact_stream(source, target)
+        except OSError as error:
+            print(f"{path}: 読み込めません: {error}", file=sys.stderr)
+            return 2
+    return 0
+
+
+def command_serve(args: argparse.Namespace) -> int:
+    """serveサブコマンド: 常駐スキャナーを起動する（起動済みの場合は終了コード2を返す）"""
+    baseline_path = args.baseline or PROJECT_ROOT / DEFAULT_BASELINE_FILE
+    cache = None if args.no_cache else ScanCache(args.cache)
+    try:
+        service = ScanService(PROJECT_ROOT, baseline_path, cache)
+        try:
+            server = ScanServer(args.socket, service)
+        except DaemonAlreadyRunning as error:
+            print(f"❌ {error}", file=sys.stderr)
+            return 2
+        print(f"{args.socket}: 常駐スキャナーを起動しました（pid {os.getpid()}）", file=sys.stderr)
+        with server:
+            server.serve(args.idle_timeout)
+    finally:
+        if cache is not None:
+            cache.close()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """コマンドライン引数のパーサーを構築する"""
+    parser = argparse.ArgumentParser(
+        prog="python -m tests.secret_scan",
+        description="AWS認証情報・機密情報のシークレットスキャン",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scan = subparsers.add_parser("scan", help="ファイルまたはGitの差分・履歴をスキャンする")
+    mode = scan.add_mutually_exclusive_group()
+    mode.add_argument("--staged", action="store_true", help="ステージ済みの変更のみをスキャンする")
+    mode.add_argument("--base", metavar="REF", help="REF...HEAD の差分のみをスキャンする")
+    mode.add_argument(
+        "--history", action="store_true", help="全履歴（到達可能なすべてのblob）をスキャンする"
+    )
+    scan.add_argument(
+        "--baseline",
+        type=Path,
+        default=Path(DEFAULT_BASELINE_FILE),
+        help=f"受け入れ済みの検出結果と除外パスのファイル（既定: {DEFAULT_BASELINE_FILE}）",
+    )
+    scan.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="現在の検出結果をすべて受け入れ済みとしてベースラインに記録する",
+    )
+    scan.add_argument("paths", nargs="*", help="スキャンするファイル")
+    scan.set_defaults(handler=command_scan)
+
+    tfjson = subparsers.add_parser(
+        "tfjson", help="Terraformのステート・プランJSONをストリーミングでスキャンする"
+    )
+    tfjson.add_argument(
+        "paths", nargs="+", metavar="FILE", help="スキャンするJSONファイル（- は標準入力）"
+    )
+    tfjson.set_defaults(handler=command_tfjson)
+
+    redact = subparsers.add_parser(
+        "redact", help="ログなどの入力のシークレットを伏せ字にして標準出力に書き出す"
+    )
+    redact.add_argument(
+        "paths", nargs="*", metavar="FILE", help="入力ファイル（- または省略で標準入力）"
+    )
+    redact.set_defaults(handler=command_redact)
+
+    serve = subparsers.add_parser(
+        "serve", help="常駐スキャナーを起動する（エディタ・フック向け、client.py から依頼する）"
+    )
+    serve.add_argument(
+        "--socket",
+        type=Path,
+        default=default_socket_path(),
+        help="待ち受けるUNIXドメインソケット（既定: プロジェクトごと、SECRET_SCAN_SOCKET で指定可）",
+    )
+    serve.add_argument(
+        "--baseline",
+        type=Path,
+        help=f"受け入れ済みの検出結果と除外パスのファイル（既定: プロジェクトルートの {DEFAULT_BASELINE_FILE}）",
+    )
+    serve.add_argument(
+        "--cache",
+        type=Path,
+        default=PROJECT_ROOT / ".pytest_cache" / "d" / "secret-scan" / "scan-cache.sqlite3",
+        help="スキャンキャッシュ（既定: pytestと共有）",
+    )
+    serve.add_argument("--no-cache", action="store_true", help="スキャンキャッシュを使わない")
+    serve.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        metavar="SECONDS",
+        help=f"リクエストがないまま経過すると終了する秒数（既定: {DEFAULT_IDLE_TIMEOUT:.0f}、0で終了しない）",
+    )
+    serve.set_defaults(handler=command_serve)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """エントリポイント"""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+"""
+アーカイブ（zip, tar, gzip）のメンバーのスキャン
+
+リリース成果物（zipしたLambdaのバンドル、tarにまとめたVPN設定、gzip圧縮したログなど）を
+ディスクに展開せず、メンバーをストリームとして読みながら行境界で区切った窓ごとにスキャンします。
+アーカイブの種類は拡張子ではなく先頭のマジックバイトで判定し、入れ子のアーカイブも同様に
+たどります。検出結果の場所は `archive.zip!dir/member.tf` 形式（入れ子は ! でつなぐ）で表します。
+
+展開爆弾（zip bomb）や深い入れ子で時間やメモリを使い尽くさないよう、入れ子の深さ・
+展開後の合計サイズ・メンバー数に上限を設け、超えた場合は ArchiveLimitExceeded を送出します
+（黙ってスキップすると、上限の先に置かれた認証情報を見逃すため）。壊れた入れ子のアーカイブは
+メモリに残した先頭（上限 MAX_REPLAY_BYTES）から、またはシークできる外側から開き直して読み直し、
+どちらもできない場合も ArchiveLimitExceeded を送出します。
+"""
+
+import contextlib
+import functools
+import gzip
+import io
+import tarfile
+import zipfile
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, ContextManager, Iterator, List, Optional, Tuple, Union
+
+from .engine import SCAN_WINDOW_BYTES, Finding, Ruleset, decode_text
+from .sniff import SNIFF_BYTES, looks_binary
+
+
+# アーカイブとして扱う拡張子（プロジェクトファイルの走査で先頭を読むかの判定に使う）
+ARCHIVE_SUFFIXES = (".zip", ".jar", ".tar", ".tgz", ".gz")
+
+# 入れ子の深さの上限（.tar.gz は gzip と tar の2段）
+MAX_ARCHIVE_DEPTH = 4
+
+# 1つのアーカイブから展開して読む合計サイズの上限
+MAX_ARCHIVE_BYTES = 1024 * 1024 * 1024
+
+# 1つのアーカイブ（入れ子を含む）のメンバー数の上限
+MAX_ARCHIVE_MEMBERS = 100_000
+
+# 壊れた入れ子のアーカイブを読み直すためにメモリに残す先頭の大きさの上限
+MAX_REPLAY_BYTES = 1024 * 1024
+
+# 種類の判定に読む先頭の大きさ（tarのマジックは257バイト目）
+_HEAD_BYTES = 512
+
+# 1回に読み込むブロックの大きさ
+_READ_BLOCK_BYTES = 1024 * 1024
+
+# メンバーごとの検出結果: (場所 "archive!member", 検出結果)
+ArchiveFindings = List[Tuple[str, List[Finding]]]
+
+# ストリームを先頭から開き直す関数（シークできる外側から開く。閉じると外側も閉じる）
+Reopen = Callable[[], ContextManager[BinaryIO]]
+
+
+class ArchiveLimitExceeded(Exception):
+    """
+    アーカイブの入れ子の深さ・展開後のサイズ・メンバー数が上限を超えた
+
+    読み込めないファイル（OSError）のように黙ってスキップされないよう、
+    Exception を継承します。
+    """
+
+
+def is_archive_path(path: Union[str, PurePosixPath, Path]) -> bool:
+    """
+    パスの拡張子がアーカイブを示すか判定する
+
+    Args:
+        path: ファイルのパス
+
+    Returns:
+        .zip, .jar, .tar, .tgz, .gz の場合True
+    """
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def archive_kind(head: bytes) -> Optional[str]:
+    """
+    先頭のバイト列からアーカイブの種類を判定する
+
+    Args:
+        head: 内容の先頭（512バイト程度）
+
+    Returns:
+        "zip", "gzip", "tar" のいずれか。アーカイブでない場合はNone
+    """
+    if head.startswith((b'PK\x03\x04', b'PK\x05\x06')):
+        return "zip"
+    if head.startswith(b'\x1f\x8b'):
+        return "gzip"
+    if head[257:262] == b'ustar':
+        return "tar"
+    return None
+
+
+class _Prefixed(io.RawIOBase):
+    """判定のために読んだ先頭を戻したストリーム"""
+
+    def __init__(self, head: bytes, stream: BinaryIO):
+        self.head = head
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        if self.head:
+            size = min(len(target), len(self.head))
+            target[:size] = self.head[:size]
+            self.head = self.head[size:]
+            return size
+        data = self.stream.read(len(target))
+        target[:len(data)] = data
+        return len(data)
+
+
+class _Recorded(io.RawIOBase):
+    """読んだバイト列の写しを上限までメモリに残すストリーム（壊れた入れ子のアーカイブの読み直し用）"""
+
+    def __init__(self, stream: BinaryIO, limit: int):
+        self.stream = stream
+        self.limit = limit
+        self.copy: Optional[bytearray] = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        data = self.stream.read(len(target))
+        target[:len(data)] = data
+        if self.copy is not None:
+            if len(self.copy) + len(data) > self.limit:
+                # 上限を超えたら写しを捨てる（ディスクには書き出さない）
+                self.copy = None
+            else:
+                self.copy += data
+        return len(data)
+
+    def replay(self) -> Optional[BinaryIO]:
+        """写しと、まだ読んでいない残りをつないだストリーム。写しが上限を超えていた場合はNone"""
+        if self.copy is None:
+            return None
+        return io.BufferedReader(_Chained(io.BytesIO(bytes(self.copy)), self.stream), _READ_BLOCK_BYTES)
+
+
+class _Chained(io.RawIOBase):
+    """2つのストリームを続けて読むストリーム"""
+
+    def __init__(self, first: BinaryIO, second: BinaryIO):
+        self.streams = [first, second]
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while self.streams:
+            data = self.streams[0].read(len(target))
+            if data:
+                target[:len(data)] = data
+                return len(data)
+            self.streams.pop(0)
+        return 0
+
+
+@contextlib.contextmanager
+def _reopen_gzip(reopen: Reopen) -> Iterator[BinaryIO]:
+    """gzipの内容を、圧縮された外側から開き直す"""
+    with reopen() as source, gzip.GzipFile(fileobj=source) as member:
+        yield member
+
+
+@contextlib.contextmanager
+def _reopen_tar_member(reopen: Reopen, info: tarfile.TarInfo) -> Iterator[BinaryIO]:
+    """シークできるtarのメンバーを、メンバーの位置から開き直す"""
+    with reopen() as source, tarfile.open(fileobj=source, mode="r:") as archive:
+        member = archive.extractfile(info)
+        if member is None:
+            raise tarfile.TarError(f"{info.name}: メンバーを開き直せません")
+        with member:
+            yield member
+
+
+class _ArchiveScan:
+    """1つのアーカイブ（入れ子を含む）のスキャン状態"""
+
+    def __init__(
+        self,
+        ruleset: Ruleset,
+        member_filter: Callable[[PurePosixPath], bool],
+        max_depth: int,
+        max_bytes: int,
+        max_members: int,
+        max_replay_bytes: int,
+    ):
+        self.ruleset = ruleset
+        self.member_filter = member_filter
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.max_members = max_members
+        self.max_replay_bytes = max_replay_bytes
+        self.bytes_read = 0
+        self.members = 0
+        self.results: ArchiveFindings = []
+        # パターン名 → 定義順（窓ごとの検出結果をルールセットと同じ順に並べる）
+        self.order = {name: index for index, (_, name) in enumerate(ruleset.patterns)}
+
+    def read(self, stream: BinaryIO, size: int, label: str) -> bytes:
+        """展開後のサイズを数えながら読み込む"""
+        data = stream.read(size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise ArchiveLimitExceeded(
+                f"{label}: 展開後のサイズが上限 {self.max_bytes} バイトを超えました"
+            )
+        return data
+
+    def add_member(self, label: str) -> None:
+        """メンバー数を数える"""
+        self.members += 1
+        if self.members > self.max_members:
+            raise ArchiveLimitExceeded(f"{label}: メンバー数が上限 {self.max_members} を超えました")
+
+    def scan_stream(self, label: str, stream: BinaryIO, depth: int, reopen: Optional[Reopen] = None) -> None:
+        """
+        ストリームがアーカイブであればメンバーを、そうでなければ内容をスキャンする
+
+        拡張子がアーカイブでも中身がテキストのファイルや、先頭がマジックバイトでも壊れたアーカイブは、
+        元のバイト列をアーカイブでない内容としてスキャンします（拡張子で認証情報を隠せないように）。
+        シークできない入れ子のストリームは、読んだ先頭を max_replay_bytes までメモリに残して読み直し、
+        それを超えて読んでいた場合は reopen で外側から開き直します。
+
+        Args:
+            label: ストリームの場所（"archive.zip!member"）
+            stream: 読み込み用のストリーム
+            depth: アーカイブの入れ子の深さ（最上位のファイルは0）
+            reopen: ストリームを先頭から開き直す関数（開き直せない場合はNone）
+
+        Raises:
+            ArchiveLimitExceeded: 壊れたアーカイブを読み直せない場合（メモリに残す上限を超えて読み込み済みで、
+                開き直せない場合）
+        """
+        head = self.read(stream, _HEAD_BYTES, label)
+        kind = archive_kind(head)
+        if kind is None:
+            self.scan_content(label, head, stream)
+            return
+        if depth >= self.max_depth:
+            raise ArchiveLimitExceeded(f"{label}: 入れ子の深さが上限 {self.max_depth} を超えました")
+
+        start = stream.tell() - len(head) if stream.seekable() else None
+        recorded = None
+        if kind == "zip" and start is not None:
+            # シークできるzip（最上位のファイル・メモリ上の内容）は直接シークして読む
+            stream.seek(start)
+            restored = stream
+        elif start is not None:
+            restored = io.BufferedReader(_Prefixed(head, stream), _READ_BLOCK_BYTES)
+        else:
+            # 入れ子の圧縮ストリームは、壊れていた場合に読み直せるよう先頭の写しをメモリに残す
+            recorded = _Recorded(stream, self.max_replay_bytes)
+            restored = io.BufferedReader(_Prefixed(head, recorded), _READ_BLOCK_BYTES)
+        try:
+            if kind == "zip":
+                self.scan_zip(label, restored, depth + 1)
+            elif kind == "tar":
+                # メンバーを開き直せるのは、tar自体をシークできる場合だけ（圧縮されたtarは先頭から読み直しになる）
+                self.scan_tar(label, restored, depth + 1, reopen if start is not None else None)
+            else:
+                self.scan_gzip(label, restored, depth + 1, reopen)
+        except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError, OSError):
+            # 壊れたアーカイブは、元のバイト列をアーカイブでない内容としてスキャンする
+            # （途中までのメンバーの検出結果は残す。読み取りエラーは読み直しで再び送出される）
+            if recorded is None:
+                stream.seek(start)
+                self.scan_content(label, b'', stream)
+                return
+            replay = recorded.replay()
+            if replay is not None:
+                self.scan_content(label, head, replay)
+            elif reopen is not None:
+                with reopen() as source:
+                    self.scan_content(label, b'', source)
+            else:
+                raise ArchiveLimitExceeded(
+                    f"{label}: 壊れたアーカイブを読み直せません（上限 {self.max_replay_bytes} バイトを超えて読み込み済み）"
+                ) from None
+
+    def scan_zip(self, label: str, stream: BinaryIO, depth: int) -> None:
+        """zipのメンバーをスキャンする（中央ディレクトリを読むため、シークできない場合はメモリに読む）"""
+        if not stream.seekable():
+            chunks = []
+            while True:
+                block = self.read(stream, _READ_BLOCK_BYTES, label)
+                if not block:
+                    break
+                chunks.append(block)
+            stream = io.BytesIO(b''.join(chunks))
+
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                member_label = f"{label}!{info.filename}"
+                self.add_member(member_label)
+                try:
+                    member = archive.open(info)
+                except (RuntimeError, NotImplementedError):
+                    # 暗号化されたメンバー・未対応の圧縮方式
+                    continue
+                with member:
+                    self.scan_member(
+                        member_label, info.filename, member, depth, functools.partial(archive.open, info)
+                    )
+
+    def scan_tar(self, label: str, stream: BinaryIO, depth: int, reopen: Optional[Reopen]) -> None:
+        """tarのメンバーを先頭から順にスキャンする（シークしない）"""
+        with tarfile.open(fileobj=stream, mode="r|") as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                member_label = f"{label}!{info.name}"
+                self.add_member(member_label)
+                member = archive.extractfile(info)
+                if member is not None:
+                    self.scan_member(
+                        member_label, info.name, member, depth,
+                        functools.partial(_reopen_tar_member, reopen, info) if reopen is not None else None,
+                    )
+
+    def scan_gzip(self, label: str, stream: BinaryIO, depth: int, reopen: Optional[Reopen]) -> None:
+        """gzipの内容をスキャンする（メンバー名は .gz を除いた名前、.tgz は .tar）"""
+        name = PurePosixPath(label.rsplit("!", 1)[-1]).name
+        lower = name.lower()
+        if lower.endswith(".tgz"):
+            name = name[:-4] + ".tar"
+        elif lower.endswith(".gz"):
+            name = name[:-3]
+        member_label = f"{label}!{name}"
+        self.add_member(member_label)
+        with gzip.GzipFile(fileobj=stream) as member:
+            self.scan_member(
+                member_label, name, member, depth,
+                functools.partial(_reopen_gzip, reopen) if reopen is not None else None,
+            )
+
+    def scan_member(self, label: str, name: str, member: BinaryIO, depth: int, reopen: Optional[Reopen]) -> None:
+        """メンバーをスキャンする（入れ子のアーカイブはメンバー名によらずたどる）"""
+        head = self.read(member, _HEAD_BYTES, label)
+        if archive_kind(head) is not None:
+            self.scan_stream(label, io.BufferedReader(_Prefixed(head, member)), depth, reopen)
+        elif self.member_filter(PurePosixPath(name)):
+            self.scan_content(label, head, member)
+
+    def scan_content(self, label: str, head: bytes, stream: BinaryIO) -> None:
+        """
+        アーカイブではない内容を行境界で区切った窓ごとにスキャンする
+
+        先頭ブロックでバイナリと判定した内容はスキャンしません。UTF-8としてデコードできない窓は
+        バイト列のまま走査します（Ruleset.scan_buffer と同じ）。
+        """
+        first = head + self.read(stream, SNIFF_BYTES, label)
+        if looks_binary(first[:SNIFF_BYTES]):
+            return
+
+        findings: List[Finding] = []
+        line_offset = 0
+        pending = first
+        while True:
+            block = self.read(stream, SCAN_WINDOW_BYTES, label)
+            data = pending + block
+            if block:
+                cut = data.rfind(b'\n') + 1
+                window, pending = data[:cut], data[cut:]
+            else:
+                window, pending = data, b''
+            if window:
+                try:
+                    window_findings = self.ruleset.scan_text(decode_text(window))
+                except UnicodeDecodeError:
+                    window_findings = self.ruleset.scan_buffer(window)
+                findings.extend(
+                    (name, value, line_num + line_offset) for name, value, line_num in window_findings
+                )
+                line_offset += window.count(b'\n')
+            if not block:
+                break
+
+        if findings:
+            # 窓をまたいでもパターン定義順・行番号順になるよう並べる（安定ソート）
+            findings.sort(key=lambda finding: self.order[finding[0]])
+            self.results.append((label, findings))
+
+
+def scan_archive(
+    source: Union[Path, bytes],
+    label: str,
+    ruleset: Ruleset,
+    member_filter: Callable[[PurePosixPath], bool] = lambda path: True,
+    max_depth: int = MAX_ARCHIVE_DEPTH,
+    max_bytes: int = MAX_ARCHIVE_BYTES,
+    max_members: int = MAX_ARCHIVE_MEMBERS,
+    max_replay_bytes: int = MAX_REPLAY_BYTES,
+) -> ArchiveFindings:
+    """
+    アーカイブのメンバーをディスクに展開せずにスキャンする
+
+    Args:
+        source: アーカイブのパス、またはアーカイブの内容（Gitのblobなど）
+        label: 検出結果の場所に使うアーカイブの名前
+        ruleset: 使用するルールセット
+        member_filter: スキャンするメンバーの判定（should_scan_file など）
+        max_depth: 入れ子の深さの上限
+        max_bytes: 展開後の合計サイズの上限
+        max_members: メンバー数の上限
+        max_replay_bytes: 壊れた入れ子のアーカイブを読み直すためにメモリに残す先頭の大きさの上限
+
+    Returns:
+        検出のあったメンバーごとの [("archive!member", 検出結果), ...]（アーカイブ内の順序）。
+        アーカイブでない内容・壊れたアーカイブは label の内容としてスキャンした結果。読み取り不可ファイルは空リスト
+
+    Raises:
+        ArchiveLimitExceeded: 入れ子の深さ・展開後のサイズ・メンバー数が上限を超えた場合、
+            壊れた入れ子のアーカイブを読み直せない場合
+    """
+    scan = _ArchiveScan(ruleset, member_filter, max_depth, max_bytes, max_members, max_replay_bytes)
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            scan.scan_stream(label, io.BytesIO(source), 0, functools.partial(io.BytesIO, source))
+        else:
+            with open(source, "rb") as stream:
+                scan.scan_stream(label, stream, 0, functools.partial(open, source, "rb"))
+    except OSError:
+        # 読み取り不可ファイルはスキップする
+        pass
+    return scan.results
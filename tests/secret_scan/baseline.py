@@ -0,0 +1,195 @@
+"""
+受け入れ済みの検出結果（ベースライン）と除外パスによる抑制
+
+確認のうえ受け入れた検出結果を、ルール名・パス・マッチ文字列のハッシュから作る
+フィンガープリントで記録します。ファイルには検出値そのものを保存しません。
+フィンガープリントは行番号を含まないため、前後の行を編集しても変わりません。
+
+読み込んだフィンガープリントはハッシュ集合に入れ、検出ごとに O(1) で抑制を判定します。
+除外パスのグロブパターンは1つの正規表現にまとめ、パスごとに1回の照合で判定します。
+
+ファイル形式（JSON）:
+    {
+      "version": 1,
+      "exclude": ["docs/**", "vpn-configs/*.example.ovpn"],
+      "findings": [
+        {"fingerprint": "...", "rule": "AWS Access Key ID", "path": "terraform/main.tf", "line": 12}
+      ]
+    }
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path, PurePath
+from typing import Iterable, List, NamedTuple, Sequence, Tuple, Union
+
+from .engine import Finding
+from .walker import compile_glob_matcher
+
+
+# ベースラインファイルの形式の版数
+BASELINE_VERSION = 1
+
+# ベースラインファイルの既定のパス（プロジェクトルートからの相対パス）
+DEFAULT_BASELINE_FILE = ".secret-scan-baseline.json"
+
+
+class BaselineEntry(NamedTuple):
+    """受け入れ済みの検出結果"""
+
+    fingerprint: str
+    rule: str
+    path: str
+    line: int  # 記録時の行番号（参考情報。照合には使わない）
+
+
+def normalize_path(path: Union[str, PurePath]) -> str:
+    """
+    パスをフィンガープリント・除外パターン用の表記（/ 区切り、先頭の ./ なし）にする
+
+    Args:
+        path: プロジェクトルートからの相対パス（アーカイブのメンバーは "archive!member"）
+
+    Returns:
+        正規化したパス
+    """
+    text = str(path)
+    if os.sep != "/":
+        text = text.replace(os.sep, "/")
+    while text.startswith("./"):
+        text = text[2:]
+    return text
+
+
+def fingerprint(rule: str, path: Union[str, PurePath], value: str) -> str:
+    """
+    検出結果のフィンガープリントを計算する
+
+    Args:
+        rule: パターン名
+        path: プロジェクトルートからの相対パス
+        value: マッチした文字列（ハッシュ値のみを使う）
+
+    Returns:
+        SHA-256による32文字の16進数文字列（行番号によらず一定）
+    """
+    value_digest = hashlib.sha256(value.encode("utf-8", "surrogatepass")).hexdigest()
+    key = "\0".join((rule, normalize_path(path), value_digest))
+    return hashlib.sha256(key.encode("utf-8", "surrogatepass")).hexdigest()[:32]
+
+
+class Baseline:
+    """
+    受け入れ済みの検出結果と除外パス
+
+    フィンガープリントはハッシュ集合、除外パスは1つの正規表現で保持します。
+    """
+
+    def __init__(self, entries: Iterable[BaselineEntry] = (), exclude: Sequence[str] = ()):
+        """
+        Args:
+            entries: 受け入れ済みの検出結果
+            exclude: スキャンしないパスのグロブパターン（.gitignore 形式）
+        """
+        self.entries = sorted(set(entries), key=lambda entry: (entry.path, entry.line, entry.rule))
+        self.exclude = list(exclude)
+        self.fingerprints = frozenset(entry.fingerprint for entry in self.entries)
+        self._exclude_matcher = compile_glob_matcher(self.exclude)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    @classmethod
+    def load(cls, path: Path) -> "Baseline":
+        """
+        ベースラインファイルを読み込む
+
+        Args:
+            path: ベースラインファイルのパス
+
+        Returns:
+            ベースライン（ファイルがない場合は空）
+
+        Raises:
+            ValueError: ファイルの形式が不正な場合
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except FileNotFoundError:
+            return cls()
+
+        if not isinstance(document, dict) or document.get("version") != BASELINE_VERSION:
+            raise ValueError(f"{path}: ベースラインファイルの版数が不正です")
+        try:
+            entries = [
+                BaselineEntry(item["fingerprint"], item["rule"], item["path"], int(item.get("line", 0)))
+                for item in document.get("findings", [])
+            ]
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"{path}: ベースラインファイルの形式が不正です: {error}") from None
+        return cls(entries, document.get("exclude", []))
+
+    @classmethod
+    def from_findings(
+        cls,
+        results: Iterable[Tuple[Union[str, PurePath], List[Finding]]],
+        exclude: Sequence[str] = (),
+    ) -> "Baseline":
+        """
+        検出結果をすべて受け入れたベースラインを作る
+
+        Args:
+            results: [(プロジェクトルートからの相対パス, 検出結果), ...]
+            exclude: 除外パスのグロブパターン
+
+        Returns:
+            ベースライン
+        """
+        entries = []
+        for path, findings in results:
+            for rule, value, line_num in findings:
+                entries.append(
+                    BaselineEntry(fingerprint(rule, path, value), rule, normalize_path(path), line_num)
+                )
+        return cls(entries, exclude)
+
+    def save(self, path: Path) -> None:
+        """ベースラインファイルに書き出す（検出値そのものは保存しない）"""
+        document = {
+            "version": BASELINE_VERSION,
+            "exclude": self.exclude,
+            "findings": [entry._asdict() for entry in self.entries],
+        }
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(document, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+    def is_excluded(self, path: Union[str, PurePath]) -> bool:
+        """パスが除外パターンに一致するか（アーカイブのメンバーはアーカイブのパスで判定）"""
+        return self._exclude_matcher.fullmatch(normalize_path(path).split("!", 1)[0]) is not None
+
+    def is_suppressed(self, rule: str, path: Union[str, PurePath], value: str) -> bool:
+        """検出結果が受け入れ済みか"""
+        return fingerprint(rule, path, value) in self.fingerprints
+
+    def filter(self, path: Union[str, PurePath], findings: List[Finding]) -> List[Finding]:
+        """
+        受け入れ済みの検出結果を除く
+
+        Args:
+            path: プロジェクトルートからの相対パス
+            findings: 検出結果
+
+        Returns:
+            受け入れ済みでない検出結果（除外パスの場合は空）
+        """
+        if not findings or self.is_excluded(path):
+            return []
+        if not self.fingerprints:
+            return findings
+        return [
+            finding for finding in findings
+            if not self.is_suppressed(finding[0], path, finding[1])
+        ]
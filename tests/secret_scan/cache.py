@@ -0,0 +1,312 @@
+"""
+コンテンツハッシュによる永続スキャンキャッシュ
+
+ファイル内容のハッシュとルールセットの版数をキーに検出結果をSQLiteへ保存し、
+変更のないファイルの再スキャンを省略します。
+ハッシュ計算の前に、パス・更新時刻・サイズによる安価な一致確認を行います。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .engine import Finding, read_content
+
+if TYPE_CHECKING:
+    from .engine import Ruleset
+
+
+# キャッシュのスキーマ版数（テーブル定義を変更した場合に上げる）
+SCHEMA_VERSION = 3
+
+# 更新時刻がキャッシュ記録時刻からこの範囲内のファイルは、同じ時刻内に再度書き換えられた
+# 可能性があるため、更新時刻・サイズが一致してもハッシュを再計算する
+RACY_WINDOW_NS = 2_000_000_000
+
+# blobs テーブルに残す内容の数の上限（最後にスキャンした時刻が古いものから削除する）。
+# 履歴スキャン・常駐スキャナーでデータベースと起動時の読み込みが際限なく大きくならないようにする
+MAX_BLOBS = 100_000
+
+
+def content_digest(data: bytes) -> str:
+    """
+    ファイル内容のハッシュ値を計算する
+
+    Args:
+        data: ファイルのバイト列
+
+    Returns:
+        BLAKE2bハッシュ値（16進数文字列）
+    """
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class ScanCache:
+    """
+    SQLiteによるスキャン結果キャッシュ
+
+    files テーブル: パス → (更新時刻, サイズ, 内容ハッシュ, 記録時刻)
+    blobs テーブル: scan_bytes でスキャンした内容（Gitのblobなど）のハッシュ → 最後にスキャンした時刻
+    findings テーブル: (ルールセット版数, 内容ハッシュ) → 検出結果(JSON)
+
+    起動時に files テーブルをメモリに読み込み、書き込みは close() でまとめて反映します。
+    """
+
+    def __init__(self, db_path: Path, max_blobs: int = MAX_BLOBS):
+        """
+        Args:
+            db_path: SQLiteデータベースファイルのパス
+            max_blobs: blobs テーブルに残す内容の数の上限
+        """
+        self.db_path = Path(db_path)
+        self.max_blobs = max_blobs
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.db_path))
+        self._initialize_schema()
+
+        self._files: Dict[str, Tuple[int, int, str, int]] = {
+            path: (mtime_ns, size, digest, recorded_ns)
+            for path, mtime_ns, size, digest, recorded_ns in self._connection.execute(
+                "SELECT path, mtime_ns, size, digest, recorded_ns FROM files"
+            )
+        }
+        self._findings: Dict[str, Dict[str, List[Finding]]] = {}
+        self._pending_files: Dict[str, Tuple[int, int, str, int]] = {}
+        self._pending_findings: List[Tuple[str, str, str]] = []
+        self._pending_blobs: Dict[str, int] = {}
+
+        # 統計情報（テスト・ベンチマーク用）
+        self.hits = 0
+        self.misses = 0
+
+    def _initialize_schema(self) -> None:
+        """スキーマを作成する（スキーマ版数が異なる場合は作り直す）"""
+        version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._connection.executescript(
+                """
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS blobs;
+                DROP TABLE IF EXISTS findings;
+                """
+            )
+        self._connection.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                recorded_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                recorded_ns INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS blobs_recorded_ns ON blobs (recorded_ns);
+            CREATE TABLE IF NOT EXISTS findings (
+                ruleset TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                findings TEXT NOT NULL,
+                PRIMARY KEY (ruleset, digest)
+            );
+            PRAGMA user_version = {SCHEMA_VERSION};
+            """
+        )
+
+    def _ruleset_findings(self, ruleset: "Ruleset") -> Dict[str, List[Finding]]:
+        """ルールセット版数に対応する検出結果をメモリに読み込む"""
+        cached = self._findings.get(ruleset.version)
+        if cached is None:
+            cached = {
+                digest: [tuple(finding) for finding in json.loads(findings)]
+                for digest, findings in self._connection.execute(
+                    "SELECT digest, findings FROM findings WHERE ruleset = ?",
+                    (ruleset.version,),
+                )
+            }
+            self._findings[ruleset.version] = cached
+        return cached
+
+    def _known_digest(self, key: str, stat: os.stat_result) -> Optional[str]:
+        """更新時刻とサイズが記録と一致する場合に記録済みのハッシュ値を返す"""
+        record = self._pending_files.get(key) or self._files.get(key)
+        if record is None:
+            return None
+        mtime_ns, size, digest, recorded_ns = record
+        if mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            return None
+        if recorded_ns - mtime_ns < RACY_WINDOW_NS:
+            # 記録時点で書き込み直後だったファイルは内容を再確認する
+            return None
+        return digest
+
+    def cached_findings(
+        self, file_path: Path, stat: os.stat_result, ruleset: "Ruleset"
+    ) -> Optional[List[Finding]]:
+        """
+        更新時刻・サイズが記録と一致するファイルの検出結果を返す（内容は読まない）
+
+        Args:
+            file_path: ファイルのパス
+            stat: ファイルのstat結果
+            ruleset: 使用するルールセット
+
+        Returns:
+            記録済みの検出結果。一致しない場合はNone
+        """
+        digest = self._known_digest(os.path.abspath(file_path), stat)
+        if digest is None:
+            return None
+        findings = self._ruleset_findings(ruleset).get(digest)
+        if findings is None:
+            return None
+        self.hits += 1
+        return list(findings)
+
+    def record(
+        self,
+        file_path: Path,
+        mtime_ns: int,
+        size: int,
+        digest: str,
+        ruleset: "Ruleset",
+        findings: List[Finding],
+    ) -> None:
+        """
+        スキャン済みファイルの内容ハッシュと検出結果を記録する（並列スキャンのワーカー結果など）
+
+        Args:
+            file_path: ファイルのパス
+            mtime_ns: 読み込み前に取得した更新時刻
+            size: 読み込み前に取得したサイズ
+            digest: 内容ハッシュ
+            ruleset: 使用したルールセット
+            findings: 検出結果
+        """
+        key = os.path.abspath(file_path)
+        self._pending_files[key] = (mtime_ns, size, digest, time.time_ns())
+        findings_by_digest = self._ruleset_findings(ruleset)
+        if digest not in findings_by_digest:
+            self.misses += 1
+            findings_by_digest[digest] = list(findings)
+            self._pending_findings.append((ruleset.version, digest, json.dumps(findings)))
+
+    def scan_path(self, file_path: Path, ruleset: "Ruleset") -> List[Finding]:
+        """
+        キャッシュを使ってファイルをスキャンする
+
+        Args:
+            file_path: スキャンするファイルのパス
+            ruleset: 使用するルールセット
+
+        Returns:
+            検出結果のリスト。バイナリファイルや読み取り不可ファイルは空リスト
+        """
+        key = os.path.abspath(file_path)
+
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return []
+
+        findings = self.cached_findings(key, stat, ruleset)
+        if findings is not None:
+            return findings
+
+        try:
+            with read_content(key) as data:
+                if data is None:
+                    # バイナリファイルは先頭ブロックの読み込みだけで済むため記録しない
+                    return []
+                digest = content_digest(data)
+                self._pending_files[key] = (stat.st_mtime_ns, stat.st_size, digest, time.time_ns())
+                return self._scan_data(data, digest, ruleset)
+        except OSError:
+            return []
+
+    def scan_bytes(self, data: bytes, ruleset: "Ruleset") -> List[Finding]:
+        """
+        キャッシュを使ってバイト列（Gitのblobなど）をスキャンする
+
+        Args:
+            data: スキャンする内容
+            ruleset: 使用するルールセット
+
+        Returns:
+            検出結果のリスト。UTF-8としてデコードできない内容は空リスト
+        """
+        digest = content_digest(data)
+        # ファイルから参照されない内容も、flush() で検出結果が削除されないように記録する
+        # （スキャンのたびに時刻を更新し、上限を超えた場合は長くスキャンしていないものから削除する）
+        self._pending_blobs[digest] = time.time_ns()
+        return self._scan_data(data, digest, ruleset)
+
+    def _scan_data(self, data, digest: str, ruleset: "Ruleset") -> List[Finding]:
+        """内容ハッシュで検出結果を引き、なければスキャンして記録する"""
+        findings_by_digest = self._ruleset_findings(ruleset)
+        findings = findings_by_digest.get(digest)
+        if findings is not None:
+            # 内容が同じファイル（touchされただけ・コピーなど）はスキャンしない
+            self.hits += 1
+            return list(findings)
+
+        self.misses += 1
+        # バイナリファイルは検出なしとして記録される
+        findings = ruleset.scan_data(data)
+
+        findings_by_digest[digest] = findings
+        self._pending_findings.append((ruleset.version, digest, json.dumps(findings)))
+        return list(findings)
+
+    def flush(self) -> None:
+        """未反映の記録をデータベースに書き込む"""
+        if not self._pending_files and not self._pending_findings and not self._pending_blobs:
+            return
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime_ns, size, digest, recorded_ns) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(path, *record) for path, record in self._pending_files.items()],
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO blobs (digest, recorded_ns) VALUES (?, ?)",
+                list(self._pending_blobs.items()),
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO findings (ruleset, digest, findings) VALUES (?, ?, ?)",
+                self._pending_findings,
+            )
+            # 上限を超えた blobs を最後にスキャンした時刻が古いものから削除する
+            pruned = self._connection.execute(
+                "DELETE FROM blobs WHERE digest IN (SELECT digest FROM blobs ORDER BY recorded_ns "
+                "LIMIT max((SELECT COUNT(*) FROM blobs) - ?, 0))",
+                (self.max_blobs,),
+            ).rowcount
+            # どのファイル・blobからも参照されなくなった検出結果を削除する
+            self._connection.execute(
+                "DELETE FROM findings WHERE digest NOT IN (SELECT digest FROM files) "
+                "AND digest NOT IN (SELECT digest FROM blobs)"
+            )
+        if pruned:
+            # 削除した検出結果をメモリからも外す（次に使うときにデータベースから読み込み直す）
+            self._findings.clear()
+        self._files.update(self._pending_files)
+        self._pending_files.clear()
+        self._pending_findings.clear()
+        self._pending_blobs.clear()
+
+    def close(self) -> None:
+        """記録を書き込んでデータベースを閉じる"""
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self) -> "ScanCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,190 @@
+"""
+常駐スキャナー（daemon.py）のクライアント
+
+フック・エディタから常駐スキャナーにパスやバッファの内容を送り、検出結果を受け取ります。
+Pythonの起動だけで済むよう標準ライブラリのみを使い、パッケージ（ルールのコンパイル、
+NumPyなど）を読み込みません。スクリプトとして直接実行できます。
+
+常駐スキャナーが起動していない場合は `python -m tests.secret_scan scan` に切り替えます。
+
+使用例:
+    # .git/hooks/pre-commit
+    python tests/secret_scan/client.py --staged
+
+    # 指定したファイルをスキャン
+    python tests/secret_scan/client.py terraform/main.tf
+
+    # 保存前のバッファ（標準入力）を、指定したパスの内容としてスキャン（エディタ向け）
+    python tests/secret_scan/client.py --stdin-path terraform/main.tf < buffer
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+
+# プロジェクトルート（tests/secret_scan/client.py の2つ上）
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+# 応答を待つ時間の上限（秒）。初回のスキャン（キャッシュなし）やアーカイブを考慮する
+REQUEST_TIMEOUT = 300.0
+
+
+class DaemonUnavailable(OSError):
+    """常駐スキャナーに接続できない（起動していない・ソケットが残っているだけ）"""
+
+
+def default_socket_path(root: Path = PROJECT_ROOT) -> Path:
+    """
+    プロジェクトごとの常駐スキャナーのソケットのパスを返す
+
+    パスの長さの制限（約100バイト）があるため、プロジェクトルートのハッシュで
+    一時ディレクトリ内に決めます。環境変数 SECRET_SCAN_SOCKET で上書きできます。
+
+    Args:
+        root: プロジェクトルート
+
+    Returns:
+        UNIXドメインソケットのパス
+    """
+    override = os.getenv("SECRET_SCAN_SOCKET")
+    if override:
+        return Path(override)
+    digest = hashlib.sha256(str(Path(root).resolve()).encode("utf-8")).hexdigest()[:12]
+    user = getattr(os, "getuid", lambda: 0)()
+    return Path(tempfile.gettempdir()) / f"secret-scan-{user}-{digest}.sock"
+
+
+def mask(value: str) -> str:
+    """検出値を先頭4文字だけ残して伏せ字にする"""
+    return value[:4] + "*" * max(len(value) - 4, 0)
+
+
+def request(
+    socket_path: Path, message: Dict[str, Any], timeout: float = REQUEST_TIMEOUT
+) -> Dict[str, Any]:
+    """
+    常駐スキャナーに1件のリクエストを送り、応答を返す
+
+    Args:
+        socket_path: 常駐スキャナーのソケットのパス
+        message: リクエスト（{"op": "scan", ...} など）
+        timeout: 応答を待つ時間の上限（秒）
+
+    Returns:
+        応答（{"ok": true, ...}）
+
+    Raises:
+        DaemonUnavailable: 常駐スキャナーに接続できない場合
+        OSError: 通信が途中で切れた場合
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.settimeout(timeout)
+        try:
+            client.connect(str(socket_path))
+        except (FileNotFoundError, ConnectionRefusedError) as error:
+            raise DaemonUnavailable(f"{socket_path}: 常駐スキャナーに接続できません: {error}") from None
+        with client.makefile("rwb") as stream:
+            stream.write(json.dumps(message).encode("utf-8") + b"\n")
+            stream.flush()
+            line = stream.readline()
+    finally:
+        client.close()
+    if not line:
+        raise ConnectionError(f"{socket_path}: 常駐スキャナーが応答せずに切断しました")
+    return json.loads(line)
+
+
+def _fallback(args: argparse.Namespace) -> int:
+    """常駐スキャナーの代わりにコマンドライン（python -m tests.secret_scan scan）で実行する"""
+    if args.stdin_path:
+        print("❌ 常駐スキャナーが起動していないため、標準入力をスキャンできません", file=sys.stderr)
+        return 2
+    command = [sys.executable, "-m", "tests.secret_scan", "scan"]
+    if args.staged:
+        command.append("--staged")
+    elif args.base:
+        command += ["--base", args.base]
+    else:
+        # コマンドラインはカレントディレクトリからの相対パスでベースラインと照合する
+        command += [os.path.relpath(os.path.abspath(path), PROJECT_ROOT) for path in args.paths]
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [str(PROJECT_ROOT), os.getenv("PYTHONPATH")])
+    ))
+    return subprocess.run(command, cwd=PROJECT_ROOT, env=environment).returncode
+
+
+def _build_request(args: argparse.Namespace) -> Dict[str, Any]:
+    """コマンドライン引数からリクエストを作る"""
+    if args.stdin_path:
+        data = sys.stdin.buffer.read()
+        return {
+            "op": "scan_blob",
+            "path": os.path.relpath(os.path.abspath(args.stdin_path), PROJECT_ROOT),
+            "data": base64.b64encode(data).decode("ascii"),
+        }
+    if args.staged:
+        return {"op": "scan", "staged": True}
+    if args.base:
+        return {"op": "scan", "base": args.base}
+    return {"op": "scan", "paths": list(args.paths), "cwd": os.getcwd()}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """エントリポイント: 検出があれば終了コード1、スキャンできない場合は2を返す"""
+    parser = argparse.ArgumentParser(
+        description="常駐スキャナーにスキャンを依頼する（起動していない場合はコマンドラインで実行）",
+    )
+    parser.add_argument("--socket", type=Path, help="常駐スキャナーのソケット（既定: プロジェクトごと）")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--staged", action="store_true", help="ステージ済みの変更のみをスキャンする")
+    mode.add_argument("--base", metavar="REF", help="REF...HEAD の差分のみをスキャンする")
+    mode.add_argument(
+        "--stdin-path", metavar="PATH", help="標準入力の内容を PATH の内容としてスキャンする"
+    )
+    parser.add_argument(
+        "--no-fallback", action="store_true", help="常駐スキャナーが起動していない場合は終了コード2で終了する"
+    )
+    parser.add_argument("paths", nargs="*", help="スキャンするファイル")
+    args = parser.parse_args(argv)
+
+    socket_path = args.socket or default_socket_path()
+    try:
+        response = request(socket_path, _build_request(args))
+    except DaemonUnavailable as error:
+        if args.no_fallback:
+            print(f"❌ {error}", file=sys.stderr)
+            return 2
+        return _fallback(args)
+    except (OSError, ValueError) as error:
+        print(f"❌ 常駐スキャナーとの通信に失敗しました: {error}", file=sys.stderr)
+        return 2
+
+    if not response.get("ok"):
+        print(f"❌ {response.get('error')}", file=sys.stderr)
+        return 2
+
+    results: List[Dict[str, Any]] = response["results"]
+    for result in results:
+        for pattern_name, match, line_num in result["findings"]:
+            print(f"{result['location']}:{line_num}: {pattern_name} = '{mask(match)}'")
+    if results:
+        print(
+            "\n⚠️  AWS認証情報は環境変数またはAWS CLIセッションを使用してください。",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+常駐スキャナー（エディタ・フック向け）
+
+コンパイル済みのルールセットとスキャンキャッシュ（コンテンツハッシュ）をメモリに保持したまま
+UNIXドメインソケットで待ち受け、フックやエディタから送られたパス・内容をスキャンします。
+Pythonの起動、ルールのコンパイル、キャッシュの読み込みを毎回行わないため、
+数ファイルのスキャンは数ミリ秒で応答します。ルールは test_aws_credentials_security.py と
+同じ（sources.py を共有）で、ベースラインはファイルが更新されると読み込み直します。
+
+プロトコル: 1行に1つのJSON（リクエスト・応答とも改行区切り。1つの接続で複数送れる）
+    {"op": "ping"}
+        → {"ok": true, "pid": 1234, "ruleset": "<ルールセットの版数>", "root": "/path/to/project"}
+    {"op": "scan", "paths": ["terraform/main.tf"], "cwd": "/path/to/project"}
+    {"op": "scan", "staged": true}  /  {"op": "scan", "base": "origin/main"}
+    {"op": "scan_blob", "path": "terraform/main.tf", "data": "<base64>"}
+        → {"ok": true, "results": [{"location": "...", "path": "...", "findings": [[パターン名, 値, 行番号], ...]}]}
+    {"op": "shutdown"}
+        → {"ok": true}（応答後に終了する）
+    スキャンできない場合 → {"ok": false, "error": "..."}
+
+SQLiteの接続をスレッド間で共有しないよう、接続は1つずつ順に処理します。
+ソケットは所有者のみが読み書きできる権限（0600）で作成します。
+
+使用例:
+    python -m tests.secret_scan serve
+    python tests/secret_scan/client.py --staged
+"""
+
+import base64
+import json
+import os
+import socket
+import socketserver
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .archive import ArchiveLimitExceeded
+from .baseline import Baseline, normalize_path
+from .cache import ScanCache
+from .client import default_socket_path, request
+from .engine import ScanBudgetExceeded
+from .rules import AWS_CREDENTIAL_RULESET
+from .sources import scan_blob, scan_sources
+
+
+# 接続が次のリクエストを送らないまま待つ時間の上限（秒）。超えると接続を閉じて次の接続を処理する
+CONNECTION_TIMEOUT = 5.0
+
+# リクエストがない状態がこの時間（秒）続くと終了する（0で終了しない）
+DEFAULT_IDLE_TIMEOUT = 3600.0
+
+
+class DaemonAlreadyRunning(Exception):
+    """同じソケットで常駐スキャナーが起動済み"""
+
+
+class ScanService:
+    """
+    常駐スキャナーのリクエスト処理（ソケットに依存しない）
+
+    キャッシュの記録はリクエストごとにデータベースへ書き込むため、
+    プロセスが強制終了されてもそれまでのスキャン結果は失われません。
+    """
+
+    def __init__(self, root: Path, baseline_path: Path, cache: Optional[ScanCache] = None):
+        """
+        Args:
+            root: プロジェクトルート（Gitのリポジトリ、ベースラインのパスの基準）
+            baseline_path: ベースラインファイルのパス（ファイルがない場合は空）
+            cache: スキャンキャッシュ
+        """
+        self.root = Path(root).resolve()
+        self.baseline_path = Path(baseline_path)
+        self.cache = cache
+        self._baseline = Baseline()
+        self._baseline_stamp: Optional[Tuple[int, int]] = None
+        self._operations: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "ping": self.ping,
+            "scan": self.scan,
+            "scan_blob": self.scan_blob,
+        }
+        # 初回のリクエストで遅延初期化が走らないよう、テキスト・バイト列のスキャンを一度実行しておく
+        AWS_CREDENTIAL_RULESET.scan_bytes(b"")
+        AWS_CREDENTIAL_RULESET.scan_buffer(b"")
+
+    @property
+    def baseline(self) -> Baseline:
+        """
+        ベースラインを返す（ファイルの更新時刻・サイズが変わっていれば読み込み直す）
+
+        Raises:
+            ValueError: ファイルの形式が不正な場合
+        """
+        try:
+            stat = os.stat(self.baseline_path)
+            stamp: Optional[Tuple[int, int]] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp != self._baseline_stamp:
+            self._baseline = Baseline.load(self.baseline_path)
+            self._baseline_stamp = stamp
+        return self._baseline
+
+    def handle(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        1件のリクエストを処理する
+
+        Args:
+            message: リクエスト（{"op": ...}）
+
+        Returns:
+            応答（スキャンできない場合も例外を送出せず {"ok": false, "error": ...}）
+        """
+        op = message.get("op") if isinstance(message, dict) else None
+        operation = self._operations.get(op) if isinstance(op, str) else None
+        if operation is None:
+            return {"ok": False, "error": f"不明な操作です: {op!r}"}
+        try:
+            return operation(message)
+        except (ArchiveLimitExceeded, ScanBudgetExceeded, subprocess.CalledProcessError, OSError,
+                ValueError, KeyError, TypeError) as error:
+            return {"ok": False, "error": f"{type(error).__name__}: {error}"}
+        finally:
+            if self.cache is not None:
+                self.cache.flush()
+
+    def ping(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """起動確認"""
+        return {
+            "ok": True,
+            "pid": os.getpid(),
+            "ruleset": AWS_CREDENTIAL_RULESET.version,
+            "root": str(self.root),
+        }
+
+    def scan(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """ファイルまたはGitの差分をスキャンする"""
+        paths = message.get("paths", [])
+        if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+            raise TypeError("paths には文字列のリストを指定してください")
+        baseline = self.baseline
+        results = scan_sources(
+            paths,
+            self.root,
+            baseline,
+            staged=bool(message.get("staged")),
+            base=message.get("base"),
+            cache=self.cache,
+            cwd=Path(message["cwd"]) if message.get("cwd") else None,
+        )
+        return {"ok": True, "results": self._report(baseline, results)}
+
+    def scan_blob(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """内容（エディタのバッファなど）をパスの内容としてスキャンする"""
+        path = normalize_path(message["path"])
+        data = base64.b64decode(message["data"], validate=True)
+        baseline = self.baseline
+        results = (
+            (member, member, findings)
+            for member, findings in scan_blob(path, data, baseline, self.cache)
+        )
+        return {"ok": True, "results": self._report(baseline, results)}
+
+    @staticmethod
+    def _report(baseline: Baseline, results) -> List[Dict[str, Any]]:
+        """受け入れ済みの検出結果を除き、検出のあった結果を応答の形式にする"""
+        report = []
+        for location, baseline_path, findings in results:
+            findings = baseline.filter(baseline_path, findings)
+            if findings:
+                report.append({
+                    "location": location,
+                    "path": baseline_path,
+                    "findings": [list(finding) for finding in findings],
+                })
+        return report
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """1つの接続のリクエストを順に処理する"""
+
+    timeout = CONNECTION_TIMEOUT
+
+    def handle(self) -> None:
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                except ValueError as error:
+                    response = {"ok": False, "error": f"JSONとして不正です: {error}"}
+                else:
+                    if isinstance(message, dict) and message.get("op") == "shutdown":
+                        self.server.stopping = True
+                        self._send({"ok": True})
+                        return
+                    response = self.server.service.handle(message)
+                self._send(response)
+        except OSError:
+            # 切断・タイムアウト
+            return
+
+    def _send(self, response: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class ScanServer(socketserver.UnixStreamServer):
+    """常駐スキャナーのUNIXドメインソケットサーバー（接続は1つずつ順に処理する）"""
+
+    def __init__(self, socket_path: Path, service: ScanService):
+        """
+        Args:
+            socket_path: 待ち受けるソケットのパス（前回の異常終了で残ったソケットは削除する）
+            service: リクエスト処理
+
+        Raises:
+            DaemonAlreadyRunning: 同じソケットで常駐スキャナーが起動済みの場合
+        """
+        self.socket_path = Path(socket_path)
+        self.service = service
+        self.stopping = False
+        _remove_stale_socket(self.socket_path)
+        super().__init__(str(self.socket_path), _RequestHandler)
+
+    def server_bind(self) -> None:
+        # 作成した時点から所有者のみが接続できるようにする
+        previous = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(previous)
+
+    def handle_timeout(self) -> None:
+        self.stopping = True
+
+    def serve(self, idle_timeout: float = DEFAULT_IDLE_TIMEOUT) -> None:
+        """
+        shutdown リクエストを受けるか、リクエストのない時間が idle_timeout 秒を超えるまで待ち受ける
+
+        Args:
+            idle_timeout: 終了するまでの待ち時間（秒、0で終了しない）
+        """
+        self.timeout = idle_timeout or None
+        while not self.stopping:
+            self.handle_request()
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path: Path) -> None:
+    """接続を受け付けていない（前回の異常終了で残った）ソケットを削除する"""
+    if not socket_path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+    except (ConnectionRefusedError, FileNotFoundError):
+        socket_path.unlink(missing_ok=True)
+        return
+    finally:
+        probe.close()
+    raise DaemonAlreadyRunning(f"{socket_path}: 常駐スキャナーは起動済みです")
+
+
+def is_running(socket_path: Optional[Path] = None) -> bool:
+    """
+    常駐スキャナーが起動しているか確認する
+
+    Args:
+        socket_path: ソケットのパス（省略時はプロジェクトごとの既定のパス）
+
+    Returns:
+        ping に応答した場合True
+    """
+    try:
+        return bool(request(socket_path or default_socket_path(), {"op": "ping"}, timeout=5.0).get("ok"))
+    except (OSError, ValueError):
+        return False
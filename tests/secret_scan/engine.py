@@ -0,0 +1,912 @@
+"""
+シングルパス・マルチパターンのスキャンエンジン
+
+ルール（正規表現）群を1つの結合マッチャーにコンパイルし、ファイル内容全体を
+1回の走査でスキャンします。各ルールは名前付きグループ（r0, r1, ...）として
+結合マッチャーに埋め込まれ、ヒットした位置でのみ個別ルールを再照合します。
+
+検出結果は従来の「パターンごと・行ごとの re.findall」と同一の内容・順序になります。
+
+大きなファイルはメモリマップし、バイト列向けにコンパイルしたルールでデコードせずに
+走査します。行番号は一致位置から改行索引で遅延計算します。
+
+google-re2 がインストールされている場合、RE2で同じ意味に表現できるルールは
+線形時間のRE2で照合します。1ファイルあたりのスキャン時間には上限（時間予算）があります。
+"""
+
+import hashlib
+import itertools
+import mmap
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Pattern, Sequence, Set,
+    Tuple, Union,
+)
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10以前
+    import sre_constants
+    import sre_parse
+
+from .linear import compile_linear, is_available as linear_backend_available
+from .prefilter import LiteralPrefilter, extract_anchors, fold_case
+from .sniff import SNIFF_BYTES, looks_binary
+
+if TYPE_CHECKING:
+    from .cache import ScanCache
+
+
+# 検出結果の型: (パターン名, マッチした文字列, 行番号)
+Finding = Tuple[str, str, int]
+
+# 一致の確認関数の型: (対象, 一致の開始位置, 一致の終了位置) → 検出として採用する場合True
+MatchCheck = Callable[[Any, int, int], bool]
+
+# エンジンの版数（検出結果が変わる変更を加えた場合に上げる。スキャンキャッシュのキーに含まれる）
+ENGINE_VERSION = 3
+
+# この大きさ以上のファイルはメモリマップし、デコードせずにバイト列のまま走査する
+MMAP_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# バイト列の走査でリテラル前段フィルタを適用する窓の大きさ
+# （大文字小文字を区別しないルールセットでの小文字化コピーの上限）
+SCAN_WINDOW_BYTES = 8 * 1024 * 1024
+
+# 正規表現バックエンド（環境変数 SECRET_SCAN_REGEX で指定）
+# - auto: google-re2 がインストールされていればRE2を使用する（既定）
+# - re2: RE2を使用する（インストールされていない場合はエラー）
+# - re: RE2を使用しない
+REGEX_BACKENDS = ("auto", "re2", "re")
+DEFAULT_REGEX_BACKEND = os.getenv("SECRET_SCAN_REGEX", "auto")
+
+# 1ファイルあたりのスキャン時間の上限（秒、環境変数 SECRET_SCAN_TIME_BUDGET で指定。0で無制限）
+DEFAULT_TIME_BUDGET = float(os.getenv("SECRET_SCAN_TIME_BUDGET", "30"))
+
+
+class ScanBudgetExceeded(Exception):
+    """
+    1ファイルのスキャンが時間予算を超過した
+
+    読み込めないファイル（OSError）のように黙ってスキップされないよう、
+    TimeoutError（OSErrorの派生）ではなく Exception を継承します。
+    """
+
+
+def decode_text(data: bytes) -> str:
+    """
+    ファイル内容をテキストモードでの読み込みと同じ規則でデコードする
+
+    Args:
+        data: ファイルのバイト列
+
+    Returns:
+        UTF-8でデコードし、改行（\\r\\n, \\r）を \\n に統一したテキスト
+
+    Raises:
+        UnicodeDecodeError: UTF-8としてデコードできない場合（バイナリファイルなど）
+    """
+    content = data.decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+
+def _class_ranges(av) -> Optional[Set[Tuple[int, int]]]:
+    """
+    文字クラス（IN）の要素を範囲の集合に変換する
+
+    Args:
+        av: sre_parseのIN要素の引数
+
+    Returns:
+        (開始コードポイント, 終了コードポイント) の集合。変換できない場合はNone
+    """
+    ranges = set()
+    for item_op, item_av in av:
+        if item_op is sre_constants.LITERAL:
+            ranges.add((item_av, item_av))
+        elif item_op is sre_constants.RANGE:
+            ranges.add(item_av)
+        else:
+            # NEGATE や CATEGORY（\s など）は扱わない
+            return None
+    return ranges
+
+
+def _render_class(ranges: Set[Tuple[int, int]]) -> str:
+    """範囲の集合を文字クラスの正規表現に変換する"""
+    return "[" + "".join(
+        re.escape(chr(lo)) if lo == hi else f"{re.escape(chr(lo))}-{re.escape(chr(hi))}"
+        for lo, hi in sorted(ranges)
+    ) + "]"
+
+
+def _first_char_ranges(items) -> Optional[Set[Tuple[int, int]]]:
+    """
+    パース済みパターンの先頭で消費され得る文字の範囲を求める
+
+    Args:
+        items: sre_parseでパースしたパターン（SubPatternまたはそのリスト）
+
+    Returns:
+        (開始コードポイント, 終了コードポイント) の集合。決定できない場合はNone
+    """
+    for op, av in items:
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT, sre_constants.AT):
+            # ゼロ幅の要素は読み飛ばす
+            continue
+        if op is sre_constants.LITERAL:
+            return {(av, av)}
+        if op is sre_constants.IN:
+            return _class_ranges(av)
+        if op is sre_constants.SUBPATTERN:
+            return _first_char_ranges(av[-1])
+        if op is sre_constants.BRANCH:
+            ranges = set()
+            for branch in av[1]:
+                branch_ranges = _first_char_ranges(branch)
+                if branch_ranges is None:
+                    return None
+                ranges |= branch_ranges
+            return ranges
+        if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            min_count, _, sub_pattern = av
+            if min_count == 0:
+                return None
+            return _first_char_ranges(sub_pattern)
+        return None
+    return None
+
+
+def _leading_lookbehind(items) -> str:
+    """
+    パターン先頭の単純な否定後読み（1文字クラス）を正規表現として復元する
+
+    Args:
+        items: sre_parseでパースしたパターン
+
+    Returns:
+        否定後読みの正規表現。該当しない場合は空文字列
+    """
+    if not len(items):
+        return ""
+    op, av = items[0]
+    if op is not sre_constants.ASSERT_NOT or av[0] != -1:
+        return ""
+    body = list(av[1])
+    if len(body) != 1:
+        return ""
+    body_op, body_av = body[0]
+    if body_op is sre_constants.LITERAL:
+        ranges = {(body_av, body_av)}
+    elif body_op is sre_constants.IN:
+        ranges = _class_ranges(body_av)
+    else:
+        return ""
+    if ranges is None:
+        return ""
+    return f"(?<!{_render_class(ranges)})"
+
+
+def _build_gate(patterns: Iterable[str], flags: int) -> str:
+    """
+    結合マッチャーの先頭に置く先読みゲートを生成する
+
+    sreは選択（|）を含むパターンでは高速な先頭文字スキップができないため、
+    全ルールの先頭文字の和集合を先読みで与えて候補位置以外を読み飛ばします。
+    先頭に否定後読みを持つルール（Base64風文字列など）は、後読みごとゲートに含めます。
+
+    Args:
+        patterns: ルールの正規表現パターン
+        flags: コンパイルフラグ
+
+    Returns:
+        先読みゲートの正規表現。決定できない場合は空文字列
+    """
+    ranges_by_prefix = {}
+    for pattern in patterns:
+        parsed = sre_parse.parse(pattern, flags)
+        pattern_ranges = _first_char_ranges(parsed)
+        if pattern_ranges is None:
+            return ""
+        ranges_by_prefix.setdefault(_leading_lookbehind(parsed), set()).update(pattern_ranges)
+
+    return "(?=" + "|".join(
+        prefix + _render_class(ranges)
+        for prefix, ranges in sorted(ranges_by_prefix.items())
+    ) + ")"
+
+
+class LineIndex:
+    """
+    一致位置から行番号を遅延計算する改行索引
+
+    ブロック（BLOCK_SIZE）ごとに「ブロック先頭までの改行数」を必要になった範囲だけ記録し、
+    ブロック内は直前に問い合わせた位置またはブロック先頭からの差分だけを数えます。
+    索引の大きさは行数ではなくブロック数に比例するため、巨大なファイルでも小さく保てます。
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, buffer, newline):
+        """
+        Args:
+            buffer: 対象のテキスト・バイト列・メモリマップ
+            newline: 改行文字（'\\n' または b'\\n'）
+        """
+        self._buffer = buffer
+        self._newline = newline
+        self._checkpoints = [0]
+        self._last_position = 0
+        self._last_line = 1
+
+    def _count(self, start: int, end: int) -> int:
+        """範囲内の改行数を数える"""
+        if isinstance(self._buffer, mmap.mmap):
+            # mmapはcountを持たないため、ブロック以下の大きさの部分コピーで数える
+            return self._buffer[start:end].count(self._newline)
+        return self._buffer.count(self._newline, start, end)
+
+    def line_number(self, position: int) -> int:
+        """
+        位置を含む行の行番号（1始まり）を返す
+
+        Args:
+            position: 対象内の位置
+
+        Returns:
+            行番号
+        """
+        block = position // self.BLOCK_SIZE
+        block_start = block * self.BLOCK_SIZE
+        if block_start <= self._last_position <= position:
+            self._last_line += self._count(self._last_position, position)
+        else:
+            checkpoints = self._checkpoints
+            while len(checkpoints) <= block:
+                start = (len(checkpoints) - 1) * self.BLOCK_SIZE
+                checkpoints.append(checkpoints[-1] + self._count(start, start + self.BLOCK_SIZE))
+            self._last_line = 1 + checkpoints[block] + self._count(block_start, position)
+        self._last_position = position
+        return self._last_line
+
+
+@contextmanager
+def read_content(file_path) -> Iterator[Optional[Union[bytes, mmap.mmap]]]:
+    """
+    スキャンのためにファイル内容を読み込む
+
+    先頭ブロックだけを読んでバイナリファイルを判定し、バイナリの場合は全体を読み込みません。
+    MMAP_THRESHOLD_BYTES 以上のファイルは全体を読み込まずにメモリマップします。
+
+    Args:
+        file_path: 読み込むファイルのパス
+
+    Yields:
+        ファイル内容（バイト列またはメモリマップ）。バイナリと判定した場合はNone
+
+    Raises:
+        OSError: ファイルを読み込めない場合
+        ScanBudgetExceeded: 内容のスキャンが時間予算を超過した場合（ファイルのパスを付加する）
+    """
+    try:
+        with _open_content(file_path) as data:
+            yield data
+    except ScanBudgetExceeded as error:
+        raise ScanBudgetExceeded(f"{file_path}: {error}") from None
+
+
+@contextmanager
+def _open_content(file_path) -> Iterator[Optional[Union[bytes, mmap.mmap]]]:
+    """read_content の本体（バイナリ判定・メモリマップ）"""
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+        if looks_binary(head):
+            yield None
+            return
+        if len(head) < SNIFF_BYTES:
+            # ファイル全体を読み込み済み
+            yield head
+            return
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD_BYTES:
+            f.seek(0)
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _line_aligned_windows(buffer, newline, window_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    対象を行境界で区切った窓（おおよそ window_size ずつ）に分割する
+
+    Args:
+        buffer: 対象のバイト列・メモリマップ
+        newline: 改行文字
+        window_size: 窓の目安の大きさ（行がこれより長い場合は行末まで広げる）
+
+    Yields:
+        (窓の開始位置, 窓の終了位置)
+    """
+    total = len(buffer)
+    start = 0
+    while start < total:
+        end = start + window_size
+        if end >= total:
+            end = total
+        else:
+            line_end = buffer.find(newline, end)
+            end = total if line_end == -1 else line_end + 1
+        yield start, end
+        start = end
+
+
+class _CompiledRules:
+    """ルールセットをテキスト（str）またはバイト列（bytes）向けにコンパイルしたもの"""
+
+    def __init__(self, ruleset: "Ruleset", binary: bool):
+        """
+        Args:
+            ruleset: コンパイルするルールセット
+            binary: Trueの場合はバイト列向けにコンパイルする
+        """
+        def encode(text: str):
+            return text.encode('utf-8') if binary else text
+
+        self.binary = binary
+        self.newline = encode('\n')
+        self.comment_prefixes = tuple(encode(prefix) for prefix in ruleset.comment_prefixes)
+        self.comment_prefix_length = max((len(prefix) for prefix in self.comment_prefixes), default=0)
+        self.leading_space = re.compile(encode(r'\s*'))
+        self.compiled = [re.compile(encode(pattern), ruleset.flags) for pattern, _ in ruleset.patterns]
+        # 線形時間のRE2で照合するルール（RE2を使えないルールはNone）。
+        # RE2で照合するルールは対象全体を1回走査するため、前段フィルタ・結合マッチャーには含めない
+        self.linear = [
+            compile_linear(pattern, ruleset.flags, binary) if ruleset.regex_backend != "re" else None
+            for pattern, _ in ruleset.patterns
+        ]
+        sre_indices = [index for index, linear in enumerate(self.linear) if linear is None]
+        self.prefilter = LiteralPrefilter([
+            tuple(encode(literal) for literal in ruleset.anchors[index])
+            if self.linear[index] is None and ruleset.anchors[index] is not None else None
+            for index in range(len(ruleset.patterns))
+        ])
+
+        unanchored_indices = [index for index in sre_indices if ruleset.anchors[index] is None]
+        self.combined = self._build_combined(ruleset, sre_indices, encode)
+        self.unanchored = self._build_combined(ruleset, unanchored_indices, encode)
+
+    def is_comment_line(self, buffer, line_start: int, line_end: int) -> bool:
+        """
+        行がコメント行かを判定する（行全体をコピーせず、先頭の空白の直後だけを調べる）
+
+        Args:
+            buffer: スキャンする対象
+            line_start: 行の開始位置
+            line_end: 行の終了位置
+
+        Returns:
+            コメント行の場合True
+        """
+        text_start = self.leading_space.match(buffer, line_start, line_end).end()
+        head = buffer[text_start:min(text_start + self.comment_prefix_length, line_end)]
+        return head.startswith(self.comment_prefixes)
+
+    def _build_combined(
+        self, ruleset: "Ruleset", indices: Sequence[int], encode
+    ) -> Optional[Tuple[Pattern, Dict[int, int]]]:
+        """
+        指定したルールを名前付きグループ付きの1つのマッチャーに結合する
+
+        Args:
+            ruleset: ルールセット
+            indices: 結合するルール番号
+            encode: パターン文字列を対象の型に変換する関数
+
+        Returns:
+            (結合マッチャー, ルール番号 → indices内の位置) 。ルールがない場合はNone
+        """
+        if not indices:
+            return None
+        patterns = [ruleset.patterns[index][0] for index in indices]
+        gate = _build_gate(patterns, ruleset.flags)
+        if self.binary and not gate.isascii():
+            # 非ASCII文字のクラスはバイト単位に変換できないためゲートを使わない
+            gate = ""
+        combined = re.compile(
+            encode(gate + "(?:" + "|".join(
+                f"(?P<r{index}>{pattern})" for index, pattern in zip(indices, patterns)
+            ) + ")"),
+            ruleset.flags,
+        )
+        return combined, {index: offset for offset, index in enumerate(indices)}
+
+
+class Ruleset:
+    """
+    コンパイル済みのスキャンルール集合
+
+    結合マッチャーは全ルールを名前付きグループ付きの選択としてまとめたものです。
+    結合マッチャーで候補位置を左から順に1つずつ求め、その位置で各ルールを
+    行末までに限定して照合することで、行単位の re.findall と同じ結果を得ます。
+
+    先頭リテラル（アンカー）を持つルールはリテラル前段フィルタで出現位置を求め、
+    その位置でのみ照合します。アンカーを持たないルール（Base64風文字列など）は
+    専用の結合マッチャーで全体を走査します。
+
+    先読み・後読みの代わりに、一致の前後をPythonで確認する関数（checks）をルールに添えられます。
+    先読み・後読みを含まないルールはRE2で照合できるため、バックトラックが爆発しません。
+    確認で除外した一致も re.findall の一致と同じく次の探索位置を進めます。
+
+    注: 個別ルールは行末に依存する構文（$ や \\Z）を含まないことを前提とします。
+    """
+
+    def __init__(
+        self,
+        patterns: Sequence[Tuple[str, str]],
+        flags: int = 0,
+        comment_prefixes: Sequence[str] = ('#',),
+        allowlist: Iterable[str] = (),
+        regex_backend: Optional[str] = None,
+        time_budget: Optional[float] = None,
+        checks: Optional[Mapping[str, MatchCheck]] = None,
+    ):
+        """
+        Args:
+            patterns: (正規表現, パターン名) のリスト
+            flags: 正規表現のコンパイルフラグ（re.IGNORECASEなど）
+            comment_prefixes: スキップするコメント行の接頭辞
+            allowlist: 検出対象から除外するマッチ文字列（例示用のキーなど）
+            regex_backend: 正規表現バックエンド（"auto", "re2", "re"。未指定の場合は
+                環境変数 SECRET_SCAN_REGEX）
+            time_budget: 1ファイルあたりのスキャン時間の上限（秒、0で無制限。未指定の場合は
+                環境変数 SECRET_SCAN_TIME_BUDGET）
+            checks: パターン名 → 一致を検出として採用するかの確認関数（対象, 開始位置, 終了位置）。
+                値の除外や前後の文字の確認など、先読み・後読みの代わりに使う
+
+        Raises:
+            ValueError: 不明なバックエンド、またはパターンにない名前の確認関数を指定した場合
+            ImportError: "re2" を指定したが google-re2 がインストールされていない場合
+        """
+        self.patterns = list(patterns)
+        self.flags = flags
+        self.comment_prefixes = tuple(comment_prefixes)
+        self.allowlist = frozenset(allowlist)
+        self.regex_backend = regex_backend or DEFAULT_REGEX_BACKEND
+        self.time_budget = DEFAULT_TIME_BUDGET if time_budget is None else time_budget
+        self.checks = dict(checks or {})
+
+        if self.regex_backend not in REGEX_BACKENDS:
+            raise ValueError(f"不明な正規表現バックエンドです: {self.regex_backend}")
+        if self.regex_backend == "re2" and not linear_backend_available():
+            raise ImportError("google-re2 がインストールされていません")
+
+        self._names = [name for _, name in self.patterns]
+        unknown = set(self.checks) - set(self._names)
+        if unknown:
+            raise ValueError(f"確認関数のパターン名がルールにありません: {sorted(unknown)}")
+        self._checks = [self.checks.get(name) for name in self._names]
+        self.anchors = [extract_anchors(pattern, flags) for pattern, _ in self.patterns]
+
+        # ルールセットの版数（スキャンキャッシュのキー）
+        self.version = hashlib.sha256(repr((
+            ENGINE_VERSION,
+            self.patterns,
+            self.flags,
+            self.comment_prefixes,
+            sorted(self.allowlist),
+            sorted((name, f"{check.__module__}.{check.__qualname__}") for name, check in self.checks.items()),
+        )).encode('utf-8')).hexdigest()[:16]
+
+        self._text_rules = _CompiledRules(self, binary=False)
+        self._binary_rules: Optional[_CompiledRules] = None
+
+    def scan_path(self, file_path: Path, cache: Optional["ScanCache"] = None) -> List[Finding]:
+        """
+        ファイルをスキャンする
+
+        Args:
+            file_path: スキャンするファイルのパス
+            cache: スキャンキャッシュ（指定した場合は変更のないファイルを再スキャンしない）
+
+        Returns:
+            検出結果のリスト。バイナリファイルや読み取り不可ファイルは空リスト
+        """
+        if cache is not None:
+            return cache.scan_path(file_path, self)
+
+        try:
+            with read_content(file_path) as data:
+                if data is None:
+                    # バイナリファイルはスキップ
+                    return []
+                return self.scan_data(data)
+        except OSError:
+            # 読み取り不可ファイルはスキップ
+            return []
+
+    def scan_bytes(self, data: bytes, cache: Optional["ScanCache"] = None) -> List[Finding]:
+        """
+        バイト列（Gitのblobなど）をスキャンする
+
+        Args:
+            data: スキャンする内容
+            cache: スキャンキャッシュ（指定した場合は同一内容を再スキャンしない）
+
+        Returns:
+            検出結果のリスト。UTF-8としてデコードできない内容は空リスト
+        """
+        if cache is not None:
+            return cache.scan_bytes(data, self)
+
+        return self.scan_data(data)
+
+    def scan_data(self, data: Union[bytes, mmap.mmap]) -> List[Finding]:
+        """
+        ファイル内容をスキャンする
+
+        先頭ブロックでバイナリと判定した内容はスキャンしません。
+        MMAP_THRESHOLD_BYTES 以上の内容はデコードせず、バイト列のまま走査します（scan_buffer）。
+
+        Args:
+            data: ファイル内容（バイト列またはメモリマップ）
+
+        Returns:
+            検出結果のリスト。バイナリと判定した内容やUTF-8としてデコードできない内容は空リスト
+        """
+        if looks_binary(data[:SNIFF_BYTES]):
+            return []
+
+        if len(data) >= MMAP_THRESHOLD_BYTES:
+            return self.scan_buffer(data)
+
+        try:
+            content = decode_text(data)
+        except UnicodeDecodeError:
+            # バイナリファイルはスキップ
+            return []
+
+        return self.scan_text(content)
+
+    def scan_text(self, content: str) -> List[Finding]:
+        """
+        テキスト全体を1パスでスキャンする
+
+        Args:
+            content: スキャンするテキスト
+
+        Returns:
+            検出結果のリスト [(パターン名, マッチした文字列, 行番号), ...]
+            （パターン定義順・行番号順）
+        """
+        return self._scan(self._text_rules, content)
+
+    def scan_buffer(self, buffer: Union[bytes, mmap.mmap]) -> List[Finding]:
+        """
+        バイト列（メモリマップを含む）をデコードせずにスキャンする
+
+        テキストへのデコードやコピーを行わないため、追加のメモリ使用量は
+        内容の大きさによらずほぼ一定です。ルールはバイト列向けにコンパイルされるため、
+        scan_text とは次の点が異なります（ASCIIのみ・改行が \\n の内容では同一の結果）。
+
+        - \\s や大文字小文字の同一視はASCII文字のみが対象
+        - 行の区切りは \\n のみ（\\r\\n の \\r は行末に残る）
+        - UTF-8としての妥当性は検査しない（マッチ文字列は置換文字を使ってデコードする。
+          scan_data 経由では先頭ブロックのみ検査される）
+
+        Args:
+            buffer: スキャンするバイト列またはメモリマップ
+
+        Returns:
+            検出結果のリスト（scan_text と同じ形式）
+        """
+        if self._binary_rules is None:
+            self._binary_rules = _CompiledRules(self, binary=True)
+        return self._scan(self._binary_rules, buffer)
+
+    def match_spans(self, content: str) -> List[Tuple[str, int, int]]:
+        """
+        テキスト中の検出値の位置を求める（ログのマスクなど、値を置き換える用途）
+
+        検出対象・除外（コメント行・例示用のキー）は scan_text と同じです。
+
+        Args:
+            content: スキャンするテキスト
+
+        Returns:
+            [(パターン名, 値の開始位置, 値の終了位置), ...]（開始位置順）。
+            グループのあるルールは最初のグループの位置
+        """
+        hits = self._collect_hits(self._text_rules, content)
+        hits.sort(key=lambda hit: (hit[4], hit[0]))
+        return [
+            (self._names[index], value_start, value_start + len(value))
+            for index, _, _, value, value_start in hits
+        ]
+
+    def _scan(self, rules: _CompiledRules, buffer) -> List[Finding]:
+        """
+        コンパイル済みルールで対象をスキャンする
+
+        Args:
+            rules: 対象の型に合わせてコンパイルしたルール
+            buffer: スキャンする対象
+
+        Returns:
+            検出結果のリスト
+
+        Raises:
+            ScanBudgetExceeded: スキャンが時間予算を超過した場合
+        """
+        hits = self._collect_hits(rules, buffer)
+        hits.sort(key=lambda hit: (hit[0], hit[1]))
+        return [(self._names[index], value, line_num) for index, _, line_num, value, _ in hits]
+
+    def _collect_hits(self, rules: _CompiledRules, buffer) -> list:
+        """
+        コンパイル済みルールで対象をスキャンし、並べ替える前の検出を返す
+
+        Returns:
+            [(ルール番号, 一致位置, 行番号, マッチ文字列, マッチ文字列の位置), ...]
+
+        Raises:
+            ScanBudgetExceeded: スキャンが時間予算を超過した場合
+        """
+        lines = LineIndex(buffer, rules.newline)
+        candidates = self._literal_candidates(rules, buffer)
+        deadline = time.monotonic() + self.time_budget if self.time_budget > 0 else None
+
+        hits = []
+        for index, matcher in enumerate(rules.linear):
+            if matcher is not None:
+                self._scan_linear(rules, index, buffer, lines, hits, deadline)
+
+        if candidates is None:
+            if rules.combined is not None:
+                self._scan_combined(rules, rules.combined, buffer, lines, hits, deadline)
+        else:
+            if rules.unanchored is not None:
+                self._scan_combined(rules, rules.unanchored, buffer, lines, hits, deadline)
+            self._scan_candidates(rules, buffer, candidates, lines, hits, deadline)
+        return hits
+
+    def _literal_candidates(self, rules: _CompiledRules, buffer):
+        """
+        リテラル前段フィルタによる候補位置を列挙する
+
+        Args:
+            rules: コンパイル済みルール
+            buffer: スキャンする対象
+
+        Returns:
+            (位置, 照合するルール番号の列, 0) の反復子（位置の昇順）。
+            前段フィルタを使えない場合はNone
+        """
+        if not rules.prefilter:
+            return None
+
+        ignorecase = self.flags & re.IGNORECASE
+        if not rules.binary:
+            # 位置を保って小文字化できない場合（İ など）は前段フィルタを使わない
+            haystack = fold_case(buffer) if ignorecase else buffer
+            if haystack is None:
+                return None
+            return (
+                (position, indices, 0)
+                for position, indices in rules.prefilter.occurrences(haystack)
+            )
+
+        def windowed():
+            # リテラルは改行を含まないため、行境界で区切った窓ごとに探索しても取りこぼさない。
+            # 小文字化のコピーと出現位置のリストは窓の大きさまでに制限される
+            for window_start, window_end in _line_aligned_windows(
+                buffer, rules.newline, SCAN_WINDOW_BYTES
+            ):
+                if ignorecase:
+                    occurrences = rules.prefilter.occurrences(
+                        buffer[window_start:window_end].lower()
+                    )
+                    for position, indices in occurrences:
+                        yield window_start + position, indices, 0
+                else:
+                    occurrences = rules.prefilter.occurrences(buffer, window_start, window_end)
+                    for position, indices in occurrences:
+                        yield position, indices, 0
+
+        return windowed()
+
+    def _scan_combined(
+        self,
+        rules: _CompiledRules,
+        combined: Tuple[Pattern, Dict[int, int]],
+        buffer,
+        lines: LineIndex,
+        hits: list,
+        deadline: Optional[float],
+    ) -> None:
+        """
+        結合マッチャーで候補位置を列挙し、各位置でルールを照合する
+
+        Args:
+            rules: コンパイル済みルール
+            combined: _build_combinedで生成した結合マッチャー
+            buffer: スキャンする対象
+            lines: 行番号の索引
+            hits: 検出結果の追加先
+            deadline: スキャンの期限（time.monotonic() の値。Noneで無制限）
+        """
+        matcher, offsets = combined
+        indices = list(offsets)
+
+        def candidates():
+            search = matcher.search
+            position = 0
+            while True:
+                match = search(buffer, position)
+                if match is None:
+                    return
+                start = match.start()
+                position = start + 1
+                # 結合マッチャーで先に試行されて失敗したルールはこの位置では一致しない
+                yield start, indices, offsets[int(match.lastgroup[1:])]
+
+        self._scan_candidates(rules, buffer, candidates(), lines, hits, deadline)
+
+    def _scan_candidates(
+        self,
+        rules: _CompiledRules,
+        buffer,
+        candidates,
+        lines: LineIndex,
+        hits: list,
+        deadline: Optional[float],
+    ) -> None:
+        """
+        候補位置（昇順）でルールを行末までに限定して照合する
+
+        Args:
+            rules: コンパイル済みルール
+            buffer: スキャンする対象
+            candidates: (位置, 照合するルール番号の列, 照合を開始する列内の位置) の反復子
+            lines: 行番号の索引
+            hits: 検出結果 (ルール番号, 位置, 行番号, マッチ文字列, マッチ文字列の位置) の追加先
+            deadline: スキャンの期限（time.monotonic() の値。Noneで無制限）
+
+        Raises:
+            ScanBudgetExceeded: 期限を過ぎた場合
+        """
+        newline = rules.newline
+        next_allowed = [0] * len(rules.compiled)
+        line_start = line_end = -1
+        skip_until = -1
+
+        for start, indices, first in candidates:
+            if deadline is not None and time.monotonic() > deadline:
+                raise ScanBudgetExceeded(
+                    f"スキャンが時間予算（{self.time_budget}秒）を超過しました"
+                )
+            if start <= skip_until:
+                continue
+
+            if start > line_end:
+                # 同じ行の候補では行の境界を求め直さない
+                line_start = buffer.rfind(newline, 0, start) + 1
+                line_end = buffer.find(newline, start)
+                if line_end == -1:
+                    line_end = len(buffer)
+
+                # コメント行はスキップ
+                if rules.is_comment_line(buffer, line_start, line_end):
+                    skip_until = line_end
+                    continue
+
+            for offset in range(first, len(indices)):
+                index = indices[offset]
+                if next_allowed[index] > start:
+                    continue
+                compiled = rules.compiled[index]
+                rule_match = compiled.match(buffer, start, line_end)
+                if rule_match is None:
+                    continue
+                next_allowed[index] = max(rule_match.end(), start + 1)
+                check = self._checks[index]
+                if check is not None and not check(buffer, start, rule_match.end()):
+                    continue
+
+                # グループがある場合は最初のグループを使用
+                value = rule_match.group(1) if compiled.groups else rule_match.group(0)
+                value_start = rule_match.start(1) if compiled.groups else start
+                if value is None:
+                    value, value_start = "", start
+                elif rules.binary:
+                    value = value.decode('utf-8', errors='replace')
+
+                # 例示用のキーは除外
+                if value in self.allowlist:
+                    continue
+
+                hits.append((index, start, lines.line_number(start), value, value_start))
+
+    def _scan_linear(
+        self,
+        rules: _CompiledRules,
+        index: int,
+        buffer,
+        lines: LineIndex,
+        hits: list,
+        deadline: Optional[float],
+    ) -> None:
+        """
+        RE2で照合するルールを対象全体に1回適用する（行単位の re.findall と同じ結果）
+
+        RE2向けのルールは改行をまたいで一致しないため、対象全体の一致は行ごとの一致と同じです。
+
+        Args:
+            rules: コンパイル済みルール
+            index: ルール番号
+            buffer: スキャンする対象
+            lines: 行番号の索引
+            hits: 検出結果の追加先
+            deadline: スキャンの期限（time.monotonic() の値。Noneで無制限）
+
+        Raises:
+            ScanBudgetExceeded: 期限を過ぎた場合
+        """
+        matcher = rules.linear[index]
+        try:
+            matches = matcher.finditer(buffer)
+            first_match = next(matches, None)
+        except UnicodeEncodeError:
+            # UTF-8に符号化できない文字（サロゲート）を含むテキストは re で照合する
+            self._scan_candidates(
+                rules, buffer, self._all_positions(rules, index, buffer), lines, hits, deadline
+            )
+            return
+        if first_match is None:
+            return
+
+        newline = rules.newline
+        check = self._checks[index]
+        line_start = line_end = -1
+        comment_line = False
+        for rule_match in itertools.chain((first_match,), matches):
+            if deadline is not None and time.monotonic() > deadline:
+                raise ScanBudgetExceeded(
+                    f"スキャンが時間予算（{self.time_budget}秒）を超過しました"
+                )
+
+            start = rule_match.start()
+            if start > line_end:
+                line_start = buffer.rfind(newline, 0, start) + 1
+                line_end = buffer.find(newline, start)
+                if line_end == -1:
+                    line_end = len(buffer)
+                comment_line = rules.is_comment_line(buffer, line_start, line_end)
+            if comment_line:
+                continue
+            if check is not None and not check(buffer, start, rule_match.end()):
+                continue
+
+            value = rule_match.group(1) if matcher.groups else rule_match.group(0)
+            value_start = rule_match.start(1) if matcher.groups else start
+            if value is None:
+                value, value_start = "", start
+            elif rules.binary:
+                value = value.decode('utf-8', errors='replace')
+
+            # 例示用のキーは除外
+            if value in self.allowlist:
+                continue
+
+            hits.append((index, start, lines.line_number(start), value, value_start))
+
+    def _all_positions(self, rules: _CompiledRules, index: int, buffer):
+        """1つのルールを re で照合するための候補位置（ルールの一致位置）を列挙する"""
+        for rule_match in rules.compiled[index].finditer(buffer):
+            yield rule_match.start(), (index,), 0
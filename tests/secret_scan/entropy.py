@@ -0,0 +1,394 @@
+"""
+高エントロピー文字列（ランダムなトークン）の検出
+
+正規表現のルールは既知の形式しか検出できないため、文字種（Base64・16進数など）ごとに
+その文字種の文字が連続する部分（トークン）を取り出し、トークン上のスライド窓の
+シャノンエントロピーが閾値以上のものを検出します。
+
+トークンの切り出しから窓ごとのエントロピー計算までを NumPy でバイト配列に対して
+一括で行い、トークンごと・文字ごとのPythonのループは使いません。
+"""
+
+import hashlib
+import math
+import mmap
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # 任意の依存パッケージ（numpy）
+    np = None
+
+from .engine import (
+    MMAP_THRESHOLD_BYTES,
+    SCAN_WINDOW_BYTES,
+    Finding,
+    LineIndex,
+    _line_aligned_windows,
+    decode_text,
+    read_content,
+)
+from .sniff import SNIFF_BYTES, looks_binary
+
+if TYPE_CHECKING:
+    from .cache import ScanCache
+
+
+# 検出器の版数（検出結果が変わる変更を加えた場合に上げる。スキャンキャッシュのキーに含まれる）
+ENTROPY_VERSION = 1
+
+# 窓をずらす幅（窓の大きさに対する割合の逆数）。トークンの末尾の窓は常に評価する
+WINDOW_STEP_DIVISOR = 4
+
+# 1回にまとめて評価するトークンの合計の大きさ（窓の配列の大きさの上限を決める）
+TOKEN_BATCH_BYTES = 1024 * 1024
+
+# トークンの先頭からこの長さまでを評価・報告する。これより長いトークンは認証情報ではなく
+# 証明書・user_data などのBase64のデータであり、先頭部分で判定すれば十分なため
+MAX_TOKEN_LENGTH = 1024
+
+
+class EntropyRule(NamedTuple):
+    """文字種ごとの高エントロピー文字列の検出ルール"""
+
+    name: str  # 検出結果に表示するルール名
+    charset: str  # トークンを構成する文字（ASCII）
+    threshold: float  # 検出するエントロピーの下限（1文字あたりのビット数）
+    window: int = 32  # エントロピーを計算する窓の大きさ（これより短いトークンは対象外）
+
+
+def is_available() -> bool:
+    """エントロピー検出が利用可能か（numpy がインストールされているか）を返す"""
+    return np is not None
+
+
+def shannon_entropy(token: str) -> float:
+    """
+    文字列のシャノンエントロピー（1文字あたりのビット数）を計算する（参照用のスカラー実装）
+
+    Args:
+        token: 対象の文字列
+
+    Returns:
+        エントロピー。空文字列は0
+    """
+    if not token:
+        return 0.0
+    length = len(token)
+    counts = {}
+    for char in token:
+        counts[char] = counts.get(char, 0) + 1
+    return -sum(count / length * math.log2(count / length) for count in counts.values())
+
+
+def window_starts(length: int, window: int) -> List[int]:
+    """
+    トークン内で評価する窓の開始位置を返す（参照用。検出器と同じ位置）
+
+    Args:
+        length: トークンの長さ
+        window: 窓の大きさ
+
+    Returns:
+        窓の開始位置のリスト。トークンが窓より短い場合は空
+    """
+    length = min(length, MAX_TOKEN_LENGTH)
+    if length < window:
+        return []
+    step = max(1, window // WINDOW_STEP_DIVISOR)
+    starts = list(range(0, length - window + 1, step))
+    if starts[-1] != length - window:
+        starts.append(length - window)
+    return starts
+
+
+class _CompiledEntropyRule:
+    """バイト値から文字種の記号番号への変換表と、窓のエントロピー計算用の表"""
+
+    def __init__(self, rule: EntropyRule):
+        """
+        Args:
+            rule: 検出ルール
+
+        Raises:
+            ValueError: 文字種がASCII以外の文字を含む場合や、窓の大きさが不正な場合
+        """
+        if not rule.charset.isascii():
+            raise ValueError(f"文字種はASCII文字のみ指定できます: {rule.name}")
+        if not 2 <= rule.window <= 255:
+            raise ValueError(f"窓の大きさは2以上255以下で指定してください: {rule.name}")
+
+        self.rule = rule
+        self.window = rule.window
+        self.step = max(1, rule.window // WINDOW_STEP_DIVISOR)
+        # バイト値 → 記号番号+1（文字種に含まれないバイトは0）
+        self.codes = np.zeros(256, dtype=np.uint8)
+        for symbol, char in enumerate(dict.fromkeys(rule.charset), start=1):
+            self.codes[ord(char)] = symbol
+        # 窓内の出現回数 c → c * log2(c)（エントロピー = log2(W) - Σ c log2 c / W）
+        counts = np.arange(rule.window + 1, dtype=np.float64)
+        self.count_log_count = np.zeros(rule.window + 1)
+        self.count_log_count[1:] = counts[1:] * np.log2(counts[1:])
+
+    def tokens(self, data: "np.ndarray"):
+        """
+        文字種の文字が窓の大きさ以上連続する部分（トークン）を列挙する
+
+        Args:
+            data: 対象のバイト配列
+
+        Returns:
+            (トークンの開始位置の配列, トークンの終了位置の配列)。
+            終了位置は先頭から MAX_TOKEN_LENGTH までに切り詰める
+        """
+        member = np.empty(len(data) + 2, dtype=np.int8)
+        member[0] = member[-1] = 0
+        np.not_equal(self.codes[data], 0, out=member[1:-1])
+        edges = np.flatnonzero(np.diff(member))
+        starts, ends = edges[0::2], edges[1::2]
+        long_enough = ends - starts >= self.window
+        starts = starts[long_enough]
+        return starts, np.minimum(ends[long_enough], starts + MAX_TOKEN_LENGTH)
+
+    def scores(self, data: "np.ndarray", starts: "np.ndarray", ends: "np.ndarray") -> "np.ndarray":
+        """
+        トークンごとに窓のエントロピーの最大値を計算する
+
+        各窓の記号を窓内で整列し、同じ記号の連続（出現回数）から Σ c log2 c を求めます。
+
+        Args:
+            data: 対象のバイト配列
+            starts: トークンの開始位置（窓の大きさ以上のトークン）
+            ends: トークンの終了位置
+
+        Returns:
+            トークンごとのエントロピーの最大値（1文字あたりのビット数）
+        """
+        window = self.window
+        # トークンごとの窓の数（ step ごとの窓と、末尾に揃えた窓）
+        spans = ends - starts - window
+        window_counts = spans // self.step + 1 + (spans % self.step != 0)
+        first_windows = np.concatenate(([0], np.cumsum(window_counts)[:-1]))
+
+        # 窓の開始位置: トークン先頭 + step * (トークン内の窓番号)。末尾の窓はトークン末尾に揃える
+        token_of_window = np.repeat(np.arange(len(starts)), window_counts)
+        offsets = (np.arange(len(token_of_window)) - first_windows[token_of_window]) * self.step
+        offsets = np.minimum(offsets, spans[token_of_window])
+        positions = starts[token_of_window] + offsets
+
+        # (窓の数, 窓の大きさ) の記号の配列を窓ごとに整列する
+        symbols = self.codes[data[positions[:, None] + np.arange(window)]]
+        symbols.sort(axis=1)
+
+        # 同じ記号の連続の長さ = 出現回数
+        run_start = np.ones(symbols.shape, dtype=bool)
+        run_start[:, 1:] = symbols[:, 1:] != symbols[:, :-1]
+        run_positions = np.flatnonzero(run_start)
+        run_lengths = np.diff(np.append(run_positions, symbols.size))
+        sum_count_log_count = np.bincount(
+            run_positions // window,
+            weights=self.count_log_count[run_lengths],
+            minlength=len(positions),
+        )
+        entropies = math.log2(window) - sum_count_log_count / window
+
+        return np.maximum.reduceat(entropies, first_windows)
+
+
+class EntropyDetector:
+    """
+    文字種ごとの閾値で高エントロピー文字列を検出する
+
+    Ruleset と同じ形式（(ルール名, 文字列, 行番号) のリスト）で検出結果を返し、
+    スキャンキャッシュ（version / scan_data）にもそのまま使えます。
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[EntropyRule],
+        comment_prefixes: Sequence[str] = ('#',),
+        allowlist: Iterable[str] = (),
+    ):
+        """
+        Args:
+            rules: 文字種ごとの検出ルール
+            comment_prefixes: スキップするコメント行の接頭辞
+            allowlist: 検出対象から除外する文字列（例示用のキーなど）
+        """
+        self.rules = list(rules)
+        self.comment_prefixes = tuple(comment_prefixes)
+        self.allowlist = frozenset(allowlist)
+        self.version = hashlib.sha256(repr((
+            "entropy",
+            ENTROPY_VERSION,
+            WINDOW_STEP_DIVISOR,
+            MAX_TOKEN_LENGTH,
+            [tuple(rule) for rule in self.rules],
+            self.comment_prefixes,
+            sorted(self.allowlist),
+        )).encode('utf-8')).hexdigest()[:16]
+        self._compiled: Optional[List[_CompiledEntropyRule]] = None
+
+    def _compiled_rules(self) -> List[_CompiledEntropyRule]:
+        """
+        ルールの変換表を作成する（初回のスキャン時）
+
+        Raises:
+            ImportError: numpy がインストールされていない場合
+        """
+        if self._compiled is None:
+            if np is None:
+                raise ImportError("エントロピー検出には numpy が必要です（pip install numpy）")
+            self._compiled = [_CompiledEntropyRule(rule) for rule in self.rules]
+        return self._compiled
+
+    def scan_path(self, file_path: Path, cache: Optional["ScanCache"] = None) -> List[Finding]:
+        """
+        ファイルをスキャンする
+
+        Args:
+            file_path: スキャンするファイルのパス
+            cache: スキャンキャッシュ（指定した場合は変更のないファイルを再スキャンしない）
+
+        Returns:
+            検出結果のリスト。バイナリファイルや読み取り不可ファイルは空リスト
+        """
+        if cache is not None:
+            return cache.scan_path(file_path, self)
+
+        try:
+            with read_content(file_path) as data:
+                if data is None:
+                    # バイナリファイルはスキップ
+                    return []
+                return self.scan_data(data)
+        except OSError:
+            # 読み取り不可ファイルはスキップ
+            return []
+
+    def scan_bytes(self, data: bytes, cache: Optional["ScanCache"] = None) -> List[Finding]:
+        """
+        バイト列（Gitのblobなど）をスキャンする
+
+        Args:
+            data: スキャンする内容
+            cache: スキャンキャッシュ（指定した場合は同一内容を再スキャンしない）
+
+        Returns:
+            検出結果のリスト
+        """
+        if cache is not None:
+            return cache.scan_bytes(data, self)
+
+        return self.scan_data(data)
+
+    def scan_data(self, data: Union[bytes, mmap.mmap]) -> List[Finding]:
+        """
+        ファイル内容をスキャンする（Ruleset.scan_data と同じ規則）
+
+        Args:
+            data: ファイル内容（バイト列またはメモリマップ）
+
+        Returns:
+            検出結果のリスト。バイナリと判定した内容やUTF-8としてデコードできない内容は空リスト
+        """
+        if looks_binary(data[:SNIFF_BYTES]):
+            return []
+
+        if len(data) >= MMAP_THRESHOLD_BYTES:
+            return self.scan_buffer(data)
+
+        try:
+            content = decode_text(data)
+        except UnicodeDecodeError:
+            return []
+
+        return self.scan_text(content)
+
+    def scan_text(self, content: str) -> List[Finding]:
+        """
+        テキストをスキャンする
+
+        Args:
+            content: スキャンするテキスト
+
+        Returns:
+            検出結果のリスト [(ルール名, トークン, 行番号), ...]（ルール定義順・行番号順）
+        """
+        # 文字種はASCIIのみのため、UTF-8に符号化しても同じトークン・行番号になる
+        return self.scan_buffer(content.encode('utf-8', errors='surrogatepass'))
+
+    def scan_buffer(self, buffer: Union[bytes, mmap.mmap]) -> List[Finding]:
+        """
+        バイト列（メモリマップを含む）をスキャンする
+
+        行境界で区切った窓（SCAN_WINDOW_BYTES）ごとにバイト配列として評価するため、
+        巨大なファイルでも追加のメモリ使用量は窓の大きさに比例する程度に収まります。
+
+        Args:
+            buffer: スキャンするバイト列またはメモリマップ
+
+        Returns:
+            検出結果のリスト（scan_text と同じ形式）
+        """
+        compiled_rules = self._compiled_rules()
+        hits = []
+        for window_start, window_end in _line_aligned_windows(buffer, b'\n', SCAN_WINDOW_BYTES):
+            data = np.frombuffer(
+                buffer, dtype=np.uint8, count=window_end - window_start, offset=window_start
+            )
+            for index, compiled in enumerate(compiled_rules):
+                starts, ends = compiled.tokens(data)
+                # トークンの合計がおおよそ TOKEN_BATCH_BYTES になるようにまとめて評価する
+                batch_ids = np.cumsum(ends - starts) // TOKEN_BATCH_BYTES
+                boundaries = np.flatnonzero(np.diff(batch_ids)) + 1
+                for batch_starts, batch_ends in zip(
+                    np.split(starts, boundaries), np.split(ends, boundaries)
+                ):
+                    if not len(batch_starts):
+                        continue
+                    scores = compiled.scores(data, batch_starts, batch_ends)
+                    flagged = np.flatnonzero(scores >= compiled.rule.threshold)
+                    for token in flagged:
+                        hits.append((
+                            index,
+                            window_start + int(batch_starts[token]),
+                            window_start + int(batch_ends[token]),
+                        ))
+
+        return self._findings(buffer, hits)
+
+    def _findings(self, buffer, hits) -> List[Finding]:
+        """
+        検出したトークンからコメント行・除外する文字列を除き、行番号を付ける
+
+        Args:
+            buffer: スキャンした対象
+            hits: (ルール番号, 開始位置, 終了位置) のリスト
+
+        Returns:
+            検出結果のリスト
+        """
+        findings = []
+        lines = LineIndex(buffer, b'\n')
+        comment_prefixes = tuple(prefix.encode('utf-8') for prefix in self.comment_prefixes)
+        prefix_length = max((len(prefix) for prefix in comment_prefixes), default=0)
+        for index, start, end in sorted(hits, key=lambda hit: hit[1]):
+            # コメント行はスキップ（行頭からトークンの直後までの空白を除いた先頭を調べる）
+            line_start = buffer.rfind(b'\n', 0, start) + 1
+            head = bytes(buffer[line_start:start + prefix_length]).lstrip()
+            if head.startswith(comment_prefixes):
+                continue
+
+            value = bytes(buffer[start:end]).decode('ascii')
+            if value in self.allowlist:
+                continue
+
+            findings.append((index, start, lines.line_number(start), value))
+
+        findings.sort(key=lambda finding: (finding[0], finding[1]))
+        return [
+            (self.rules[index].name, value, line_num)
+            for index, _, line_num, value in findings
+        ]
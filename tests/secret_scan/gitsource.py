@@ -0,0 +1,321 @@
+"""
+Gitの差分・履歴を対象とするスキャン入力
+
+作業ツリーを走査する代わりに、ベースrefとの差分またはステージ済みの変更だけを
+Gitのローカルplumbingコマンドで列挙し、blobの内容を直接読み出します。
+pre-commit / pre-pushフックで変更分だけを検査するために使用します。
+
+履歴スキャンでは全refから到達可能なblobを重複なく1回ずつ読み出し、
+検出のあったblobだけをそれを追加したコミットとパスに対応付けます。
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+
+# 通常ファイルとして扱うGitのファイルモード（シンボリックリンク・サブモジュールは対象外）
+REGULAR_FILE_MODES = {"100644", "100755"}
+
+
+class GitBlob(NamedTuple):
+    """Gitのblob（ファイル内容）"""
+
+    path: str  # リポジトリルートからの相対パス（/区切り）
+    sha: str  # blobのオブジェクトID
+    data: bytes  # blobの内容
+
+
+class ChangedPath(NamedTuple):
+    """差分に含まれるファイル"""
+
+    path: str  # リポジトリルートからの相対パス（/区切り）
+    sha: str  # 変更後のblobのオブジェクトID
+
+
+class BlobIntroduction(NamedTuple):
+    """blobを追加（または変更により導入）したコミットとパス"""
+
+    commit: str  # コミットのオブジェクトID
+    path: str  # リポジトリルートからの相対パス（/区切り）
+
+
+def run_git(repo_root: Path, *args: str) -> bytes:
+    """
+    gitコマンドを実行して標準出力を返す
+
+    Args:
+        repo_root: リポジトリのルートディレクトリ
+        args: gitのサブコマンドと引数
+
+    Returns:
+        標準出力のバイト列
+
+    Raises:
+        subprocess.CalledProcessError: gitコマンドが失敗した場合
+    """
+    result = subprocess.run(
+        ["git", *args],
+        cwd=repo_root,
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def repository_root(path: Path) -> Path:
+    """
+    指定したパスを含むGitリポジトリのルートディレクトリを返す
+
+    Args:
+        path: リポジトリ内の任意のパス
+
+    Returns:
+        リポジトリのルートディレクトリ
+    """
+    output = run_git(path, "rev-parse", "--show-toplevel")
+    return Path(output.decode("utf-8").strip())
+
+
+def changed_paths(
+    repo_root: Path, base_ref: Optional[str] = None, staged: bool = False
+) -> List[ChangedPath]:
+    """
+    変更されたファイルと変更後のblobを列挙する
+
+    Args:
+        repo_root: リポジトリのルートディレクトリ
+        base_ref: 比較するベースref（HEADとのマージベースからの差分を対象とする）
+        staged: Trueの場合はステージ済みの変更（HEADとインデックスの差分）を対象とする
+
+    Returns:
+        変更後のファイルのリスト（追加・変更・型変更のみ。削除は含まない）
+    """
+    if staged:
+        revision_args = ["--cached"]
+    elif base_ref:
+        revision_args = [f"{base_ref}...HEAD"]
+    else:
+        raise ValueError("base_ref または staged のいずれかを指定してください")
+
+    output = run_git(
+        repo_root,
+        "diff", "--raw", "-z", "--no-abbrev", "--no-renames", "--diff-filter=ACMT",
+        *revision_args,
+    )
+    return _parse_raw_diff(output)
+
+
+def _parse_raw_diff(output: bytes) -> List[ChangedPath]:
+    """
+    git diff --raw -z の出力から変更後の通常ファイルを取り出す
+
+    Args:
+        output: --raw -z 形式の出力
+
+    Returns:
+        変更後のファイルのリスト（通常ファイルのみ）
+    """
+    # 出力形式: ":<旧モード> <新モード> <旧SHA> <新SHA> <状態>\0<パス>\0" の繰り返し
+    tokens = output.split(b"\0")
+    changes = []
+    for header, path in zip(tokens[0::2], tokens[1::2]):
+        header = header.lstrip(b"\n")
+        if not header.startswith(b":"):
+            continue
+        _, new_mode, _, new_sha, _ = header[1:].decode("ascii").split(" ")
+        if new_mode not in REGULAR_FILE_MODES:
+            continue
+        changes.append(ChangedPath(path.decode("utf-8", errors="surrogateescape"), new_sha))
+    return changes
+
+
+def history_blobs(repo_root: Path) -> List[ChangedPath]:
+    """
+    全refから到達可能なblobを重複なく列挙する
+
+    git rev-list --objects は各オブジェクトを1回だけ出力するため、
+    数千のコミットに現れるblobも1回だけ列挙されます。
+
+    Args:
+        repo_root: リポジトリのルートディレクトリ
+
+    Returns:
+        blobのリスト（パスはそのblobが最初に見つかったパス）
+    """
+    listing = run_git(repo_root, "rev-list", "--objects", "--all")
+    if not listing:
+        return []
+
+    # オブジェクトの種類で絞り込む（コミット・ツリーを除く）
+    result = subprocess.run(
+        ["git", "cat-file", "--batch-check=%(objecttype) %(objectname) %(rest)"],
+        cwd=repo_root,
+        input=listing,
+        capture_output=True,
+        check=True,
+    )
+
+    blobs = []
+    for line in result.stdout.split(b"\n"):
+        object_type, _, rest = line.partition(b" ")
+        if object_type != b"blob":
+            continue
+        sha, _, path = rest.partition(b" ")
+        blobs.append(ChangedPath(path.decode("utf-8", errors="surrogateescape"), sha.decode("ascii")))
+    return blobs
+
+
+def blob_introductions(repo_root: Path, sha: str) -> List[BlobIntroduction]:
+    """
+    blobを追加したコミットとパスを列挙する
+
+    git log --find-object でblobの出現数が変わるコミットを求め、
+    変更後がそのblobとなる変更（追加・変更）だけを取り出します。
+
+    Args:
+        repo_root: リポジトリのルートディレクトリ
+        sha: blobのオブジェクトID
+
+    Returns:
+        (コミット, パス) のリスト（新しいコミットから順）
+    """
+    output = run_git(
+        repo_root,
+        "log", "--all", "--no-renames", "--raw", "--no-abbrev", "-z",
+        "--format=%x01%H", f"--find-object={sha}",
+    )
+
+    introductions = []
+    # 出力形式: "\x01<コミット>\0\n" に続いて --raw -z 形式の変更
+    for record in output.split(b"\x01")[1:]:
+        commit, _, raw = record.partition(b"\0")
+        for change in _parse_raw_diff(raw):
+            if change.sha == sha:
+                introductions.append(BlobIntroduction(commit.decode("ascii"), change.path))
+    return introductions
+
+
+def read_blobs(repo_root: Path, changes: List[ChangedPath]) -> Iterator[GitBlob]:
+    """
+    git cat-file --batch でblobの内容を順に読み出す
+
+    Args:
+        repo_root: リポジトリのルートディレクトリ
+        changes: 読み出すファイルとblob
+
+    Yields:
+        GitBlob
+    """
+    if not changes:
+        return
+
+    process = subprocess.Popen(
+        ["git", "cat-file", "--batch"],
+        cwd=repo_root,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+    )
+    try:
+        for change in changes:
+            # 1件ずつ要求と応答を交互に行う（パイプの詰まりを防ぐ）
+            process.stdin.write(change.sha.encode("ascii") + b"\n")
+            process.stdin.flush()
+
+            header = process.stdout.readline().decode("ascii").split()
+            if len(header) != 3 or header[1] != "blob":
+                # missing（浅いクローンなど）やblob以外は読み飛ばす
+                continue
+            size = int(header[2])
+            data = process.stdout.read(size)
+            process.stdout.read(1)  # 末尾の改行
+            yield GitBlob(change.path, change.sha, data)
+    finally:
+        process.stdin.close()
+        process.stdout.close()
+        process.wait()
+
+
+class GitChangeSet:
+    """
+    差分スキャンの対象（反復するたびにblobを遅延読み出しする）
+
+    環境変数 SECRET_SCAN_BASE（ベースref）または SECRET_SCAN_STAGED=1 で有効化します。
+    """
+
+    def __init__(self, repo_root: Path, base_ref: Optional[str] = None, staged: bool = False):
+        """
+        Args:
+            repo_root: リポジトリ内の任意のパス
+            base_ref: 比較するベースref
+            staged: ステージ済みの変更を対象とする場合True
+        """
+        self.repo_root = repository_root(repo_root)
+        self.base_ref = base_ref
+        self.staged = staged
+        self._changes: Optional[List[ChangedPath]] = None
+
+    @property
+    def changes(self) -> List[ChangedPath]:
+        """変更されたファイルのリスト"""
+        if self._changes is None:
+            self._changes = changed_paths(self.repo_root, self.base_ref, self.staged)
+        return self._changes
+
+    def __iter__(self) -> Iterator[GitBlob]:
+        return read_blobs(self.repo_root, self.changes)
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def locate(self, blob: GitBlob) -> List[str]:
+        """blobの表示用の位置（パス）を返す"""
+        return [blob.path]
+
+    def describe(self) -> str:
+        """差分の範囲を説明する文字列"""
+        return "ステージ済みの変更" if self.staged else f"{self.base_ref}...HEAD の差分"
+
+
+class GitHistory:
+    """
+    履歴スキャンの対象（全refから到達可能なblobを1回ずつ遅延読み出しする）
+
+    環境変数 SECRET_SCAN_HISTORY=1 で有効化します。
+    """
+
+    def __init__(self, repo_root: Path):
+        """
+        Args:
+            repo_root: リポジトリ内の任意のパス
+        """
+        self.repo_root = repository_root(repo_root)
+        self._blobs: Optional[List[ChangedPath]] = None
+
+    @property
+    def blobs(self) -> List[ChangedPath]:
+        """到達可能なblobのリスト"""
+        if self._blobs is None:
+            self._blobs = history_blobs(self.repo_root)
+        return self._blobs
+
+    def __iter__(self) -> Iterator[GitBlob]:
+        return read_blobs(self.repo_root, self.blobs)
+
+    def __len__(self) -> int:
+        return len(self.blobs)
+
+    def locate(self, blob: GitBlob) -> List[str]:
+        """
+        blobを追加したコミットとパスを "<コミット>:<パス>" の形式で返す
+
+        マージでのみ導入されたblobなどコミットを特定できない場合は、blobのパスを返します。
+        """
+        introductions = blob_introductions(self.repo_root, blob.sha)
+        if not introductions:
+            return [blob.path]
+        return [f"{commit[:12]}:{path}" for commit, path in introductions]
+
+    def describe(self) -> str:
+        """スキャン範囲を説明する文字列"""
+        return f"全履歴（{len(self)}個のblob）"
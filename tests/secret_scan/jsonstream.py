@@ -0,0 +1,267 @@
+"""
+JSONのストリーミング解析
+
+ファイル全体を読み込まずに、一定の大きさのブロックごとに読みながらJSONを字句解析し、
+値の開始・終了とスカラー値をJSONパスとともにイベントとして列挙します。
+巨大な文字列（Base64のデータなど）は先頭の MAX_STRING_BYTES だけを保持し、残りは読み飛ばすため、
+メモリ使用量はドキュメントの大きさによらず「ブロックの大きさ + 入れ子の深さ」程度に収まります。
+"""
+
+import json
+import re
+from typing import BinaryIO, Iterator, List, NamedTuple, Tuple, Union
+
+
+# 1回に読み込むブロックの大きさ
+READ_BLOCK_BYTES = 1024 * 1024
+
+# 文字列値として保持する最大の大きさ（これを超える部分は読み飛ばす）
+MAX_STRING_BYTES = 64 * 1024
+
+# イベントの種類
+START_MAP = "start_map"
+END_MAP = "end_map"
+START_ARRAY = "start_array"
+END_ARRAY = "end_array"
+SCALAR = "scalar"
+
+# JSONパスの要素（オブジェクトのキーまたは配列の添字）
+PathElement = Union[str, int]
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_WHITESPACE_BYTES = frozenset(b' \t\n\r')
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_NUMBER = re.compile(rb'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+_TRAILING_ESCAPE = re.compile(rb'(\\+)(?:u[0-9a-fA-F]{0,3})?$')
+_NUMBER_CHARS = re.compile(rb'[-+.0-9eE]*')
+_LITERALS = {b't': (b'true', True), b'f': (b'false', False), b'n': (b'null', None)}
+
+
+class JsonEvent(NamedTuple):
+    """ストリーミング解析のイベント"""
+
+    kind: str  # START_MAP, END_MAP, START_ARRAY, END_ARRAY, SCALAR
+    path: Tuple[PathElement, ...]  # 値のJSONパス
+    value: object = None  # スカラー値（SCALAR のみ）
+    truncated: bool = False  # 文字列が MAX_STRING_BYTES で切り詰められた場合True
+
+
+class JsonStreamError(ValueError):
+    """JSONとして不正な入力"""
+
+
+def format_path(path: Tuple[PathElement, ...]) -> str:
+    """
+    JSONパスを $.a.b[0]["c d"] 形式の文字列にする
+
+    Args:
+        path: JSONパスの要素
+
+    Returns:
+        JSONパスの文字列
+    """
+    parts = ["$"]
+    for element in path:
+        if isinstance(element, int):
+            parts.append(f"[{element}]")
+        elif re.fullmatch(r'[A-Za-z_][A-Za-z0-9_-]*', element):
+            parts.append(f".{element}")
+        else:
+            parts.append(f"[{json.dumps(element, ensure_ascii=False)}]")
+    return "".join(parts)
+
+
+class _Reader:
+    """ブロック単位の読み込みバッファ"""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.buffer = b''
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """未処理の部分を残して次のブロックを読み込む（読み込めた場合True）"""
+        if self.eof:
+            return False
+        block = self.stream.read(READ_BLOCK_BYTES)
+        if not block:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + block
+        self.position = 0
+        return True
+
+    def next_byte(self) -> bytes:
+        """空白を読み飛ばして次のバイトを返す（入力の終わりでは b''）"""
+        while True:
+            if self.position < len(self.buffer) and self.buffer[self.position] not in _WHITESPACE_BYTES:
+                return self.buffer[self.position:self.position + 1]
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position:self.position + 1]
+            if not self.fill():
+                return b''
+
+    def read_string(self) -> Tuple[str, bool]:
+        """
+        文字列（開始の " の位置から）を読み込む
+
+        Returns:
+            (文字列, 切り詰めた場合True)
+        """
+        self.position += 1
+        kept = []
+        kept_size = 0
+        truncated = False
+        while True:
+            end = _STRING_BODY.match(self.buffer, self.position).end()
+            chunk = self.buffer[self.position:end]
+            if kept_size < MAX_STRING_BYTES:
+                kept.append(chunk[:MAX_STRING_BYTES - kept_size])
+            kept_size += len(chunk)
+            truncated = truncated or kept_size > MAX_STRING_BYTES
+            self.position = end
+
+            if end < len(self.buffer) and self.buffer[end:end + 1] == b'"':
+                self.position = end + 1
+                break
+            # ブロックの終わり（末尾の \ はエスケープの途中のため次のブロックと合わせて読む）
+            if truncated:
+                # 読み飛ばした部分は保持しない
+                self.buffer = self.buffer[self.position:]
+                self.position = 0
+            if not self.fill():
+                raise JsonStreamError("文字列が閉じられていません")
+
+        raw = b''.join(kept)
+        if truncated:
+            # 切り詰めた位置でエスケープ・UTF-8の文字が途切れないよう、末尾の不完全な部分を除く
+            escape = _TRAILING_ESCAPE.search(raw)
+            if escape and len(escape.group(1)) % 2 == 1:
+                raw = raw[:escape.end(1) - 1]
+            raw = raw.decode("utf-8", "ignore").encode("utf-8")
+        try:
+            if b'\\' not in raw:
+                # エスケープを含まない文字列（大半の値）はデコードのみ
+                return raw.decode("utf-8"), truncated
+            return json.loads(b'"' + raw + b'"'), truncated
+        except (ValueError, UnicodeDecodeError) as error:
+            raise JsonStreamError(f"不正な文字列です: {error}") from None
+
+    def read_number(self) -> bytes:
+        """数値を読み込む（ブロックの境界をまたぐ場合は読み足す）"""
+        while True:
+            end = _NUMBER_CHARS.match(self.buffer, self.position).end()
+            if end < len(self.buffer) or not self.fill():
+                break
+        match = _NUMBER.match(self.buffer, self.position)
+        if match is None or match.end() != end:
+            raise JsonStreamError(f"不正な数値です（位置 {self.position}）")
+        self.position = end
+        return match.group(0)
+
+    def expect(self, literal: bytes) -> None:
+        """リテラル（true, false, null）を読み込む"""
+        while len(self.buffer) - self.position < len(literal) and self.fill():
+            pass
+        if self.buffer[self.position:self.position + len(literal)] != literal:
+            raise JsonStreamError(f"不正なトークンです（位置 {self.position}）")
+        self.position += len(literal)
+
+
+def iter_events(stream: BinaryIO) -> Iterator[JsonEvent]:
+    """
+    JSONドキュメントをストリーミングで解析してイベントを列挙する
+
+    Args:
+        stream: バイナリモードで開いた入力（ファイル・標準入力・パイプ）
+
+    Yields:
+        イベント（ドキュメント順）
+
+    Raises:
+        JsonStreamError: JSONとして不正な場合
+    """
+    reader = _Reader(stream)
+    path: List[PathElement] = []
+    # 開いているコンテナの種類（'{' または '['）
+    containers: List[bytes] = []
+    # 値を読む状態: "value"（値）, "key"（オブジェクトのキー）, "after"（値の後の , または閉じ括弧）
+    state = "value"
+
+    while True:
+        byte = reader.next_byte()
+        if not byte:
+            if containers or state == "value":
+                raise JsonStreamError("ドキュメントが途中で終わっています")
+            return
+
+        if state == "after":
+            if not containers:
+                raise JsonStreamError(f"ドキュメントの後に余分なデータがあります（位置 {reader.position}）")
+            reader.position += 1
+            if byte == b',':
+                if containers[-1] == b'[':
+                    path[-1] += 1
+                    state = "value"
+                else:
+                    path.pop()
+                    state = "key"
+            elif byte == b']' and containers[-1] == b'[':
+                containers.pop()
+                path.pop()
+                yield JsonEvent(END_ARRAY, tuple(path))
+            elif byte == b'}' and containers[-1] == b'{':
+                containers.pop()
+                path.pop()
+                yield JsonEvent(END_MAP, tuple(path))
+            else:
+                raise JsonStreamError(f"予期しない文字です: {byte!r}（位置 {reader.position - 1}）")
+            continue
+
+        if state == "key":
+            if byte != b'"':
+                raise JsonStreamError(f"オブジェクトのキーが必要です（位置 {reader.position}）")
+            key, _ = reader.read_string()
+            if reader.next_byte() != b':':
+                raise JsonStreamError(f": が必要です（位置 {reader.position}）")
+            reader.position += 1
+            path.append(key)
+            state = "value"
+            continue
+
+        # 値
+        if byte == b'{':
+            reader.position += 1
+            yield JsonEvent(START_MAP, tuple(path))
+            if reader.next_byte() == b'}':
+                reader.position += 1
+                yield JsonEvent(END_MAP, tuple(path))
+                state = "after"
+            else:
+                containers.append(b'{')
+                state = "key"
+            continue
+        if byte == b'[':
+            reader.position += 1
+            yield JsonEvent(START_ARRAY, tuple(path))
+            if reader.next_byte() == b']':
+                reader.position += 1
+                yield JsonEvent(END_ARRAY, tuple(path))
+                state = "after"
+            else:
+                containers.append(b'[')
+                path.append(0)
+            continue
+
+        if byte == b'"':
+            value, truncated = reader.read_string()
+            yield JsonEvent(SCALAR, tuple(path), value, truncated)
+        elif byte in _LITERALS:
+            literal, value = _LITERALS[byte]
+            reader.expect(literal)
+            yield JsonEvent(SCALAR, tuple(path), value)
+        else:
+            yield JsonEvent(SCALAR, tuple(path), json.loads(reader.read_number()))
+        state = "after"
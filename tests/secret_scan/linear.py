@@ -0,0 +1,162 @@
+"""
+線形時間の正規表現バックエンド（RE2）
+
+google-re2 がインストールされている場合、RE2で表現でき、かつPythonの re と
+一致判定が同一になるルールをRE2でコンパイルします。RE2はバックトラックを行わないため、
+照合時間は対象の長さに対して線形です。RE2で照合するルールは改行をまたがないように
+書き換え、対象全体を1回の走査で照合します。
+
+否定先読み・後読みを含むルールなど、RE2で表現できないルールは従来の re で照合します。
+"""
+
+import re
+from typing import Optional
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10以前
+    import sre_parse
+
+try:
+    import re2
+except ImportError:  # 任意の依存パッケージ（google-re2）
+    re2 = None
+
+
+# Pythonの re の \s に一致する文字から改行を除いたもの
+# （str: str.isspace() と同じ集合、bytes: ASCIIの空白類）
+_PYTHON_TEXT_SPACE = (
+    "\t\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+_PYTHON_BYTES_SPACE = "\t\x0b\x0c\r "
+
+# RE2でも同じ意味になるエスケープ（英字）。これ以外の英数字のエスケープを含むパターンは変換しない
+_PORTABLE_ESCAPES = set("tfvr")
+# バイト列向け（ASCIIの文字種）でのみ同じ意味になるエスケープ
+_ASCII_CLASS_ESCAPES = {"d": "0-9", "w": "0-9A-Za-z_"}
+
+
+def is_available() -> bool:
+    """RE2バックエンドが利用可能か（google-re2 がインストールされているか）を返す"""
+    return re2 is not None
+
+
+def translate_for_re2(pattern: str, binary: bool) -> Optional[str]:
+    """
+    Pythonの正規表現を、改行を含まない一致だけを返すRE2の正規表現に書き換える
+
+    スキャンは行単位のため、ルールは改行をまたいで一致してはいけません。
+    \s・否定の文字クラスから改行を除くことで、対象全体を1回走査するだけで
+    行ごとの re.findall と同じ一致が得られるようにします。
+    あわせて、RE2の \s は垂直タブやUnicodeの空白類を含まないため、Pythonの \s と
+    同じ文字集合に展開します。
+
+    Args:
+        pattern: Pythonの正規表現
+        binary: バイト列向けの場合True
+
+    Returns:
+        RE2向けの正規表現。同じ意味に変換できない場合（改行・行頭/行末・Unicodeの文字種・
+        数値によるエスケープを含む場合など）はNone
+    """
+    space = _PYTHON_BYTES_SPACE if binary else _PYTHON_TEXT_SPACE
+    parts = []
+    in_class = False
+    class_negated = False
+    class_start = -1
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            escaped = pattern[index + 1:index + 2]
+            if escaped == "s":
+                parts.append(space if in_class else f"[{space}]")
+            elif escaped == "S" and not in_class:
+                parts.append(f"[^{space}\\n]")
+            elif escaped.lower() in _ASCII_CLASS_ESCAPES and binary:
+                characters = _ASCII_CLASS_ESCAPES[escaped.lower()]
+                if escaped.isupper():
+                    if in_class:
+                        return None
+                    parts.append(f"[^{characters}\\n]")
+                else:
+                    parts.append(characters if in_class else f"[{characters}]")
+            elif escaped == "n" and in_class and class_negated:
+                # 否定の文字クラスの改行はもともと除外されている
+                parts.append("\\n")
+            elif escaped in _PORTABLE_ESCAPES or (escaped and not escaped.isalnum()):
+                if in_class and (parts[-1:] == ["-"] or pattern.startswith("-", index + 2)):
+                    # エスケープを端点とする範囲は改行を含み得るため変換しない
+                    return None
+                parts.append(pattern[index:index + 2])
+            else:
+                return None
+            index += 2
+            continue
+
+        if in_class:
+            # 先頭（^ の直後を含む）の ] は文字として扱う
+            if char == "]" and index > class_start + 1 and not (
+                index == class_start + 2 and pattern[class_start + 1] == "^"
+            ):
+                in_class = False
+        elif char == "[":
+            in_class = True
+            class_start = index
+            class_negated = pattern.startswith("[^", index)
+            if class_negated:
+                # 否定の文字クラスは改行に一致させない
+                parts.append("[^\\n")
+                index += 2
+                continue
+        elif char in "^$\n":
+            return None
+        parts.append(char)
+        index += 1
+    return "".join(parts)
+
+
+def compile_linear(pattern: str, flags: int, binary: bool):
+    """
+    ルールをRE2でコンパイルする
+
+    RE2と re で一致判定が異なり得るルールはコンパイルしません。
+
+    - re.IGNORECASE 以外のフラグを使うルール
+    - str向けで re.IGNORECASE を使うルール（ı, ſ などの同一視の規則が異なる）
+    - 空文字列に一致し得るルール（空一致の後の探索位置の規則が異なる）
+    - 改行をまたがない形に書き換えられないルール（translate_for_re2）
+    - RE2で表現できないルール（否定先読み・後読み、後方参照など）
+
+    Args:
+        pattern: Pythonの正規表現
+        flags: コンパイルフラグ
+        binary: バイト列向けの場合True（各バイトを1文字として扱う）
+
+    Returns:
+        RE2のコンパイル済みパターン。RE2を使えない場合はNone
+    """
+    if re2 is None:
+        return None
+    if flags & ~re.IGNORECASE:
+        return None
+    if flags & re.IGNORECASE and not (binary and pattern.isascii()):
+        return None
+    if sre_parse.parse(pattern, flags).getwidth()[0] == 0:
+        return None
+
+    translated = translate_for_re2(pattern, binary)
+    if translated is None:
+        return None
+
+    options = re2.Options()
+    options.log_errors = False
+    options.case_sensitive = not flags & re.IGNORECASE
+    if binary:
+        # バイト列向けのルールはUTF-8に符号化したパターンを1バイト1文字として照合する
+        options.encoding = re2.Options.Encoding.LATIN1
+        translated = translated.encode("utf-8")
+    try:
+        return re2.compile(translated, options)
+    except re2.error:
+        return None
@@ -0,0 +1,152 @@
+"""
+プロセスプールによる並列ファイルスキャン
+
+正規表現によるスキャンはCPUバウンドのため、ファイルリストをチャンクに分けて
+プロセスプールで並列に処理します。検出結果は入力順（決定的な順序）で返します。
+小さなツリーではプロセス起動のコストが上回るため直列処理にフォールバックします。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from .cache import content_digest
+from .engine import Finding, Ruleset, read_content
+
+if TYPE_CHECKING:
+    from .cache import ScanCache
+
+
+# 並列化する最小のファイル数・合計サイズ（これ未満は直列処理）
+MIN_PARALLEL_FILES = 64
+MIN_PARALLEL_BYTES = 4 * 1024 * 1024
+
+# ワーカーあたりのチャンク数（負荷の偏りを均すため、ワーカー数より多めに分割する）
+CHUNKS_PER_WORKER = 4
+
+# ワーカープロセス内のルールセット（プール初期化時に1回だけ受け取る）
+_worker_ruleset: Optional[Ruleset] = None
+
+
+def default_worker_count() -> int:
+    """
+    並列スキャンのワーカー数を返す
+
+    環境変数 SECRET_SCAN_WORKERS で指定できます（1で直列処理）。
+    未指定の場合はCPUコア数を使用します。
+    """
+    configured = os.getenv("SECRET_SCAN_WORKERS")
+    if configured:
+        return max(int(configured), 1)
+    return os.cpu_count() or 1
+
+
+def _initialize_worker(ruleset: Ruleset) -> None:
+    """ワーカープロセスの初期化（ルールセットを保持する）"""
+    global _worker_ruleset
+    _worker_ruleset = ruleset
+
+
+def _scan_chunk(
+    chunk: List[Tuple[int, str]]
+) -> List[Tuple[int, Optional[Tuple[int, int, str]], List[Finding]]]:
+    """
+    ワーカープロセスでファイルのチャンクをスキャンする
+
+    Args:
+        chunk: [(入力順の番号, ファイルパス), ...]
+
+    Returns:
+        [(入力順の番号, (更新時刻, サイズ, 内容ハッシュ) または None, 検出結果), ...]
+    """
+    results = []
+    for index, file_path in chunk:
+        try:
+            stat = os.stat(file_path)
+            with read_content(file_path) as data:
+                if data is None:
+                    # バイナリファイルはスキップ（キャッシュにも記録しない）
+                    results.append((index, None, []))
+                    continue
+                findings = _worker_ruleset.scan_data(data)
+                digest = content_digest(data)
+        except OSError:
+            # 読み取り不可ファイルはスキップ
+            results.append((index, None, []))
+            continue
+        results.append((index, (stat.st_mtime_ns, stat.st_size, digest), findings))
+    return results
+
+
+def _chunked(items: List[Tuple[int, str]], chunk_count: int) -> List[List[Tuple[int, str]]]:
+    """リストをほぼ同じ大きさのチャンクに分割する"""
+    chunk_size = max(-(-len(items) // chunk_count), 1)
+    return [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+
+def scan_paths(
+    paths: Sequence[Path],
+    ruleset: Ruleset,
+    cache: Optional["ScanCache"] = None,
+    workers: Optional[int] = None,
+    min_parallel_files: int = MIN_PARALLEL_FILES,
+    min_parallel_bytes: int = MIN_PARALLEL_BYTES,
+) -> List[Tuple[Path, List[Finding]]]:
+    """
+    複数のファイルを（必要に応じて並列に）スキャンする
+
+    Args:
+        paths: スキャンするファイルのパス
+        ruleset: 使用するルールセット
+        cache: スキャンキャッシュ（キャッシュ済みのファイルはワーカーに渡さない）
+        workers: ワーカー数（未指定の場合は default_worker_count()）
+        min_parallel_files: 並列化する最小のファイル数
+        min_parallel_bytes: 並列化する最小の合計サイズ
+
+    Returns:
+        [(ファイルパス, 検出結果), ...]（入力順）
+    """
+    results: List[Optional[List[Finding]]] = [None] * len(paths)
+    pending: List[Tuple[int, str]] = []
+    pending_bytes = 0
+
+    for index, file_path in enumerate(paths):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            results[index] = []
+            continue
+        if cache is not None:
+            cached = cache.cached_findings(file_path, stat, ruleset)
+            if cached is not None:
+                results[index] = cached
+                continue
+        pending.append((index, str(file_path)))
+        pending_bytes += stat.st_size
+
+    worker_count = workers if workers is not None else default_worker_count()
+    if (
+        worker_count <= 1
+        or len(pending) < max(min_parallel_files, 2)
+        or pending_bytes < min_parallel_bytes
+    ):
+        # 小さなツリーは直列処理（プロセス起動のコストを避ける）
+        for index, _ in pending:
+            results[index] = ruleset.scan_path(paths[index], cache)
+    else:
+        chunks = _chunked(pending, worker_count * CHUNKS_PER_WORKER)
+        with ProcessPoolExecutor(
+            max_workers=min(worker_count, len(chunks)),
+            initializer=_initialize_worker,
+            initargs=(ruleset,),
+        ) as executor:
+            # map は投入順に結果を返すため、出力順は決定的になる
+            for chunk_results in executor.map(_scan_chunk, chunks):
+                for index, file_state, findings in chunk_results:
+                    results[index] = findings
+                    if cache is not None and file_state is not None:
+                        mtime_ns, size, digest = file_state
+                        cache.record(paths[index], mtime_ns, size, digest, ruleset, findings)
+
+    return [(file_path, findings or []) for file_path, findings in zip(paths, results)]
@@ -0,0 +1,178 @@
+"""
+リテラル前段フィルタ
+
+各ルールの正規表現から「一致の先頭に必ず現れるリテラル」（アンカー）を抽出し、
+高コストな正規表現をアンカーの出現位置でのみ実行するための前段フィルタです。
+
+Pythonの標準ライブラリにはAho-Corasickオートマトンがないため、リテラルごとの
+str.find（C実装の高速部分文字列探索）で出現位置を列挙します。リテラル数が少ない
+（10前後）ルールセットでは、純Python実装のオートマトンや正規表現の選択より高速です。
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10以前
+    import sre_constants
+    import sre_parse
+
+
+# アンカーとして採用するリテラルの最小長（短すぎるリテラルは絞り込み効果がない）
+MIN_ANCHOR_LENGTH = 3
+
+# 1ルールあたりのアンカー候補の上限（選択の組み合わせ爆発を防ぐ）
+MAX_ANCHORS_PER_RULE = 32
+
+# re.IGNORECASEでASCII英字と同一視されるが、str.lowerではASCIIにならない文字
+# （İ は小文字化で2文字になるため fold_case で長さの不一致として扱う。K は k に小文字化される）
+_IGNORECASE_ASCII_EQUIVALENTS = {
+    '\u0131': 'i',  # ı（点なしi）
+    '\u017f': 's',  # ſ（長いs）
+}
+
+
+def _literal_prefixes(items) -> Tuple[Optional[Set[str]], bool]:
+    """
+    パース済みパターンの一致が必ず始まるリテラル接頭辞の集合を求める
+
+    Args:
+        items: sre_parseでパースしたパターン（SubPatternまたはそのリスト）
+
+    Returns:
+        (接頭辞の集合, パターン全体がリテラルのみで構成されているか)
+        接頭辞の集合が大きくなりすぎた場合はNone
+    """
+    prefixes = {""}
+    for op, av in items:
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT, sre_constants.AT):
+            # ゼロ幅の要素は一致文字列に影響しない
+            continue
+        if op is sre_constants.LITERAL:
+            prefixes = {prefix + chr(av) for prefix in prefixes}
+            continue
+
+        if op is sre_constants.SUBPATTERN:
+            alternatives, complete = _literal_prefixes(av[-1])
+        elif op is sre_constants.BRANCH:
+            alternatives, complete = set(), True
+            for branch in av[1]:
+                branch_prefixes, branch_complete = _literal_prefixes(branch)
+                if branch_prefixes is None:
+                    return None, False
+                alternatives |= branch_prefixes
+                complete = complete and branch_complete
+        elif op is sre_constants.IN and all(
+            item_op is sre_constants.LITERAL for item_op, _ in av
+        ):
+            # 1文字の選択（a|b）はsreによりINに最適化される
+            alternatives, complete = {chr(item_av) for _, item_av in av}, True
+        else:
+            return prefixes, False
+
+        if alternatives is None:
+            return None, False
+        prefixes = {prefix + alternative for prefix in prefixes for alternative in alternatives}
+        if len(prefixes) > MAX_ANCHORS_PER_RULE:
+            return None, False
+        if not complete:
+            return prefixes, False
+
+    return prefixes, True
+
+
+def extract_anchors(pattern: str, flags: int = 0) -> Optional[Tuple[str, ...]]:
+    """
+    ルールの正規表現からアンカーとなるリテラルを抽出する
+
+    Args:
+        pattern: ルールの正規表現
+        flags: コンパイルフラグ（re.IGNORECASEの場合は小文字化したリテラルを返す）
+
+    Returns:
+        アンカーリテラルのタプル。抽出できない場合（先頭が文字クラスなど）はNone
+    """
+    prefixes, _ = _literal_prefixes(sre_parse.parse(pattern, flags))
+    if not prefixes or min(len(prefix) for prefix in prefixes) < MIN_ANCHOR_LENGTH:
+        return None
+    if flags & re.IGNORECASE:
+        if not all(prefix.isascii() for prefix in prefixes):
+            # 非ASCIIリテラルは fold_case による同一視が保証できない
+            return None
+        prefixes = {prefix.lower() for prefix in prefixes}
+    return tuple(sorted(prefixes))
+
+
+def fold_case(content: str) -> Optional[str]:
+    """
+    大文字小文字を区別しないルールセット用に、位置を保ったまま小文字化する
+
+    Args:
+        content: 元のテキスト
+
+    Returns:
+        小文字化したテキスト（元のテキストと同じ位置対応）。
+        小文字化で文字数が変わる場合は位置が対応しないためNone
+    """
+    lowered = content.lower()
+    if len(lowered) != len(content):
+        return None
+    if not content.isascii():
+        for char, ascii_char in _IGNORECASE_ASCII_EQUIVALENTS.items():
+            if char in lowered:
+                lowered = lowered.replace(char, ascii_char)
+    return lowered
+
+
+class LiteralPrefilter:
+    """
+    複数リテラルの出現位置を列挙する前段フィルタ
+
+    ルールごとのアンカーを「リテラル → ルール番号」の表にまとめ、
+    テキスト中の全出現位置と、その位置で照合すべきルールを返します。
+    """
+
+    def __init__(self, anchors: Sequence[Optional[Tuple[str, ...]]]):
+        """
+        Args:
+            anchors: ルール番号順のアンカー（アンカーを持たないルールはNone）
+        """
+        table: Dict[str, List[int]] = {}
+        for index, rule_anchors in enumerate(anchors):
+            for literal in rule_anchors or ():
+                table.setdefault(literal, []).append(index)
+        self.literals = [(literal, tuple(indices)) for literal, indices in sorted(table.items())]
+
+    def __bool__(self) -> bool:
+        return bool(self.literals)
+
+    def occurrences(
+        self, haystack, start: int = 0, end: Optional[int] = None
+    ) -> List[Tuple[int, Tuple[int, ...]]]:
+        """
+        リテラルの出現位置を列挙する
+
+        Args:
+            haystack: 探索対象のテキストまたはバイト列
+                （大文字小文字を区別しないルールセットでは小文字化済み）
+            start: 探索範囲の開始位置
+            end: 探索範囲の終了位置（省略時は末尾まで）
+
+        Returns:
+            [(出現位置, 照合すべきルール番号のタプル), ...]（位置の昇順）
+        """
+        if end is None:
+            end = len(haystack)
+
+        found = []
+        for literal, indices in self.literals:
+            find = haystack.find
+            position = find(literal, start, end)
+            while position != -1:
+                found.append((position, indices))
+                position = find(literal, position + 1, end)
+
+        found.sort()
+        return found
@@ -0,0 +1,231 @@
+"""
+ログのストリーミングマスク
+
+ツールが書き出すログ（terraform plan の出力、scripts/log-errors.sh のエラーログなど）を
+ディスクに書き込む前に、シークレットスキャンのルールに一致した値を伏せ字にします。
+入力はチャンク単位で受け取り、行境界までを1回ずつスキャンして書き出します。
+改行のない長い行は末尾の OVERLAP_CHARS 文字を次のチャンクに持ち越して区切るため、
+チャンクの境界をまたぐ値も取りこぼさず、数GBのログも一定のメモリで1パスで処理できます。
+
+秘密鍵（-----BEGIN ... PRIVATE KEY-----）は見出しの後ろの本文も -----END まで伏せ字にします。
+パスワードなど引用符で囲んだ機密情報の値は、先頭の文字も残さず値全体を伏せ字にします。
+"""
+
+import codecs
+import re
+from typing import BinaryIO, List, Optional, TextIO, Tuple
+
+from .client import mask
+from .engine import Ruleset
+from .rules import REDACTION_RULESET, SENSITIVE_VALUE_PATTERNS
+
+
+# 1回に読み込むブロックの大きさ
+READ_BLOCK_BYTES = 1024 * 1024
+
+# 改行のない行をこの文字数まで保持し、超えた場合は途中で区切って書き出す
+MAX_PENDING_CHARS = 1024 * 1024
+
+# 改行のない行を途中で区切るときに次のチャンクへ持ち越す文字数（1つの値の長さの上限の目安）
+OVERLAP_CHARS = 4096
+
+# 秘密鍵の本文の終わり
+_PRIVATE_KEY_END = "-----END"
+
+# 秘密鍵の本文のうち伏せ字にする文字（改行・空白は残す）
+_NON_SPACE = re.compile(r'\S')
+
+# 値全体を伏せ字にするルール（先頭4文字を残すと短いパスワードなどはほとんど見えてしまう）
+_FULLY_MASKED = frozenset(name for _, name in SENSITIVE_VALUE_PATTERNS)
+
+
+class StreamRedactor:
+    """
+    チャンク単位でテキストを受け取り、ルールに一致した値を伏せ字にして返す
+
+    使用例:
+        redactor = StreamRedactor()
+        for chunk in chunks:
+            output.write(redactor.feed(chunk))
+        output.write(redactor.close())
+    """
+
+    def __init__(
+        self,
+        ruleset: Ruleset = REDACTION_RULESET,
+        max_pending_chars: int = MAX_PENDING_CHARS,
+        overlap_chars: int = OVERLAP_CHARS,
+    ):
+        """
+        Args:
+            ruleset: 伏せ字にする値を検出するルールセット
+            max_pending_chars: 改行のない行を保持する文字数の上限
+            overlap_chars: 改行のない行を区切るときに持ち越す文字数
+        """
+        self.ruleset = ruleset
+        self.max_pending_chars = max_pending_chars
+        self.overlap_chars = overlap_chars
+        self.pending = ""
+        self.in_private_key = False
+        # 伏せ字にした値の数
+        self.redactions = 0
+
+    def feed(self, chunk: str) -> str:
+        """
+        チャンクを受け取り、書き出してよい部分（伏せ字にしたもの）を返す
+
+        Args:
+            chunk: テキストのチャンク（行の途中で区切られていてよい）
+
+        Returns:
+            伏せ字にしたテキスト（最後の行の途中までは次の feed / close まで保持する）
+        """
+        data = self.pending + chunk
+        cut = data.rfind("\n") + 1
+        if cut:
+            self.pending = data[cut:]
+            return self._redact(data[:cut])
+        if len(data) <= self.max_pending_chars:
+            self.pending = data
+            return ""
+
+        # 改行のない長い行: 末尾を持ち越して区切る（区切りをまたぐ値は区切りを値の外へずらす）
+        spans = self.ruleset.match_spans(data)
+        cut = len(data) - self.overlap_chars
+        for _, start, end in spans:
+            if start < cut < end:
+                # 値がデータの末尾まで続く場合は、続きがある可能性があるため値ごと持ち越す
+                cut = start if end == len(data) and start > 0 else end
+        self.pending = data[cut:]
+        return self._redact(data[:cut], [span for span in spans if span[2] <= cut])
+
+    def close(self) -> str:
+        """保持している残りを伏せ字にして返す"""
+        data, self.pending = self.pending, ""
+        return self._redact(data) if data else ""
+
+    def _redact(self, text: str, spans: Optional[List[Tuple[str, int, int]]] = None) -> str:
+        """テキスト中のルールに一致した値と秘密鍵の本文を伏せ字にする"""
+        if spans is None:
+            spans = self.ruleset.match_spans(text)
+        regions = [(start, end, True, name in _FULLY_MASKED) for name, start, end in spans]
+
+        # 秘密鍵の本文（見出しの後ろから -----END まで。チャンクをまたぐ場合は状態を持ち越す）
+        body_starts = [end for name, _, end in spans if name == "Private Key"]
+        if self.in_private_key:
+            body_starts.insert(0, 0)
+        self.in_private_key = False
+        for body_start in body_starts:
+            body_end = text.find(_PRIVATE_KEY_END, body_start)
+            if body_end == -1:
+                body_end = len(text)
+                self.in_private_key = True
+            regions.append((body_start, body_end, False, True))
+        if not regions:
+            return text
+
+        pieces = []
+        position = 0
+        # 同じ位置では秘密鍵の本文を優先し、次に値全体を伏せ字にする値を優先する
+        # （本文中の見出しも本文として伏せ字にし、同じ値の先頭4文字を残さない）
+        ordered = sorted(regions, key=lambda region: (region[0], region[2], not region[3]))
+        for start, end, is_value, fully in ordered:
+            if end <= position:
+                continue
+            if start < position:
+                # 前の領域と重なる部分の続き（重なった値の先頭を見せないよう、すべて伏せ字にする）
+                pieces.append(_NON_SPACE.sub("*", text[position:end]))
+            else:
+                pieces.append(text[position:start])
+                region = text[start:end]
+                if is_value:
+                    self.redactions += 1
+                    pieces.append("*" * len(region) if fully else mask(region))
+                else:
+                    pieces.append(_NON_SPACE.sub("*", region))
+            position = end
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+
+class RedactingWriter:
+    """
+    書き込んだテキストを伏せ字にしてから書き出すファイルラッパー
+
+    使用例:
+        with open(log_file, "w", encoding="utf-8") as raw, RedactingWriter(raw) as log:
+            log.write(result.stdout)
+    """
+
+    def __init__(self, target: TextIO, ruleset: Ruleset = REDACTION_RULESET):
+        """
+        Args:
+            target: 書き出し先（閉じる責任は呼び出し元にある）
+            ruleset: 伏せ字にする値を検出するルールセット
+        """
+        self.target = target
+        self.redactor = StreamRedactor(ruleset)
+
+    def write(self, text: str) -> int:
+        self.target.write(self.redactor.feed(text))
+        return len(text)
+
+    def close(self) -> None:
+        """保持している最後の行を書き出す（書き出し先は閉じない）"""
+        self.target.write(self.redactor.close())
+        self.target.flush()
+
+    def __enter__(self) -> "RedactingWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def redact_text(text: str, ruleset: Ruleset = REDACTION_RULESET) -> str:
+    """
+    テキスト全体を伏せ字にする（テストの失敗メッセージなど、小さなテキスト向け）
+
+    Args:
+        text: 伏せ字にするテキスト
+        ruleset: 伏せ字にする値を検出するルールセット
+
+    Returns:
+        伏せ字にしたテキスト
+    """
+    redactor = StreamRedactor(ruleset)
+    return redactor.feed(text) + redactor.close()
+
+
+def redact_stream(
+    source: BinaryIO,
+    target: BinaryIO,
+    ruleset: Ruleset = REDACTION_RULESET,
+    block_bytes: int = READ_BLOCK_BYTES,
+) -> int:
+    """
+    バイトストリームを伏せ字にして書き出す
+
+    UTF-8として不正なバイトはそのまま書き出します（surrogateescape）。改行コードは変換しません。
+
+    Args:
+        source: 読み込み元
+        target: 書き出し先
+        ruleset: 伏せ字にする値を検出するルールセット
+        block_bytes: 1回に読み込むバイト数
+
+    Returns:
+        伏せ字にした値の数
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")("surrogateescape")
+    redactor = StreamRedactor(ruleset)
+    while True:
+        block = source.read(block_bytes)
+        text = decoder.decode(block, final=not block)
+        output = redactor.feed(text) if block else redactor.feed(text) + redactor.close()
+        if output:
+            target.write(output.encode("utf-8", "surrogateescape"))
+        if not block:
+            break
+    target.flush()
+    return redactor.redactions
@@ -0,0 +1,55 @@
+"""
+ファイル内容の先頭ブロックによるバイナリ判定
+
+ファイル全体を読み込んでデコードに失敗するまで待つ代わりに、先頭ブロックだけを読んで
+バイナリファイル（アーカイブ・プロバイダーのバイナリ・画像など）を判定します。
+拡張子で除外できない成果物も、小さな読み込み1回でスキップできます。
+"""
+
+import codecs
+
+
+# 判定に使用する先頭ブロックの大きさ
+SNIFF_BYTES = 8192
+
+# テキスト以外のバイト（制御文字）の割合がこれを超える場合はバイナリと判定する
+MAX_NON_TEXT_RATIO = 0.3
+
+# テキストとして扱うバイト: 表示可能なASCII文字、空白類、バックスペース、
+# ESC（terraformのログなどのANSIカラー）、および非ASCII文字（UTF-8の多バイト文字）
+_TEXT_BYTES = bytes(
+    {0x08, 0x09, 0x0a, 0x0b, 0x0c, 0x0d, 0x1b}
+    | set(range(0x20, 0x7f))
+    | set(range(0x80, 0x100))
+)
+
+
+def looks_binary(block: bytes) -> bool:
+    """
+    先頭ブロックからバイナリファイルかどうかを判定する
+
+    次のいずれかに該当する場合はバイナリと判定します。
+
+    - NULバイトを含む
+    - UTF-8として不正なバイト列を含む（ブロック末尾で途切れた多バイト文字は除く）
+    - テキスト以外のバイトの割合が MAX_NON_TEXT_RATIO を超える
+
+    Args:
+        block: ファイル内容の先頭ブロック（SNIFF_BYTES 程度）
+
+    Returns:
+        バイナリと判定した場合True。空のブロックはテキストとして扱う
+    """
+    if not block:
+        return False
+    if b'\0' in block:
+        return True
+
+    try:
+        # final=False: ブロック末尾で途切れた多バイト文字はエラーにしない
+        codecs.getincrementaldecoder('utf-8')().decode(block, final=False)
+    except UnicodeDecodeError:
+        return True
+
+    non_text = len(block.translate(None, _TEXT_BYTES))
+    return non_text / len(block) > MAX_NON_TEXT_RATIO
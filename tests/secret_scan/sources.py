@@ -0,0 +1,119 @@
+"""
+コマンドラインと常駐スキャナーで共有するスキャン対象の列挙
+
+ファイルのパス、Gitの差分・履歴（blob）、エディタのバッファなどの内容を、
+同じルール（AWS_CREDENTIAL_RULESET・should_scan_file・アーカイブのメンバーのスキャン・
+ベースラインの除外パス）でスキャンします。test_aws_credentials_security.py もこのモジュールを使い、
+フック・常駐スキャナー・テストで同じツリーの結果が食い違わないようにします。
+"""
+
+import os
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple
+
+from .archive import is_archive_path, scan_archive
+from .baseline import Baseline, normalize_path
+from .engine import Finding
+from .gitsource import GitChangeSet, GitHistory
+from .parallel import scan_paths
+from .rules import AWS_CREDENTIAL_RULESET, should_scan_file
+
+if TYPE_CHECKING:
+    from .cache import ScanCache
+
+
+# スキャン結果: (表示用の位置, ベースラインと照合するパス, 検出結果)
+SourceFindings = Tuple[str, str, List[Finding]]
+
+
+def scan_blob(
+    path: str, data: bytes, baseline: Baseline, cache: Optional["ScanCache"] = None
+) -> List[Tuple[str, List[Finding]]]:
+    """
+    ファイルの内容（Gitのblob・エディタのバッファなど）をスキャンする
+
+    Args:
+        path: プロジェクトルートからの相対パス（/区切り）
+        data: ファイルの内容
+        baseline: 除外パスの判定に使うベースライン
+        cache: スキャンキャッシュ（指定した場合は同一内容を再スキャンしない）
+
+    Returns:
+        [(パス（アーカイブのメンバーは "archive!member"）, 検出結果), ...]。
+        スキャン対象外のパスは空リスト
+
+    Raises:
+        ArchiveLimitExceeded: アーカイブが上限を超えた場合
+    """
+    if not should_scan_file(PurePosixPath(path)) or baseline.is_excluded(path):
+        return []
+    if is_archive_path(path):
+        # アーカイブはメンバーごとに報告する（archive!member）
+        return scan_archive(data, path, AWS_CREDENTIAL_RULESET, should_scan_file)
+    return [(path, AWS_CREDENTIAL_RULESET.scan_bytes(data, cache))]
+
+
+def scan_sources(
+    paths: Sequence[str],
+    root: Path,
+    baseline: Baseline,
+    staged: bool = False,
+    base: Optional[str] = None,
+    history: bool = False,
+    cache: Optional["ScanCache"] = None,
+    cwd: Optional[Path] = None,
+) -> Iterator[SourceFindings]:
+    """
+    ファイルまたはGitの差分・履歴をスキャンする
+
+    Args:
+        paths: スキャンするファイル（cwd からの相対パスまたは絶対パス）
+        root: プロジェクトルート（Gitのリポジトリ、ベースラインのパスの基準）
+        baseline: 除外パスの判定に使うベースライン（受け入れ済みの検出結果は除かない）
+        staged: ステージ済みの変更のみをスキャンする
+        base: base...HEAD の差分のみをスキャンする
+        history: 全履歴（到達可能なすべてのblob）をスキャンする
+        cache: スキャンキャッシュ
+        cwd: paths の基準ディレクトリ（省略時は root）
+
+    ファイル数が多い場合はアーカイブ以外のファイルをプロセスプールで並列にスキャンします
+    （SECRET_SCAN_WORKERS で並列数を指定）。結果は paths の順に返します。
+
+    Yields:
+        (表示用の位置, ベースラインと照合するパス, 検出結果)
+
+    Raises:
+        ArchiveLimitExceeded: アーカイブが上限を超えた場合
+    """
+    if history or staged or base:
+        if history:
+            source = GitHistory(root)
+        else:
+            source = GitChangeSet(root, base_ref=base, staged=staged)
+        for blob in source:
+            for member, findings in scan_blob(blob.path, blob.data, baseline, cache):
+                if findings:
+                    # 履歴スキャンではblobを追加したコミットとパスごとに報告する
+                    for location in source.locate(blob):
+                        yield location + member[len(blob.path):], member, findings
+        return
+
+    base_dir = root if cwd is None else cwd
+    targets = []
+    for path in paths:
+        file_path = base_dir / path
+        relative_path = normalize_path(os.path.relpath(file_path, root))
+        if should_scan_file(file_path) and not baseline.is_excluded(relative_path):
+            targets.append((path, relative_path, file_path))
+
+    # アーカイブ以外のファイルはまとめてスキャンする（ファイル数が多い場合は並列）
+    files = [file_path for _, _, file_path in targets if not is_archive_path(file_path)]
+    file_findings = iter(scan_paths(files, AWS_CREDENTIAL_RULESET, cache=cache))
+    for path, relative_path, file_path in targets:
+        if is_archive_path(file_path):
+            for member, findings in scan_archive(
+                file_path, relative_path, AWS_CREDENTIAL_RULESET, should_scan_file
+            ):
+                yield path + member[len(relative_path):], member, findings
+        else:
+            yield path, relative_path, next(file_findings)[1]
@@ -0,0 +1,291 @@
+"""
+Terraformのステート・プランJSONのストリーミングスキャン
+
+terraform.tfstate（ステート v4）、terraform show -json（ステート・プラン）の出力を
+jsonstream で逐次解析し、次の2種類の問題をJSONパスとともに報告します。
+
+- secret: 値がシークレットのパターン（AWS認証情報・秘密鍵）に一致する
+- unmarked_sensitive: 属性名が機密情報を示す（password, secret_string など）のに
+  sensitive としてマークされていない
+
+sensitive の判定には、値と同じオブジェクトにある次のキーを使います。
+
+- values → sensitive_values（terraform show -json のリソース）
+- before / after → before_sensitive / after_sensitive（プランの change）
+- attributes → sensitive_attributes（ステート v4 のインスタンス）
+- value → sensitive（出力値）。プランの変数は configuration の sensitive 宣言を使う
+
+未判定の候補は判定するオブジェクトが閉じるまでのみ保持し、シークレットのスキャンは
+一定の大きさごとにまとめて行うため、メモリ使用量はドキュメントの大きさによらず一定に収まります。
+"""
+
+import re
+import sys
+from bisect import bisect_right
+from pathlib import Path
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .engine import Ruleset
+from .jsonstream import (
+    END_MAP,
+    SCALAR,
+    START_MAP,
+    JsonEvent,
+    PathElement,
+    format_path,
+    iter_events,
+)
+from .rules import (
+    NON_SENSITIVE_ATTRIBUTE_SUFFIX,
+    SENSITIVE_ATTRIBUTE_PATTERN,
+    STATE_VALUE_RULESET,
+)
+
+
+# 問題の種類
+SECRET = "secret"
+UNMARKED_SENSITIVE = "unmarked_sensitive"
+
+# 値のキー → 同じオブジェクトで sensitive を表すキー
+SENSITIVITY_KEYS = {
+    "values": "sensitive_values",
+    "before": "before_sensitive",
+    "after": "after_sensitive",
+    "attributes": "sensitive_attributes",
+    "value": "sensitive",
+}
+_DATA_KEYS = {sensitivity: data for data, sensitivity in SENSITIVITY_KEYS.items()}
+
+# シークレットのスキャンでまとめる値の大きさ（文字数）
+SCAN_BATCH_CHARS = 1024 * 1024
+
+_SENSITIVE_ATTRIBUTE = re.compile(SENSITIVE_ATTRIBUTE_PATTERN, re.IGNORECASE)
+_NON_SENSITIVE_ATTRIBUTE = re.compile(NON_SENSITIVE_ATTRIBUTE_SUFFIX, re.IGNORECASE)
+
+JsonPath = Tuple[PathElement, ...]
+
+
+class StateFinding(NamedTuple):
+    """ステート・プランJSONの検出結果"""
+
+    kind: str  # SECRET または UNMARKED_SENSITIVE
+    path: str  # 値のJSONパス（$.resources[0].instances[0].attributes.password 形式）
+    rule: str  # 一致したパターン名（SECRET）または属性名（UNMARKED_SENSITIVE）
+    value: str
+
+
+def is_sensitive_attribute(name: str) -> bool:
+    """
+    属性名が sensitive にすべき値を示すか判定する
+
+    Args:
+        name: 属性名
+
+    Returns:
+        password, secret_string, private_key_pem などの場合True
+        （secret_arn, access_key_id など識別子を示す接尾辞を持つ場合はFalse）
+    """
+    return bool(_SENSITIVE_ATTRIBUTE.search(name)) and not _NON_SENSITIVE_ATTRIBUTE.search(name)
+
+
+class _Candidate(NamedTuple):
+    """sensitive の判定待ちの値"""
+
+    sequence: int  # ドキュメント内の順序
+    path: JsonPath
+    name: str
+    value: str
+
+
+class _Frame:
+    """開いているオブジェクトごとの判定状態"""
+
+    __slots__ = ("depth", "candidates", "coverage", "attribute_steps")
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.candidates: List[_Candidate] = []
+        # 値のキー → sensitive とマークされた相対パスの集合（キーがあれば判定できる）
+        self.coverage: Dict[str, Set[JsonPath]] = {}
+        # sensitive_attributes[i][j] のステップ
+        self.attribute_steps: Dict[int, Dict[int, PathElement]] = {}
+
+    def record(self, sensitivity_key: str, relative: JsonPath, event: JsonEvent) -> None:
+        """sensitive を表すキーの下のイベントを記録する"""
+        covered = self.coverage.setdefault(_DATA_KEYS[sensitivity_key], set())
+        if event.kind != SCALAR:
+            return
+        if sensitivity_key == "sensitive_attributes":
+            # [[{"type": "get_attr", "value": "password"}, {"type": "index", "value": {"value": 0}}]]
+            if len(relative) >= 3 and relative[2] == "value" and isinstance(relative[1], int):
+                if len(relative) == 3 or relative[3:] == ("value",):
+                    self.attribute_steps.setdefault(relative[0], {})[relative[1]] = event.value
+        elif event.value is True:
+            covered.add(relative)
+
+    def covers(self, data_key: str, relative: JsonPath) -> bool:
+        """値のキーの下の相対パスが sensitive とマークされているか"""
+        covered = set(self.coverage[data_key])
+        if data_key == "attributes":
+            for steps in self.attribute_steps.values():
+                covered.add(tuple(steps[index] for index in sorted(steps)))
+        return any(relative[:len(prefix)] == prefix for prefix in covered)
+
+
+class _SecretBatch:
+    """シークレットのスキャンを行う値をまとめる"""
+
+    def __init__(self, ruleset: Ruleset, findings: List[Tuple[int, StateFinding]]):
+        self.ruleset = ruleset
+        self.findings = findings
+        self.lines: List[str] = []
+        self.size = 0
+        # 値ごとの (先頭の行番号, 順序, パス)
+        self.starts: List[int] = []
+        self.entries: List[Tuple[int, JsonPath]] = []
+        self.next_line = 1
+
+    def add(self, sequence: int, path: JsonPath, name: str, value: str) -> None:
+        """値を `属性名 = "値"` の行として追加する"""
+        line = f'{name} = "{value}"'
+        self.starts.append(self.next_line)
+        self.entries.append((sequence, path))
+        self.lines.append(line)
+        self.next_line += line.count("\n") + 1
+        self.size += len(line)
+        if self.size >= SCAN_BATCH_CHARS:
+            self.flush()
+
+    def flush(self) -> None:
+        """まとめた値をスキャンする"""
+        if self.lines:
+            for rule, value, line_num in self.ruleset.scan_text("\n".join(self.lines)):
+                sequence, path = self.entries[bisect_right(self.starts, line_num) - 1]
+                self.findings.append((sequence, StateFinding(SECRET, format_path(path), rule, value)))
+        self.lines, self.starts, self.entries = [], [], []
+        self.size = 0
+        self.next_line = 1
+
+
+def _attribute_name(path: JsonPath, data_index: Optional[int]) -> Optional[str]:
+    """値の属性名（値のキーより後の最も近いキー。なければ出力・変数の名前）"""
+    for element in reversed(path[data_index + 1:] if data_index is not None else path):
+        if isinstance(element, str):
+            return element
+    if data_index is not None:
+        for element in reversed(path[:data_index]):
+            if isinstance(element, str):
+                return element
+    return None
+
+
+def scan_stream(stream: BinaryIO, ruleset: Ruleset = STATE_VALUE_RULESET) -> List[StateFinding]:
+    """
+    ステート・プランJSONをストリーミングでスキャンする
+
+    Args:
+        stream: バイナリモードで開いた入力（ファイル・標準入力）
+        ruleset: 値に適用するシークレットのルールセット
+
+    Returns:
+        検出結果のリスト（ドキュメント順）
+
+    Raises:
+        JsonStreamError: JSONとして不正な場合
+    """
+    findings: List[Tuple[int, StateFinding]] = []
+    batch = _SecretBatch(ruleset, findings)
+    frames: List[_Frame] = []
+    remaining: List[_Candidate] = []
+    sensitive_variables: Set[str] = set()
+
+    for sequence, event in enumerate(iter_events(stream)):
+        path = event.path
+
+        # sensitive を表すキーの下のイベントは、そのキーを持つ最も内側のオブジェクトに記録する
+        for frame in reversed(frames):
+            if frame.depth < len(path) and path[frame.depth] in _DATA_KEYS:
+                frame.record(path[frame.depth], path[frame.depth + 1:], event)
+                break
+
+        if event.kind == START_MAP:
+            frames.append(_Frame(len(path)))
+            continue
+
+        if event.kind == END_MAP:
+            frame = frames.pop()
+            unresolved = remaining if not frames else frames[-1].candidates
+            for candidate in frame.candidates:
+                data_key = candidate.path[frame.depth]
+                if data_key in frame.coverage:
+                    if not frame.covers(data_key, candidate.path[frame.depth + 1:]):
+                        findings.append((candidate.sequence, StateFinding(
+                            UNMARKED_SENSITIVE, format_path(candidate.path),
+                            candidate.name, candidate.value,
+                        )))
+                else:
+                    unresolved.append(candidate)
+            continue
+
+        if event.kind != SCALAR:
+            continue
+
+        if (
+            len(path) == 5 and path[:3] == ("configuration", "root_module", "variables")
+            and path[4] == "sensitive" and event.value is True
+        ):
+            sensitive_variables.add(path[3])
+
+        if not isinstance(event.value, str) or not event.value:
+            continue
+
+        data_indices = [
+            index for index, element in enumerate(path)
+            if isinstance(element, str) and element in SENSITIVITY_KEYS
+        ]
+        data_index = data_indices[-1] if data_indices else None
+        name = _attribute_name(path, data_index) or "value"
+        batch.add(sequence, path, name, event.value)
+
+        # 値のキーの下にある機密情報を示す属性名の値は、sensitive の判定を待つ
+        # （sensitive を表すキーの下の値は判定の対象外）
+        if (
+            data_index is not None and frames and is_sensitive_attribute(name)
+            and not any(isinstance(element, str) and element in _DATA_KEYS for element in path)
+        ):
+            frames[-1].candidates.append(_Candidate(sequence, path, name, event.value))
+    batch.flush()
+
+    # どのオブジェクトでも判定できなかった候補（プランの変数は configuration の宣言で判定する）
+    for candidate in remaining:
+        path = candidate.path
+        if len(path) >= 3 and path[0] == "variables" and path[2] == "value":
+            if path[1] in sensitive_variables:
+                continue
+        findings.append((candidate.sequence, StateFinding(
+            UNMARKED_SENSITIVE, format_path(path), candidate.name, candidate.value,
+        )))
+
+    findings.sort(key=lambda item: item[0])
+    return [finding for _, finding in findings]
+
+
+def scan_path(file_path: Path, ruleset: Ruleset = STATE_VALUE_RULESET) -> List[StateFinding]:
+    """
+    ステート・プランJSONのファイルをスキャンする（"-" は標準入力）
+
+    Args:
+        file_path: スキャンするファイルのパス
+        ruleset: 値に適用するシークレットのルールセット
+
+    Returns:
+        検出結果のリスト（ドキュメント順）
+
+    Raises:
+        JsonStreamError: JSONとして不正な場合
+        OSError: ファイルを読み込めない場合
+    """
+    if str(file_path) == "-":
+        return scan_stream(sys.stdin.buffer, ruleset)
+    with open(file_path, "rb") as f:
+        return scan_stream(f, ruleset)
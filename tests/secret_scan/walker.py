@@ -0,0 +1,297 @@
+"""
+.gitignoreを考慮したプロジェクトファイルの走査
+
+除外ディレクトリ（.git, .terraform など）と .gitignore で無視されるディレクトリを
+降りる前に刈り込み、ファイルのパスを遅延的に列挙します。
+プロバイダーキャッシュ（.terraform）のような巨大なディレクトリは走査しません。
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Pattern, Tuple
+
+
+class IgnoreRule(NamedTuple):
+    """.gitignoreの1行（パターン）"""
+
+    regex: Pattern  # .gitignoreのあるディレクトリからの相対パスに対する正規表現
+    negated: bool  # ! で始まる（無視を取り消す）パターン
+    directory_only: bool  # / で終わる（ディレクトリのみに一致する）パターン
+
+
+# 1つの .gitignore のルール: (.gitignoreのあるディレクトリの相対パス, ルールのリスト)
+IgnoreLevel = Tuple[str, List[IgnoreRule]]
+
+
+def _translate_glob(pattern: str) -> str:
+    """
+    .gitignoreのグロブパターンを正規表現に変換する
+
+    Args:
+        pattern: 先頭・末尾の / を取り除いたパターン
+
+    Returns:
+        正規表現（/ 区切りの相対パス全体に一致させる）
+    """
+    parts = []
+    index = 0
+    length = len(pattern)
+    while index < length:
+        char = pattern[index]
+        at_segment_start = index == 0 or pattern[index - 1] == '/'
+        if pattern.startswith('**/', index) and at_segment_start:
+            # 先頭・途中の **/ は0個以上のディレクトリに一致する
+            parts.append('(?:.*/)?')
+            index += 3
+        elif pattern.startswith('**', index) and at_segment_start and index + 2 == length:
+            # 末尾の /** は内部のすべてに一致する
+            parts.append('.*' if index == 0 else '.+')
+            index += 2
+        elif char == '*':
+            while index < length and pattern[index] == '*':
+                index += 1
+            parts.append('[^/]*')
+        elif char == '?':
+            parts.append('[^/]')
+            index += 1
+        elif char == '[':
+            end = index + 1
+            if end < length and pattern[end] in '!^':
+                end += 1
+            if end < length and pattern[end] == ']':
+                end += 1
+            end = pattern.find(']', end)
+            if end == -1:
+                # 閉じていない [ は文字として扱う
+                parts.append(re.escape(char))
+                index += 1
+                continue
+            body = pattern[index + 1:end]
+            negate = body[:1] in ('!', '^')
+            if negate:
+                body = body[1:]
+            # 範囲指定の - 以外は文字として扱う
+            body = ''.join('\\' + c if c in '\\[]^&~|' else c for c in body)
+            if negate:
+                body = '^' + body
+            parts.append(f'(?!/)[{body}]')
+            index = end + 1
+        elif char == '\\' and index + 1 < length:
+            parts.append(re.escape(pattern[index + 1]))
+            index += 2
+        else:
+            parts.append(re.escape(char))
+            index += 1
+    return ''.join(parts)
+
+
+def parse_gitignore(lines: Iterable[str]) -> List[IgnoreRule]:
+    """
+    .gitignoreの内容をルールのリストに変換する
+
+    Args:
+        lines: .gitignoreの各行
+
+    Returns:
+        ルールのリスト（ファイル内の順序）
+    """
+    rules = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('#'):
+            continue
+
+        # 末尾の空白は無視する（\ でエスケープされたものを除く）
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line:
+            continue
+
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        elif line.startswith(('\\!', '\\#')):
+            line = line[1:]
+
+        directory_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+
+        # 先頭・途中に / を含むパターンは.gitignoreのあるディレクトリからの相対パスに固定する
+        anchored = '/' in line
+        regex = _translate_glob(line.lstrip('/'))
+        if not anchored:
+            regex = '(?:.*/)?' + regex
+        rules.append(IgnoreRule(re.compile(regex, re.DOTALL), negated, directory_only))
+    return rules
+
+
+def compile_glob_matcher(patterns: Iterable[str]) -> Pattern:
+    """
+    .gitignore 形式のグロブパターンを1つの正規表現にまとめる
+
+    / を含まないパターンは任意の階層の名前に一致し、先頭・途中に / を含むパターンは
+    ルートからの相対パスに固定されます。ディレクトリに一致するパターンはその下の
+    すべてのパスに一致します。! による取り消しは扱いません。
+
+    Args:
+        patterns: グロブパターン（例: "docs/**", "*.lock", "/vpn-configs/"）
+
+    Returns:
+        ルートからの相対パス（/ 区切り）に fullmatch で照合する正規表現
+        （パターンがない場合は何にも一致しない）
+    """
+    alternatives = []
+    for rule in parse_gitignore(patterns):
+        if rule.negated:
+            continue
+        suffix = '/.*' if rule.directory_only else '(?:/.*)?'
+        alternatives.append(f'(?:{rule.regex.pattern}){suffix}')
+    return re.compile('|'.join(alternatives) or '(?!)', re.DOTALL)
+
+
+def _read_ignore_file(path: Path) -> List[IgnoreRule]:
+    """除外パターンのファイルを読み込む（存在しない場合は空）"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            return parse_gitignore(f)
+    except OSError:
+        return []
+
+
+def is_ignored(levels: Iterable[IgnoreLevel], relative_path: str, is_dir: bool) -> bool:
+    """
+    パスが .gitignore で無視されるかを判定する
+
+    上位のディレクトリの .gitignore から順に評価し、最後に一致したルールで決まります
+    （下位の .gitignore・ファイル内の後の行が優先）。
+
+    Args:
+        levels: 適用される .gitignore のルール（上位から順）
+        relative_path: 走査のルートからの相対パス（/ 区切り）
+        is_dir: ディレクトリの場合True
+
+    Returns:
+        無視される場合True
+    """
+    ignored = False
+    for base, rules in levels:
+        if base:
+            if not relative_path.startswith(base + '/'):
+                continue
+            path = relative_path[len(base) + 1:]
+        else:
+            path = relative_path
+        for rule in rules:
+            if rule.directory_only and not is_dir:
+                continue
+            if rule.regex.fullmatch(path):
+                ignored = not rule.negated
+    return ignored
+
+
+def walk_files(
+    root: Path,
+    exclude_dirs: Iterable[str] = (),
+    exclude_extensions: Iterable[str] = (),
+    use_gitignore: bool = True,
+) -> Iterator[Path]:
+    """
+    ディレクトリを刈り込みながらファイルを遅延的に列挙する
+
+    除外ディレクトリと .gitignore（および .git/info/exclude）で無視されるディレクトリには
+    降りません。無視されたディレクトリ内のファイルは、git と同様に ! でも再び含められません。
+    シンボリックリンクのディレクトリはたどりません。
+
+    Args:
+        root: 走査のルートディレクトリ
+        exclude_dirs: 除外するディレクトリ名
+        exclude_extensions: 除外する拡張子（"." を含む）
+        use_gitignore: .gitignore を考慮する場合True
+
+    Yields:
+        ファイルのパス（ディレクトリごとに名前順）
+    """
+    root = Path(root)
+    exclude_dirs = frozenset(exclude_dirs)
+    exclude_extensions = frozenset(exclude_extensions)
+
+    base_levels: Tuple[IgnoreLevel, ...] = ()
+    if use_gitignore:
+        exclude_rules = _read_ignore_file(root / '.git' / 'info' / 'exclude')
+        if exclude_rules:
+            base_levels = (('', exclude_rules),)
+
+    # (ディレクトリ, ルートからの相対パス, 適用される .gitignore のルール)
+    stack = [(root, '', base_levels)]
+    while stack:
+        directory, relative_dir, levels = stack.pop()
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        if use_gitignore and any(entry.name == '.gitignore' for entry in entries):
+            rules = _read_ignore_file(directory / '.gitignore')
+            if rules:
+                levels = levels + ((relative_dir, rules),)
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue
+
+            if is_dir:
+                if entry.name in exclude_dirs or is_ignored(levels, relative_path, True):
+                    # 降りる前に刈り込む
+                    continue
+                subdirectories.append((Path(entry.path), relative_path, levels))
+            elif is_file:
+                if os.path.splitext(entry.name)[1] in exclude_extensions:
+                    continue
+                if is_ignored(levels, relative_path, False):
+                    continue
+                yield Path(entry.path)
+
+        # 名前順に処理するため逆順に積む
+        stack.extend(reversed(subdirectories))
+
+
+class ProjectFiles:
+    """
+    プロジェクトのファイル一覧（反復するたびに遅延的に走査し直す）
+
+    リストを作らずに walk_files の結果を返すため、セッションスコープのフィクスチャとして
+    複数のテストで再利用できます。
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        exclude_dirs: Iterable[str] = (),
+        exclude_extensions: Iterable[str] = (),
+        use_gitignore: bool = True,
+    ):
+        """
+        Args:
+            root: 走査のルートディレクトリ
+            exclude_dirs: 除外するディレクトリ名
+            exclude_extensions: 除外する拡張子（"." を含む）
+            use_gitignore: .gitignore を考慮する場合True
+        """
+        self.root = Path(root)
+        self.exclude_dirs = frozenset(exclude_dirs)
+        self.exclude_extensions = frozenset(exclude_extensions)
+        self.use_gitignore = use_gitignore
+
+    def __iter__(self) -> Iterator[Path]:
+        return walk_files(self.root, self.exclude_dirs, self.exclude_extensions, self.use_gitignore)
@@ -0,0 +1,45 @@
+# Terraform Static Analysis Package
+# 静的テストで共有するTerraform構成（.tf）とプラン（terraform show -json）の解析
+
+from .config import DEFAULT_CACHE, ParseCache, TerraformFile, TerraformModule
+from .ec2view import PlanEC2View, UnsupportedFilter
+from .evaluate import Evaluator, ResourceInstance
+from .graph import ReferenceGraph
+from .hcl import (
+    Attribute,
+    Block,
+    HclSyntaxError,
+    NotLiteral,
+    Reference,
+    literal_value,
+    parse,
+    references,
+)
+from .impact import ChangedFile, ImpactAnalysis, impact_from_environment
+from .plan import PlannedResource, ResourceIndex, symbolic_value
+
+__all__ = [
+    "DEFAULT_CACHE",
+    "ParseCache",
+    "TerraformFile",
+    "TerraformModule",
+    "Attribute",
+    "Block",
+    "HclSyntaxError",
+    "NotLiteral",
+    "Reference",
+    "literal_value",
+    "parse",
+    "references",
+    "Evaluator",
+    "ResourceInstance",
+    "PlanEC2View",
+    "UnsupportedFilter",
+    "PlannedResource",
+    "ResourceIndex",
+    "symbolic_value",
+    "ReferenceGraph",
+    "ChangedFile",
+    "ImpactAnalysis",
+    "impact_from_environment",
+]
@@ -0,0 +1,111 @@
+"""
+Terraform構成の静的解析のコマンドラインインターフェース
+
+使用例:
+    # 参照グラフを出力（参照元 -> 参照先。--dot で Graphviz の形式）
+    python -m tests.tfanalysis graph
+    python -m tests.tfanalysis graph --dot | dot -Tsvg > graph.svg
+
+    # 変更の影響を受ける宣言を出力（origin/main とのマージベースから作業ツリーまで）
+    python -m tests.tfanalysis affected --base origin/main
+
+    # 指定したファイルの変更の影響を受ける宣言を出力
+    python -m tests.tfanalysis affected terraform/cloudtrail.tf
+
+    # 影響を受けるテストだけを実行（pytest経由）
+    TF_IMPACT_BASE=origin/main pytest tests/
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+from .config import TerraformModule
+from .graph import ReferenceGraph
+from .hcl import HclSyntaxError
+from .impact import ChangedFile, ImpactAnalysis, git_changed_files
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+def _load(args: argparse.Namespace) -> Optional[TerraformModule]:
+    try:
+        return TerraformModule.load(args.terraform_dir)
+    except HclSyntaxError as error:
+        print(f"❌ 構文を解析できません: {error}", file=sys.stderr)
+        return None
+
+
+def command_graph(args: argparse.Namespace) -> int:
+    """graphサブコマンド: 参照グラフを出力する（構文が不正な場合は2を返す）"""
+    module = _load(args)
+    if module is None:
+        return 2
+    graph = ReferenceGraph.from_module(module)
+    if args.dot:
+        print("digraph terraform {")
+        for node in sorted(graph.nodes):
+            print(f'  "{node}";')
+        for source, target in graph.edges():
+            print(f'  "{source}" -> "{target}";')
+        print("}")
+    else:
+        for source, target in graph.edges():
+            print(f"{source} -> {target}")
+    return 0
+
+
+def command_affected(args: argparse.Namespace) -> int:
+    """affectedサブコマンド: 影響を受ける宣言を出力する（構文が不正・gitが失敗した場合は2を返す）"""
+    module = _load(args)
+    if module is None:
+        return 2
+    if args.base:
+        try:
+            changes = git_changed_files(PROJECT_ROOT, args.base)
+        except subprocess.CalledProcessError as error:
+            print(f"❌ 変更したファイルを列挙できません: {error.stderr.decode('utf-8', 'replace').strip()}",
+                  file=sys.stderr)
+            return 2
+    else:
+        changes = [ChangedFile(Path(path), None) for path in args.paths]
+    impact = ImpactAnalysis(module, changes)
+    for address in sorted(impact.affected):
+        print(address)
+    print(impact.describe(), file=sys.stderr)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m tests.tfanalysis", description="Terraform構成の静的解析")
+    parser.add_argument(
+        "--terraform-dir",
+        type=Path,
+        default=PROJECT_ROOT / "terraform",
+        help="Terraformのディレクトリ（既定: プロジェクトルートの terraform）",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    graph = subparsers.add_parser("graph", help="宣言間の参照グラフを出力する")
+    graph.add_argument("--dot", action="store_true", help="Graphviz の dot 形式で出力する")
+    graph.set_defaults(handler=command_graph)
+
+    affected = subparsers.add_parser("affected", help="変更の影響を受ける宣言を出力する")
+    mode = affected.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--base", metavar="REF", help="REF とのマージベースから作業ツリーまでの変更を対象とする")
+    mode.add_argument("paths", nargs="*", default=[], metavar="FILE", help="変更したファイル")
+    affected.set_defaults(handler=command_affected)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """エントリポイント"""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
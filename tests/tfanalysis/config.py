@@ -0,0 +1,168 @@
+"""
+Terraformの構成（ディレクトリ内の .tf ファイル）の読み込み
+
+ファイル内容のハッシュをキーに構文木をキャッシュし、同じ内容のファイルは1回だけ解析します。
+構文木は変更できないため、1回のテスト実行のすべての静的テストで共有できます。
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .hcl import Attribute, Block, parse
+
+
+class TerraformFile(NamedTuple):
+    """解析した .tf ファイル"""
+
+    path: Path
+    digest: str  # 内容のハッシュ値
+    blocks: Tuple[Block, ...]
+
+
+class ParseCache:
+    """
+    内容ハッシュ → 構文木のキャッシュ（プロセス内）
+
+    ファイルのパスではなく内容をキーにするため、ファイルが書き換えられると自動的に解析し直し、
+    内容が同じであれば別のパス（Gitのblob、テスト用の一時ファイルなど）でも解析を省略します。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Block, ...]] = {}
+        # 統計情報（テスト用）
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, data: bytes, path: str = "<string>") -> Tuple[str, Tuple[Block, ...]]:
+        """
+        内容を解析する（同じ内容を解析済みの場合はキャッシュから返す）
+
+        Args:
+            data: .tf ファイルの内容
+            path: エラーメッセージに表示するパス
+
+        Returns:
+            (内容のハッシュ値, 最上位のブロック)
+
+        Raises:
+            HclSyntaxError: 構文が不正な場合
+            UnicodeDecodeError: UTF-8として不正な場合
+        """
+        digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+        blocks = self._entries.get(digest)
+        if blocks is None:
+            self.misses += 1
+            blocks = parse(data.decode("utf-8"), path)
+            self._entries[digest] = blocks
+        else:
+            self.hits += 1
+        return digest, blocks
+
+    def parse_file(self, path: Union[str, Path]) -> TerraformFile:
+        """
+        ファイルを解析する
+
+        Raises:
+            HclSyntaxError: 構文が不正な場合
+            OSError: ファイルを読み込めない場合
+        """
+        path = Path(path)
+        digest, blocks = self.parse(path.read_bytes(), str(path))
+        return TerraformFile(path, digest, blocks)
+
+
+# プロセス内で共有する既定のキャッシュ
+DEFAULT_CACHE = ParseCache()
+
+
+class TerraformModule:
+    """
+    ディレクトリ内の .tf ファイルからなるTerraformの構成
+
+    使用例:
+        module = TerraformModule.load(Path("terraform"))
+        for variable in module.variables.values():
+            print(variable.labels[0], variable.literal("sensitive", False))
+    """
+
+    def __init__(self, directory: Path, files: List[TerraformFile]):
+        """
+        Args:
+            directory: 構成のディレクトリ
+            files: 解析した .tf ファイル（ファイル名の順）
+        """
+        self.directory = Path(directory)
+        self.files = tuple(files)
+        self._declarations: Optional[Dict[str, Tuple[TerraformFile, Block]]] = None
+
+    @classmethod
+    def load(cls, directory: Union[str, Path], cache: Optional[ParseCache] = None) -> "TerraformModule":
+        """
+        ディレクトリ内の .tf ファイルを解析する（サブディレクトリは含まない）
+
+        Args:
+            directory: 構成のディレクトリ
+            cache: 構文木のキャッシュ（省略時はプロセス内で共有する DEFAULT_CACHE）
+
+        Raises:
+            HclSyntaxError: 構文が不正な場合
+        """
+        cache = DEFAULT_CACHE if cache is None else cache
+        directory = Path(directory)
+        return cls(directory, [cache.parse_file(path) for path in sorted(directory.glob("*.tf"))])
+
+    def blocks(self, block_type: Optional[str] = None) -> Iterator[Tuple[TerraformFile, Block]]:
+        """
+        最上位のブロックを (ファイル, ブロック) の組で列挙する
+
+        Args:
+            block_type: ブロックの種類（resource、variable など。省略時はすべて）
+        """
+        for terraform_file in self.files:
+            for block in terraform_file.blocks:
+                if block_type is None or block.type == block_type:
+                    yield terraform_file, block
+
+    @property
+    def declarations(self) -> Dict[str, Tuple[TerraformFile, Block]]:
+        """アドレス（aws_vpc.main、data.x.y、var.x、module.x、output.x）→ (ファイル, ブロック)"""
+        if self._declarations is None:
+            self._declarations = {
+                block.address: (terraform_file, block)
+                for terraform_file, block in self.blocks()
+                if block.address is not None
+            }
+        return self._declarations
+
+    def _by_type(self, block_type: str) -> Dict[str, Block]:
+        return {block.address: block for _, block in self.blocks(block_type) if block.address is not None}
+
+    @property
+    def resources(self) -> Dict[str, Block]:
+        """アドレス（type.name）→ resource ブロック"""
+        return self._by_type("resource")
+
+    @property
+    def data_sources(self) -> Dict[str, Block]:
+        """アドレス（data.type.name）→ data ブロック"""
+        return self._by_type("data")
+
+    @property
+    def variables(self) -> Dict[str, Block]:
+        """変数名 → variable ブロック"""
+        return {block.labels[0]: block for _, block in self.blocks("variable") if block.labels}
+
+    @property
+    def outputs(self) -> Dict[str, Block]:
+        """出力名 → output ブロック"""
+        return {block.labels[0]: block for _, block in self.blocks("output") if block.labels}
+
+    @property
+    def locals(self) -> Dict[str, Attribute]:
+        """ローカル値の名前 → locals ブロックの属性（複数の locals ブロックをまとめる）"""
+        return {
+            attribute.name: attribute
+            for _, block in self.blocks("locals")
+            for attribute in block.attributes
+        }
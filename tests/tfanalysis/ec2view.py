@@ -0,0 +1,574 @@
+"""
+プランのリソースの索引によるEC2 APIの応答（オフライン解析）
+
+ResourceIndex のリソースから、boto3 の EC2 クライアントの describe_* と同じ形の応答を作ります。
+統合テストの ec2_client をこのクラスに差し替えると、AWSのAPIを呼ばずに、apply 前のプランに対して
+同じアサーションを数ミリ秒で評価できます（tests/integration/conftest.py の TF_PLAN_JSON・TF_PLAN_FILE）。
+
+apply まで決まらないID・ARNは ResourceIndex の記号的な値（参照先のインスタンスのアドレス）になるため、
+リソース間の関連（サブネットのVPC、ルートのNAT Gatewayなど）は実際のIDと同じように照合できます。
+状態は作成直後の値（VPC・サブネットは available、VPNエンドポイントは pending-associate など）にします。
+"""
+
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .plan import PlannedResource, ResourceIndex
+
+
+# Terraformのプロトコルの表記 → EC2 APIの表記
+_PROTOCOLS = {"all": "-1", "-1": "-1", "6": "tcp", "17": "udp", "1": "icmp", "58": "icmpv6"}
+
+# ルートの属性 → EC2 APIのキー
+_ROUTE_DESTINATIONS = {
+    "cidr_block": "DestinationCidrBlock",
+    "destination_cidr_block": "DestinationCidrBlock",
+    "ipv6_cidr_block": "DestinationIpv6CidrBlock",
+    "destination_ipv6_cidr_block": "DestinationIpv6CidrBlock",
+    "destination_prefix_list_id": "DestinationPrefixListId",
+}
+_ROUTE_TARGETS = {
+    "gateway_id": "GatewayId",
+    "nat_gateway_id": "NatGatewayId",
+    "transit_gateway_id": "TransitGatewayId",
+    "vpc_peering_connection_id": "VpcPeeringConnectionId",
+    "network_interface_id": "NetworkInterfaceId",
+    "vpc_endpoint_id": "GatewayId",
+    "egress_only_gateway_id": "EgressOnlyInternetGatewayId",
+    "carrier_gateway_id": "CarrierGatewayId",
+    "local_gateway_id": "LocalGatewayId",
+}
+
+# 応答の1件とフィルタで照合する値（フィルタ名 → 値のリスト）
+_Record = Tuple[Dict[str, Any], Dict[str, List[Any]], Dict[str, str]]
+
+
+class UnsupportedFilter(ValueError):
+    """オフライン解析で対応していないフィルタ"""
+
+
+def _tag_list(tags: Dict[str, str]) -> List[Dict[str, str]]:
+    return [{"Key": key, "Value": value} for key, value in tags.items()]
+
+
+def _matches(fields: Dict[str, List[Any]], tags: Dict[str, str], filters: Optional[Iterable[Dict[str, Any]]]) -> bool:
+    """フィルタ（名前ごとにAND、値はOR、* と ? のワイルドカード）に一致するか"""
+    for item in filters or ():
+        name, patterns = item["Name"], item.get("Values", [])
+        if name.startswith("tag:"):
+            key = name[4:]
+            candidates = [tags[key]] if key in tags else []
+        elif name == "tag-key":
+            candidates = list(tags)
+        elif name in fields:
+            candidates = fields[name]
+        else:
+            raise UnsupportedFilter(f"オフライン解析では未対応のフィルタです: {name}")
+        if not any(
+            fnmatchcase(_filter_text(candidate), _wildcard(pattern))
+            for candidate in candidates if candidate is not None
+            for pattern in patterns
+        ):
+            return False
+    return True
+
+
+def _wildcard(pattern: Any) -> str:
+    """EC2 APIのワイルドカード（* と ?）を fnmatch のパターンにする（記号的なIDの [0] は文字どおり照合する）"""
+    return str(pattern).replace("[", "[[]")
+
+
+def _filter_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _select(records: Iterable[_Record], filters, ids: Optional[Iterable[str]] = None,
+            id_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+    """フィルタ・IDの指定に一致する応答を返す"""
+    if ids:
+        filters = list(filters or []) + [{"Name": id_filter, "Values": list(ids)}]
+    return [record for record, fields, tags in records if _matches(fields, tags, filters)]
+
+
+def _compact(mapping: Dict[str, Any]) -> Dict[str, Any]:
+    """値が None・空文字列・空リストのキーを除く（EC2 APIは未設定のキーを返さない。False・0 は残す）"""
+    return {key: value for key, value in mapping.items() if value not in (None, "", [])}
+
+
+class PlanEC2View:
+    """
+    プランの索引から boto3 の EC2 クライアントと同じ形の応答を返す
+
+    使用例:
+        ec2 = PlanEC2View(ResourceIndex.load("plan.json"))
+        ec2.describe_subnets(Filters=[{"Name": "tag:Type", "Values": ["Private"]}])["Subnets"]
+    """
+
+    def __init__(self, index: ResourceIndex):
+        """
+        Args:
+            index: プランまたはステートのリソースの索引
+        """
+        self.index = index
+        # id → インスタンス（記号的な値の id を含む）
+        self._by_id: Dict[Any, PlannedResource] = {}
+        for resource in index:
+            resource_id = resource.values.get("id")
+            if isinstance(resource_id, str):
+                self._by_id.setdefault(resource_id, resource)
+
+    def _related(self, resource_id: Any) -> Optional[PlannedResource]:
+        return self._by_id.get(resource_id) if isinstance(resource_id, str) else None
+
+    # --- VPC・サブネット ---
+
+    def describe_vpcs(self, Filters=None, VpcIds=None, **_) -> Dict[str, Any]:
+        records = []
+        for vpc in self.index.by_type("aws_vpc"):
+            values = vpc.values
+            record = {
+                "VpcId": values.get("id"),
+                "CidrBlock": values.get("cidr_block"),
+                "State": "available",
+                "InstanceTenancy": values.get("instance_tenancy") or "default",
+                "IsDefault": False,
+                "Tags": _tag_list(vpc.tags),
+                # DescribeVpcAttribute の値（テストが参照するため同じ応答に含める）
+                "EnableDnsHostnames": values.get("enable_dns_hostnames"),
+                "EnableDnsSupport": values.get("enable_dns_support"),
+            }
+            fields = {
+                "vpc-id": [record["VpcId"]],
+                "cidr": [record["CidrBlock"]],
+                "cidr-block-association.cidr-block": [record["CidrBlock"]],
+                "state": ["available"],
+                "is-default": [False],
+            }
+            records.append((record, fields, vpc.tags))
+        return {"Vpcs": _select(records, Filters, VpcIds, "vpc-id")}
+
+    def describe_subnets(self, Filters=None, SubnetIds=None, **_) -> Dict[str, Any]:
+        records = []
+        for subnet in self.index.by_type("aws_subnet"):
+            values = subnet.values
+            record = _compact({
+                "SubnetId": values.get("id"),
+                "VpcId": values.get("vpc_id"),
+                "CidrBlock": values.get("cidr_block"),
+                "AvailabilityZone": values.get("availability_zone"),
+                "MapPublicIpOnLaunch": bool(values.get("map_public_ip_on_launch")),
+                "State": "available",
+                "Tags": _tag_list(subnet.tags),
+            })
+            fields = {
+                "subnet-id": [record.get("SubnetId")],
+                "vpc-id": [record.get("VpcId")],
+                "cidr-block": [record.get("CidrBlock")],
+                "availability-zone": [record.get("AvailabilityZone")],
+                "map-public-ip-on-launch": [record["MapPublicIpOnLaunch"]],
+                "state": ["available"],
+            }
+            records.append((record, fields, subnet.tags))
+        return {"Subnets": _select(records, Filters, SubnetIds, "subnet-id")}
+
+    # --- セキュリティグループ ---
+
+    def describe_security_groups(self, Filters=None, GroupIds=None, GroupNames=None, **_) -> Dict[str, Any]:
+        rules = self._security_group_rules()
+        records = []
+        for group in self.index.by_type("aws_security_group"):
+            values = group.values
+            group_id = values.get("id")
+            ingress, egress = rules.get(group_id, ([], []))
+            record = {
+                "GroupId": group_id,
+                "GroupName": values.get("name"),
+                "Description": values.get("description"),
+                "VpcId": values.get("vpc_id"),
+                "IpPermissions": _merge_permissions(_inline_permissions(values.get("ingress")) + ingress),
+                "IpPermissionsEgress": _merge_permissions(_inline_permissions(values.get("egress")) + egress),
+                "Tags": _tag_list(group.tags),
+            }
+            fields = {
+                "group-id": [group_id],
+                "group-name": [record["GroupName"]],
+                "vpc-id": [record["VpcId"]],
+                "description": [record["Description"]],
+            }
+            records.append((record, fields, group.tags))
+        if GroupNames:
+            Filters = list(Filters or []) + [{"Name": "group-name", "Values": list(GroupNames)}]
+        return {"SecurityGroups": _select(records, Filters, GroupIds, "group-id")}
+
+    def _security_group_rules(self) -> Dict[Any, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+        """個別ルールのリソース（aws_vpc_security_group_*_rule、aws_security_group_rule）をグループごとに集める"""
+        rules: Dict[Any, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+        for direction, resource_type in ((0, "aws_vpc_security_group_ingress_rule"),
+                                         (1, "aws_vpc_security_group_egress_rule")):
+            for rule in self.index.by_type(resource_type):
+                values = rule.values
+                permission = _permission(
+                    values.get("ip_protocol"), values.get("from_port"), values.get("to_port"),
+                    [values.get("cidr_ipv4")], [values.get("cidr_ipv6")],
+                    [values.get("referenced_security_group_id")], [values.get("prefix_list_id")],
+                    values.get("description"),
+                )
+                rules.setdefault(values.get("security_group_id"), ([], []))[direction].append(permission)
+        for rule in self.index.by_type("aws_security_group_rule"):
+            values = rule.values
+            sources = [values.get("source_security_group_id")]
+            if values.get("self"):
+                sources.append(values.get("security_group_id"))
+            permission = _permission(
+                values.get("protocol"), values.get("from_port"), values.get("to_port"),
+                values.get("cidr_blocks") or [], values.get("ipv6_cidr_blocks") or [],
+                sources, values.get("prefix_list_ids") or [], values.get("description"),
+            )
+            direction = 0 if values.get("type") == "ingress" else 1
+            rules.setdefault(values.get("security_group_id"), ([], []))[direction].append(permission)
+        return rules
+
+    # --- Client VPN ---
+
+    def describe_client_vpn_endpoints(self, Filters=None, ClientVpnEndpointIds=None, **_) -> Dict[str, Any]:
+        records = []
+        for endpoint in self.index.by_type("aws_ec2_client_vpn_endpoint"):
+            values = endpoint.values
+            log_options = (values.get("connection_log_options") or [{}])[0]
+            banner_options = (values.get("client_login_banner_options") or [{}])[0]
+            record = _compact({
+                "ClientVpnEndpointId": values.get("id"),
+                "Description": values.get("description"),
+                "Status": {"Code": "pending-associate"},
+                "ClientCidrBlock": values.get("client_cidr_block"),
+                "DnsServers": values.get("dns_servers"),
+                "SplitTunnel": bool(values.get("split_tunnel")),
+                "VpnProtocol": "openvpn",
+                "TransportProtocol": values.get("transport_protocol") or "udp",
+                "VpnPort": values.get("vpn_port") or 443,
+                "ServerCertificateArn": values.get("server_certificate_arn"),
+                "AuthenticationOptions": [
+                    _authentication_option(option) for option in values.get("authentication_options") or []
+                ],
+                "ConnectionLogOptions": _compact({
+                    "Enabled": bool(log_options.get("enabled")),
+                    "CloudwatchLogGroup": log_options.get("cloudwatch_log_group"),
+                    "CloudwatchLogStream": log_options.get("cloudwatch_log_stream"),
+                }),
+                "SecurityGroupIds": values.get("security_group_ids"),
+                "VpcId": values.get("vpc_id"),
+                "SelfServicePortalUrl": values.get("self_service_portal_url"),
+                "SessionTimeoutHours": values.get("session_timeout_hours"),
+                "ClientLoginBannerOptions": _compact({
+                    "Enabled": bool(banner_options.get("enabled")),
+                    "BannerText": banner_options.get("banner_text"),
+                }),
+                "Tags": _tag_list(endpoint.tags),
+            })
+            fields = {
+                "endpoint-id": [record.get("ClientVpnEndpointId")],
+                "transport-protocol": [record["TransportProtocol"]],
+            }
+            records.append((record, fields, endpoint.tags))
+        return {"ClientVpnEndpoints": _select(records, Filters, ClientVpnEndpointIds, "endpoint-id")}
+
+    def describe_client_vpn_target_networks(self, ClientVpnEndpointId, Filters=None, **_) -> Dict[str, Any]:
+        records = []
+        for association in self.index.by_type("aws_ec2_client_vpn_network_association"):
+            values = association.values
+            if values.get("client_vpn_endpoint_id") != ClientVpnEndpointId:
+                continue
+            subnet = self._related(values.get("subnet_id"))
+            record = _compact({
+                "AssociationId": values.get("association_id") or values.get("id"),
+                "VpcId": values.get("vpc_id") or (subnet.values.get("vpc_id") if subnet else None),
+                "TargetNetworkId": values.get("subnet_id"),
+                "ClientVpnEndpointId": ClientVpnEndpointId,
+                "Status": {"Code": "associated"},
+                "SecurityGroups": values.get("security_groups"),
+            })
+            fields = {
+                "association-id": [record.get("AssociationId")],
+                "target-network-id": [record.get("TargetNetworkId")],
+                "vpc-id": [record.get("VpcId")],
+            }
+            records.append((record, fields, {}))
+        return {"ClientVpnTargetNetworks": _select(records, Filters)}
+
+    def describe_client_vpn_authorization_rules(self, ClientVpnEndpointId, Filters=None, **_) -> Dict[str, Any]:
+        records = []
+        for rule in self.index.by_type("aws_ec2_client_vpn_authorization_rule"):
+            values = rule.values
+            if values.get("client_vpn_endpoint_id") != ClientVpnEndpointId:
+                continue
+            record = _compact({
+                "ClientVpnEndpointId": ClientVpnEndpointId,
+                "Description": values.get("description"),
+                "GroupId": values.get("access_group_id"),
+                "AccessAll": bool(values.get("authorize_all_groups")),
+                "DestinationCidr": values.get("target_network_cidr"),
+                "Status": {"Code": "active"},
+            })
+            fields = {
+                "description": [record.get("Description")],
+                "destination-cidr": [record.get("DestinationCidr")],
+                "group-id": [record.get("GroupId")],
+            }
+            records.append((record, fields, {}))
+        return {"AuthorizationRules": _select(records, Filters)}
+
+    def describe_client_vpn_routes(self, ClientVpnEndpointId, Filters=None, **_) -> Dict[str, Any]:
+        records = []
+        # ターゲットネットワークの関連付けで暗黙に作成されるVPCのCIDRへのルート
+        for association in self.index.by_type("aws_ec2_client_vpn_network_association"):
+            values = association.values
+            if values.get("client_vpn_endpoint_id") != ClientVpnEndpointId:
+                continue
+            subnet = self._related(values.get("subnet_id"))
+            vpc = self._related(subnet.values.get("vpc_id")) if subnet else None
+            if vpc is None or not vpc.values.get("cidr_block"):
+                continue
+            records.append(self._client_vpn_route(
+                ClientVpnEndpointId, vpc.values["cidr_block"], values.get("subnet_id"), "associate", None,
+            ))
+        for route in self.index.by_type("aws_ec2_client_vpn_route"):
+            values = route.values
+            if values.get("client_vpn_endpoint_id") != ClientVpnEndpointId:
+                continue
+            records.append(self._client_vpn_route(
+                ClientVpnEndpointId, values.get("destination_cidr_block"), values.get("target_vpc_subnet_id"),
+                "add-route", values.get("description"),
+            ))
+        return {"Routes": _select(records, Filters)}
+
+    @staticmethod
+    def _client_vpn_route(endpoint_id, destination, subnet_id, origin, description) -> _Record:
+        record = _compact({
+            "ClientVpnEndpointId": endpoint_id,
+            "DestinationCidr": destination,
+            "TargetSubnet": subnet_id,
+            "Type": "Nat",
+            "Origin": origin,
+            "Status": {"Code": "active"},
+            "Description": description,
+        })
+        fields = {
+            "destination-cidr": [destination],
+            "origin": [origin],
+            "target-subnet": [subnet_id],
+        }
+        return record, fields, {}
+
+    # --- ゲートウェイ・Elastic IP ---
+
+    def describe_internet_gateways(self, Filters=None, InternetGatewayIds=None, **_) -> Dict[str, Any]:
+        attachments: Dict[Any, List[Any]] = {}
+        for attachment in self.index.by_type("aws_internet_gateway_attachment"):
+            attachments.setdefault(attachment.values.get("internet_gateway_id"), []).append(
+                attachment.values.get("vpc_id")
+            )
+        records = []
+        for gateway in self.index.by_type("aws_internet_gateway"):
+            values = gateway.values
+            vpc_ids = ([values["vpc_id"]] if values.get("vpc_id") else []) + attachments.get(values.get("id"), [])
+            record = {
+                "InternetGatewayId": values.get("id"),
+                "Attachments": [{"State": "available", "VpcId": vpc_id} for vpc_id in vpc_ids],
+                "Tags": _tag_list(gateway.tags),
+            }
+            fields = {
+                "internet-gateway-id": [record["InternetGatewayId"]],
+                "attachment.vpc-id": vpc_ids,
+                "attachment.state": ["available"] if vpc_ids else [],
+            }
+            records.append((record, fields, gateway.tags))
+        return {"InternetGateways": _select(records, Filters, InternetGatewayIds, "internet-gateway-id")}
+
+    def describe_nat_gateways(self, Filters=None, NatGatewayIds=None, Filter=None, **_) -> Dict[str, Any]:
+        records = []
+        for gateway in self.index.by_type("aws_nat_gateway"):
+            values = gateway.values
+            subnet = self._related(values.get("subnet_id"))
+            address = self._related(values.get("allocation_id"))
+            addresses = []
+            if values.get("allocation_id"):
+                addresses.append(_compact({
+                    "AllocationId": values.get("allocation_id"),
+                    "PublicIp": address.values.get("public_ip") if address else values.get("public_ip"),
+                    "PrivateIp": values.get("private_ip"),
+                }))
+            record = _compact({
+                "NatGatewayId": values.get("id"),
+                "SubnetId": values.get("subnet_id"),
+                "VpcId": subnet.values.get("vpc_id") if subnet else None,
+                "State": "available",
+                "ConnectivityType": values.get("connectivity_type") or "public",
+                "NatGatewayAddresses": addresses,
+                "Tags": _tag_list(gateway.tags),
+            })
+            record.setdefault("NatGatewayAddresses", [])
+            fields = {
+                "nat-gateway-id": [record.get("NatGatewayId")],
+                "subnet-id": [record.get("SubnetId")],
+                "vpc-id": [record.get("VpcId")],
+                "state": ["available"],
+            }
+            records.append((record, fields, gateway.tags))
+        # describe_nat_gateways は Filter（単数）も受け付ける
+        return {"NatGateways": _select(records, Filters or Filter, NatGatewayIds, "nat-gateway-id")}
+
+    def describe_addresses(self, Filters=None, AllocationIds=None, PublicIps=None, **_) -> Dict[str, Any]:
+        records = []
+        for eip in self.index.by_type("aws_eip"):
+            values = eip.values
+            domain = values.get("domain") or ("vpc" if values.get("vpc") else "standard")
+            record = _compact({
+                "AllocationId": values.get("id"),  # VPCのElastic IPでは id が割り当てID
+                "PublicIp": values.get("public_ip"),
+                "Domain": domain,
+                "Tags": _tag_list(eip.tags),
+            })
+            fields = {
+                "allocation-id": [record.get("AllocationId")],
+                "public-ip": [record.get("PublicIp")],
+                "domain": [domain],
+            }
+            records.append((record, fields, eip.tags))
+        if PublicIps:
+            Filters = list(Filters or []) + [{"Name": "public-ip", "Values": list(PublicIps)}]
+        return {"Addresses": _select(records, Filters, AllocationIds, "allocation-id")}
+
+    # --- ルートテーブル ---
+
+    def describe_route_tables(self, Filters=None, RouteTableIds=None, **_) -> Dict[str, Any]:
+        routes: Dict[Any, List[Dict[str, Any]]] = {}
+        for route in self.index.by_type("aws_route"):
+            routes.setdefault(route.values.get("route_table_id"), []).append(_route(route.values))
+        associations: Dict[Any, List[Dict[str, Any]]] = {}
+        for association in self.index.by_type("aws_route_table_association"):
+            values = association.values
+            associations.setdefault(values.get("route_table_id"), []).append(_compact({
+                "RouteTableAssociationId": values.get("id"),
+                "RouteTableId": values.get("route_table_id"),
+                "SubnetId": values.get("subnet_id"),
+                "GatewayId": values.get("gateway_id"),
+                "Main": False,
+                "AssociationState": {"State": "associated"},
+            }))
+
+        records = []
+        for table in self.index.by_type("aws_route_table"):
+            values = table.values
+            table_id = values.get("id")
+            vpc = self._related(values.get("vpc_id"))
+            # VPC内のローカルルート（暗黙に作成される）
+            table_routes = []
+            if vpc and vpc.values.get("cidr_block"):
+                table_routes.append({
+                    "DestinationCidrBlock": vpc.values["cidr_block"],
+                    "GatewayId": "local",
+                    "Origin": "CreateRouteTable",
+                    "State": "active",
+                })
+            table_routes += [_route(route) for route in values.get("route") or []]
+            table_routes += routes.get(table_id, [])
+            table_associations = associations.get(table_id, [])
+            record = {
+                "RouteTableId": table_id,
+                "VpcId": values.get("vpc_id"),
+                "Routes": table_routes,
+                "Associations": table_associations,
+                "Tags": _tag_list(table.tags),
+            }
+            fields = {
+                "route-table-id": [table_id],
+                "vpc-id": [record["VpcId"]],
+                "association.subnet-id": [a.get("SubnetId") for a in table_associations],
+                "association.route-table-association-id": [
+                    a.get("RouteTableAssociationId") for a in table_associations
+                ],
+                "route.destination-cidr-block": [r.get("DestinationCidrBlock") for r in table_routes],
+                "route.gateway-id": [r.get("GatewayId") for r in table_routes],
+                "route.nat-gateway-id": [r.get("NatGatewayId") for r in table_routes],
+            }
+            records.append((record, fields, table.tags))
+        return {"RouteTables": _select(records, Filters, RouteTableIds, "route-table-id")}
+
+
+def _authentication_option(option: Dict[str, Any]) -> Dict[str, Any]:
+    """authentication_options ブロック → AuthenticationOptions の要素"""
+    option_type = option.get("type")
+    result: Dict[str, Any] = {"Type": option_type}
+    if option_type == "certificate-authentication":
+        result["MutualAuthentication"] = _compact({
+            "ClientRootCertificateChain": option.get("root_certificate_chain_arn"),
+        })
+    elif option_type == "federated-authentication":
+        result["FederatedAuthentication"] = _compact({
+            "SamlProviderArn": option.get("saml_provider_arn"),
+            "SelfServiceSamlProviderArn": option.get("self_service_saml_provider_arn"),
+        })
+    elif option_type == "directory-service-authentication":
+        result["ActiveDirectory"] = _compact({"DirectoryId": option.get("active_directory_id")})
+    return result
+
+
+def _permission(protocol, from_port, to_port, ipv4, ipv6, groups, prefix_lists, description) -> Dict[str, Any]:
+    """セキュリティグループのルール → IpPermissions の要素"""
+    protocol = _PROTOCOLS.get(str(protocol), str(protocol))
+    describe = {"Description": description} if description else {}
+    permission: Dict[str, Any] = {
+        "IpProtocol": protocol,
+        "IpRanges": [{"CidrIp": cidr, **describe} for cidr in ipv4 if cidr],
+        "Ipv6Ranges": [{"CidrIpv6": cidr, **describe} for cidr in ipv6 if cidr],
+        "UserIdGroupPairs": [{"GroupId": group, **describe} for group in groups if group],
+        "PrefixListIds": [{"PrefixListId": prefix, **describe} for prefix in prefix_lists if prefix],
+    }
+    # 全プロトコル（-1）のルールはポートを持たない
+    if protocol != "-1":
+        permission["FromPort"] = from_port
+        permission["ToPort"] = to_port
+    return permission
+
+
+def _inline_permissions(rules: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """aws_security_group の ingress・egress ブロック → IpPermissions の要素"""
+    permissions = []
+    for rule in rules or []:
+        groups = list(rule.get("security_groups") or [])
+        permissions.append(_permission(
+            rule.get("protocol"), rule.get("from_port"), rule.get("to_port"),
+            rule.get("cidr_blocks") or [], rule.get("ipv6_cidr_blocks") or [],
+            groups, rule.get("prefix_list_ids") or [], rule.get("description"),
+        ))
+    return permissions
+
+
+def _merge_permissions(permissions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """同じプロトコル・ポート範囲のルールを1つの要素にまとめる（EC2 APIと同じ形）"""
+    merged: "OrderedDict[Tuple[Any, Any, Any], Dict[str, Any]]" = OrderedDict()
+    for permission in permissions:
+        key = (permission["IpProtocol"], permission.get("FromPort"), permission.get("ToPort"))
+        if key not in merged:
+            merged[key] = {k: (list(v) if isinstance(v, list) else v) for k, v in permission.items()}
+            continue
+        for name in ("IpRanges", "Ipv6Ranges", "UserIdGroupPairs", "PrefixListIds"):
+            merged[key][name].extend(permission[name])
+    return list(merged.values())
+
+
+def _route(values: Dict[str, Any]) -> Dict[str, Any]:
+    """route ブロック・aws_route → Routes の要素"""
+    route: Dict[str, Any] = {}
+    for attribute, key in _ROUTE_DESTINATIONS.items():
+        if values.get(attribute):
+            route[key] = values[attribute]
+    for attribute, key in _ROUTE_TARGETS.items():
+        if values.get(attribute):
+            route[key] = values[attribute]
+    route["Origin"] = "CreateRoute"
+    route["State"] = "active"
+    return route
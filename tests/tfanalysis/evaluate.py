@@ -0,0 +1,465 @@
+"""
+Terraformの式の静的な評価
+
+変数の既定値（または指定した値）・ローカル値・count.index・each.key などから、構成の式の値を求めます。
+apply まで決まらない値（構成で指定していないリソースの属性：id、arn など）は、plan.py と同じ
+記号的な値（id は参照先のインスタンスのアドレス、それ以外は "アドレス.属性"）にするため、
+aws_nat_gateway.main[count.index].id のような参照もインスタンスごとに区別して照合できます。
+"""
+
+import ipaddress
+import json
+import math
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Union
+
+from .config import TerraformModule
+from .hcl import (
+    Block,
+    Conditional,
+    Expression,
+    ForExpression,
+    FunctionCall,
+    GetAttr,
+    Index,
+    Literal,
+    NotLiteral,
+    ObjectExpression,
+    Operation,
+    Splat,
+    Template,
+    TemplateDirective,
+    Traversal,
+    TupleExpression,
+    Variable,
+    literal_value,
+)
+from .plan import PlannedResource, ResourceIndex, symbolic_value
+
+_MISSING = object()
+
+# リソースの値に含めないメタ引数・ブロック
+_META_ATTRIBUTES = frozenset({"count", "for_each", "depends_on", "provider"})
+_META_BLOCKS = frozenset({"lifecycle", "provisioner", "connection", "dynamic"})
+
+
+class ResourceInstance(NamedTuple):
+    """resource・data ブロックのインスタンス（count・for_each で展開したもの）"""
+
+    address: str  # aws_subnet.private[0]、aws_vpc.main、data.aws_region.current など
+    block: Block
+    key: Optional[Union[int, str]]  # count の添字または for_each のキー
+    context: Dict[str, Any]  # count・each の値
+
+
+class Evaluator:
+    """
+    構成の式を評価する
+
+    使用例:
+        evaluator = Evaluator(TerraformModule.load("terraform"))
+        for instance in evaluator.instances("aws_subnet.private"):
+            print(instance.address, evaluator.attribute(instance, "cidr_block"))
+
+    評価できない式（モジュールの出力、未対応の関数、テンプレートのディレクティブ、既定値のない変数など）は
+    NotLiteral を送出します。
+    """
+
+    def __init__(self, module: TerraformModule, variables: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            module: Terraformの構成
+            variables: 変数の値（指定しない変数は既定値）
+        """
+        self.module = module
+        self.variables = dict(variables or {})
+        self._locals = module.locals
+        self._local_values: Dict[str, Any] = {}
+        self._evaluating: Set[str] = set()
+        self._instances: Dict[str, List[ResourceInstance]] = {}
+
+    # --- 宣言 ---
+
+    def variable(self, name: str) -> Any:
+        """変数の値（指定した値、なければ既定値）"""
+        if name in self.variables:
+            return self.variables[name]
+        block = self.module.variables.get(name)
+        if block is None:
+            raise NotLiteral(f"変数 {name} は宣言されていません")
+        default = block.attribute("default")
+        if default is None:
+            raise NotLiteral(f"変数 {name} には既定値がありません")
+        return literal_value(default.expression)
+
+    def local(self, name: str) -> Any:
+        """ローカル値"""
+        if name in self._local_values:
+            return self._local_values[name]
+        attribute = self._locals.get(name)
+        if attribute is None:
+            raise NotLiteral(f"ローカル値 {name} は宣言されていません")
+        key = f"local.{name}"
+        if key in self._evaluating:
+            raise NotLiteral(f"ローカル値 {name} が循環しています")
+        self._evaluating.add(key)
+        try:
+            value = self.evaluate(attribute.expression)
+        finally:
+            self._evaluating.discard(key)
+        self._local_values[name] = value
+        return value
+
+    def instances(self, address: str) -> List[ResourceInstance]:
+        """
+        resource・data ブロックのインスタンス（count・for_each で展開する）
+
+        Args:
+            address: aws_subnet.private、data.aws_region.current などのアドレス
+        """
+        if address in self._instances:
+            return self._instances[address]
+        block = self.module.resources.get(address) or self.module.data_sources.get(address)
+        if block is None:
+            raise NotLiteral(f"{address} は宣言されていません")
+        if address in self._evaluating:
+            raise NotLiteral(f"{address} の count・for_each が循環しています")
+        self._evaluating.add(address)
+        try:
+            instances = self._expand(address, block)
+        finally:
+            self._evaluating.discard(address)
+        self._instances[address] = instances
+        return instances
+
+    def _expand(self, address: str, block: Block) -> List[ResourceInstance]:
+        count = block.attribute("count")
+        if count is not None:
+            n = self.evaluate(count.expression)
+            if not isinstance(n, int) or isinstance(n, bool):
+                raise NotLiteral(f"{address} の count が整数ではありません")
+            return [ResourceInstance(f"{address}[{i}]", block, i, {"count": {"index": i}}) for i in range(n)]
+        for_each = block.attribute("for_each")
+        if for_each is not None:
+            collection = self.evaluate(for_each.expression)
+            items = collection.items() if isinstance(collection, dict) else ((key, key) for key in collection)
+            return [
+                ResourceInstance(f"{address}[{json.dumps(key)}]", block, key, {"each": {"key": key, "value": value}})
+                for key, value in sorted(items, key=lambda item: item[0])
+            ]
+        return [ResourceInstance(address, block, None, {})]
+
+    def attribute(self, instance: ResourceInstance, name: str, default: Any = _MISSING) -> Any:
+        """
+        インスタンスの属性の値（構成で指定していない属性は default、省略時は記号的な値）
+        """
+        attribute = instance.block.attribute(name)
+        if attribute is None:
+            return symbolic_value(instance.address, name) if default is _MISSING else default
+        return self.evaluate(attribute.expression, instance.context)
+
+    def block_attributes(self, instance: ResourceInstance, block: Block) -> Dict[str, Any]:
+        """インスタンスの入れ子のブロック（route、ingress など）の属性の値"""
+        return {attribute.name: self.evaluate(attribute.expression, instance.context) for attribute in block.attributes}
+
+    def resource_index(self, resource_types: Optional[Iterable[str]] = None) -> ResourceIndex:
+        """
+        構成のリソース（managed）を評価した ResourceIndex（plan.py と同じ形）
+
+        評価できない属性は apply まで決まらない値（記号的な値）、評価できない入れ子のブロックの属性は省きます。
+        PlanEC2View と組み合わせると、プランを作らずに構成から describe_* の応答を作れます。
+
+        Args:
+            resource_types: 対象とするリソースの種類（省略時はすべて）
+        """
+        types = None if resource_types is None else set(resource_types)
+        resources = []
+        for address, block in sorted(self.module.resources.items()):
+            resource_type, name = block.labels
+            if types is not None and resource_type not in types:
+                continue
+            for instance in self.instances(address):
+                values: Dict[str, Any] = {"id": symbolic_value(instance.address, "id")}
+                unknown = {"id"}
+                for attribute in block.attributes:
+                    if attribute.name in _META_ATTRIBUTES:
+                        continue
+                    try:
+                        value = self.evaluate(attribute.expression, instance.context)
+                    except NotLiteral:
+                        value = None
+                    if value is None or isinstance(value, ResourceInstance):
+                        value = symbolic_value(instance.address, attribute.name)
+                        unknown.add(attribute.name)
+                    values[attribute.name] = value
+                for child in block.blocks:
+                    if child.type in _META_BLOCKS:
+                        continue
+                    values.setdefault(child.type, []).append(self._known_attributes(instance, child))
+                resources.append(PlannedResource(
+                    instance.address, "managed", resource_type, name, instance.key, None,
+                    values, frozenset(unknown), ("create",),
+                ))
+        return ResourceIndex(resources)
+
+    def _known_attributes(self, instance: ResourceInstance, block: Block) -> Dict[str, Any]:
+        values = {}
+        for attribute in block.attributes:
+            try:
+                values[attribute.name] = self.evaluate(attribute.expression, instance.context)
+            except NotLiteral:
+                continue
+        for child in block.blocks:
+            values.setdefault(child.type, []).append(self._known_attributes(instance, child))
+        return values
+
+    # --- 式 ---
+
+    def evaluate(self, expression: Expression, context: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        式の値を求める
+
+        Args:
+            expression: 式
+            context: count・each・for 式の反復変数の値
+
+        Raises:
+            NotLiteral: 静的に評価できない場合
+        """
+        context = context or {}
+        try:
+            return self._evaluate(expression, context)
+        except (KeyError, IndexError, TypeError, ZeroDivisionError) as error:
+            raise NotLiteral(f"行 {getattr(expression, 'line', '?')}: 式を評価できません: {error!r}") from None
+
+    def _evaluate(self, expression: Expression, context: Dict[str, Any]) -> Any:
+        if isinstance(expression, Literal):
+            return expression.value
+        if isinstance(expression, Variable):
+            if expression.name in context:
+                return context[expression.name]
+            return self._traverse_root(expression.name, (), context)
+        if isinstance(expression, Traversal):
+            if isinstance(expression.source, Variable) and expression.source.name not in context:
+                return self._traverse_root(expression.source.name, expression.steps, context)
+            return self._apply(self._evaluate(expression.source, context), expression.steps, context)
+        if isinstance(expression, TupleExpression):
+            return [self._evaluate(item, context) for item in expression.items]
+        if isinstance(expression, ObjectExpression):
+            return {
+                _string(self._evaluate(key, context)): self._evaluate(value, context)
+                for key, value in expression.items
+            }
+        if isinstance(expression, FunctionCall):
+            return self._call(expression, context)
+        if isinstance(expression, Operation):
+            return self._operation(expression, context)
+        if isinstance(expression, Conditional):
+            condition = self._evaluate(expression.condition, context)
+            return self._evaluate(expression.true_result if condition else expression.false_result, context)
+        if isinstance(expression, ForExpression):
+            return self._for(expression, context)
+        if isinstance(expression, Template):
+            parts = []
+            for part in expression.parts:
+                if isinstance(part, TemplateDirective):
+                    raise NotLiteral(f"行 {expression.line}: テンプレートのディレクティブは評価できません")
+                parts.append(part if isinstance(part, str) else _string(self._evaluate(part, context)))
+            return "".join(parts)
+        raise NotLiteral(f"行 {getattr(expression, 'line', '?')}: 評価できない式です")
+
+    def _traverse_root(self, name: str, steps, context: Dict[str, Any]) -> Any:
+        """var.x・local.x・count.index・リソースの参照をたどる"""
+        steps = tuple(steps)
+        if name in ("var", "local") and steps and isinstance(steps[0], GetAttr):
+            value = self.variable(steps[0].name) if name == "var" else self.local(steps[0].name)
+            return self._apply(value, steps[1:], context)
+        if name in ("count", "each"):
+            if name not in context:
+                raise NotLiteral(f"{name} はこのブロックでは使用できません")
+            return self._apply(context[name], steps, context)
+        if name == "data" and len(steps) >= 2 and all(isinstance(s, GetAttr) for s in steps[:2]):
+            address = f"data.{steps[0].name}.{steps[1].name}"
+            return self._apply(self._resource(address), steps[2:], context)
+        if steps and isinstance(steps[0], GetAttr) and name not in ("module", "path", "terraform", "self"):
+            address = f"{name}.{steps[0].name}"
+            return self._apply(self._resource(address), steps[1:], context)
+        raise NotLiteral(f"{name} の参照は評価できません")
+
+    def _resource(self, address: str) -> Any:
+        """リソースの参照の値（count はリスト、for_each はマップ、それ以外はインスタンス）"""
+        instances = self.instances(address)
+        block = instances[0].block if instances else (
+            self.module.resources.get(address) or self.module.data_sources.get(address)
+        )
+        if block.attribute("count") is not None:
+            return list(instances)
+        if block.attribute("for_each") is not None:
+            return {instance.key: instance for instance in instances}
+        return instances[0]
+
+    def _apply(self, value: Any, steps, context: Dict[str, Any]) -> Any:
+        for position, step in enumerate(steps):
+            if isinstance(step, Splat):
+                items = [] if value is None else value if isinstance(value, list) else [value]
+                return [self._apply(item, steps[position + 1:], context) for item in items]
+            if isinstance(step, GetAttr):
+                value = self.attribute(value, step.name) if isinstance(value, ResourceInstance) else value[step.name]
+            elif isinstance(step, Index):
+                key = self._evaluate(step.key, context)
+                if isinstance(value, list):
+                    key = int(key)
+                value = value[key]
+        return value
+
+    def _for(self, expression: ForExpression, context: Dict[str, Any]) -> Any:
+        collection = self._evaluate(expression.collection, context)
+        items = collection.items() if isinstance(collection, dict) else enumerate(collection)
+        result_list: List[Any] = []
+        result_map: Dict[str, Any] = {}
+        for key, value in items:
+            scoped = dict(context)
+            scoped[expression.value_variable] = value
+            if expression.key_variable:
+                scoped[expression.key_variable] = key
+            if expression.condition is not None and not self._evaluate(expression.condition, scoped):
+                continue
+            item = self._evaluate(expression.value, scoped)
+            if expression.key is None:
+                result_list.append(item)
+            elif expression.grouping:
+                result_map.setdefault(_string(self._evaluate(expression.key, scoped)), []).append(item)
+            else:
+                result_map[_string(self._evaluate(expression.key, scoped))] = item
+        return result_list if expression.key is None else result_map
+
+    def _operation(self, expression: Operation, context: Dict[str, Any]) -> Any:
+        operator = expression.operator
+        if len(expression.operands) == 1:
+            operand = self._evaluate(expression.operands[0], context)
+            return -operand if operator == "-" else not operand
+        if operator in ("&&", "||"):
+            left = self._evaluate(expression.operands[0], context)
+            if operator == "&&":
+                return bool(left) and bool(self._evaluate(expression.operands[1], context))
+            return bool(left) or bool(self._evaluate(expression.operands[1], context))
+        left, right = (self._evaluate(operand, context) for operand in expression.operands)
+        if operator == "/":
+            result = left / right
+            return int(result) if result == int(result) else result
+        return _BINARY[operator](left, right)
+
+    def _call(self, expression: FunctionCall, context: Dict[str, Any]) -> Any:
+        if expression.name in ("try", "can"):
+            for argument in expression.arguments:
+                try:
+                    value = self.evaluate(argument, context)
+                except NotLiteral:
+                    continue
+                return True if expression.name == "can" else value
+            if expression.name == "can":
+                return False
+            raise NotLiteral(f"行 {expression.line}: try のすべての引数を評価できません")
+        function = _FUNCTIONS.get(expression.name)
+        if function is None:
+            raise NotLiteral(f"行 {expression.line}: 関数 {expression.name} は評価できません")
+        arguments = [self._evaluate(argument, context) for argument in expression.arguments]
+        if expression.expand_final and arguments:
+            arguments = arguments[:-1] + list(arguments[-1])
+        try:
+            return function(*arguments)
+        except ValueError as error:
+            raise NotLiteral(f"行 {expression.line}: {expression.name} を評価できません: {error}") from None
+
+
+def _string(value: Any) -> str:
+    """テンプレート・マップのキーでの文字列への変換"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float, str)):
+        return str(value)
+    if isinstance(value, ResourceInstance):
+        raise NotLiteral(f"{value.address} を文字列にできません")
+    raise NotLiteral(f"{type(value).__name__} を文字列にできません")
+
+
+_BINARY: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "%": lambda a, b: a % b,
+}
+
+
+def _cidrsubnet(prefix: str, newbits: int, netnum: int) -> str:
+    network = ipaddress.ip_network(prefix, strict=False)
+    new_prefix = network.prefixlen + newbits
+    if new_prefix > network.max_prefixlen or netnum >= 2 ** newbits:
+        raise ValueError(f"{prefix} に {newbits} ビットの番号 {netnum} は収まりません")
+    start = int(network.network_address) + (netnum << (network.max_prefixlen - new_prefix))
+    return str(ipaddress.ip_network((start, new_prefix)))
+
+
+def _cidrhost(prefix: str, hostnum: int) -> str:
+    network = ipaddress.ip_network(prefix, strict=False)
+    if not -network.num_addresses <= hostnum < network.num_addresses:
+        raise ValueError(f"{prefix} にホスト番号 {hostnum} は収まりません")
+    offset = hostnum if hostnum >= 0 else network.num_addresses + hostnum
+    return str(network.network_address + offset)
+
+
+def _format(spec: str, *values: Any) -> str:
+    return spec.replace("%v", "%s") % tuple(_string(v) if isinstance(v, bool) else v for v in values)
+
+
+def _flatten(values: List[Any]) -> List[Any]:
+    result = []
+    for value in values:
+        result.extend(_flatten(value) if isinstance(value, list) else [value])
+    return result
+
+
+# 対応する組み込み関数（引数は評価済みの値）
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "length": len,
+    "concat": lambda *lists: [item for values in lists for item in values],
+    "element": lambda values, index: values[index % len(values)],
+    "lookup": lambda mapping, key, *default: mapping[key] if key in mapping or not default else default[0],
+    "merge": lambda *maps: {key: value for mapping in maps for key, value in (mapping or {}).items()},
+    "tolist": list,
+    "toset": lambda values: sorted(set(values), key=str),
+    "tomap": dict,
+    "tostring": _string,
+    "tonumber": lambda value: value if isinstance(value, (int, float)) else json.loads(value),
+    "join": lambda separator, values: separator.join(_string(value) for value in values),
+    "split": lambda separator, value: value.split(separator),
+    "keys": lambda mapping: sorted(mapping),
+    "values": lambda mapping: [mapping[key] for key in sorted(mapping)],
+    "distinct": lambda values: list(dict.fromkeys(values)),
+    "flatten": _flatten,
+    "compact": lambda values: [value for value in values if value not in (None, "")],
+    "coalesce": lambda *values: next(iter([value for value in values if value not in (None, "")]), None),
+    "contains": lambda values, value: value in values,
+    "range": lambda *bounds: list(range(*bounds)),
+    "min": min,
+    "max": max,
+    "abs": abs,
+    "ceil": math.ceil,
+    "floor": math.floor,
+    "lower": str.lower,
+    "upper": str.upper,
+    "trimspace": str.strip,
+    "replace": lambda value, old, new: value.replace(old, new),
+    "startswith": str.startswith,
+    "endswith": str.endswith,
+    "format": _format,
+    "jsonencode": lambda value: json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False),
+    "cidrsubnet": _cidrsubnet,
+    "cidrhost": _cidrhost,
+    "cidrnetmask": lambda prefix: str(ipaddress.ip_network(prefix, strict=False).netmask),
+}
@@ -0,0 +1,159 @@
+"""
+Terraform構成の参照グラフ
+
+宣言（resource、data、variable、locals の各値、module、output、check）をノード、
+式中の参照（aws_ec2_client_vpn_endpoint.pc → aws_cloudwatch_log_group.vpn_pc など）を辺とする
+有向グラフです。変更したファイルの宣言から参照を逆向きにたどると、変更の影響を受ける宣言が分かります。
+"""
+
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .config import TerraformModule
+from .hcl import Block, Reference
+
+# 構成全体に影響するブロック（プロバイダーの設定、Terraformのバージョンなど）
+GLOBAL_BLOCK_TYPES = frozenset({"terraform", "provider"})
+
+
+def declaration_address(block: Block) -> Optional[str]:
+    """
+    最上位のブロックのアドレス（Block.address に加えて check.name。locals・provider などはNone）
+    """
+    if block.address is not None:
+        return block.address
+    if block.type == "check" and len(block.labels) == 1:
+        return f"check.{block.labels[0]}"
+    return None
+
+
+def declarations(blocks: Iterable[Block]) -> Iterator[Tuple[str, List[Reference]]]:
+    """
+    最上位のブロックの宣言と、その式中の参照を列挙する
+
+    locals ブロックは値ごとに local.name の宣言とする。
+    """
+    for block in blocks:
+        if block.type == "locals":
+            for attribute in block.attributes:
+                yield f"local.{attribute.name}", list(attribute.references())
+            continue
+        address = declaration_address(block)
+        if address is not None:
+            yield address, list(block.references())
+
+
+def declaration_sources(text: str, blocks: Tuple[Block, ...]) -> Dict[str, str]:
+    """
+    宣言ごとのソースの範囲（変更の有無を宣言単位で比べるため）
+
+    ブロックの開始行から次の最上位のブロックの直前の行までを1つの宣言のソースとし、
+    locals の値は式のソースとする。provider・terraform などアドレスのないブロックは種類とラベルをキーにする。
+
+    Args:
+        text: .tf ファイルの内容
+        blocks: text を解析した最上位のブロック
+
+    Returns:
+        アドレス → ソース
+    """
+    lines = text.splitlines()
+    starts = [block.line for block in blocks] + [len(lines) + 1]
+    sources: Dict[str, str] = {}
+    for block, start, end in zip(blocks, starts, starts[1:]):
+        if block.type == "locals":
+            for attribute in block.attributes:
+                sources[f"local.{attribute.name}"] = attribute.source
+            continue
+        key = declaration_address(block) or " ".join((block.type,) + block.labels)
+        sources[key] = "\n".join(line.rstrip() for line in lines[start - 1:end - 1]).strip()
+    return sources
+
+
+class ReferenceGraph:
+    """
+    宣言の参照グラフ
+
+    使用例:
+        graph = ReferenceGraph.from_module(TerraformModule.load("terraform"))
+        graph.dependencies("aws_ec2_client_vpn_endpoint.pc")  # 直接参照する宣言
+        graph.downstream(graph.declared_in("terraform/kms.tf"))  # kms.tf の変更の影響を受ける宣言
+    """
+
+    def __init__(self):
+        self._dependencies: Dict[str, Set[str]] = defaultdict(set)
+        self._dependents: Dict[str, Set[str]] = defaultdict(set)
+        # ファイルのパス → 宣言のアドレス
+        self._files: Dict[Path, Set[str]] = defaultdict(set)
+        # 構成全体に影響するブロックを含むファイル
+        self._global_files: Set[Path] = set()
+
+    @classmethod
+    def from_module(cls, module: TerraformModule) -> "ReferenceGraph":
+        """構成のすべての .tf ファイルからグラフを作る"""
+        graph = cls()
+        found: List[Tuple[str, List[Reference]]] = []
+        for terraform_file in module.files:
+            path = Path(terraform_file.path).resolve()
+            for address, refs in declarations(terraform_file.blocks):
+                graph._files[path].add(address)
+                found.append((address, refs))
+            if any(block.type in GLOBAL_BLOCK_TYPES for block in terraform_file.blocks):
+                graph._global_files.add(path)
+
+        nodes = {address for address, _ in found}
+        for address, refs in found:
+            # 宣言されたものへの参照のみを辺にする（count.index、path.module などは除く）
+            for target in {reference.subject for reference in refs} & nodes:
+                if target != address:
+                    graph._dependencies[address].add(target)
+                    graph._dependents[target].add(address)
+            graph._dependencies.setdefault(address, set())
+        return graph
+
+    @property
+    def nodes(self) -> FrozenSet[str]:
+        """すべての宣言のアドレス"""
+        return frozenset(self._dependencies)
+
+    def edges(self) -> Iterator[Tuple[str, str]]:
+        """(参照元, 参照先) の組をアドレスの順に列挙する"""
+        for source in sorted(self._dependencies):
+            for target in sorted(self._dependencies[source]):
+                yield source, target
+
+    def dependencies(self, address: str) -> FrozenSet[str]:
+        """宣言が直接参照する宣言"""
+        return frozenset(self._dependencies.get(address, ()))
+
+    def dependents(self, address: str) -> FrozenSet[str]:
+        """宣言を直接参照する宣言"""
+        return frozenset(self._dependents.get(address, ()))
+
+    def upstream(self, addresses: Iterable[str]) -> FrozenSet[str]:
+        """宣言と、それらが（推移的に）参照するすべての宣言"""
+        return self._closure(addresses, self._dependencies)
+
+    def downstream(self, addresses: Iterable[str]) -> FrozenSet[str]:
+        """宣言と、それらを（推移的に）参照するすべての宣言（変更の影響を受ける宣言）"""
+        return self._closure(addresses, self._dependents)
+
+    @staticmethod
+    def _closure(addresses: Iterable[str], adjacency: Dict[str, Set[str]]) -> FrozenSet[str]:
+        seen = set(addresses)
+        stack = list(seen)
+        while stack:
+            for neighbour in adjacency.get(stack.pop(), ()):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    stack.append(neighbour)
+        return frozenset(seen)
+
+    def declared_in(self, path: Union[str, Path]) -> FrozenSet[str]:
+        """ファイルで宣言されたアドレス（構成に含まれないファイルは空）"""
+        return frozenset(self._files.get(Path(path).resolve(), ()))
+
+    def is_global(self, path: Union[str, Path]) -> bool:
+        """ファイルが構成全体に影響するブロック（provider、terraform）を含むか"""
+        return Path(path).resolve() in self._global_files
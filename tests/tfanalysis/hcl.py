@@ -0,0 +1,1022 @@
+"""
+HCL（Terraformのネイティブ構文）の字句解析・構文解析
+
+.tf ファイルをブロック・属性・式の型付きの構文木にします。正規表現による抽出と異なり、
+入れ子の波括弧（validation ブロック・jsonencode のオブジェクトなど）、ヒアドキュメント、
+テンプレートの補間（${...}）・ディレクティブ（%{...}）、コメントを正しく扱います。
+
+構文木は NamedTuple とタプルのみで構成し、変更できないため、キャッシュしてテスト間で共有できます。
+式の評価は行いません（リテラルのみ literal_value で値にできます）。参照（var.x、aws_vpc.main.id など）は
+references で列挙できます。for 式・テンプレートの for ディレクティブの反復変数は参照に含めません。
+"""
+
+import re
+from typing import FrozenSet, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+# 字句の種類
+IDENT = "ident"
+NUMBER = "number"
+TEMPLATE = "template"
+OPERATOR = "operator"
+NEWLINE = "newline"
+EOF = "eof"
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_-]*')
+_NUMBER = re.compile(r'[0-9]+(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+_SPACE = re.compile(r'[ \t\r\ufeff]+')
+_OPERATOR = re.compile(
+    r'\.\.\.|==|!=|<=|>=|&&|\|\||=>|::|[<>=!+\-*/%?:.,()\[\]{}]'
+)
+_HEREDOC = re.compile(r'<<(-?)([A-Za-z_][A-Za-z0-9_-]*)[ \t]*\r?\n')
+_QUOTED_LITERAL = re.compile(r'[^"\\$%\n]+')
+_HEREDOC_LITERAL = re.compile(r'[^$%]+')
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", '"': '"', "\\": "\\"}
+
+# 二項演算子の優先順位（大きいほど強く結合する）
+_BINARY_PRECEDENCE = {
+    "||": 1,
+    "&&": 2,
+    "==": 3, "!=": 3,
+    "<": 4, ">": 4, "<=": 4, ">=": 4,
+    "+": 5, "-": 5,
+    "*": 6, "/": 6, "%": 6,
+}
+
+
+class HclSyntaxError(ValueError):
+    """HCLとして不正な入力"""
+
+    def __init__(self, message: str, path: str, line: int, column: int):
+        super().__init__(f"{path}:{line}:{column}: {message}")
+        self.path = path
+        self.line = line
+        self.column = column
+
+
+class NotLiteral(ValueError):
+    """式がリテラル（定数）ではない"""
+
+
+class Token(NamedTuple):
+    """字句"""
+
+    kind: str  # IDENT, NUMBER, TEMPLATE, OPERATOR, NEWLINE, EOF
+    value: object  # 識別子・演算子の文字列、数値の文字列、テンプレートの要素
+    line: int
+    column: int
+    start: int  # 入力中の開始位置（文字数）
+    end: int  # 入力中の終了位置（文字数）
+
+
+class _Interpolation(NamedTuple):
+    """テンプレート中の ${...} または %{...}（字句のまま保持し、構文解析で式にする）"""
+
+    marker: str  # "${" または "%{"
+    tokens: Tuple[Token, ...]
+
+
+# ---------------------------------------------------------------------------
+# 構文木
+# ---------------------------------------------------------------------------
+
+class Literal(NamedTuple):
+    """数値・文字列・真偽値・null のリテラル"""
+
+    value: object
+    line: int
+
+
+class Variable(NamedTuple):
+    """参照の先頭の名前（var、aws_vpc、each など）"""
+
+    name: str
+    line: int
+
+
+class GetAttr(NamedTuple):
+    """属性の参照（.name）"""
+
+    name: str
+
+
+class Index(NamedTuple):
+    """添字による参照（[key]、旧形式の .0）"""
+
+    key: "Expression"
+
+
+class Splat(NamedTuple):
+    """スプラット（[*] または .*）"""
+
+    full: bool  # [*] の場合True、.* の場合False
+
+
+TraversalStep = Union[GetAttr, Index, Splat]
+
+
+class Traversal(NamedTuple):
+    """式に続く属性・添字・スプラットの参照の連なり（aws_subnet.public[0].id など）"""
+
+    source: "Expression"
+    steps: Tuple[TraversalStep, ...]
+    line: int
+
+
+class FunctionCall(NamedTuple):
+    """関数呼び出し"""
+
+    name: str
+    arguments: Tuple["Expression", ...]
+    expand_final: bool  # 最後の引数が ... で展開される場合True
+    line: int
+
+
+class TupleExpression(NamedTuple):
+    """タプル（リスト）の構築 [a, b]"""
+
+    items: Tuple["Expression", ...]
+    line: int
+
+
+class ObjectExpression(NamedTuple):
+    """オブジェクト（マップ）の構築 {key = value}（識別子のキーは文字列のリテラルにする）"""
+
+    items: Tuple[Tuple["Expression", "Expression"], ...]
+    line: int
+
+
+class Operation(NamedTuple):
+    """単項・二項演算"""
+
+    operator: str
+    operands: Tuple["Expression", ...]
+    line: int
+
+
+class Conditional(NamedTuple):
+    """条件式 condition ? true_result : false_result"""
+
+    condition: "Expression"
+    true_result: "Expression"
+    false_result: "Expression"
+    line: int
+
+
+class ForExpression(NamedTuple):
+    """for 式 [for v in c : r] / {for k, v in c : k => v...}"""
+
+    key_variable: Optional[str]
+    value_variable: str
+    collection: "Expression"
+    key: Optional["Expression"]  # オブジェクトの for 式のみ
+    value: "Expression"
+    condition: Optional["Expression"]
+    grouping: bool  # 値の後ろに ... がある場合True
+    line: int
+
+
+class TemplateDirective(NamedTuple):
+    """テンプレートのディレクティブ（%{if c}・%{for v in c}・%{else}・%{endif}・%{endfor}）"""
+
+    keyword: str
+    variables: Tuple[str, ...]  # for の反復変数
+    expression: Optional["Expression"]
+    line: int
+
+
+class Template(NamedTuple):
+    """補間・ディレクティブを含む文字列（含まない文字列は Literal にする）"""
+
+    parts: Tuple[Union[str, "Expression", TemplateDirective], ...]
+    line: int
+
+
+Expression = Union[
+    Literal, Variable, Traversal, FunctionCall, TupleExpression, ObjectExpression,
+    Operation, Conditional, ForExpression, Template,
+]
+
+
+class Reference(NamedTuple):
+    """式中の参照（var.x、aws_subnet.public[0].id など。添字は省いた名前の並び）"""
+
+    parts: Tuple[str, ...]
+    line: int
+
+    @property
+    def subject(self) -> str:
+        """
+        参照の対象（var.x、local.x、module.x、data.type.name、type.name（リソース）など）
+        """
+        if self.parts[0] == "data":
+            return ".".join(self.parts[:3])
+        return ".".join(self.parts[:2])
+
+    def __str__(self) -> str:
+        return ".".join(self.parts)
+
+
+class Attribute(NamedTuple):
+    """属性 name = expression"""
+
+    name: str
+    expression: Expression
+    line: int
+    source: str  # 式の元のテキスト
+
+    @property
+    def value(self) -> object:
+        """
+        リテラルの値
+
+        Raises:
+            NotLiteral: 式がリテラルではない場合
+        """
+        return literal_value(self.expression)
+
+    def references(self) -> Iterator[Reference]:
+        """式中の参照を列挙する"""
+        return references(self.expression)
+
+
+class Block(NamedTuple):
+    """ブロック type "label" ... { ... }"""
+
+    type: str
+    labels: Tuple[str, ...]
+    attributes: Tuple[Attribute, ...]
+    blocks: Tuple["Block", ...]
+    line: int
+
+    def attribute(self, name: str) -> Optional[Attribute]:
+        """名前の属性を返す（ない場合はNone）"""
+        for attribute in self.attributes:
+            if attribute.name == name:
+                return attribute
+        return None
+
+    def literal(self, name: str, default: object = None) -> object:
+        """
+        属性のリテラルの値を返す
+
+        Args:
+            name: 属性名
+            default: 属性がない場合の値
+
+        Raises:
+            NotLiteral: 式がリテラルではない場合
+        """
+        attribute = self.attribute(name)
+        return default if attribute is None else attribute.value
+
+    def children(self, block_type: str) -> List["Block"]:
+        """種類が block_type の入れ子のブロックを返す"""
+        return [block for block in self.blocks if block.type == block_type]
+
+    @property
+    def address(self) -> Optional[str]:
+        """
+        宣言のアドレス（resource → type.name、data → data.type.name、variable → var.name、
+        module → module.name、output → output.name。それ以外はNone）
+        """
+        if self.type == "resource" and len(self.labels) == 2:
+            return ".".join(self.labels)
+        if self.type == "data" and len(self.labels) == 2:
+            return "data." + ".".join(self.labels)
+        prefix = {"variable": "var", "module": "module", "output": "output"}.get(self.type)
+        if prefix and len(self.labels) == 1:
+            return f"{prefix}.{self.labels[0]}"
+        return None
+
+    def references(self) -> Iterator[Reference]:
+        """属性と入れ子のブロック中の参照を列挙する"""
+        for attribute in self.attributes:
+            yield from references(attribute.expression)
+        for block in self.blocks:
+            yield from block.references()
+
+
+# ---------------------------------------------------------------------------
+# 式の走査
+# ---------------------------------------------------------------------------
+
+def references(expression: Expression, local_names: FrozenSet[str] = frozenset()) -> Iterator[Reference]:
+    """
+    式中の参照を出現順に列挙する
+
+    Args:
+        expression: 式
+        local_names: 参照に含めない名前（for 式の反復変数）
+
+    Yields:
+        参照
+    """
+    if isinstance(expression, Variable):
+        if expression.name not in local_names:
+            yield Reference((expression.name,), expression.line)
+    elif isinstance(expression, Traversal):
+        if isinstance(expression.source, Variable):
+            if expression.source.name not in local_names:
+                names = [expression.source.name]
+                names.extend(step.name for step in expression.steps if isinstance(step, GetAttr))
+                yield Reference(tuple(names), expression.line)
+        else:
+            yield from references(expression.source, local_names)
+        for step in expression.steps:
+            if isinstance(step, Index):
+                yield from references(step.key, local_names)
+    elif isinstance(expression, ForExpression):
+        yield from references(expression.collection, local_names)
+        scoped = local_names | {expression.value_variable}
+        if expression.key_variable:
+            scoped |= {expression.key_variable}
+        for child in (expression.key, expression.value, expression.condition):
+            if child is not None:
+                yield from references(child, scoped)
+    elif isinstance(expression, Template):
+        scoped = local_names
+        for part in expression.parts:
+            if isinstance(part, TemplateDirective):
+                if part.expression is not None:
+                    yield from references(part.expression, scoped)
+                # %{for} の反復変数は以降の要素で参照に含めない
+                scoped = scoped | frozenset(part.variables)
+            elif not isinstance(part, str):
+                yield from references(part, scoped)
+    elif isinstance(expression, ObjectExpression):
+        for key, value in expression.items:
+            yield from references(key, local_names)
+            yield from references(value, local_names)
+    elif isinstance(expression, Conditional):
+        for child in (expression.condition, expression.true_result, expression.false_result):
+            yield from references(child, local_names)
+    elif isinstance(expression, FunctionCall):
+        for argument in expression.arguments:
+            yield from references(argument, local_names)
+    elif isinstance(expression, TupleExpression):
+        for item in expression.items:
+            yield from references(item, local_names)
+    elif isinstance(expression, Operation):
+        for operand in expression.operands:
+            yield from references(operand, local_names)
+
+
+def literal_value(expression: Expression) -> object:
+    """
+    リテラル（数値・文字列・真偽値・null と、それだけからなるリスト・マップ）の値を返す
+
+    Args:
+        expression: 式
+
+    Returns:
+        値（リストは list、マップは dict）
+
+    Raises:
+        NotLiteral: 参照・関数呼び出し・補間などを含む場合
+    """
+    if isinstance(expression, Literal):
+        return expression.value
+    if isinstance(expression, TupleExpression):
+        return [literal_value(item) for item in expression.items]
+    if isinstance(expression, ObjectExpression):
+        result = {}
+        for key, value in expression.items:
+            name = literal_value(key)
+            if not isinstance(name, str):
+                raise NotLiteral(f"行 {expression.line}: マップのキーが文字列ではありません")
+            result[name] = literal_value(value)
+        return result
+    if (
+        isinstance(expression, Operation) and expression.operator == "-"
+        and len(expression.operands) == 1
+    ):
+        value = literal_value(expression.operands[0])
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value
+    raise NotLiteral(f"行 {getattr(expression, 'line', '?')}: リテラルではありません")
+
+
+# ---------------------------------------------------------------------------
+# 字句解析
+# ---------------------------------------------------------------------------
+
+class _Lexer:
+    """HCLの字句解析（テンプレートの補間は入れ子の字句列として保持する）"""
+
+    def __init__(self, text: str, path: str):
+        self.text = text
+        self.path = path
+        self.position = 0
+        self.line = 1
+        self.line_start = 0
+        # 直前の補間が ~} で閉じられた（後ろの文字列の先頭の空白を除く）場合True
+        self.strip_following = False
+
+    def error(self, message: str) -> HclSyntaxError:
+        return HclSyntaxError(message, self.path, self.line, self.position - self.line_start + 1)
+
+    def _advance(self, end: int) -> None:
+        """位置を end まで進める（行番号を更新する）"""
+        newlines = self.text.count("\n", self.position, end)
+        if newlines:
+            self.line += newlines
+            self.line_start = self.text.rindex("\n", self.position, end) + 1
+        self.position = end
+
+    def _token(self, kind: str, value: object, end: int) -> Token:
+        """現在位置から end までの字句を作って位置を進める"""
+        token = Token(kind, value, self.line, self.position - self.line_start + 1, self.position, end)
+        self._advance(end)
+        return token
+
+    def tokenize(self, interpolation: bool = False) -> List[Token]:
+        """
+        字句の列を返す
+
+        Args:
+            interpolation: テンプレートの補間の中（対応する } で終わる）
+
+        Returns:
+            字句の列（最後は EOF。補間の場合は閉じる } の位置の EOF）
+        """
+        text = self.text
+        tokens: List[Token] = []
+        depth = 0
+        self.strip_following = False
+        while True:
+            if self.position >= len(text):
+                if interpolation:
+                    raise self.error("テンプレートの補間が閉じられていません")
+                tokens.append(self._token(EOF, None, self.position))
+                return tokens
+            char = text[self.position]
+            if char in " \t\r\ufeff":
+                self._advance(_SPACE.match(text, self.position).end())
+            elif char == "\n":
+                tokens.append(self._token(NEWLINE, "\n", self.position + 1))
+            elif char == "#" or text.startswith("//", self.position):
+                end = text.find("\n", self.position)
+                self._advance(len(text) if end == -1 else end)
+            elif text.startswith("/*", self.position):
+                end = text.find("*/", self.position + 2)
+                if end == -1:
+                    raise self.error("コメントが閉じられていません")
+                multiline = "\n" in text[self.position:end]
+                token = self._token(NEWLINE, "\n", end + 2)
+                if multiline:
+                    # 複数行のコメントは改行として扱う
+                    tokens.append(token)
+            elif char == '"':
+                tokens.append(self._quoted())
+            elif char == "<" and _HEREDOC.match(text, self.position):
+                tokens.append(self._heredoc(_HEREDOC.match(text, self.position)))
+            elif _IDENTIFIER.match(text, self.position):
+                match = _IDENTIFIER.match(text, self.position)
+                tokens.append(self._token(IDENT, match.group(), match.end()))
+            elif _NUMBER.match(text, self.position):
+                match = _NUMBER.match(text, self.position)
+                tokens.append(self._token(NUMBER, match.group(), match.end()))
+            elif interpolation and char == "~" and depth == 0:
+                # 閉じる } の直前の ~（後ろの空白の除去）
+                following = _SPACE.match(text, self.position + 1)
+                end = following.end() if following else self.position + 1
+                if not text.startswith("}", end):
+                    raise self.error("不正な文字です: '~'")
+                self._advance(end)
+                self.strip_following = True
+            else:
+                match = _OPERATOR.match(text, self.position)
+                if not match:
+                    raise self.error(f"不正な文字です: {char!r}")
+                operator = match.group()
+                if operator == "{":
+                    depth += 1
+                elif operator == "}":
+                    if interpolation and depth == 0:
+                        tokens.append(self._token(EOF, None, self.position))
+                        self._advance(match.end())
+                        return tokens
+                    depth -= 1
+                tokens.append(self._token(OPERATOR, operator, match.end()))
+
+    def _quoted(self) -> Token:
+        """"..." の文字列"""
+        start, line, column = self.position, self.line, self.position - self.line_start + 1
+        self._advance(self.position + 1)
+        parts = self._template_parts(quoted=True, end=len(self.text))
+        return Token(TEMPLATE, parts, line, column, start, self.position)
+
+    def _heredoc(self, header) -> Token:
+        """<<EOF / <<-EOF のヒアドキュメント"""
+        start, line, column = self.position, self.line, self.position - self.line_start + 1
+        indented, marker = header.group(1) == "-", header.group(2)
+        closing = re.compile(rf'^[ \t]*{re.escape(marker)}[ \t]*\r?$', re.MULTILINE)
+        end_match = closing.search(self.text, header.end())
+        if not end_match:
+            raise self.error(f"ヒアドキュメントの終わり（{marker}）がありません")
+        self._advance(header.end())
+        body_end = end_match.start()
+        parts = self._template_parts(quoted=False, end=body_end)
+        if indented:
+            parts = _strip_indent(parts)
+        self._advance(end_match.end())
+        return Token(TEMPLATE, parts, line, column, start, self.position)
+
+    def _template_parts(self, quoted: bool, end: int) -> Tuple[Union[str, _Interpolation], ...]:
+        """テンプレートの本文を文字列と補間の並びにする（"..." は閉じる " の後ろまで進める）"""
+        text = self.text
+        parts: List[Union[str, _Interpolation]] = []
+        literal: List[str] = []
+        strip_next = False
+        literal_pattern = _QUOTED_LITERAL if quoted else _HEREDOC_LITERAL
+
+        def flush(strip_right: bool = False) -> None:
+            nonlocal strip_next
+            chunk = "".join(literal)
+            literal.clear()
+            if strip_next:
+                chunk = chunk.lstrip()
+                strip_next = False
+            if strip_right:
+                chunk = chunk.rstrip()
+            if chunk:
+                parts.append(chunk)
+
+        while True:
+            if self.position >= end:
+                if quoted:
+                    raise self.error("文字列が閉じられていません")
+                break
+            match = literal_pattern.match(text, self.position, end)
+            if match:
+                literal.append(match.group())
+                self._advance(match.end())
+                continue
+            char = text[self.position]
+            if quoted and char == '"':
+                self._advance(self.position + 1)
+                break
+            if quoted and char == "\n":
+                raise self.error("文字列が閉じられていません")
+            if quoted and char == "\\":
+                literal.append(self._escape())
+            elif text.startswith(("$${", "%%{"), self.position):
+                literal.append(text[self.position + 1:self.position + 3])
+                self._advance(self.position + 3)
+            elif text.startswith(("${", "%{"), self.position):
+                marker = text[self.position:self.position + 2]
+                self._advance(self.position + 2)
+                strip_left = text.startswith("~", self.position)
+                if strip_left:
+                    self._advance(self.position + 1)
+                flush(strip_right=strip_left)
+                tokens = self.tokenize(interpolation=True)
+                parts.append(_Interpolation(marker, tuple(tokens)))
+                strip_next = self.strip_following
+            else:
+                literal.append(char)
+                self._advance(self.position + 1)
+        flush()
+        return tuple(parts)
+
+    def _escape(self) -> str:
+        """"..." 中のエスケープシーケンス"""
+        text = self.text
+        code = text[self.position + 1:self.position + 2]
+        if code in _ESCAPES:
+            self._advance(self.position + 2)
+            return _ESCAPES[code]
+        if code in ("u", "U"):
+            size = 4 if code == "u" else 8
+            digits = text[self.position + 2:self.position + 2 + size]
+            if len(digits) == size and re.fullmatch(r'[0-9A-Fa-f]+', digits):
+                self._advance(self.position + 2 + size)
+                return chr(int(digits, 16))
+        raise self.error(f"不正なエスケープシーケンスです: \\{code}")
+
+
+def _strip_indent(parts: Tuple[Union[str, _Interpolation], ...]) -> Tuple[Union[str, _Interpolation], ...]:
+    """<<- のヒアドキュメントから各行に共通する先頭の空白を除く"""
+    lines = []
+    at_line_start = True
+    for part in parts:
+        if isinstance(part, str):
+            for index, line in enumerate(part.split("\n")):
+                if (index > 0 or at_line_start) and line.strip():
+                    lines.append(len(line) - len(line.lstrip(" \t")))
+            at_line_start = part.endswith("\n")
+        else:
+            at_line_start = False
+    indent = min(lines, default=0)
+    if not indent:
+        return parts
+
+    result: List[Union[str, _Interpolation]] = []
+    at_line_start = True
+    for part in parts:
+        if isinstance(part, str):
+            lines_in_part = part.split("\n")
+            stripped = [
+                line[min(indent, len(line) - len(line.lstrip(" \t"))):]
+                if index > 0 or at_line_start else line
+                for index, line in enumerate(lines_in_part)
+            ]
+            result.append("\n".join(stripped))
+            at_line_start = part.endswith("\n")
+        else:
+            result.append(part)
+            at_line_start = False
+    return tuple(result)
+
+
+# ---------------------------------------------------------------------------
+# 構文解析
+# ---------------------------------------------------------------------------
+
+class _Parser:
+    """字句の列からブロック・属性・式の構文木を作る"""
+
+    def __init__(self, tokens: List[Token], text: str, path: str):
+        self.tokens = tokens
+        self.text = text
+        self.path = path
+        self.index = 0
+        # 改行を無視する（括弧の中）か、区切りとして扱う（本文・オブジェクトの中）か
+        self.ignore_newlines = [False]
+
+    # --- 字句の読み込み ---
+
+    def peek(self) -> Token:
+        if self.ignore_newlines[-1]:
+            while self.tokens[self.index].kind == NEWLINE:
+                self.index += 1
+        return self.tokens[self.index]
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token.kind != EOF:
+            self.index += 1
+        return token
+
+    def skip_newlines(self) -> None:
+        while self.tokens[self.index].kind == NEWLINE:
+            self.index += 1
+
+    def is_operator(self, value: str) -> bool:
+        token = self.peek()
+        return token.kind == OPERATOR and token.value == value
+
+    def expect(self, value: str) -> Token:
+        token = self.next()
+        if token.kind != OPERATOR or token.value != value:
+            raise self.error(token, f"'{value}' が必要です")
+        return token
+
+    def error(self, token: Token, message: str) -> HclSyntaxError:
+        found = "入力の終わり" if token.kind == EOF else repr(self.text[token.start:token.end])
+        return HclSyntaxError(f"{message}（{found}）", self.path, token.line, token.column)
+
+    # --- 本文 ---
+
+    def parse_body(self, closing: bool) -> Tuple[Tuple[Attribute, ...], Tuple[Block, ...]]:
+        """
+        本文（属性とブロックの並び）を解析する
+
+        Args:
+            closing: } で終わる（ブロックの本文）場合True、入力の終わりで終わる場合False
+        """
+        attributes: List[Attribute] = []
+        blocks: List[Block] = []
+        names = set()
+        while True:
+            self.skip_newlines()
+            token = self.next()
+            if closing and token.kind == OPERATOR and token.value == "}":
+                break
+            if not closing and token.kind == EOF:
+                break
+            if token.kind != IDENT:
+                raise self.error(token, "属性名またはブロックの種類が必要です")
+
+            if self.is_operator("="):
+                self.next()
+                expression_start = self.peek()
+                expression = self.parse_expression()
+                if token.value in names:
+                    raise self.error(token, f"属性 {token.value} が重複しています")
+                names.add(token.value)
+                source = self.text[expression_start.start:self.tokens[self.index - 1].end]
+                attributes.append(Attribute(token.value, expression, token.line, source))
+            else:
+                labels = []
+                while self.peek().kind in (IDENT, TEMPLATE):
+                    label = self.next()
+                    if label.kind == TEMPLATE:
+                        if any(not isinstance(part, str) for part in label.value):
+                            raise self.error(label, "ブロックのラベルに補間は使えません")
+                        labels.append("".join(label.value))
+                    else:
+                        labels.append(label.value)
+                self.expect("{")
+                self.ignore_newlines.append(False)
+                body_attributes, body_blocks = self.parse_body(closing=True)
+                self.ignore_newlines.pop()
+                blocks.append(Block(token.value, tuple(labels), body_attributes, body_blocks, token.line))
+
+            following = self.peek()
+            if following.kind == NEWLINE:
+                continue
+            if following.kind == EOF and not closing:
+                continue
+            if closing and following.kind == OPERATOR and following.value == "}":
+                continue
+            raise self.error(following, "改行が必要です")
+        return tuple(attributes), tuple(blocks)
+
+    # --- 式 ---
+
+    def parse_expression(self) -> Expression:
+        """式（条件式を含む）を解析する"""
+        condition = self.parse_binary(1)
+        if not self.is_operator("?"):
+            return condition
+        self.next()
+        true_result = self.parse_expression()
+        self.expect(":")
+        false_result = self.parse_expression()
+        return Conditional(condition, true_result, false_result, _line(condition))
+
+    def parse_binary(self, precedence: int) -> Expression:
+        left = self.parse_unary()
+        while True:
+            token = self.peek()
+            operator_precedence = _BINARY_PRECEDENCE.get(token.value) if token.kind == OPERATOR else None
+            if operator_precedence is None or operator_precedence < precedence:
+                return left
+            self.next()
+            right = self.parse_binary(operator_precedence + 1)
+            left = Operation(token.value, (left, right), _line(left))
+
+    def parse_unary(self) -> Expression:
+        token = self.peek()
+        if token.kind == OPERATOR and token.value in ("!", "-"):
+            self.next()
+            return Operation(token.value, (self.parse_unary(),), token.line)
+        return self.parse_postfix(self.parse_primary())
+
+    def parse_postfix(self, expression: Expression) -> Expression:
+        """属性・添字・スプラットの参照を続けて解析する"""
+        steps: List[TraversalStep] = []
+        while True:
+            if self.is_operator("."):
+                self.next()
+                token = self.next()
+                if token.kind == IDENT:
+                    steps.append(GetAttr(token.value))
+                elif token.kind == NUMBER and token.value.isdigit():
+                    steps.append(Index(Literal(int(token.value), token.line)))
+                elif token.kind == OPERATOR and token.value == "*":
+                    steps.append(Splat(full=False))
+                else:
+                    raise self.error(token, "属性名が必要です")
+            elif self.is_operator("["):
+                self.next()
+                self.ignore_newlines.append(True)
+                if self.is_operator("*"):
+                    self.next()
+                    steps.append(Splat(full=True))
+                else:
+                    steps.append(Index(self.parse_expression()))
+                self.expect("]")
+                self.ignore_newlines.pop()
+            else:
+                break
+        if not steps:
+            return expression
+        if isinstance(expression, Traversal):
+            return Traversal(expression.source, expression.steps + tuple(steps), expression.line)
+        return Traversal(expression, tuple(steps), _line(expression))
+
+    def parse_primary(self) -> Expression:
+        token = self.next()
+        if token.kind == NUMBER:
+            value = float(token.value) if any(c in token.value for c in ".eE") else int(token.value)
+            return Literal(value, token.line)
+        if token.kind == TEMPLATE:
+            return self.parse_template(token)
+        if token.kind == IDENT:
+            if token.value in ("true", "false"):
+                return Literal(token.value == "true", token.line)
+            if token.value == "null":
+                return Literal(None, token.line)
+            name = token.value
+            # プロバイダー定義関数（provider::name::function）
+            while self.is_operator("::"):
+                self.next()
+                part = self.next()
+                if part.kind != IDENT:
+                    raise self.error(part, "関数名が必要です")
+                name += "::" + part.value
+            if self.is_operator("("):
+                return self.parse_call(name, token.line)
+            if "::" in name:
+                raise self.error(self.peek(), "'(' が必要です")
+            return Variable(name, token.line)
+        if token.kind == OPERATOR:
+            if token.value == "(":
+                self.ignore_newlines.append(True)
+                expression = self.parse_expression()
+                self.expect(")")
+                self.ignore_newlines.pop()
+                return expression
+            if token.value == "[":
+                return self.parse_tuple(token)
+            if token.value == "{":
+                return self.parse_object(token)
+        raise self.error(token, "式が必要です")
+
+    def parse_call(self, name: str, line: int) -> FunctionCall:
+        self.expect("(")
+        self.ignore_newlines.append(True)
+        arguments: List[Expression] = []
+        expand_final = False
+        while not self.is_operator(")"):
+            arguments.append(self.parse_expression())
+            if self.is_operator("..."):
+                self.next()
+                expand_final = True
+                break
+            if not self.is_operator(","):
+                break
+            self.next()
+        self.expect(")")
+        self.ignore_newlines.pop()
+        return FunctionCall(name, tuple(arguments), expand_final, line)
+
+    def _at_for(self) -> bool:
+        """for 式の始まりか（for の後ろに反復変数が続く）"""
+        token = self.peek()
+        following = self.tokens[self.index + 1:self.index + 3]
+        return (
+            token.kind == IDENT and token.value == "for"
+            and any(t.kind == IDENT for t in following[:1])
+        )
+
+    def parse_tuple(self, opening: Token) -> Expression:
+        self.ignore_newlines.append(True)
+        if self._at_for():
+            expression = self.parse_for(opening, "]")
+        else:
+            items: List[Expression] = []
+            while not self.is_operator("]"):
+                items.append(self.parse_expression())
+                if not self.is_operator(","):
+                    break
+                self.next()
+            self.expect("]")
+            expression = TupleExpression(tuple(items), opening.line)
+        self.ignore_newlines.pop()
+        return expression
+
+    def parse_object(self, opening: Token) -> Expression:
+        self.ignore_newlines.append(True)
+        if self._at_for():
+            expression = self.parse_for(opening, "}")
+            self.ignore_newlines.pop()
+            return expression
+        self.ignore_newlines[-1] = False
+
+        items: List[Tuple[Expression, Expression]] = []
+        while True:
+            self.skip_newlines()
+            if self.is_operator("}"):
+                self.next()
+                break
+            token = self.peek()
+            following = self.tokens[self.index + 1]
+            if token.kind == IDENT and following.kind == OPERATOR and following.value in ("=", ":"):
+                # 識別子のキーは文字列として扱う
+                self.next()
+                key: Expression = Literal(token.value, token.line)
+            else:
+                key = self.parse_expression()
+            separator = self.next()
+            if separator.kind != OPERATOR or separator.value not in ("=", ":"):
+                raise self.error(separator, "'=' が必要です")
+            items.append((key, self.parse_expression()))
+
+            following = self.peek()
+            if following.kind == OPERATOR and following.value == ",":
+                self.next()
+            elif following.kind == NEWLINE:
+                continue
+            elif not (following.kind == OPERATOR and following.value == "}"):
+                raise self.error(following, "',' または改行が必要です")
+        self.ignore_newlines.pop()
+        return ObjectExpression(tuple(items), opening.line)
+
+    def parse_for(self, opening: Token, closing: str) -> ForExpression:
+        self.next()  # for
+        first = self.next()
+        if first.kind != IDENT:
+            raise self.error(first, "反復変数が必要です")
+        key_variable, value_variable = None, first.value
+        if self.is_operator(","):
+            self.next()
+            second = self.next()
+            if second.kind != IDENT:
+                raise self.error(second, "反復変数が必要です")
+            key_variable, value_variable = first.value, second.value
+        keyword = self.next()
+        if keyword.kind != IDENT or keyword.value != "in":
+            raise self.error(keyword, "'in' が必要です")
+        collection = self.parse_expression()
+        self.expect(":")
+
+        key = None
+        if closing == "}":
+            key = self.parse_expression()
+            self.expect("=>")
+        value = self.parse_expression()
+        grouping = False
+        if closing == "}" and self.is_operator("..."):
+            self.next()
+            grouping = True
+        condition = None
+        token = self.peek()
+        if token.kind == IDENT and token.value == "if":
+            self.next()
+            condition = self.parse_expression()
+        self.expect(closing)
+        return ForExpression(
+            key_variable, value_variable, collection, key, value, condition, grouping, opening.line
+        )
+
+    def parse_template(self, token: Token) -> Expression:
+        """テンプレートの字句を Literal（補間なし）または Template にする"""
+        if all(isinstance(part, str) for part in token.value):
+            return Literal("".join(token.value), token.line)
+        parts: List[Union[str, Expression, TemplateDirective]] = []
+        for part in token.value:
+            if isinstance(part, str):
+                parts.append(part)
+                continue
+            parser = _Parser(list(part.tokens), self.text, self.path)
+            parser.ignore_newlines = [True]
+            if part.marker == "${":
+                parts.append(parser.parse_expression())
+            else:
+                parts.append(parser.parse_directive())
+            end = parser.peek()
+            if end.kind != EOF:
+                raise self.error(end, "'}' が必要です")
+        return Template(tuple(parts), token.line)
+
+    def parse_directive(self) -> TemplateDirective:
+        keyword = self.next()
+        if keyword.kind != IDENT or keyword.value not in ("if", "else", "endif", "for", "endfor"):
+            raise self.error(keyword, "テンプレートのディレクティブが必要です")
+        if keyword.value == "if":
+            return TemplateDirective("if", (), self.parse_expression(), keyword.line)
+        if keyword.value == "for":
+            names = [self.next()]
+            if self.is_operator(","):
+                self.next()
+                names.append(self.next())
+            if any(name.kind != IDENT for name in names):
+                raise self.error(names[-1], "反復変数が必要です")
+            in_keyword = self.next()
+            if in_keyword.kind != IDENT or in_keyword.value != "in":
+                raise self.error(in_keyword, "'in' が必要です")
+            return TemplateDirective(
+                "for", tuple(name.value for name in names), self.parse_expression(), keyword.line
+            )
+        return TemplateDirective(keyword.value, (), None, keyword.line)
+
+
+def _line(expression: Expression) -> int:
+    return expression.line
+
+
+def parse(text: str, path: str = "<string>") -> Tuple[Block, ...]:
+    """
+    HCLのテキストを解析して最上位のブロックを返す
+
+    Args:
+        text: .tf ファイルの内容
+        path: エラーメッセージに表示するパス
+
+    Returns:
+        最上位のブロック（最上位の属性は .tf では使わないためエラーにする）
+
+    Raises:
+        HclSyntaxError: 構文が不正な場合
+    """
+    tokens = _Lexer(text, path).tokenize()
+    parser = _Parser(tokens, text, path)
+    attributes, blocks = parser.parse_body(closing=False)
+    if attributes:
+        attribute = attributes[0]
+        raise HclSyntaxError(f"最上位に属性 {attribute.name} は書けません", path, attribute.line, 1)
+    return blocks
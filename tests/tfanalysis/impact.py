@@ -0,0 +1,206 @@
+"""
+変更したファイルから影響を受けるテストを選ぶ
+
+テストは検証するTerraformの宣言のアドレスを terraform_resources マーカー（fnmatch のパターン）で宣言します。
+変更した .tf ファイルの宣言（ベースとの比較ができる場合は変更した宣言のみ）から参照グラフを逆向きにたどり、
+影響を受ける宣言に一致するマーカーを持つテストだけを選びます。たとえば cloudtrail.tf の変更は
+CloudTrail・S3の宣言にしか影響しないため、VPNエンドポイント・ネットワークのテストは実行しません。
+
+判断できない変更は安全側に倒します:
+    - terraform/ の .tf 以外のファイル（tfvars、ロックファイルなど）、provider・terraform ブロックの変更 → すべての宣言が影響を受ける
+    - テストモジュール（test_*.py）の変更 → そのモジュールのテストを選ぶ
+    - それ以外のファイル（conftest.py、共有パッケージ、ドキュメントなど）の変更 → すべてのテストを選ぶ
+"""
+
+import os
+import re
+import subprocess
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional, Set
+
+from tests.secret_scan.gitsource import repository_root, run_git
+
+from .config import DEFAULT_CACHE, ParseCache, TerraformModule
+from .graph import ReferenceGraph, declaration_sources
+from .hcl import HclSyntaxError
+
+# テストが検証する宣言を指定するマーカー
+MARKER = "terraform_resources"
+
+
+class ChangedFile(NamedTuple):
+    """変更したファイル"""
+
+    path: Path  # 絶対パス
+    previous: Optional[bytes]  # ベースの内容（追加したファイル・ベースが不明な場合はNone）
+
+
+def git_changed_files(repo_root: Path, base_ref: str) -> List[ChangedFile]:
+    """
+    ベースとのマージベースから作業ツリーまで（コミット済み・未コミット・未追跡）に変更したファイルを列挙する
+
+    Args:
+        repo_root: リポジトリ内の任意のパス
+        base_ref: 比較するベースref
+
+    Raises:
+        subprocess.CalledProcessError: gitコマンドが失敗した場合
+    """
+    root = repository_root(repo_root)
+    merge_base = run_git(root, "merge-base", base_ref, "HEAD").decode("ascii").strip()
+    names = run_git(root, "diff", "--name-only", "-z", "--no-renames", merge_base).split(b"\0")
+    names += run_git(root, "ls-files", "--others", "--exclude-standard", "-z").split(b"\0")
+
+    changes = []
+    for name in dict.fromkeys(name.decode("utf-8", errors="surrogateescape") for name in names if name):
+        previous = None
+        if name.endswith(".tf"):
+            try:
+                previous = run_git(root, "show", f"{merge_base}:{name}")
+            except subprocess.CalledProcessError:
+                pass  # マージベースにないファイル（追加したファイル）
+        changes.append(ChangedFile(root / name, previous))
+    return changes
+
+
+def _is_address(key: str) -> bool:
+    """declaration_sources のキーが宣言のアドレスか（アドレスのないブロックは "provider aws" などの種類とラベル）"""
+    return "." in key.split(" ", 1)[0]
+
+
+def _is_test_module(path: Path) -> bool:
+    return path.name.startswith("test_") and path.suffix == ".py"
+
+
+def _is_within(path: Path, directory: Path) -> bool:
+    try:
+        path.relative_to(directory)
+    except ValueError:
+        return False
+    return True
+
+
+class ImpactAnalysis:
+    """
+    変更したファイルの影響範囲
+
+    使用例:
+        impact = ImpactAnalysis(TerraformModule.load("terraform"), git_changed_files(root, "origin/main"))
+        impact.selects(Path("tests/integration/test_logging.py"), ["aws_cloudtrail.*"])
+    """
+
+    def __init__(self, module: TerraformModule, changes: Iterable[ChangedFile], cache: Optional[ParseCache] = None):
+        """
+        Args:
+            module: 現在のTerraformの構成
+            changes: 変更したファイル
+            cache: 変更前の内容の構文木のキャッシュ（省略時は DEFAULT_CACHE）
+        """
+        cache = DEFAULT_CACHE if cache is None else cache
+        self.graph = ReferenceGraph.from_module(module)
+        terraform_dir = module.directory.resolve()
+        current = {Path(f.path).resolve(): f for f in module.files}
+
+        changes = [change._replace(path=Path(change.path).resolve()) for change in changes]
+        self.changed_paths: FrozenSet[Path] = frozenset(change.path for change in changes)
+        # Terraformの構成・テストモジュール以外の変更（すべてのテストを選ぶ）
+        self.other_files: FrozenSet[Path] = frozenset(
+            change.path for change in changes
+            if not _is_within(change.path, terraform_dir) and not _is_test_module(change.path)
+        )
+
+        changed: Set[str] = set()
+        everything = False
+        for change in changes:
+            if not _is_within(change.path, terraform_dir):
+                continue
+            if change.path.suffix != ".tf" or change.path.parent != terraform_dir:
+                everything = True
+                continue
+            declared = self._changed_declarations(change, current.get(change.path), cache)
+            if declared is None:
+                everything = True
+                continue
+            changed |= declared
+
+        # アドレスのないブロック（provider、terraform、moved など）の変更は構成全体に影響する
+        addresses = {key for key in changed if _is_address(key)}
+        everything = everything or len(addresses) < len(changed)
+        self.changed_declarations: FrozenSet[str] = frozenset(changed)
+        # 削除した宣言は現在のグラフにないため、それ自体を影響範囲に加える
+        self.affected: FrozenSet[str] = (
+            self.graph.nodes if everything else self.graph.downstream(addresses & self.graph.nodes)
+        ) | addresses
+
+    def _changed_declarations(self, change: ChangedFile, terraform_file, cache: ParseCache) -> Optional[Set[str]]:
+        """
+        ファイルで変更した宣言（判断できない場合はNone）
+
+        ベースの内容がある場合は宣言ごとのソースを比べ、ない場合はファイルのすべての宣言とする。
+        """
+        if terraform_file is None and change.previous is None:
+            # 削除したファイルで、ベースの内容が分からない
+            return None
+        try:
+            before = {}
+            if change.previous is not None:
+                _, blocks = cache.parse(change.previous, str(change.path))
+                before = declaration_sources(change.previous.decode("utf-8"), blocks)
+            after = {}
+            if terraform_file is not None:
+                after = declaration_sources(terraform_file.path.read_text(encoding="utf-8"), terraform_file.blocks)
+        except (HclSyntaxError, UnicodeDecodeError, OSError):
+            return None
+        if change.previous is None:
+            return set(after)
+        return {key for key in before.keys() | after.keys() if before.get(key) != after.get(key)}
+
+    def covers(self, patterns: Iterable[str]) -> bool:
+        """影響を受ける宣言にパターン（fnmatch）のいずれかが一致するか"""
+        patterns = list(patterns)
+        return any(fnmatchcase(address, pattern) for address in self.affected for pattern in patterns)
+
+    def selects(self, test_path: Path, patterns: Iterable[str]) -> bool:
+        """
+        テストを選ぶか
+
+        Args:
+            test_path: テストモジュールのパス
+            patterns: テストの terraform_resources マーカーのパターン（マーカーがない場合は空）
+        """
+        if self.other_files or Path(test_path).resolve() in self.changed_paths:
+            return True
+        return self.covers(patterns)
+
+    def describe(self) -> str:
+        """影響範囲を説明する文字列"""
+        if self.other_files:
+            return f"Terraform以外の変更 {len(self.other_files)} 件のため、すべてのテストを選択"
+        return (
+            f"変更したファイル {len(self.changed_paths)} 件、変更した宣言 {len(self.changed_declarations)} 件、"
+            f"影響を受ける宣言 {len(self.affected)} 件"
+        )
+
+
+def impact_from_environment(project_root: Path, terraform_dir: Optional[Path] = None) -> Optional[ImpactAnalysis]:
+    """
+    環境変数から影響範囲を求める（未指定の場合はNone）
+
+    TF_IMPACT_BASE: 比較するベースref（マージベースから作業ツリーまでの変更）
+    TF_IMPACT_FILES: 変更したファイル（プロジェクトルートからの相対パス。カンマまたは空白区切り）
+
+    Args:
+        project_root: プロジェクトのルートディレクトリ
+        terraform_dir: Terraformのディレクトリ（省略時は project_root/terraform）
+    """
+    terraform_dir = terraform_dir or project_root / "terraform"
+    base_ref = os.environ.get("TF_IMPACT_BASE")
+    files = os.environ.get("TF_IMPACT_FILES")
+    if base_ref:
+        changes = git_changed_files(project_root, base_ref)
+    elif files:
+        changes = [ChangedFile(project_root / name, None) for name in re.split(r"[,\s]+", files.strip()) if name]
+    else:
+        return None
+    return ImpactAnalysis(TerraformModule.load(terraform_dir), changes)
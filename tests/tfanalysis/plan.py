@@ -0,0 +1,352 @@
+"""
+terraform show -json（プラン・ステート）のリソースの索引
+
+保存したプラン（terraform plan -out）を terraform show -json で1回だけJSONにし、
+リソースのインスタンスをアドレス・種類・タグで引ける索引をメモリに作ります。
+AWSのAPIを呼ばずに、apply 前のプランに対してリソースの設定を検証できます。
+
+プランでは apply まで決まらない値（id、arn など）があります。これらは構成（configuration）の式の参照を
+たどって、参照先のインスタンスの値または記号的な値（id は参照先のインスタンスのアドレス、
+それ以外は "アドレス.属性"）にします。たとえば aws_subnet.public[0] の vpc_id は、
+aws_vpc.main の id と同じ "aws_vpc.main" になるため、リソース間の関連を apply 前に照合できます。
+"""
+
+import json
+import re
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+# 属性のパスの要素（属性名または添字）
+PathElement = Union[str, int]
+
+# 参照（aws_subnet.public[0].id、data.aws_region.current.name など）
+_REFERENCE = re.compile(
+    r'^(?P<resource>(?:data\.)?[A-Za-z_][A-Za-z0-9_-]*\.[A-Za-z_][A-Za-z0-9_-]*)'
+    r'(?:\[(?P<index>[^\]]+)\])?(?:\.(?P<attribute>[A-Za-z_][A-Za-z0-9_-]*))?'
+)
+
+# リソース以外の参照の接頭辞
+_NON_RESOURCE_PREFIXES = ("var.", "local.", "module.", "count.", "each.", "path.", "terraform.", "self.")
+
+
+class PlannedResource(NamedTuple):
+    """プラン・ステートのリソースのインスタンス"""
+
+    address: str  # aws_subnet.public[0]、module.x.aws_vpc.main など
+    mode: str  # managed または data
+    type: str
+    name: str
+    index: Optional[Union[int, str]]  # count の添字または for_each のキー
+    module: Optional[str]  # モジュールのアドレス（ルートモジュールはNone）
+    values: Dict[str, Any]  # 属性の値（apply まで決まらない値は記号的な値）
+    unknown: FrozenSet[str]  # apply まで決まらない最上位の属性
+    actions: Tuple[str, ...]  # プランの操作（create、update など。ステートの場合は空）
+
+    @property
+    def resource_address(self) -> str:
+        """添字を除いたアドレス"""
+        return self.address.split("[", 1)[0] if self.index is not None else self.address
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        """タグ（プロバイダーの default_tags を含む tags_all を優先する）"""
+        tags = self.values.get("tags_all")
+        if not isinstance(tags, dict):
+            tags = self.values.get("tags")
+        return tags if isinstance(tags, dict) else {}
+
+
+def symbolic_value(address: str, attribute: str) -> str:
+    """
+    apply まで決まらない値の記号的な値
+
+    Args:
+        address: インスタンスのアドレス
+        attribute: 属性名
+
+    Returns:
+        id の場合はアドレス、それ以外は "アドレス.属性"
+    """
+    return address if attribute == "id" else f"{address}.{attribute}"
+
+
+class ResourceIndex:
+    """
+    リソースのインスタンスの索引（アドレス・種類・タグ）
+
+    使用例:
+        index = ResourceIndex.from_plan_file(Path("tfplan"), Path("terraform"))
+        vpc = index.find("aws_vpc", Name="client-vpn-vpc")[0]
+        subnets = index.find("aws_subnet", Type="Private")
+        assert all(subnet.values["vpc_id"] == vpc.values["id"] for subnet in subnets)
+    """
+
+    def __init__(self, resources: List[PlannedResource]):
+        """
+        Args:
+            resources: リソースのインスタンス
+        """
+        self._by_address: Dict[str, PlannedResource] = {}
+        self._by_type: Dict[str, List[PlannedResource]] = defaultdict(list)
+        self._by_tag: Dict[Tuple[str, str], List[PlannedResource]] = defaultdict(list)
+        for resource in resources:
+            self._by_address[resource.address] = resource
+            self._by_type[resource.type].append(resource)
+            for key, value in resource.tags.items():
+                self._by_tag[(key, value)].append(resource)
+
+    @classmethod
+    def from_json(cls, document: Dict[str, Any]) -> "ResourceIndex":
+        """
+        terraform show -json の出力（プランまたはステート）から索引を作る
+
+        Args:
+            document: JSONを読み込んだ辞書
+
+        Raises:
+            ValueError: プラン・ステートの形式ではない場合
+        """
+        if "planned_values" in document:
+            return cls(list(_PlanReader(document).resources()))
+        if "values" in document:
+            return cls(list(_iter_module((document.get("values") or {}).get("root_module", {}), {}, {})))
+        raise ValueError("terraform show -json の出力（planned_values または values）ではありません")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "ResourceIndex":
+        """
+        terraform show -json の出力を保存したファイルから索引を作る
+
+        Raises:
+            OSError: ファイルを読み込めない場合
+            ValueError: JSON・プラン・ステートの形式ではない場合
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+    @classmethod
+    def from_plan_file(
+        cls, plan_file: Union[str, Path], working_dir: Union[str, Path], terraform: str = "terraform"
+    ) -> "ResourceIndex":
+        """
+        保存したプランを terraform show -json で1回だけ変換して索引を作る
+
+        Args:
+            plan_file: terraform plan -out で保存したプラン
+            working_dir: terraform init 済みのディレクトリ
+            terraform: terraform コマンド
+
+        Raises:
+            subprocess.CalledProcessError: terraform show が失敗した場合
+        """
+        result = subprocess.run(
+            [terraform, "show", "-json", str(Path(plan_file).resolve())],
+            cwd=str(working_dir),
+            capture_output=True,
+            check=True,
+        )
+        return cls.from_json(json.loads(result.stdout))
+
+    def __len__(self) -> int:
+        return len(self._by_address)
+
+    def __iter__(self) -> Iterator[PlannedResource]:
+        return iter(self._by_address.values())
+
+    def __contains__(self, address: str) -> bool:
+        return address in self._by_address
+
+    def get(self, address: str) -> Optional[PlannedResource]:
+        """アドレスのインスタンスを返す（ない場合はNone）"""
+        return self._by_address.get(address)
+
+    def by_type(self, resource_type: str) -> List[PlannedResource]:
+        """種類のインスタンスを返す"""
+        return list(self._by_type.get(resource_type, ()))
+
+    def by_tag(self, key: str, value: str) -> List[PlannedResource]:
+        """タグ key = value を持つインスタンスを返す"""
+        return list(self._by_tag.get((key, value), ()))
+
+    def find(self, resource_type: Optional[str] = None, **tags: str) -> List[PlannedResource]:
+        """
+        種類とタグがすべて一致するインスタンスを返す
+
+        Args:
+            resource_type: 種類（省略時はすべて）
+            **tags: タグの値
+
+        Returns:
+            インスタンス（索引に追加した順）
+        """
+        if tags:
+            key, value = next(iter(tags.items()))
+            candidates = self._by_tag.get((key, value), ())
+        elif resource_type is not None:
+            candidates = self._by_type.get(resource_type, ())
+        else:
+            candidates = self._by_address.values()
+        return [
+            resource for resource in candidates
+            if (resource_type is None or resource.type == resource_type)
+            and all(resource.tags.get(key) == value for key, value in tags.items())
+        ]
+
+
+def _iter_module(
+    module: Dict[str, Any],
+    unknowns: Dict[str, Any],
+    actions: Dict[str, Tuple[str, ...]],
+    resolver: Optional["_PlanReader"] = None,
+) -> Iterator[PlannedResource]:
+    """planned_values・values のモジュール（子モジュールを含む）のインスタンスを列挙する"""
+    for item in module.get("resources", []):
+        address = item["address"]
+        values = dict(item.get("values") or {})
+        after_unknown = unknowns.get(address) or {}
+        if resolver is not None and after_unknown:
+            values = resolver.fill_unknown(item, values, after_unknown)
+        yield PlannedResource(
+            address=address,
+            mode=item.get("mode", "managed"),
+            type=item["type"],
+            name=item["name"],
+            index=item.get("index"),
+            module=module.get("address"),
+            values=values,
+            unknown=frozenset(key for key, flag in after_unknown.items() if flag is True),
+            actions=actions.get(address, ()),
+        )
+    for child in module.get("child_modules", []):
+        yield from _iter_module(child, unknowns, actions, resolver)
+
+
+class _PlanReader:
+    """プランJSONのインスタンスを列挙し、apply まで決まらない値を構成の参照から補う"""
+
+    def __init__(self, document: Dict[str, Any]):
+        self.document = document
+        self.unknowns: Dict[str, Any] = {}
+        self.actions: Dict[str, Tuple[str, ...]] = {}
+        for change in document.get("resource_changes", []):
+            self.unknowns[change["address"]] = change.get("change", {}).get("after_unknown") or {}
+            self.actions[change["address"]] = tuple(change.get("change", {}).get("actions", ()))
+
+        # ルートモジュールの構成の式（リソースのアドレス → 属性 → 式）
+        root = document.get("configuration", {}).get("root_module", {})
+        self.expressions: Dict[str, Dict[str, Any]] = {
+            resource["address"]: resource.get("expressions", {})
+            for resource in root.get("resources", [])
+        }
+        # 添字を除いたアドレス → インスタンスの添字
+        self.instances: Dict[str, List[Optional[Union[int, str]]]] = defaultdict(list)
+        self.known: Dict[str, Dict[str, Any]] = {}
+
+    def resources(self) -> Iterator[PlannedResource]:
+        planned = self.document.get("planned_values", {}).get("root_module", {})
+        # プラン時に読み込んだデータソースは prior_state にのみ含まれる
+        prior = (self.document.get("prior_state") or {}).get("values", {}).get("root_module", {})
+        prior_data = {
+            "resources": [r for r in prior.get("resources", []) if r.get("mode") == "data"],
+        }
+        modules = [planned, prior_data]
+
+        # 参照の解決に使うため、先にすべてのインスタンスの添字と決まっている値を集める
+        for module in modules:
+            for item in _iter_items(module):
+                self.instances[_resource_address(item)].append(item.get("index"))
+                self.known[item["address"]] = item.get("values") or {}
+
+        seen = set()
+        for module in modules:
+            for resource in _iter_module(module, self.unknowns, self.actions, self):
+                if resource.address not in seen:
+                    seen.add(resource.address)
+                    yield resource
+
+    def fill_unknown(self, item: Dict[str, Any], values: Dict[str, Any], after_unknown: Dict[str, Any]) -> Dict[str, Any]:
+        """after_unknown で true の値を、構成の参照先の値または記号的な値にする"""
+        expressions = self.expressions.get(_resource_address(item), {})
+        return _fill(values, after_unknown, expressions, (), item, self)
+
+    def resolve(self, item: Dict[str, Any], path: Tuple[PathElement, ...], expression: Any) -> Any:
+        """apply まで決まらない値（path）を、式の参照先の値または記号的な値にする"""
+        references = expression.get("references", []) if isinstance(expression, dict) else []
+        index = item.get("index")
+        for reference in references:
+            if reference.startswith(_NON_RESOURCE_PREFIXES):
+                continue
+            match = _REFERENCE.match(reference)
+            if not match or not match.group("attribute"):
+                continue
+            target = self._target_instance(match.group("resource"), match.group("index"), index, references)
+            if target is None:
+                continue
+            attribute = match.group("attribute")
+            known = self.known.get(target, {}).get(attribute)
+            return known if known is not None else symbolic_value(target, attribute)
+        # 自身の属性（id など）
+        return symbolic_value(item["address"], ".".join(str(element) for element in path))
+
+    def _target_instance(self, resource: str, reference_index: Optional[str], own_index: Any,
+                         references: List[str]) -> Optional[str]:
+        """参照先のインスタンスのアドレスを決める（決められない場合はNone）"""
+        indexes = self.instances.get(resource)
+        if not indexes:
+            return None
+        if reference_index in ("count.index", "each.key"):
+            # aws_eip.nat[count.index] は自身と同じ添字のインスタンス
+            return f"{resource}[{json.dumps(own_index)}]" if own_index in indexes else None
+        if reference_index is not None:
+            return f"{resource}[{reference_index}]"
+        if indexes == [None]:
+            return resource
+        # aws_subnet.public[count.index] のような参照は自身と同じ添字のインスタンスとする
+        if ("count.index" in references or "each.key" in references) and own_index in indexes:
+            return f"{resource}[{json.dumps(own_index)}]"
+        if len(indexes) == 1:
+            return f"{resource}[{json.dumps(indexes[0])}]"
+        return None
+
+
+def _resource_address(item: Dict[str, Any]) -> str:
+    """インスタンスのアドレスから添字を除く"""
+    return item["address"].split("[", 1)[0] if item.get("index") is not None else item["address"]
+
+
+def _iter_items(module: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield from module.get("resources", [])
+    for child in module.get("child_modules", []):
+        yield from _iter_items(child)
+
+
+def _fill(value: Any, unknown: Any, expressions: Any, path: Tuple[PathElement, ...],
+          item: Dict[str, Any], reader: _PlanReader) -> Any:
+    """after_unknown の構造に沿って、決まらない値を補った値を返す"""
+    if unknown is True:
+        return reader.resolve(item, path, expressions)
+    if isinstance(unknown, dict):
+        result = dict(value) if isinstance(value, dict) else {}
+        for key, flag in unknown.items():
+            if flag is False:
+                continue
+            child_expressions = expressions.get(key) if isinstance(expressions, dict) else None
+            result[key] = _fill(result.get(key), flag, child_expressions, path + (key,), item, reader)
+        return result
+    if isinstance(unknown, list):
+        result = list(value) if isinstance(value, list) else []
+        result.extend([None] * (len(unknown) - len(result)))
+        for position, flag in enumerate(unknown):
+            if flag is False:
+                continue
+            # 入れ子のブロックの式はブロックごとのリスト、リスト属性の式は属性全体の1つ
+            if isinstance(expressions, list):
+                child_expressions = expressions[position] if position < len(expressions) else None
+            else:
+                child_expressions = expressions
+            result[position] = _fill(result[position], flag, child_expressions, path + (position,), item, reader)
+        return result
+    return value